@@ -1,4 +1,6 @@
+import os
 import shutil
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -17,6 +19,11 @@ from app.log import logger
 from app.schemas import NotificationType
 from app.helper.downloader import DownloaderHelper
 
+from .tracker_collector import TrackerCollector
+from .torrent_fields import field_resolver, FieldReadTimeout
+from .path_index import ContentPathIndex, DirSizeCache
+from .torrent_actions import TorrentActionPlan, execute_plan, ACTION_DELETE, ACTION_LABEL
+
 class CleanInvalidSeed(_PluginBase):
     # 插件名称
     plugin_name = "清理无效做种"
@@ -25,7 +32,7 @@ class CleanInvalidSeed(_PluginBase):
     # 插件图标
     plugin_icon = "clean_a.png"
     # 插件版本
-    plugin_version = "2.1"
+    plugin_version = "2.5"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -57,6 +64,7 @@ class CleanInvalidSeed(_PluginBase):
     _exclude_labels = ""
     _more_logs = False
     _min_seeding_days = 0  # 最小做种天数，0表示不限制
+    _incremental_detect = False  # 增量检测无效源文件
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
     _error_msg = [
@@ -67,6 +75,19 @@ class CleanInvalidSeed(_PluginBase):
         "Torrent not exists",
     ]
     _custom_error_msg = ""
+    # 获取Transmission tracker信息时读取的种子属性
+    TRANSMISSION_TRACKER_FIELDS = (
+        "name", "error", "errorString", "error_string",
+        "trackerStats", "tracker_stats", "trackers", "trackerList",
+    )
+    # 未完成的失效种子处理计划数据库键名
+    PENDING_ACTIONS_KEY = "pending_torrent_actions"
+    # 增量检测无效源文件的状态数据库键名
+    DETECT_STATE_KEY = "detect_invalid_files_state"
+    # 检测无效源文件时读取的种子属性
+    CONTENT_PATH_FIELDS = ("content_path", "downloadDir", "download_dir", "hashString", "trackerStats", "name")
+    # 批量读取种子属性的最短截止时间（秒）
+    CONTENT_PATH_TIMEOUT = 30
 
     def init_plugin(self, config: dict = None):
         self.downloader_helper = DownloaderHelper()
@@ -90,6 +111,7 @@ class CleanInvalidSeed(_PluginBase):
             self._exclude_labels = config.get("exclude_labels")
             self._custom_error_msg = config.get("custom_error_msg")
             self._more_logs = config.get("more_logs")
+            self._incremental_detect = config.get("incremental_detect")
             self._downloaders = config.get("downloaders")
             # 确保最小做种天数是整数类型
             min_seeding_days_raw = config.get("min_seeding_days", 0)
@@ -143,6 +165,7 @@ class CleanInvalidSeed(_PluginBase):
                 "more_logs": self._more_logs,
                 "downloaders": self._downloaders,
                 "min_seeding_days": self._min_seeding_days,
+                "incremental_detect": self._incremental_detect,
             }
         )
 
@@ -385,12 +408,14 @@ class CleanInvalidSeed(_PluginBase):
                 if hasattr(torrent, 'trackers') and torrent.trackers:
                     trackers = torrent.trackers
             elif downloader_type == "transmission":
+                # 一次读取需要的全部属性
+                fields = field_resolver.fields(torrent, self.TRANSMISSION_TRACKER_FIELDS, timeout=5)
                 # 首先检查Transmission的error和errorString属性
-                error_code = self.safe_getattr(torrent, 'error', 0, timeout=3)
-                error_string = self.safe_getattr(torrent, 'errorString', '', timeout=3)
+                error_code = fields.get('error', 0)
+                error_string = fields.get('errorString', '')
                 # 也检查error_string属性（下划线命名）
                 if not error_string:
-                    error_string = self.safe_getattr(torrent, 'error_string', '', timeout=3)
+                    error_string = fields.get('error_string', '')
 
                 if self._more_logs:
                     logger.debug(f"种子 [{getattr(torrent, 'name', 'Unknown')}] error_code: {error_code}, error_string: '{error_string}'")
@@ -399,8 +424,8 @@ class CleanInvalidSeed(_PluginBase):
                 if self._more_logs:
                     torrent_attrs = []
                     for attr in ['trackerStats', 'trackers', 'trackerList']:
-                        if self.safe_hasattr(torrent, attr, timeout=1):
-                            attr_value = self.safe_getattr(torrent, attr, None, timeout=2)
+                        if attr in fields:
+                            attr_value = fields.get(attr)
                             if attr_value is not None:
                                 if hasattr(attr_value, '__len__'):
                                     torrent_attrs.append(f"{attr}={type(attr_value).__name__}({len(attr_value)})")
@@ -418,17 +443,17 @@ class CleanInvalidSeed(_PluginBase):
                 if (error_code and error_code != 0) or (error_string and error_string.strip()):
                     # 尝试从trackerStats获取第一个tracker的URL，如果没有则使用默认值
                     tracker_url = "unknown"
-                    if self.safe_hasattr(torrent, 'trackerStats', timeout=2):
-                        tracker_stats = self.safe_getattr(torrent, 'trackerStats', [], timeout=3)
+                    if 'trackerStats' in fields:
+                        tracker_stats = fields.get('trackerStats', [])
                         if tracker_stats and len(tracker_stats) > 0:
                             tracker_url = tracker_stats[0].get("announce", "unknown")
-                    elif self.safe_hasattr(torrent, 'trackers', timeout=2):
+                    elif 'trackers' in fields:
                         # 有些Transmission版本可能也有trackers属性
-                        trackers_list = self.safe_getattr(torrent, 'trackers', [], timeout=3)
+                        trackers_list = fields.get('trackers', [])
                         tracker_url = trackers_list[0] if trackers_list else "unknown"
-                    elif self.safe_hasattr(torrent, 'trackerList', timeout=2):
+                    elif 'trackerList' in fields:
                         # 尝试trackerList属性
-                        tracker_list = self.safe_getattr(torrent, 'trackerList', [], timeout=3)
+                        tracker_list = fields.get('trackerList', [])
                         if tracker_list and len(tracker_list) > 0:
                             # trackerList可能是字符串列表
                             tracker_url = tracker_list[0] if isinstance(tracker_list[0], str) else tracker_list[0].get("announce", "unknown")
@@ -446,10 +471,10 @@ class CleanInvalidSeed(_PluginBase):
 
                 # 处理正常的trackerStats（尝试两种命名方式）
                 tracker_stats = None
-                if self.safe_hasattr(torrent, 'trackerStats', timeout=2):
-                    tracker_stats = self.safe_getattr(torrent, 'trackerStats', [], timeout=3)
-                elif self.safe_hasattr(torrent, 'tracker_stats', timeout=2):
-                    tracker_stats = self.safe_getattr(torrent, 'tracker_stats', [], timeout=3)
+                if 'trackerStats' in fields:
+                    tracker_stats = fields.get('trackerStats', [])
+                elif 'tracker_stats' in fields:
+                    tracker_stats = fields.get('tracker_stats', [])
 
                 if tracker_stats:
                     if self._more_logs:
@@ -520,8 +545,8 @@ class CleanInvalidSeed(_PluginBase):
                     logger.debug(f"种子 [{getattr(torrent, 'name', 'Unknown')}] 没有从trackerStats获取到tracker，尝试其他属性...")
 
                     # 尝试trackers属性 (Transmission的Tracker对象列表)
-                    if self.safe_hasattr(torrent, 'trackers', timeout=2):
-                        trackers_list = self.safe_getattr(torrent, 'trackers', [], timeout=3)
+                    if 'trackers' in fields:
+                        trackers_list = fields.get('trackers', [])
                         logger.debug(f"种子 [{getattr(torrent, 'name', 'Unknown')}] trackers: {trackers_list}")
                         if trackers_list:
                             for i, tracker_obj in enumerate(trackers_list):
@@ -562,8 +587,8 @@ class CleanInvalidSeed(_PluginBase):
                                     trackers.append(tracker_info)
 
                     # 尝试trackerList属性
-                    elif self.safe_hasattr(torrent, 'trackerList', timeout=2):
-                        tracker_list = self.safe_getattr(torrent, 'trackerList', [], timeout=3)
+                    elif 'trackerList' in fields:
+                        tracker_list = fields.get('trackerList', [])
                         logger.debug(f"种子 [{getattr(torrent, 'name', 'Unknown')}] trackerList: {tracker_list}")
                         if tracker_list:
                             for i, tracker_url in enumerate(tracker_list):
@@ -651,51 +676,98 @@ class CleanInvalidSeed(_PluginBase):
             return getattr(torrent, 'hashString', None)
         return None
 
-    def set_torrent_label(self, downloader_obj, downloader_type, torrent_hash, torrent, label):
+    def get_label_tags(self, downloader_type, torrent, label):
         """
-        设置种子标签，兼容qBittorrent和Transmission
+        获取给种子打上标签时需要设置的标签列表
         """
-        if downloader_type == "qbittorrent":
-            # qBittorrent使用set_torrents_tag方法
-            downloader_obj.set_torrents_tag(ids=torrent_hash, tags=[label])
-        elif downloader_type == "transmission":
+        if downloader_type == "transmission":
             # Transmission需要获取现有标签并追加新标签
             existing_labels = getattr(torrent, 'labels', [])
             existing_labels = [str(tag) for tag in existing_labels] if existing_labels else []
             if label not in existing_labels:
                 existing_labels.append(label)
-            downloader_obj.set_torrent_tag(ids=torrent_hash, tags=existing_labels)
+            return existing_labels
+        # qBittorrent是追加标签
+        return [label]
 
-    def safe_hasattr(self, obj, attr_name, timeout=3):
+    def set_torrent_label(self, downloader_obj, downloader_type, torrent_hash, torrent, label):
         """
-        安全检查对象是否有属性，带超时保护
+        设置种子标签，兼容qBittorrent和Transmission
         """
-        try:
-            import threading
-            result = [False]
-            exception = [None]
+        tags = self.get_label_tags(downloader_type, torrent, label)
+        return self.apply_torrent_action(downloader_obj, downloader_type, ACTION_LABEL, torrent_hash, tags)
 
-            def check_attr():
-                try:
-                    result[0] = hasattr(obj, attr_name)
-                except Exception as e:
-                    exception[0] = e
-
-            thread = threading.Thread(target=check_attr)
-            thread.daemon = True
-            thread.start()
-            thread.join(timeout)
+    @staticmethod
+    def apply_torrent_action(downloader_obj, downloader_type, action, torrent_hashes, tags=None):
+        """
+        对一批种子执行删除或设置标签，torrent_hashes可以是单个hash或hash列表
+        """
+        if action == ACTION_DELETE:
+            # 只删除种子不删除文件，以防其它站点辅种
+            return downloader_obj.delete_torrents(False, torrent_hashes)
+        if downloader_type == "qbittorrent":
+            # qBittorrent使用set_torrents_tag方法
+            return downloader_obj.set_torrents_tag(ids=torrent_hashes, tags=tags)
+        if downloader_type == "transmission":
+            return downloader_obj.set_torrent_tag(ids=torrent_hashes, tags=tags)
+        return False
 
-            if thread.is_alive():
-                logger.warning(f"检查属性 {attr_name} 超时 ({timeout}s)")
-                return False
+    def save_action_plan(self, plan: TorrentActionPlan):
+        """
+        保存下载器的处理计划，计划已全部完成时删除
+        """
+        plans = self.get_data(self.PENDING_ACTIONS_KEY) or {}
+        if len(plan):
+            plans[plan.downloader] = plan.to_dict()
+        else:
+            plans.pop(plan.downloader, None)
+        self.save_data(self.PENDING_ACTIONS_KEY, plans)
 
-            if exception[0]:
-                logger.error(f"检查属性 {attr_name} 时出错: {exception[0]}")
-                return False
+    def run_action_plan(self, plan: TorrentActionPlan, downloader_obj, downloader_type) -> Tuple[List[str], List[str]]:
+        """
+        保存并按批执行处理计划
+        :return: (处理成功的hash列表, 处理失败的hash列表)
+        """
+        if not len(plan):
+            return [], []
+        action_name = "删除" if plan.action == ACTION_DELETE else "标记"
+        logger.info(f"{plan.downloader} 开始批量{action_name} {len(plan)} 个失效种子")
+        self.save_action_plan(plan)
+        start = time.perf_counter()
+        done, failed = execute_plan(
+            plan,
+            apply=lambda hashes, tags: self.apply_torrent_action(
+                downloader_obj, downloader_type, plan.action, hashes, tags),
+            save=self.save_action_plan,
+        )
+        logger.info(f"{plan.downloader} 批量{action_name}完成: 成功 {len(done)} 个，失败 {len(failed)} 个，"
+                    f"耗时 {time.perf_counter() - start:.2f}s")
+        return done, failed
 
-            return result[0]
+    def resume_action_plan(self, downloader_name, downloader_obj, downloader_type):
+        """
+        继续处理上次任务中断时未完成的计划
+        """
+        plans = self.get_data(self.PENDING_ACTIONS_KEY) or {}
+        plan = TorrentActionPlan.from_dict(downloader_name, plans.get(downloader_name))
+        if not plan or not len(plan):
+            return
+        current_action = ACTION_LABEL if self._label_only else ACTION_DELETE if self._delete_invalid_torrents else None
+        if plan.action != current_action:
+            # 配置已变化，不再按旧计划处理
+            logger.info(f"{downloader_name} 存在 {plan.created} 未完成的处理计划，当前配置已变化，放弃该计划")
+            plan.items.clear()
+            self.save_action_plan(plan)
+            return
+        logger.info(f"{downloader_name} 继续处理 {plan.created} 中断的计划，剩余 {len(plan)} 个种子")
+        self.run_action_plan(plan, downloader_obj, downloader_type)
 
+    def safe_hasattr(self, obj, attr_name, timeout=3):
+        """
+        安全检查对象是否有属性，带超时保护
+        """
+        try:
+            return field_resolver.hasattr(obj, attr_name, timeout=timeout)
         except Exception as e:
             logger.error(f"安全检查属性 {attr_name} 时发生异常: {e}")
             return False
@@ -705,39 +777,11 @@ class CleanInvalidSeed(_PluginBase):
         安全获取对象属性，带超时保护
         """
         try:
-            # 使用简单的超时机制
-            import threading
-            result = [default]
-            exception = [None]
-
-            def get_attr():
-                try:
-                    if hasattr(obj, attr_name):
-                        result[0] = getattr(obj, attr_name)
-                except Exception as e:
-                    exception[0] = e
-
-            thread = threading.Thread(target=get_attr)
-            thread.daemon = True
-            thread.start()
-            thread.join(timeout)
-
-            if thread.is_alive():
-                logger.warning(f"获取属性 {attr_name} 超时 ({timeout}s)")
-                return default
-
-            if exception[0]:
-                logger.error(f"获取属性 {attr_name} 时出错: {exception[0]}")
-                return default
-
-            return result[0]
-
+            return field_resolver.getattr(obj, attr_name, default, timeout=timeout)
         except Exception as e:
             logger.error(f"安全获取属性 {attr_name} 时发生异常: {e}")
             return default
 
-
-
     def is_file_old_enough(self, file_path):
         """
         检查文件是否已经存在足够长时间
@@ -783,9 +827,18 @@ class CleanInvalidSeed(_PluginBase):
                 logger.error(f"{self.LOG_TAG} 获取下载器失败 {downloader_name}")
                 continue
             logger.info(f"开始清理 {downloader_name} ({downloader_type}) 无效做种...")
+            self.resume_action_plan(downloader_name, downloader_obj, downloader_type)
             logger.info(f"正在获取 {downloader_name} 的种子列表...")
             all_torrents = self.get_all_torrents(service)
             logger.info(f"获取到 {len(all_torrents)} 个种子，开始分析...")
+            # 批量获取tracker信息，本次任务内按hash缓存
+            tracker_collector = TrackerCollector(
+                downloader_type,
+                fetch=lambda torrent: self.get_tracker_info(torrent, downloader_type),
+                hash_of=lambda torrent: self.get_torrent_hash(torrent, downloader_type),
+            )
+            tracker_collector.collect(all_torrents)
+            logger.info(f"{downloader_name} {tracker_collector.summary()}")
             temp_invalid_torrents = []
             # tracker未工作，但暂时不能判定为失效做种，需人工判断
             tracker_not_working_torrents = []
@@ -816,7 +869,7 @@ class CleanInvalidSeed(_PluginBase):
                     logger.info(f"正在处理第 {processed_count}/{len(all_torrents)} 个种子...")
 
                 try:
-                    trackers = self.get_tracker_info(torrent, downloader_type)
+                    trackers = tracker_collector.get(torrent)
                     if self._more_logs:
                         logger.debug(f"种子 [{torrent.name}] 获取到 {len(trackers)} 个tracker信息")
 
@@ -900,8 +953,15 @@ class CleanInvalidSeed(_PluginBase):
             # 将invalid_torrents基本信息保存起来，在种子被删除后依然可以打印这些信息
             invalid_torrent_tuple_list = []
             deleted_torrent_tuple_list = []
+            # 先生成处理计划，筛选完成后再批量删除或标记
+            action_plan = TorrentActionPlan(
+                downloader_name,
+                ACTION_LABEL if self._label_only else ACTION_DELETE,
+                self._label if self._label != "" else "无效做种",
+            )
+            planned_torrent_tuples = {}
             for torrent in temp_invalid_torrents:
-                trackers = self.get_tracker_info(torrent, downloader_type)
+                trackers = tracker_collector.get(torrent)
                 for tracker in trackers:
                     if tracker.get("tier") == -1:
                         continue
@@ -941,22 +1001,17 @@ class CleanInvalidSeed(_PluginBase):
                                 if torrent_hash:
                                     if self._label_only:
                                         # 仅标记
-                                        self.set_torrent_label(downloader_obj, downloader_type, torrent_hash, torrent, self._label if self._label != "" else "无效做种")
+                                        action_plan.add(torrent_hash,
+                                                        self.get_label_tags(downloader_type, torrent, action_plan.label))
                                     else:
-                                        # 只删除种子不删除文件，以防其它站点辅种
-                                        downloader_obj.delete_torrents(False, torrent_hash)
-                                    # 标记已处理种子信息
-                                    deleted_torrent_tuple_list.append(
-                                            (
-                                                torrent.name,
-                                                torrent_category,
-                                                torrent_tags,
-                                                torrent_size,
-                                                tracker_domian,
-                                                tracker.get("msg", ""),
-                                            )
-                                        )
+                                        action_plan.add(torrent_hash)
+                                    planned_torrent_tuples[torrent_hash] = invalid_torrent_tuple_list[-1]
                         break
+            # 批量处理失效种子，只统计处理成功的种子
+            done_hashes, failed_hashes = self.run_action_plan(action_plan, downloader_obj, downloader_type)
+            deleted_torrent_tuple_list = [planned_torrent_tuples[torrent_hash] for torrent_hash in done_hashes]
+            if failed_hashes:
+                logger.error(f"{downloader_name} {len(failed_hashes)} 个失效种子处理失败，下次运行时重新检测")
             if len(invalid_torrent_tuple_list) > 0:
                 invalid_msg = f"🔍 检测到 {len(invalid_torrent_tuple_list)} 个失效做种\n"
             else:
@@ -1127,37 +1182,49 @@ class CleanInvalidSeed(_PluginBase):
         path_extracted_count = 0     # 成功提取路径的种子数
         total_torrents_count = len(all_torrents)
 
+        # 一次批量读取所有种子需要的属性，整批共用一个截止时间
+        try:
+            torrent_fields = field_resolver.fields_many(
+                all_torrents, self.CONTENT_PATH_FIELDS,
+                timeout=max(self.CONTENT_PATH_TIMEOUT, 0.005 * total_torrents_count)
+            )
+        except FieldReadTimeout as e:
+            # 未读取到的种子没有内容路径，继续检测会把它们的文件当作未做种文件删除
+            logger.error(f"{e}，本次跳过无效源文件检测")
+            self.post_message(
+                mtype=NotificationType.SiteMessage,
+                title=f"⚠️ 【检测无效源文件】",
+                text=f"读取种子信息超时，已读取 {e.done}/{total_torrents_count} 个种子，本次跳过检测，未删除任何文件",
+            )
+            return
         # 需要根据种子来源确定下载器类型，而不是假设所有种子来自同一个下载器
-        for i, torrent in enumerate(all_torrents):
-            if i % 100 == 0:  # 每100个种子输出一次进度
-                logger.info(f"正在处理第 {i+1}/{total_torrents_count} 个种子")
-
+        for fields in torrent_fields:
             # 根据种子属性判断下载器类型 - 使用更宽松的检测条件
             downloader_type = "unknown"
 
             # 检查是否为qBittorrent种子
-            if self.safe_hasattr(torrent, 'content_path', timeout=2):
+            if 'content_path' in fields:
                 downloader_type = "qbittorrent"
             # 检查是否为Transmission种子 - 使用更多可能的属性组合
-            elif self.safe_hasattr(torrent, 'downloadDir', timeout=2) or self.safe_hasattr(torrent, 'download_dir', timeout=2):
+            elif 'downloadDir' in fields or 'download_dir' in fields:
                 downloader_type = "transmission"
-            elif self.safe_hasattr(torrent, 'hashString', timeout=2):
+            elif 'hashString' in fields:
                 downloader_type = "transmission"
-            elif self.safe_hasattr(torrent, 'trackerStats', timeout=2):
+            elif 'trackerStats' in fields:
                 downloader_type = "transmission"
 
             # 获取种子内容路径，兼容qBittorrent和Transmission
             content_path = None
             if downloader_type == "qbittorrent":
-                content_path = self.safe_getattr(torrent, 'content_path', None, timeout=3)
+                content_path = fields.get('content_path')
             elif downloader_type == "transmission":
                 # Transmission可能使用不同的属性名
-                download_dir = self.safe_getattr(torrent, 'downloadDir', None, timeout=3)
+                download_dir = fields.get('downloadDir')
                 if download_dir is None:
-                    download_dir = self.safe_getattr(torrent, 'download_dir', None, timeout=3)
+                    download_dir = fields.get('download_dir')
 
                 if download_dir is not None:
-                    torrent_name = self.safe_getattr(torrent, 'name', None, timeout=2)
+                    torrent_name = fields.get('name')
                     if torrent_name is not None:
                         content_path = f"{download_dir}/{torrent_name}"
 
@@ -1169,6 +1236,16 @@ class CleanInvalidSeed(_PluginBase):
 
         filtered_files_count = 0  # 因时间不足被过滤的文件数
 
+        # 种子内容路径索引，按路径组件前缀匹配
+        content_index = ContentPathIndex(content_path_set)
+        # 增量模式：目录mtime和种子路径都未变化的下载目录沿用上次的检测结果
+        incremental = bool(self._incremental_detect)
+        detect_state = (self.get_data(self.DETECT_STATE_KEY) or {}) if incremental else {}
+        saved_dir_states = detect_state.get("dirs") or {}
+        dir_states = {}
+        size_cache = DirSizeCache(detect_state.get("sizes") if incremental else None)
+        reused_dirs = 0
+
         message = "检测未做种无效源文件：\n"
         for source_path_str in source_paths:
             source_path = Path(source_path_str)
@@ -1182,54 +1259,46 @@ class CleanInvalidSeed(_PluginBase):
                 )
                 continue
 
-            source_files = []
-            # 获取source_path下的所有文件包括文件夹
+            downloader_paths = source_path_map[source_path_str]
+            fingerprint = content_index.fingerprint(source_path_str, downloader_paths, exclude_key_words)
             try:
-                for file in source_path.iterdir():
-                    source_files.append(file)
-            except Exception as e:
-                logger.error(f"遍历目录 {source_path} 失败: {e}")
+                dir_mtime = source_path.stat().st_mtime_ns
+            except OSError as e:
+                logger.error(f"读取目录 {source_path} 信息失败: {e}")
                 continue
-
-            for i, source_file in enumerate(source_files):
-                if i % 50 == 0:  # 每50个文件输出一次进度
-                    logger.info(f"正在检测第 {i+1}/{len(source_files)} 个文件: {source_file.name}")
-                skip = False
-                for key_word in exclude_key_words:
-                    if key_word in source_file.name:
-                        skip = True
-                        break
-                if skip:
+            saved = saved_dir_states.get(source_path_str)
+            if incremental and saved and saved.get("mtime") == dir_mtime and saved.get("fingerprint") == fingerprint:
+                orphan_names = saved.get("orphans") or []
+                reused_dirs += 1
+                logger.info(f"目录 {source_path} 及种子列表自上次检测后未变化，沿用上次结果: {len(orphan_names)} 个未做种文件")
+            else:
+                orphan_names = self.__scan_orphans(source_path, downloader_paths, content_index, exclude_key_words)
+                if orphan_names is None:
                     continue
+            dir_states[source_path_str] = {"mtime": dir_mtime, "fingerprint": fingerprint, "orphans": orphan_names}
 
-                # 检查文件是否在任何一个映射的下载器路径中存在
-                is_exist = False
-                for downloader_path in source_path_map[source_path_str]:
-                    # 将mp_path替换成对应的downloader_path
-                    mapped_path = (str(source_file)).replace(source_path_str, downloader_path)
-
-                    # 检查是否在种子内容路径中存在
-                    for content_path in content_path_set:
-                        if mapped_path in content_path:
-                            is_exist = True
-                            break
-                    if is_exist:
-                        break
+            for name in orphan_names:
+                source_file = source_path / name
+                if not os.path.lexists(source_file):
+                    continue
+                # 检查文件是否已经存在足够长时间
+                if not self.is_file_old_enough(source_file):
+                    filtered_files_count += 1
+                    continue
 
-                if not is_exist:
-                    # 检查文件是否已经存在足够长时间
-                    if not self.is_file_old_enough(source_file):
-                        filtered_files_count += 1
-                        continue
+                deleted_file_cnt += 1
+                message += f"{deleted_file_cnt}. {str(source_file)}\n"
+                total_size += size_cache.size(source_file)
+                if self._delete_invalid_files:
+                    if source_file.is_file():
+                        source_file.unlink()
+                    elif source_file.is_dir():
+                        shutil.rmtree(source_file)
 
-                    deleted_file_cnt += 1
-                    message += f"{deleted_file_cnt}. {str(source_file)}\n"
-                    total_size += self.get_size(source_file)
-                    if self._delete_invalid_files:
-                        if source_file.is_file():
-                            source_file.unlink()
-                        elif source_file.is_dir():
-                            shutil.rmtree(source_file)
+        if incremental:
+            self.save_data(self.DETECT_STATE_KEY, {"dirs": dir_states, "sizes": size_cache.to_dict()})
+        logger.info(f"目录扫描完成: {len(source_paths)} 个下载目录，沿用上次结果 {reused_dirs} 个，"
+                    f"统计大小时遍历 {size_cache.walked} 个目录，复用 {size_cache.reused} 个目录的缓存")
 
         # 添加时间筛选统计信息
         min_days = int(self._min_seeding_days) if self._min_seeding_days is not None else 0
@@ -1263,15 +1332,32 @@ class CleanInvalidSeed(_PluginBase):
             )
         logger.info("检测无效源文件任务结束")
 
+    def __scan_orphans(self, source_path: Path, downloader_paths: List[str],
+                       content_index: ContentPathIndex, exclude_key_words: List[str]) -> Optional[List[str]]:
+        """
+        扫描下载目录下没有对应种子的文件和文件夹
+        :return: 文件名列表，遍历目录失败时返回None
+        """
+        try:
+            with os.scandir(source_path) as entries:
+                names = [entry.name for entry in entries]
+        except OSError as e:
+            logger.error(f"遍历目录 {source_path} 失败: {e}")
+            return None
+
+        orphan_names = []
+        for i, name in enumerate(names):
+            if i % 50 == 0:  # 每50个文件输出一次进度
+                logger.info(f"正在检测第 {i+1}/{len(names)} 个文件: {name}")
+            if any(key_word in name for key_word in exclude_key_words):
+                continue
+            # 检查文件是否在任何一个映射的下载器路径中存在
+            if not any(content_index.covers(f"{downloader_path}/{name}") for downloader_path in downloader_paths):
+                orphan_names.append(name)
+        return orphan_names
+
     def get_size(self, path: Path):
-        total_size = 0
-        if path.is_file():
-            return path.stat().st_size
-        # rglob 方法用于递归遍历所有文件和目录
-        for entry in path.rglob("*"):
-            if entry.is_file():
-                total_size += entry.stat().st_size
-        return total_size
+        return DirSizeCache().size(path)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
@@ -1495,7 +1581,7 @@ class CleanInvalidSeed(_PluginBase):
                         "content": [
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 4},
+                                "props": {"cols": 12, "md": 3},
                                 "content": [
                                     {
                                         "component": "VSwitch",
@@ -1508,7 +1594,7 @@ class CleanInvalidSeed(_PluginBase):
                             },
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 4},
+                                "props": {"cols": 12, "md": 3},
                                 "content": [
                                     {
                                         "component": "VSwitch",
@@ -1522,7 +1608,7 @@ class CleanInvalidSeed(_PluginBase):
                             },
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 4},
+                                "props": {"cols": 12, "md": 3},
                                 "content": [
                                     {
                                         "component": "VTextField",
@@ -1537,6 +1623,21 @@ class CleanInvalidSeed(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "incremental_detect",
+                                            "label": "增量检测",
+                                            "hint": "目录及种子未变化时沿用上次结果",
+                                            "persistent-hint": True,
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     # 目录映射配置
@@ -1716,6 +1817,7 @@ class CleanInvalidSeed(_PluginBase):
             "label": "",
             "more_logs": False,
             "min_seeding_days": 0,
+            "incremental_detect": False,
         }
 
     def get_page(self) -> List[dict]:
@@ -1731,5 +1833,6 @@ class CleanInvalidSeed(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            field_resolver.shutdown()
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
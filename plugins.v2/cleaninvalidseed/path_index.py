@@ -0,0 +1,118 @@
+"""
+无效源文件检测用的路径索引和目录大小统计
+- ContentPathIndex: 种子内容路径及其所有上级目录的集合，判断某个路径下是否有种子只需一次哈希查找
+- DirSizeCache: 基于 os.scandir 的目录大小统计，按目录mtime缓存，可在多次运行之间持久化
+"""
+import hashlib
+import os
+import posixpath
+from typing import Any, Dict, Iterable, Optional
+
+
+def normalize_path(path: Any) -> str:
+    """
+    统一路径格式：反斜杠转为斜杠，去掉多余的分隔符和末尾的斜杠
+    """
+    path = str(path).replace("\\", "/")
+    if not path:
+        return path
+    normalized = posixpath.normpath(path)
+    # normpath 保留开头的双斜杠，统一为单个
+    if normalized.startswith("//"):
+        normalized = "/" + normalized.lstrip("/")
+    return normalized
+
+
+class ContentPathIndex:
+    """种子内容路径索引，按路径组件做前缀匹配"""
+
+    def __init__(self, content_paths: Iterable[Any]):
+        self.paths = set()
+        self._covered = set()
+        for content_path in content_paths:
+            if not content_path:
+                continue
+            path = normalize_path(content_path)
+            if path in self.paths:
+                continue
+            self.paths.add(path)
+            # 记录所有上级目录，遇到已记录的目录说明更上层也已记录
+            while path and path not in self._covered:
+                self._covered.add(path)
+                parent = posixpath.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def covers(self, path: Any) -> bool:
+        """路径本身是种子内容路径，或其下有种子内容路径"""
+        return normalize_path(path) in self._covered
+
+    def fingerprint(self, *extra: Any) -> str:
+        """索引内容的摘要，内容路径或附加的配置变化时摘要随之变化"""
+        digest = hashlib.sha1()
+        for path in sorted(self.paths):
+            digest.update(path.encode("utf-8", "surrogateescape"))
+            digest.update(b"\0")
+        for item in extra:
+            digest.update(repr(item).encode("utf-8", "surrogateescape"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+class DirSizeCache:
+    """
+    目录大小统计，一次 scandir 遍历得到目录下所有文件的总大小
+    目录的mtime未变化时直接使用上次的结果
+    """
+
+    def __init__(self, cached: Optional[Dict[str, Any]] = None):
+        # 路径 -> [mtime_ns, 大小]
+        self._cache: Dict[str, list] = dict(cached or {})
+        self._used: Dict[str, list] = {}
+        self.walked = 0
+        self.reused = 0
+
+    def size(self, path: Any) -> int:
+        path = str(path)
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return 0
+        if not os.path.isdir(path) or os.path.islink(path):
+            return stat.st_size
+        cached = self._cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns:
+            self.reused += 1
+            total = cached[1]
+        else:
+            self.walked += 1
+            total = self._walk(path)
+        self._used[path] = [stat.st_mtime_ns, total]
+        return total
+
+    @staticmethod
+    def _walk(root: str) -> int:
+        total = 0
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                total += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return total
+
+    def to_dict(self) -> Dict[str, list]:
+        """本次用到的目录大小，用于持久化，不再存在的目录自然淘汰"""
+        return dict(self._used)
@@ -0,0 +1,121 @@
+"""
+批量删除/标记失效种子
+原来第二轮筛选中每个失效种子单独调用一次删除或设置标签，tracker关站时会有成百上千次顺序请求。
+这里先生成处理计划并保存，再按批调用下载器接口：
+- qBittorrent和Transmission的删除、设置标签接口都支持一次传入多个hash
+- 每批失败后重试，仍失败的种子记录下来，不影响其它批次
+- 每完成一批更新保存的计划，任务中断后下次运行可以继续处理剩余的种子
+"""
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.log import logger
+
+# 每批处理的种子数，qBittorrent的hash以|拼接放在请求中，避免请求过长
+ACTION_BATCH_SIZE = 100
+# 每批失败后的重试次数
+ACTION_RETRIES = 2
+# 重试间隔（秒），每次重试翻倍
+ACTION_RETRY_DELAY = 1.0
+
+ACTION_DELETE = "delete"
+ACTION_LABEL = "label"
+
+
+class TorrentActionPlan:
+    """一个下载器的失效种子处理计划"""
+
+    def __init__(self, downloader: str, action: str, label: str = "",
+                 items: Optional[Dict[str, Optional[List[str]]]] = None, created: Optional[str] = None):
+        """
+        :param downloader: 下载器名称
+        :param action: delete 或 label
+        :param label: 标记失效种子使用的标签
+        :param items: 种子hash -> 需要设置的完整标签列表，删除时为None
+        """
+        self.downloader = downloader
+        self.action = action
+        self.label = label
+        self.items: Dict[str, Optional[List[str]]] = dict(items or {})
+        self.created = created or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, torrent_hash: str, tags: Optional[List[str]] = None):
+        self.items[torrent_hash] = list(tags) if tags is not None else None
+
+    def batches(self, batch_size: int = ACTION_BATCH_SIZE) -> List[Tuple[Optional[List[str]], List[str]]]:
+        """
+        按需要设置的标签分组后再按批大小切分
+        :return: [(标签列表, hash列表)]
+        """
+        groups: Dict[Optional[Tuple[str, ...]], List[str]] = {}
+        for torrent_hash, tags in self.items.items():
+            groups.setdefault(tuple(tags) if tags is not None else None, []).append(torrent_hash)
+        batches = []
+        for tags, hashes in groups.items():
+            for start in range(0, len(hashes), max(1, batch_size)):
+                batches.append((list(tags) if tags is not None else None, hashes[start:start + batch_size]))
+        return batches
+
+    def mark_done(self, hashes: Sequence[str]):
+        for torrent_hash in hashes:
+            self.items.pop(torrent_hash, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "action": self.action,
+            "label": self.label,
+            "items": self.items,
+            "created": self.created,
+        }
+
+    @classmethod
+    def from_dict(cls, downloader: str, data: Dict[str, Any]) -> Optional["TorrentActionPlan"]:
+        if not isinstance(data, dict) or data.get("action") not in (ACTION_DELETE, ACTION_LABEL):
+            return None
+        return cls(downloader, data["action"], data.get("label") or "", data.get("items") or {}, data.get("created"))
+
+
+def execute_plan(plan: TorrentActionPlan,
+                 apply: Callable[[List[str], Optional[List[str]]], Any],
+                 save: Optional[Callable[[TorrentActionPlan], None]] = None,
+                 batch_size: int = ACTION_BATCH_SIZE,
+                 retries: int = ACTION_RETRIES,
+                 retry_delay: float = ACTION_RETRY_DELAY,
+                 sleep: Callable[[float], None] = time.sleep) -> Tuple[List[str], List[str]]:
+    """
+    按批执行处理计划
+    :param apply: 处理一批种子的函数，参数为hash列表和标签列表，返回False或抛出异常视为失败
+    :param save: 每完成一批后保存剩余计划的函数
+    :return: (处理成功的hash列表, 处理失败的hash列表)
+    """
+    done: List[str] = []
+    failed: List[str] = []
+    batches = plan.batches(batch_size)
+    for index, (tags, hashes) in enumerate(batches, 1):
+        succeeded = False
+        for attempt in range(retries + 1):
+            try:
+                succeeded = apply(hashes, tags) is not False
+            except Exception as e:
+                logger.error(f"{plan.downloader} 第 {index}/{len(batches)} 批 ({len(hashes)} 个种子) 处理出错: {e}")
+                succeeded = False
+            if succeeded:
+                break
+            if attempt < retries:
+                delay = retry_delay * (2 ** attempt)
+                logger.warning(f"{plan.downloader} 第 {index}/{len(batches)} 批处理失败，{delay:.1f}秒后重试")
+                sleep(delay)
+        if succeeded:
+            done.extend(hashes)
+        else:
+            failed.extend(hashes)
+            logger.error(f"{plan.downloader} 第 {index}/{len(batches)} 批重试 {retries} 次后仍失败，跳过 {len(hashes)} 个种子")
+        # 失败的种子也从计划中移除，留到下次检测时重新判定
+        plan.mark_done(hashes)
+        if save:
+            save(plan)
+    return done, failed
@@ -0,0 +1,180 @@
+"""
+带超时保护的种子属性读取
+原来每读取一个属性就新建一个线程来做超时保护，检测大量种子时会创建数十万个短命线程。
+这里改为：
+- 所有超时保护的读取共用一个小线程池
+- 一次读取一个种子需要的全部属性（或一批种子），整批只有一个截止时间
+- 读取超时后丢弃该线程池，卡住的线程不会让后续读取排队等待
+"""
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.log import logger
+
+# 共享线程池大小
+FIELD_RESOLVER_WORKERS = 2
+
+_MISSING = object()
+
+
+class FieldReadTimeout(TimeoutError):
+    """批量读取未在截止时间内完成"""
+
+    def __init__(self, partial: List[Dict[str, Any]], done: int, timeout: float):
+        super().__init__(f"批量获取种子属性超时 ({timeout}s)，已获取 {done}/{len(partial)} 个")
+        # 与输入顺序一致的结果，未读取的对象为空字典
+        self.partial = partial
+        self.done = done
+        self.timeout = timeout
+
+
+def read_fields(obj, names: Iterable[str]) -> Dict[str, Any]:
+    """
+    读取对象的多个属性，不存在或读取出错的属性不出现在结果中
+    """
+    fields = {}
+    for name in names:
+        try:
+            value = getattr(obj, name, _MISSING)
+        except Exception as e:
+            # 不同版本的客户端库字段不同，未请求的字段可能抛出KeyError等异常
+            logger.debug(f"获取属性 {name} 时出错: {e}")
+            continue
+        if value is not _MISSING:
+            fields[name] = value
+    return fields
+
+
+class _DaemonPool:
+    """
+    守护线程组成的线程池，读取卡住的线程不会阻止进程退出
+    （ThreadPoolExecutor的线程在退出时会被等待）
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        self._queue.put((future, fn, args))
+        # 有空闲线程时交给它执行，否则在上限内新建线程
+        if not self._idle.acquire(timeout=0):
+            with self._lock:
+                if self._threads < self.max_workers:
+                    self._threads += 1
+                    threading.Thread(target=self._work, daemon=True,
+                                     name=f"{self.name}-{self._threads}").start()
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._idle.release()
+
+    def shutdown(self):
+        """已排队的任务执行完后空闲线程退出，卡住的线程随进程结束"""
+        with self._lock:
+            for _ in range(self._threads):
+                self._queue.put(None)
+
+
+class FieldResolver:
+    """共用线程池的属性读取器"""
+
+    def __init__(self, max_workers: int = FIELD_RESOLVER_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[_DaemonPool] = None
+        self._lock = threading.Lock()
+        self.abandoned = 0
+
+    def _submit(self, fn, *args):
+        """
+        :return: (线程池, Future)
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = _DaemonPool(self.max_workers, "cleaninvalidseed-fields")
+            pool = self._pool
+        return pool, pool.submit(fn, *args)
+
+    def _abandon(self, pool: _DaemonPool):
+        """读取超时的线程可能一直卡住，丢弃它所在的线程池，后续读取使用新的线程"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.abandoned += 1
+        pool.shutdown()
+
+    def fields(self, obj, names: Sequence[str], timeout: float = 5) -> Dict[str, Any]:
+        """
+        读取一个对象的多个属性
+        :return: 属性名 -> 值，超时时返回空字典
+        """
+        pool, future = self._submit(read_fields, obj, names)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self._abandon(pool)
+            logger.warning(f"获取属性 {', '.join(names)} 超时 ({timeout}s)")
+            return {}
+
+    def fields_many(self, objs: Sequence[Any], names: Sequence[str], timeout: float) -> List[Dict[str, Any]]:
+        """
+        批量读取多个对象的属性，整批共用一个截止时间
+        :return: 与objs顺序一致的属性字典列表
+        :raises FieldReadTimeout: 截止时间内没有全部读取完成，异常中带有已读取的部分结果
+        """
+        results: List[Dict[str, Any]] = [{} for _ in objs]
+        cancelled = threading.Event()
+        progress = [0]
+
+        def read_all():
+            for index, obj in enumerate(objs):
+                if cancelled.is_set():
+                    return index
+                results[index] = read_fields(obj, names)
+                progress[0] = index + 1
+            return len(objs)
+
+        pool, future = self._submit(read_all)
+        try:
+            future.result(timeout)
+        except FutureTimeoutError:
+            cancelled.set()
+            self._abandon(pool)
+            error = FieldReadTimeout(results, progress[0], timeout)
+            logger.warning(str(error))
+            raise error
+        return results
+
+    def hasattr(self, obj, name: str, timeout: float = 3) -> bool:
+        return name in self.fields(obj, (name,), timeout)
+
+    def getattr(self, obj, name: str, default=None, timeout: float = 5):
+        return self.fields(obj, (name,), timeout).get(name, default)
+
+    def shutdown(self):
+        """停止线程池，下次使用时重新创建"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown()
+
+
+field_resolver = FieldResolver()
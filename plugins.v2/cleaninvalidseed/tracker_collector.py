@@ -0,0 +1,109 @@
+"""
+批量获取种子tracker信息
+qBittorrent的 torrent.trackers 每个种子都是一次单独的HTTP请求，这里：
+- torrents/info 中 tracker 字段非空的种子（当前有正常工作的tracker）直接判定，不再请求
+- 其余种子用有界线程池并发请求，线程数不超过下载器连接池大小
+- 一次清理任务内按hash缓存结果，第二轮筛选不再重复获取
+Transmission的tracker信息已包含在种子列表中，只做缓存。
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.log import logger
+
+# 并发请求tracker的线程数，qbittorrent-api底层requests连接池默认每个主机10个连接
+TRACKER_FETCH_WORKERS = 8
+# 每完成多少个种子输出一次进度
+PROGRESS_INTERVAL = 500
+
+
+class TrackerCollector:
+    """一次清理任务内的tracker信息收集器"""
+
+    def __init__(self,
+                 downloader_type: str,
+                 fetch: Callable[[Any], List[dict]],
+                 hash_of: Callable[[Any], Optional[str]],
+                 max_workers: int = TRACKER_FETCH_WORKERS):
+        """
+        :param downloader_type: qbittorrent 或 transmission
+        :param fetch: 获取单个种子tracker信息的函数
+        :param hash_of: 获取种子hash的函数
+        :param max_workers: 并发请求的线程数
+        """
+        self.downloader_type = downloader_type
+        self._fetch = fetch
+        self._hash_of = hash_of
+        self.max_workers = max(1, max_workers)
+        self._cache: Dict[str, List[dict]] = {}
+        self.from_info = 0
+        self.fetched = 0
+        self.elapsed = 0.0
+
+    def _key(self, torrent) -> str:
+        return self._hash_of(torrent) or str(id(torrent))
+
+    def _from_info(self, torrent) -> Optional[List[dict]]:
+        """
+        qBittorrent的 torrents/info 返回当前工作的tracker，非空说明至少有一个tracker正常
+        """
+        if self.downloader_type != "qbittorrent" or not hasattr(torrent, "get"):
+            return None
+        tracker = torrent.get("tracker")
+        if not tracker:
+            return None
+        return [{"url": tracker, "status": 2, "msg": "", "tier": 0}]
+
+    def collect(self, torrents: Iterable[Any]):
+        """
+        批量获取种子的tracker信息
+        """
+        start = time.perf_counter()
+        pending = []
+        for torrent in torrents:
+            key = self._key(torrent)
+            if key in self._cache:
+                continue
+            trackers = self._from_info(torrent)
+            if trackers is not None:
+                self._cache[key] = trackers
+                self.from_info += 1
+            else:
+                pending.append((key, torrent))
+
+        if pending:
+            if self.downloader_type == "qbittorrent" and len(pending) > 1:
+                logger.info(f"并发获取 {len(pending)} 个种子的tracker信息，线程数 {self.max_workers}")
+                with ThreadPoolExecutor(max_workers=self.max_workers,
+                                        thread_name_prefix="cleaninvalidseed-tracker") as executor:
+                    results = executor.map(lambda item: self._fetch(item[1]), pending)
+                    for index, ((key, _), trackers) in enumerate(zip(pending, results), 1):
+                        self._cache[key] = trackers
+                        if index % PROGRESS_INTERVAL == 0:
+                            logger.info(f"已获取 {index}/{len(pending)} 个种子的tracker信息")
+            else:
+                for key, torrent in pending:
+                    self._cache[key] = self._fetch(torrent)
+            self.fetched += len(pending)
+        self.elapsed += time.perf_counter() - start
+
+    def get(self, torrent) -> List[dict]:
+        """
+        获取种子的tracker信息，未收集过的种子单独获取并缓存
+        """
+        key = self._key(torrent)
+        trackers = self._cache.get(key)
+        if trackers is None:
+            trackers = self._cache[key] = self._fetch(torrent)
+            self.fetched += 1
+        return trackers
+
+    @property
+    def total(self) -> int:
+        return len(self._cache)
+
+    def summary(self) -> str:
+        rate = self.total / self.elapsed if self.elapsed > 0 else 0
+        return (f"tracker信息获取完成: {self.total} 个种子，{self.from_info} 个由种子列表直接判定，"
+                f"{self.fetched} 个单独请求，耗时 {self.elapsed:.2f}s，{rate:.0f} 个种子/秒")
@@ -3,7 +3,6 @@ import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
-from xml.dom import minidom
 import platform
 import threading
 import json
@@ -15,6 +14,8 @@ from watchdog.events import FileSystemEventHandler
 from watchdog.observers.polling import PollingObserver
 
 from app.plugins.embyrating.DoubanHelper import DoubanHelper
+from app.plugins.embyrating.nfo_document import NfoDocument, NfoDocumentCache, NfoError, serialize_xml
+from app.plugins.embyrating.scan_index import ScanIndex, SCAN_INDEX_FILE
 
 from app.core.config import settings
 from app.core.event import eventmanager, Event
@@ -67,7 +68,7 @@ class EmbyRating(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DzAvril/MoviePilot-Plugins/main/icons/emby_rating.png"
     # 插件版本
-    plugin_version = "1.6"
+    plugin_version = "1.8"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -122,6 +123,9 @@ class EmbyRating(_PluginBase):
     # 停止标志，用于中断长时间运行的任务
     _should_stop = False
 
+    # 最近处理的NFO文档，同一文件在一次处理中只解析一次
+    _nfo_documents: Optional[NfoDocumentCache] = None
+
     def __choose_observer(self, force_polling=False):
         """
         选择最优的监控模式
@@ -463,8 +467,7 @@ class EmbyRating(_PluginBase):
     def get_tmdb_rating_from_nfo(self, nfo_path: Path) -> Optional[float]:
         """从NFO文件中获取TMDB评分"""
         try:
-            tree = ET.parse(nfo_path)
-            root = tree.getroot()
+            root = self._load_nfo(nfo_path).root
 
             # 首先尝试从EmbyRating标签中获取TMDB评分
             emby_rating_elem = root.find("EmbyRating")
@@ -500,79 +503,56 @@ class EmbyRating(_PluginBase):
 
         return None
 
-    def backup_tmdb_rating(self, nfo_path: Path, media_key: str):
-        """备份TMDB评分到EmbyRating标签"""
+    def backup_tmdb_rating(self, nfo_path: Path, media_key: str, save: bool = True):
+        """
+        备份TMDB评分到EmbyRating标签
+        :param save: 是否立即保存，为False时由调用方在处理完成后统一保存
+        """
         try:
-            # 读取原始文件内容
             try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    logger.error(
-                        f"无法读取NFO文件编码: {nfo_path}")
-                    return
-
-            # 解析XML
-            try:
-                root = ET.fromstring(content)
-            except ET.ParseError as e:
-                logger.error(
-                    f"XML解析失败: {nfo_path}, "
-                    f"错误: {str(e)}")
+                doc = self._load_nfo(nfo_path)
+            except NfoError as e:
+                logger.error(f"{e}: {nfo_path}")
                 return
 
             # 检查是否已有EmbyRating标签
-            emby_rating_elem = root.find("EmbyRating")
-            if emby_rating_elem is None:
-                emby_rating_elem = ET.SubElement(root, "EmbyRating")
+            if doc.emby_rating is None:
                 logger.debug(f"创建EmbyRating标签")
+            emby_rating_elem = doc.ensure_emby_rating()
 
             # 检查是否已有tmdb评分
-            tmdb_elem = emby_rating_elem.find("tmdb")
-            if tmdb_elem is not None and tmdb_elem.text:
+            tmdb_text = doc.get_text("tmdb", emby_rating_elem)
+            if tmdb_text:
                 logger.debug(
                     f"EmbyRating标签中已有TMDB评分: "
-                    f"{tmdb_elem.text}")
+                    f"{tmdb_text}")
                 return
 
-            # 获取当前评分
+            # 获取当前评分，从传统rating标签获取
             current_rating = None
-
-            # 首先尝试从传统rating标签获取
-            rating_elem = root.find("rating")
-            if rating_elem is not None and rating_elem.text:
+            rating_text = doc.get_text("rating")
+            if rating_text:
                 try:
-                    current_rating = float(rating_elem.text)
+                    current_rating = float(rating_text)
                 except ValueError:
                     pass
 
             # 保存TMDB评分到EmbyRating标签
-            if tmdb_elem is None:
-                tmdb_elem = ET.SubElement(emby_rating_elem, "tmdb")
-
             # 如果没有找到评分，记录为"none"，表示原本就没有评分
             if current_rating is None:
-                tmdb_elem.text = "none"
+                doc.set_text("tmdb", "none", emby_rating_elem)
                 logger.info(f"原NFO文件无评分，备份为none: {nfo_path}")
             else:
-                tmdb_elem.text = str(current_rating)
+                doc.set_text("tmdb", str(current_rating), emby_rating_elem)
                 logger.info(f"备份TMDB评分: {media_key} = {current_rating}")
 
             # 添加更新时间
-            update_elem = emby_rating_elem.find("update")
-            if update_elem is None:
-                update_elem = ET.SubElement(emby_rating_elem, "update")
-            update_elem.text = datetime.now().strftime("%Y-%m-%d")
+            doc.set_text("update", datetime.now().strftime("%Y-%m-%d"), emby_rating_elem)
 
-            # 格式化XML并直接保存
+            if not save:
+                return
             try:
-                xml_str = self.format_xml(root)
-                with open(nfo_path, 'w', encoding='utf-8') as f:
-                    f.write(xml_str)
+                doc.save()
                 logger.debug(f"备份操作完成: {nfo_path}")
             except Exception as e:
                 logger.error(
@@ -635,37 +615,24 @@ class EmbyRating(_PluginBase):
     def format_xml(self, root) -> str:
         """格式化XML，避免多余的空行"""
         try:
-            # 使用minidom格式化，但处理多余的空行
-            xml_str = minidom.parseString(
-                ET.tostring(root, encoding='unicode')
-            ).toprettyxml(indent="  ")
-
-            # 移除多余的空行
-            lines = xml_str.split('\n')
-            formatted_lines = []
-
-            for i, line in enumerate(lines):
-                # 保留非空行
-                if line.strip():
-                    formatted_lines.append(line)
-                # 对于空行，只在特定情况下保留
-                elif i > 0 and i < len(lines) - 1:
-                    # 检查前后行是否都是标签
-                    prev_line = lines[i-1].strip()
-                    next_line = lines[i+1].strip()
-
-                    # 如果前后都是标签，保留一个空行
-                    if (prev_line.startswith('<') and prev_line.endswith('>') and
-                            next_line.startswith('<') and next_line.endswith('>')):
-                        formatted_lines.append('')
-
-            return '\n'.join(formatted_lines)
-
+            return serialize_xml(root)
         except Exception as e:
             logger.error(f"XML格式化失败: {str(e)}")
             # 如果格式化失败，使用简单的tostring
             return ET.tostring(root, encoding='unicode', xml_declaration=True)
 
+    def _nfo_cache(self) -> NfoDocumentCache:
+        if self._nfo_documents is None:
+            self._nfo_documents = NfoDocumentCache()
+        return self._nfo_documents
+
+    def _load_nfo(self, nfo_path: Path) -> NfoDocument:
+        """
+        获取NFO文档，处理同一个文件的各个步骤共用一次解析结果
+        :raises NfoError: 文件无法读取或解析
+        """
+        return self._nfo_cache().get(nfo_path)
+
     def should_skip_rating_update(self, nfo_path: Path, rating_source: str) -> bool:
         """检查是否应该跳过评分更新（跳过逻辑）"""
         try:
@@ -677,40 +644,27 @@ class EmbyRating(_PluginBase):
             if rating_source != "douban":
                 return False
 
-            # 读取NFO文件
-            try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    return False
-
-            # 解析XML
             try:
-                root = ET.fromstring(content)
-            except ET.ParseError:
+                doc = self._load_nfo(nfo_path)
+            except NfoError:
                 return False
 
             # 查找EmbyRating标签
-            emby_rating_elem = root.find("EmbyRating")
+            emby_rating_elem = doc.emby_rating
             if emby_rating_elem is None:
                 return False
 
             # 检查当前评分源
-            current_source_elem = emby_rating_elem.find("rating_source")
-            if current_source_elem is None or current_source_elem.text != rating_source:
+            if doc.get_text("rating_source", emby_rating_elem) != rating_source:
                 return False
 
             # 检查更新时间
-            update_elem = emby_rating_elem.find("update")
-            if update_elem is None or not update_elem.text:
+            update_text = doc.get_text("update", emby_rating_elem)
+            if not update_text:
                 return False
 
             try:
-                last_update = datetime.strptime(update_elem.text, "%Y-%m-%d")
+                last_update = datetime.strptime(update_text, "%Y-%m-%d")
                 days_since_update = (datetime.now() - last_update).days
 
                 if days_since_update < self._update_interval:
@@ -732,36 +686,19 @@ class EmbyRating(_PluginBase):
     def get_existing_douban_rating(self, nfo_path: Path) -> Optional[float]:
         """从NFO文件中获取已存在的豆瓣评分"""
         try:
-            # 读取NFO文件
-            try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    return None
-
-            # 解析XML
             try:
-                root = ET.fromstring(content)
-            except ET.ParseError:
-                return None
-
-            # 查找EmbyRating标签
-            emby_rating_elem = root.find("EmbyRating")
-            if emby_rating_elem is None:
+                doc = self._load_nfo(nfo_path)
+            except NfoError:
                 return None
 
-            # 获取豆瓣评分
-            douban_elem = emby_rating_elem.find("douban")
-            if douban_elem is None or not douban_elem.text:
+            # 获取EmbyRating标签中的豆瓣评分
+            douban_text = doc.emby_text("douban")
+            if not douban_text:
                 return None
 
             # 检查评分是否有效
             try:
-                rating = float(douban_elem.text)
+                rating = float(douban_text)
                 if rating > 0:  # 评分应该大于0
                     return rating
             except ValueError:
@@ -776,48 +713,17 @@ class EmbyRating(_PluginBase):
     def is_existing_douban_rating_valid(self, nfo_path: Path) -> bool:
         """检查NFO中已存在的豆瓣评分是否有效且未过期"""
         try:
-            # 读取NFO文件
-            try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    return False
-
-            # 解析XML
-            try:
-                root = ET.fromstring(content)
-            except ET.ParseError:
-                return False
-
-            # 查找EmbyRating标签
-            emby_rating_elem = root.find("EmbyRating")
-            if emby_rating_elem is None:
-                return False
-
-            # 检查是否存在豆瓣评分
-            douban_elem = emby_rating_elem.find("douban")
-            if douban_elem is None or not douban_elem.text:
-                return False
-
-            # 检查评分是否有效
-            try:
-                rating = float(douban_elem.text)
-                if rating <= 0:  # 评分应该大于0
-                    return False
-            except ValueError:
+            # 已存在的有效豆瓣评分
+            if not self.get_existing_douban_rating(nfo_path):
                 return False
 
             # 检查更新时间
-            update_elem = emby_rating_elem.find("update")
-            if update_elem is None or not update_elem.text:
+            update_text = self._load_nfo(nfo_path).emby_text("update")
+            if not update_text:
                 return False
 
             try:
-                last_update = datetime.strptime(update_elem.text, "%Y-%m-%d")
+                last_update = datetime.strptime(update_text, "%Y-%m-%d")
                 days_since_update = (datetime.now() - last_update).days
 
                 # 检查是否在更新间隔内
@@ -873,85 +779,48 @@ class EmbyRating(_PluginBase):
                                  rating_source: str = "douban"):
         """直接更新NFO文件中的评分（不进行跳过检查）"""
         try:
-            # 读取原始文件内容
             try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    logger.error(
-                        f"无法读取NFO文件编码: {nfo_path}"
-                    )
-                    return False
-
-            # 解析XML
-            try:
-                root = ET.fromstring(content)
-            except ET.ParseError as e:
-                logger.error(
-                    f"XML解析失败: {nfo_path}, "
-                    f"错误: {str(e)}"
-                )
+                doc = self._load_nfo(nfo_path)
+            except NfoError as e:
+                logger.error(f"{e}: {nfo_path}")
                 return False
 
             # 查找或创建EmbyRating标签
-            emby_rating_elem = root.find("EmbyRating")
-            if emby_rating_elem is None:
-                emby_rating_elem = ET.SubElement(root, "EmbyRating")
+            if doc.emby_rating is None:
                 logger.debug(f"创建EmbyRating标签")
+            emby_rating_elem = doc.ensure_emby_rating()
 
             # 备份原始TMDB评分（如果存在且当前要更新为豆瓣评分）
             if rating_source == "douban":
                 # 检查是否已经有tmdb备份
-                tmdb_elem = emby_rating_elem.find("tmdb")
-                if tmdb_elem is None:
+                if emby_rating_elem.find("tmdb") is None:
                     # 尝试从传统rating标签获取原始评分
-                    traditional_rating_elem = root.find("rating")
-                    if traditional_rating_elem is not None and traditional_rating_elem.text:
+                    original_text = doc.get_text("rating")
+                    if original_text:
                         try:
-                            original_rating = float(traditional_rating_elem.text)
+                            original_rating = float(original_text)
                             # 只有当原始评分不是0且不等于当前豆瓣评分时才备份
                             if original_rating > 0 and abs(original_rating - new_rating) > 0.1:
-                                tmdb_elem = ET.SubElement(emby_rating_elem, "tmdb")
-                                tmdb_elem.text = str(original_rating)
+                                doc.set_text("tmdb", str(original_rating), emby_rating_elem)
                                 logger.info(f"备份原始TMDB评分: {original_rating}")
                         except (ValueError, TypeError):
                             logger.debug("原始rating标签值无效，跳过备份")
 
             # 更新对应评分源的评分
-            rating_elem = emby_rating_elem.find(rating_source)
-            if rating_elem is None:
-                rating_elem = ET.SubElement(emby_rating_elem, rating_source)
-            rating_elem.text = str(new_rating)
+            doc.set_text(rating_source, str(new_rating), emby_rating_elem)
 
             # 添加或更新rating_source字段
-            rating_source_elem = emby_rating_elem.find("rating_source")
-            if rating_source_elem is None:
-                rating_source_elem = ET.SubElement(emby_rating_elem, "rating_source")
-            rating_source_elem.text = rating_source
+            doc.set_text("rating_source", rating_source, emby_rating_elem)
 
             # 更新传统rating标签（保持兼容性）
-            traditional_rating_elem = root.find("rating")
-            if traditional_rating_elem is None:
-                traditional_rating_elem = ET.SubElement(root, "rating")
-            traditional_rating_elem.text = str(new_rating)
+            doc.set_text("rating", str(new_rating))
 
             # 添加更新时间
-            update_elem = emby_rating_elem.find("update")
-            if update_elem is None:
-                update_elem = ET.SubElement(emby_rating_elem, "update")
-            update_elem.text = datetime.now().strftime("%Y-%m-%d")
-
-            # 使用改进的格式化方法
-            xml_str = self.format_xml(root)
+            doc.set_text("update", datetime.now().strftime("%Y-%m-%d"), emby_rating_elem)
 
             # 直接写入原文件
             try:
-                with open(nfo_path, 'w', encoding='utf-8') as f:
-                    f.write(xml_str)
+                doc.save()
                 logger.info(
                     f"更新NFO评分成功: {nfo_path} = "
                     f"{new_rating} ({rating_source})"
@@ -1119,6 +988,11 @@ class EmbyRating(_PluginBase):
         # 发送批量通知
         self._send_batch_notification()
 
+        # 释放本次处理的NFO文档
+        if self._nfo_documents is not None:
+            logger.debug(f"NFO文件解析 {self._nfo_documents.loads} 次，复用 {self._nfo_documents.hits} 次")
+            self._nfo_documents.clear()
+
         # 保存缓存数据
         self._save_cache_data()
 
@@ -1752,56 +1626,72 @@ class EmbyRating(_PluginBase):
 
             # 收集所有需要处理的NFO文件
             processed_shows = set()  # 记录已处理的电视剧，避免重复处理
+            # 包含tvshow.nfo的目录，遍历时上级目录先于子目录返回
+            tvshow_dirs = set()
+            # 目录 -> 电视剧根目录，同一季目录下的剧集只查找一次
+            show_roots: Dict[Path, Optional[Path]] = {}
 
             # 统计目录中的文件
             total_files = 0
             media_files = 0
             nfo_files = 0
-
-            # 遍历目录查找媒体文件
-            for item in media_dir.rglob("*"):
-                if self._should_stop:
-                    logger.info(f"检测到停止信号，中断媒体目录处理")
-                    break
-
-                if item.is_file():
-                    total_files += 1
-                    if item.suffix.lower() == '.nfo':
-                        nfo_files += 1
-                    elif item.suffix.lower() in self.MEDIA_EXTENSIONS:
-                        media_files += 1
-
-                if item.is_file() and item.suffix.lower() in self.MEDIA_EXTENSIONS:
-                    logger.debug(f"发现媒体文件: {item}")
-                    # 检查是否为电视剧结构
-                    if self._is_tv_show_structure(item):
-                        logger.debug(f"识别为电视剧结构: {item}")
-                        # 处理电视剧
-                        show_root = self._get_tv_show_root(item)
-                        if show_root and show_root not in processed_shows:
-                            logger.info(f"开始处理电视剧: {show_root}")
-                            processed_shows.add(show_root)
-                            self._process_tv_show(show_root, directory_alias)
-                        elif show_root in processed_shows:
-                            logger.debug(f"电视剧已处理，跳过: {show_root}")
-                    else:
-                        logger.debug(f"识别为电影: {item}")
-                        # 处理电影
-                        nfo_path = item.with_suffix('.nfo')
-                        if not nfo_path.exists():
-                            logger.debug(f"NFO文件不存在，尝试刮削: {nfo_path}")
-                            # 尝试刮削，传递目标媒体文件
-                            if not self.scrape_media_if_needed(item.parent, False, item):
-                                logger.debug(f"刮削失败或跳过: {item}")
-                                continue
-                            # 重新检查NFO文件
-                            if not nfo_path.exists():
-                                logger.warning(
-                                    f"刮削后仍未找到NFO文件: {nfo_path}"
-                                )
-                                continue
-                        # 处理NFO文件
-                        self.process_nfo_file(nfo_path, MediaType.MOVIE, directory_alias)
+            unchanged_nfos = 0
+
+            with ScanIndex(Path(self.get_data_path()) / SCAN_INDEX_FILE, self.MEDIA_EXTENSIONS) as scan_index:
+                # 遍历目录查找媒体文件，未变化的目录使用上次扫描的结果
+                for listing in scan_index.walk(media_dir, should_stop=lambda: self._should_stop):
+                    directory = Path(listing.path)
+                    total_files += listing.files
+                    media_files += len(listing.media)
+                    nfo_files += len(listing.nfo)
+                    if "tvshow.nfo" in listing.nfo:
+                        tvshow_dirs.add(directory)
+
+                    for name in listing.media:
+                        if self._should_stop:
+                            break
+                        item = directory / name
+                        logger.debug(f"发现媒体文件: {item}")
+                        # 检查是否为电视剧结构
+                        if self._is_tv_show_structure(item):
+                            logger.debug(f"识别为电视剧结构: {item}")
+                            # 处理电视剧
+                            if directory not in show_roots:
+                                show_roots[directory] = self._find_tv_show_root(directory, media_dir, tvshow_dirs)
+                            show_root = show_roots[directory]
+                            if show_root and show_root not in processed_shows:
+                                logger.debug(f"开始处理电视剧: {show_root}")
+                                processed_shows.add(show_root)
+                                if self._process_tv_show(show_root, directory_alias, scan_index) is False:
+                                    unchanged_nfos += 1
+                            elif show_root in processed_shows:
+                                logger.debug(f"电视剧已处理，跳过: {show_root}")
+                        else:
+                            logger.debug(f"识别为电影: {item}")
+                            # 处理电影
+                            nfo_path = item.with_suffix('.nfo')
+                            if nfo_path.name not in listing.nfo:
+                                logger.debug(f"NFO文件不存在，尝试刮削: {nfo_path}")
+                                # 尝试刮削，传递目标媒体文件
+                                if not self.scrape_media_if_needed(item.parent, False, item):
+                                    logger.debug(f"刮削失败或跳过: {item}")
+                                    continue
+                                # 重新检查NFO文件
+                                if not nfo_path.exists():
+                                    logger.warning(
+                                        f"刮削后仍未找到NFO文件: {nfo_path}"
+                                    )
+                                    continue
+                            # 处理NFO文件
+                            if not self._process_nfo_if_changed(nfo_path, MediaType.MOVIE, directory_alias, scan_index):
+                                unchanged_nfos += 1
+
+                # 完整扫描后清理已删除文件的记录
+                if not self._should_stop:
+                    scan_index.prune(media_dir)
+
+                logger.info(f"增量扫描 - 读取目录: {scan_index.dirs_scanned}, 复用目录缓存: {scan_index.dirs_reused}, "
+                            f"未变化跳过的NFO文件: {unchanged_nfos}")
 
             # 输出统计信息
             logger.info(f"目录统计 - 总文件: {total_files}, 媒体文件: {media_files}, NFO文件: {nfo_files}")
@@ -1813,6 +1703,55 @@ class EmbyRating(_PluginBase):
         except Exception as e:
             logger.error(f"处理媒体目录失败 {media_dir}: {str(e)}")
 
+    def _find_tv_show_root(self, directory: Path, media_dir: Path, tvshow_dirs: set) -> Optional[Path]:
+        """根据扫描到的tvshow.nfo位置查找电视剧根目录，媒体目录之外的上级目录沿用逐级查找"""
+        current = directory
+        while True:
+            if current in tvshow_dirs:
+                return current
+            if current == media_dir or current.parent == current:
+                break
+            current = current.parent
+        return self._get_tv_show_root(media_dir)
+
+    def _process_nfo_if_changed(self, nfo_path: Path, media_type: MediaType, directory_alias: str = None,
+                                scan_index: Optional[ScanIndex] = None) -> bool:
+        """
+        处理NFO文件，文件自上次处理后未变化且未到更新间隔时直接跳过，不再打开文件
+        :return: 是否处理了文件
+        """
+        if scan_index is None:
+            self.process_nfo_file(nfo_path, media_type, directory_alias)
+            return True
+        try:
+            stat = nfo_path.stat()
+        except OSError:
+            logger.warning(f"NFO文件不存在: {nfo_path}")
+            return True
+        if scan_index.is_up_to_date(str(nfo_path), stat, self._rating_source,
+                                    self._update_interval * 24 * 3600):
+            logger.debug(f"NFO文件未变化，跳过: {nfo_path}")
+            return False
+
+        failed_count = len(self._failed_results)
+        self.process_nfo_file(nfo_path, media_type, directory_alias)
+        if self._should_stop or len(self._failed_results) > failed_count:
+            # 处理失败或中断的文件下次扫描时重新处理
+            scan_index.forget_nfo(str(nfo_path))
+        else:
+            scan_index.record_nfo(str(nfo_path), self._rating_source, self._get_nfo_update_time(nfo_path))
+        return True
+
+    def _get_nfo_update_time(self, nfo_path: Path) -> float:
+        """NFO文件中记录的评分更新时间，没有记录时为当前时间"""
+        try:
+            update_text = self._load_nfo(nfo_path).emby_text("update")
+            if update_text:
+                return datetime.strptime(update_text, "%Y-%m-%d").timestamp()
+        except (NfoError, ValueError):
+            pass
+        return time.time()
+
     def _is_tv_show_structure(self, media_file: Path) -> bool:
         """判断是否为电视剧结构"""
         try:
@@ -1842,8 +1781,12 @@ class EmbyRating(_PluginBase):
         except Exception:
             return None
 
-    def _process_tv_show(self, show_root: Path, directory_alias: str = None):
-        """处理电视剧，更新tvshow.nfo文件评分"""
+    def _process_tv_show(self, show_root: Path, directory_alias: str = None,
+                         scan_index: Optional[ScanIndex] = None) -> bool:
+        """
+        处理电视剧，更新tvshow.nfo文件评分
+        :return: tvshow.nfo未变化而跳过时返回False
+        """
         try:
             tvshow_nfo = show_root / "tvshow.nfo"
 
@@ -1866,10 +1809,8 @@ class EmbyRating(_PluginBase):
                     logger.warning(f"目录结构不符合电视剧格式，跳过: {show_root}")
                     return
 
-            logger.info(f"使用统一方法处理电视剧NFO: {tvshow_nfo}")
-            self.process_nfo_file(tvshow_nfo, MediaType.TV, directory_alias)
-
-
+            logger.debug(f"使用统一方法处理电视剧NFO: {tvshow_nfo}")
+            return self._process_nfo_if_changed(tvshow_nfo, MediaType.TV, directory_alias, scan_index)
 
         except Exception as e:
             logger.error(f"处理电视剧失败 {show_root}: {str(e)}")
@@ -1879,6 +1820,7 @@ class EmbyRating(_PluginBase):
                 'reason': f'处理异常: {str(e)}',
                 'media_type': 'TV'
             })
+        return True
 
     def _is_tv_show_directory(self, directory: Path) -> bool:
         """判断是否为电视剧目录"""
@@ -1999,6 +1941,18 @@ class EmbyRating(_PluginBase):
             return None
 
     def process_nfo_file(self, nfo_path: Path, media_type: MediaType = MediaType.UNKNOWN, directory_alias: str = None):
+        """处理单个NFO文件，同一个文件不会被监控线程和定时任务同时处理"""
+        cache = self._nfo_cache()
+        with cache.path_lock(nfo_path):
+            try:
+                self._process_nfo_file(nfo_path, media_type, directory_alias)
+            finally:
+                # 处理中断或保存失败时丢弃内存中未保存的修改，下次重新读取文件
+                if cache.discard_dirty(nfo_path):
+                    logger.debug(f"丢弃未保存的NFO修改: {nfo_path}")
+
+    def _process_nfo_file(self, nfo_path: Path, media_type: MediaType = MediaType.UNKNOWN,
+                          directory_alias: str = None):
         """处理单个NFO文件，兼容命名空间"""
         try:
             # 检查是否需要停止
@@ -2020,35 +1974,13 @@ class EmbyRating(_PluginBase):
             logger.info(
                 f"开始处理NFO文件: {nfo_path} (大小: {file_size} bytes)")
 
-            # 尝试读取文件内容
-            try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                logger.debug(f"成功读取NFO文件内容，长度: {len(content)}")
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                    logger.debug(f"使用GBK编码成功读取NFO文件")
-                except UnicodeDecodeError:
-                    logger.error(f"NFO文件编码无法识别: {nfo_path}")
-                    return
-                except Exception as e:
-                    logger.error(
-                        f"读取NFO文件失败: {nfo_path}, 错误: {str(e)}")
-                    return
-
-            # 解析XML
+            # 读取并解析NFO文件，后续各步骤共用解析结果
             try:
-                root = ET.fromstring(content)
+                doc = self._load_nfo(nfo_path)
+                root = doc.root
                 logger.debug(f"成功解析XML，根元素: {root.tag}")
-            except ET.ParseError as e:
-                logger.error(
-                    f"XML解析失败: {nfo_path}, 错误: {str(e)}")
-                return
-            except Exception as e:
-                logger.error(
-                    f"XML解析异常: {nfo_path}, 错误: {str(e)}")
+            except NfoError as e:
+                logger.error(f"{e}: {nfo_path}")
                 return
 
             # 获取媒体信息（忽略命名空间）
@@ -2163,8 +2095,8 @@ class EmbyRating(_PluginBase):
             media_key = self.get_media_key(title, year, media_type)
             logger.debug(f"生成媒体键: {media_key}")
 
-            # 备份TMDB评分
-            self.backup_tmdb_rating(nfo_path, media_key)
+            # 备份TMDB评分，与评分更新一起保存
+            self.backup_tmdb_rating(nfo_path, media_key, save=False)
 
             # 根据评分源处理
             if self._rating_source == "douban":
@@ -2264,8 +2196,13 @@ class EmbyRating(_PluginBase):
                         'file_path': str(nfo_path),
                         'directory_alias': directory_alias
                     })
+
+            # 保存未随评分更新写入的修改（如仅备份了TMDB评分），没有修改时不写文件
+            if doc.save():
+                logger.debug(f"保存NFO文件: {nfo_path}")
         except Exception as e:
             logger.error(f"处理NFO文件失败 {nfo_path}: {str(e)}")
+            self._nfo_cache().discard(nfo_path)
             # 添加到失败结果
             self._failed_results.append({
                 'title': title if 'title' in locals() else str(nfo_path.stem),
@@ -2347,113 +2284,53 @@ class EmbyRating(_PluginBase):
     def restore_tmdb_rating(self, nfo_path: Path, media_key: str) -> Optional[float]:
         """从EmbyRating标签恢复TMDB评分，返回恢复的评分值"""
         try:
-            # 读取原始文件内容
             try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    logger.error(f"无法读取NFO文件编码: {nfo_path}")
-                    return False
-
-            # 解析XML
-            try:
-                root = ET.fromstring(content)
-            except ET.ParseError as e:
-                logger.error(
-                    f"XML解析失败: {nfo_path}, 错误: {str(e)}")
-                return False
+                doc = self._load_nfo(nfo_path)
+            except NfoError as e:
+                logger.error(f"{e}: {nfo_path}")
+                return None
 
             # 从EmbyRating标签中获取TMDB评分
-            emby_rating_elem = root.find("EmbyRating")
+            emby_rating_elem = doc.emby_rating
             if emby_rating_elem is None:
                 logger.warning(f"未找到EmbyRating标签: {media_key}")
                 return None
 
-            tmdb_elem = emby_rating_elem.find("tmdb")
-            if tmdb_elem is None or not tmdb_elem.text:
+            tmdb_text = doc.get_text("tmdb", emby_rating_elem)
+            if not tmdb_text:
                 logger.warning(f"未找到TMDB评分备份: {media_key}")
                 # 如果没有备份，记录为none，表示原本就没有TMDB评分
-                if tmdb_elem is None:
-                    tmdb_elem = ET.SubElement(emby_rating_elem, "tmdb")
-                tmdb_elem.text = "none"
+                doc.set_text("tmdb", "none", emby_rating_elem)
                 logger.info(f"记录原NFO文件无TMDB评分: {media_key}")
-
-                # 删除rating标签（如果存在）
-                traditional_rating_elem = root.find("rating")
-                if traditional_rating_elem is not None:
-                    root.remove(traditional_rating_elem)
-                    logger.debug(f"已删除rating标签")
-
-                # 更新rating_source为tmdb
-                rating_source_elem = emby_rating_elem.find("rating_source")
-                if rating_source_elem is None:
-                    rating_source_elem = ET.SubElement(emby_rating_elem, "rating_source")
-                rating_source_elem.text = "tmdb"
-
-                # 保存文件
-                try:
-                    xml_str = self.format_xml(root)
-                    with open(nfo_path, 'w', encoding='utf-8') as f:
-                        f.write(xml_str)
-                    logger.info(f"恢复TMDB状态成功（无评分）: {media_key}")
-                    return 0.0
-                except Exception as e:
-                    logger.error(f"保存NFO文件失败: {nfo_path}, 错误: {str(e)}")
-                    return None
+                tmdb_text = "none"
 
             # 检查是否为"none"，表示原本就没有评分
-            if tmdb_elem.text.strip().lower() == "none":
+            if tmdb_text.strip().lower() == "none":
                 logger.info(f"原NFO文件无评分，删除rating标签: {media_key}")
                 # 删除rating标签（如果存在）
-                traditional_rating_elem = root.find("rating")
-                if traditional_rating_elem is not None:
-                    root.remove(traditional_rating_elem)
+                if doc.remove("rating"):
                     logger.debug(f"已删除rating标签")
+                rating = 0.0  # 返回0表示成功但无评分
+            else:
+                # 尝试解析评分
+                try:
+                    rating = float(tmdb_text)
+                except ValueError:
+                    logger.error(f"TMDB评分格式无效: {tmdb_text}")
+                    return None
 
-                # 更新rating_source为tmdb
-                rating_source_elem = emby_rating_elem.find("rating_source")
-                if rating_source_elem is None:
-                    rating_source_elem = ET.SubElement(emby_rating_elem, "rating_source")
-                rating_source_elem.text = "tmdb"
-
-                return 0.0  # 返回0表示成功但无评分
-
-            # 尝试解析评分
-            try:
-                rating = float(tmdb_elem.text)
-            except ValueError:
-                logger.error(f"TMDB评分格式无效: {tmdb_elem.text}")
-                return None
-
-            # 更新传统rating标签
-            traditional_rating_elem = root.find("rating")
-            if traditional_rating_elem is None:
-                traditional_rating_elem = ET.SubElement(root, "rating")
-            traditional_rating_elem.text = str(rating)
+                # 更新传统rating标签
+                doc.set_text("rating", str(rating))
 
             # 更新EmbyRating标签中的rating_source
-            rating_source_elem = emby_rating_elem.find("rating_source")
-            if rating_source_elem is None:
-                rating_source_elem = ET.SubElement(emby_rating_elem, "rating_source")
-            rating_source_elem.text = "tmdb"
-
-            # 更新更新时间
-            update_elem = emby_rating_elem.find("update")
-            if update_elem is None:
-                update_elem = ET.SubElement(emby_rating_elem, "update")
-            update_elem.text = datetime.now().strftime("%Y-%m-%d")
-
-            # 格式化XML并直接保存
-            try:
-                xml_str = self.format_xml(root)
+            doc.set_text("rating_source", "tmdb", emby_rating_elem)
 
-                with open(nfo_path, 'w', encoding='utf-8') as f:
-                    f.write(xml_str)
+            # 已经是TMDB评分时不改动更新时间，文件没有变化时不写入
+            if doc.dirty:
+                doc.set_text("update", datetime.now().strftime("%Y-%m-%d"), emby_rating_elem)
 
+            try:
+                doc.save()
                 if rating == 0.0:
                     logger.info(f"恢复TMDB状态成功（无评分）: {media_key}")
                 else:
@@ -2625,23 +2502,10 @@ class EmbyRating(_PluginBase):
     def _determine_nfo_type(self, nfo_path: Path) -> Optional[str]:
         """判断NFO文件类型"""
         try:
-            # 读取NFO文件内容
-            try:
-                with open(nfo_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(nfo_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    logger.debug(f"无法读取NFO文件编码: {nfo_path}")
-                    return None
-
-            # 解析XML
             try:
-                root = ET.fromstring(content)
-            except ET.ParseError as e:
-                logger.debug(f"XML解析失败: {nfo_path}, 错误: {str(e)}")
+                root = self._load_nfo(nfo_path).root
+            except NfoError as e:
+                logger.debug(f"{e}: {nfo_path}")
                 return None
 
             # 根据根元素判断类型
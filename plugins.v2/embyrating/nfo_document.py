@@ -0,0 +1,213 @@
+"""
+NFO文件文档模型
+处理一个NFO文件时，备份TMDB评分、跳过检查、读取已有豆瓣评分、更新评分等步骤原来各自重新打开文件，
+依次尝试utf-8和gbk编码后重新解析XML，保存时再经过minidom转换一次。这里把NFO文件解析为一个文档对象供各步骤共用：
+- 文件只读取一次，XML只解析一次
+- 修改时记录是否有变化，没有变化时不写文件
+- 使用 ElementTree.indent 直接格式化输出
+"""
+import os
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# 依次尝试的文件编码
+NFO_ENCODINGS = ("utf-8", "gbk")
+XML_DECLARATION = '<?xml version="1.0" ?>'
+# 缓存的NFO文档数量，只需覆盖一次处理过程中反复访问的文件
+NFO_CACHE_SIZE = 64
+# 按路径分配的处理锁数量
+NFO_PATH_LOCKS = 64
+
+
+class NfoError(Exception):
+    """NFO文件无法读取或解析"""
+
+
+def serialize_xml(root: ET.Element) -> str:
+    """
+    格式化XML，每层缩进两个空格，不产生多余的空行
+    """
+    ET.indent(root, space="  ")
+    return f"{XML_DECLARATION}\n{ET.tostring(root, encoding='unicode')}\n"
+
+
+def _stat_signature(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class NfoDocument:
+    """解析后的NFO文件"""
+
+    def __init__(self, path: Union[str, Path], root: ET.Element, encoding: str = "utf-8",
+                 signature: Optional[Tuple[int, int]] = None):
+        self.path = Path(path)
+        self.root = root
+        self.encoding = encoding
+        # 读取时文件的 (mtime_ns, size)，用于判断文件是否被外部修改
+        self.signature = signature
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NfoDocument":
+        """
+        读取并解析NFO文件
+        :raises NfoError: 文件无法读取、编码无法识别或XML解析失败
+        """
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+        except OSError as e:
+            raise NfoError(f"读取NFO文件失败: {e}") from e
+
+        for encoding in NFO_ENCODINGS:
+            try:
+                content = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise NfoError("无法识别NFO文件编码")
+
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError as e:
+            raise NfoError(f"XML解析失败: {e}") from e
+        return cls(path, root, encoding, (stat.st_mtime_ns, stat.st_size))
+
+    @property
+    def emby_rating(self) -> Optional[ET.Element]:
+        return self.root.find("EmbyRating")
+
+    def ensure_emby_rating(self) -> ET.Element:
+        """获取EmbyRating标签，不存在时创建"""
+        elem = self.emby_rating
+        if elem is None:
+            elem = ET.SubElement(self.root, "EmbyRating")
+            self.dirty = True
+        return elem
+
+    def get_text(self, tag: str, parent: Optional[ET.Element] = None) -> Optional[str]:
+        """获取子标签的文本，parent为空时在根元素下查找"""
+        elem = (self.root if parent is None else parent).find(tag)
+        return elem.text if elem is not None else None
+
+    def emby_text(self, tag: str) -> Optional[str]:
+        """获取EmbyRating标签下子标签的文本"""
+        emby_rating_elem = self.emby_rating
+        if emby_rating_elem is None:
+            return None
+        return self.get_text(tag, emby_rating_elem)
+
+    def set_text(self, tag: str, text: str, parent: Optional[ET.Element] = None) -> ET.Element:
+        """设置子标签的文本，不存在时创建，内容有变化时标记为已修改"""
+        parent = self.root if parent is None else parent
+        elem = parent.find(tag)
+        if elem is None:
+            elem = ET.SubElement(parent, tag)
+            self.dirty = True
+        if elem.text != text:
+            elem.text = text
+            self.dirty = True
+        return elem
+
+    def remove(self, tag: str, parent: Optional[ET.Element] = None) -> bool:
+        """删除子标签，返回是否删除"""
+        parent = self.root if parent is None else parent
+        elem = parent.find(tag)
+        if elem is None:
+            return False
+        parent.remove(elem)
+        self.dirty = True
+        return True
+
+    def to_string(self) -> str:
+        return serialize_xml(self.root)
+
+    def save(self) -> bool:
+        """
+        有修改时以utf-8写回文件
+        :return: 是否写入了文件
+        """
+        if not self.dirty:
+            return False
+        content = self.to_string()
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.encoding = "utf-8"
+        self.dirty = False
+        self.signature = _stat_signature(self.path)
+        return True
+
+    def is_current(self) -> bool:
+        """文件自读取后未被外部修改"""
+        return self.signature is not None and _stat_signature(self.path) == self.signature
+
+
+class NfoDocumentCache:
+    """
+    最近访问的NFO文档，文件被外部修改后重新解析
+    缓存的文档是可修改的共享对象，修改文档的一方需持有 path_lock(path)
+    """
+
+    def __init__(self, maxsize: int = NFO_CACHE_SIZE):
+        self.maxsize = max(1, maxsize)
+        self._docs: "OrderedDict[str, NfoDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._path_locks = [threading.RLock() for _ in range(NFO_PATH_LOCKS)]
+        self.loads = 0
+        self.hits = 0
+
+    def path_lock(self, path: Union[str, Path]) -> threading.RLock:
+        """处理同一个文件的锁，同一线程可重入"""
+        return self._path_locks[hash(str(path)) % len(self._path_locks)]
+
+    def get(self, path: Union[str, Path]) -> NfoDocument:
+        """
+        获取NFO文档
+        :raises NfoError: 文件无法读取或解析
+        """
+        key = str(path)
+        with self._lock:
+            doc = self._docs.get(key)
+            # 文件被外部修改（如重新刮削、用户编辑）后，即使有未保存的修改也以文件为准
+            if doc is not None and doc.is_current():
+                self._docs.move_to_end(key)
+                self.hits += 1
+                return doc
+        doc = NfoDocument.load(path)
+        with self._lock:
+            self._docs[key] = doc
+            self._docs.move_to_end(key)
+            self.loads += 1
+            while len(self._docs) > self.maxsize:
+                self._docs.popitem(last=False)
+        return doc
+
+    def discard(self, path: Union[str, Path]):
+        with self._lock:
+            self._docs.pop(str(path), None)
+
+    def discard_dirty(self, path: Union[str, Path]) -> bool:
+        """
+        丢弃有未保存修改的文档，处理中断或保存失败后不让内存中的内容留在缓存中
+        :return: 是否丢弃
+        """
+        key = str(path)
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is None or not doc.dirty:
+                return False
+            del self._docs[key]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
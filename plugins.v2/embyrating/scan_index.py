@@ -0,0 +1,220 @@
+"""
+媒体库增量扫描索引
+定时任务原来每次都对整个媒体库 rglob 并对每个文件调用 stat，每个未变化的NFO文件还要重新打开解析才知道可以跳过。
+这里用SQLite保存上次扫描的结果：
+- 目录：mtime 和目录下的子目录、媒体文件、NFO文件列表，mtime未变化的目录直接使用保存的列表，不再读取目录
+- NFO文件：mtime、大小、评分源和最后更新时间，文件未变化、评分源相同且未到更新间隔时不再打开
+目录的mtime只在增删改名目录项时变化，子目录仍会逐个检查，NFO文件仍会stat一次以发现原地修改。
+"""
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Union
+
+SCAN_INDEX_FILE = "scan_index.db"
+# 目录列表缓存的最长有效期（秒），超过后重新读取目录，避免文件系统未更新目录mtime时一直遗漏
+DIR_LISTING_TTL = 7 * 24 * 3600
+# 累计多少次写入后提交一次
+COMMIT_INTERVAL = 500
+
+
+@dataclass
+class DirListing:
+    """一个目录下与评分处理相关的目录项"""
+    path: str
+    dirs: List[str] = field(default_factory=list)
+    media: List[str] = field(default_factory=list)
+    nfo: List[str] = field(default_factory=list)
+    files: int = 0
+    # 是否使用的是上次保存的列表
+    cached: bool = False
+
+
+@dataclass
+class NfoState:
+    mtime_ns: int
+    size: int
+    rating_source: Optional[str]
+    last_update: float
+
+
+class ScanIndex:
+    """媒体库扫描索引，一次扫描任务内使用，不跨线程共享"""
+
+    def __init__(self, db_path: Union[str, Path], media_extensions: Iterable[str]):
+        self.db_path = str(db_path)
+        self.media_extensions = {ext.lower() for ext in media_extensions}
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                scanned_at REAL NOT NULL,
+                listing TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS nfo_files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                rating_source TEXT,
+                last_update REAL NOT NULL
+            );
+            """
+        )
+        self._writes = 0
+        self._seen_dirs: Set[str] = set()
+        self._seen_nfos: Set[str] = set()
+        self.dirs_scanned = 0
+        self.dirs_reused = 0
+
+    def __enter__(self) -> "ScanIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.commit()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def _write(self, sql: str, params=()):
+        self._conn.execute(sql, params)
+        self._writes += 1
+        if self._writes % COMMIT_INTERVAL == 0:
+            self._conn.commit()
+
+    def walk(self, root: Union[str, Path], should_stop: Optional[Callable[[], bool]] = None) -> Iterator[DirListing]:
+        """
+        深度优先遍历目录，上级目录先于子目录返回，不进入目录软链接
+        """
+        stack = [str(root)]
+        while stack:
+            if should_stop and should_stop():
+                return
+            listing = self._list_dir(stack.pop())
+            if listing is None:
+                continue
+            self._seen_dirs.add(listing.path)
+            yield listing
+            stack.extend(os.path.join(listing.path, name) for name in reversed(listing.dirs))
+
+    def _list_dir(self, path: str) -> Optional[DirListing]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT mtime_ns, scanned_at, listing FROM dirs WHERE path = ?", (path,)
+        ).fetchone()
+        if row and row[0] == mtime_ns and now - row[1] < DIR_LISTING_TTL:
+            try:
+                self.dirs_reused += 1
+                return DirListing(path=path, cached=True, **json.loads(row[2]))
+            except (TypeError, ValueError):
+                self.dirs_reused -= 1
+
+        listing = DirListing(path=path)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            listing.dirs.append(entry.name)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    listing.files += 1
+                    suffix = os.path.splitext(entry.name)[1].lower()
+                    if suffix == ".nfo":
+                        listing.nfo.append(entry.name)
+                    elif suffix in self.media_extensions:
+                        listing.media.append(entry.name)
+        except OSError:
+            return None
+        listing.dirs.sort()
+        listing.media.sort()
+        listing.nfo.sort()
+        self._write(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns, scanned_at, listing) VALUES (?, ?, ?, ?)",
+            (path, mtime_ns, now, json.dumps({"dirs": listing.dirs, "media": listing.media,
+                                              "nfo": listing.nfo, "files": listing.files},
+                                             ensure_ascii=False)),
+        )
+        self.dirs_scanned += 1
+        return listing
+
+    def nfo_state(self, path: str) -> Optional[NfoState]:
+        row = self._conn.execute(
+            "SELECT mtime_ns, size, rating_source, last_update FROM nfo_files WHERE path = ?", (path,)
+        ).fetchone()
+        return NfoState(*row) if row else None
+
+    def is_up_to_date(self, path: str, stat: os.stat_result, rating_source: str,
+                      update_interval: float, now: Optional[float] = None) -> bool:
+        """
+        NFO文件自上次处理后未变化、评分源相同且未到更新间隔
+        :param update_interval: 更新间隔（秒）
+        """
+        self._seen_nfos.add(path)
+        state = self.nfo_state(path)
+        if state is None or (state.mtime_ns, state.size) != (stat.st_mtime_ns, stat.st_size):
+            return False
+        if state.rating_source != rating_source:
+            return False
+        # TMDB评分是静态数据，不需要按间隔更新
+        if rating_source == "tmdb":
+            return True
+        now = time.time() if now is None else now
+        return now - state.last_update < update_interval
+
+    def record_nfo(self, path: str, rating_source: str, last_update: float):
+        """记录处理后的NFO文件状态"""
+        self._seen_nfos.add(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.forget_nfo(path)
+            return
+        self._write(
+            "INSERT OR REPLACE INTO nfo_files (path, mtime_ns, size, rating_source, last_update) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (path, stat.st_mtime_ns, stat.st_size, rating_source, last_update),
+        )
+
+    def forget_nfo(self, path: str):
+        """删除NFO文件记录，下次扫描时重新处理"""
+        self._write("DELETE FROM nfo_files WHERE path = ?", (path,))
+
+    def prune(self, root: Union[str, Path]) -> int:
+        """
+        删除本次完整扫描中未遇到的目录和NFO文件记录
+        :return: 删除的记录数
+        """
+        root = str(root)
+        prefix = root.rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        removed = 0
+        for table, seen in (("dirs", self._seen_dirs), ("nfo_files", self._seen_nfos)):
+            rows = self._conn.execute(
+                f"SELECT path FROM {table} WHERE path = ? OR (path >= ? AND path < ?)", (root, prefix, upper)
+            ).fetchall()
+            stale = [(path,) for (path,) in rows if path not in seen]
+            if stale:
+                self._conn.executemany(f"DELETE FROM {table} WHERE path = ?", stale)
+                removed += len(stale)
+        self._conn.commit()
+        return removed
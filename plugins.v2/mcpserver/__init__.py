@@ -661,7 +661,7 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
     plugin_name = "MCP Server"
     plugin_desc = "使用MCP客户端通过大模型来操作MoviePilot"
     plugin_icon = "https://raw.githubusercontent.com/DzAvril/MoviePilot-Plugins/main/icons/mcp.png"
-    plugin_version = "2.9"
+    plugin_version = "2.19"
     plugin_author = "DzAvril"
     author_url = "https://github.com/DzAvril"
     plugin_config_prefix = "mcpserver_"
@@ -677,7 +677,7 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
         "health_check_interval": 3,
         "max_startup_time": 60,
         "venv_dir": "venv",
-        "dependencies": ["mcp[cli]"],
+        "dependencies": ["mcp[cli]", "watchdog"],
         "auto_restart": True,
         "restart_delay": 5,
         "auth_token": "",
@@ -1437,6 +1437,20 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
                 "auth": "bear",
                 "summary": "获取MCP服务器进程资源占用统计",
             },
+            {
+                "path": "/traces",
+                "endpoint": self._get_traces_api,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "获取MCP服务器请求追踪记录",
+            },
+            {
+                "path": "/traces",
+                "endpoint": self._configure_traces_api,
+                "methods": ["POST"],
+                "auth": "bear",
+                "summary": "启用/停用MCP服务器请求追踪",
+            },
         ]
 
     def _start_server_api(self) -> Dict[str, Any]:
@@ -1623,6 +1637,7 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
                     return {
                         "message": "获取进程统计信息成功",
                         "process_stats": process_stats,
+                        "server_stats": self._get_server_runtime_stats(),
                         "server_status": status,
                         "enable": self._enable,
                     }
@@ -1667,6 +1682,72 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
                 "enable": self._enable,
             }
 
+    def _get_server_auth_headers(self) -> Dict[str, str]:
+        """访问MCP服务器内部端点所需的认证头"""
+        headers = {}
+        auth_token = self._config.get("auth_token", "")
+        if auth_token:
+            headers["Authorization"] = f"Bearer {auth_token}"
+        return headers
+
+    def _get_server_runtime_stats(self) -> Optional[Dict[str, Any]]:
+        """从MCP服务器的 /stats 端点获取运行统计（事件存储等）"""
+        try:
+            port = int(self._config["port"])
+            response = requests.get(
+                f"http://localhost:{port}/stats", headers=self._get_server_auth_headers(), timeout=3
+            )
+            if response.status_code == 200:
+                return response.json()
+            logger.debug(f"获取MCP服务器运行统计失败: HTTP {response.status_code}")
+        except Exception as e:
+            logger.debug(f"获取MCP服务器运行统计失败: {str(e)}")
+        return None
+
+    def _get_traces_api(self, limit: int = 100, kind: str = None, name: str = None) -> Dict[str, Any]:
+        """API Endpoint: 获取MCP服务器请求追踪记录
+
+        Args:
+            limit: 返回的最近span数量
+            kind: 按类型过滤，tool 或 http
+            name: 按工具名或API端点过滤
+        """
+        if not self._process_manager or not self._process_manager.is_running():
+            return {"message": "服务器未运行", "error": True}
+        try:
+            params = {"limit": limit}
+            if kind:
+                params["kind"] = kind
+            if name:
+                params["name"] = name
+            response = requests.get(
+                f"http://localhost:{int(self._config['port'])}/traces",
+                params=params, headers=self._get_server_auth_headers(), timeout=5
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"获取请求追踪记录失败: {str(e)}")
+            return {"message": f"获取请求追踪记录失败: {str(e)}", "error": True}
+
+    def _configure_traces_api(self, body: dict = None) -> Dict[str, Any]:
+        """API Endpoint: 启用/停用MCP服务器请求追踪
+
+        请求体可包含 enabled（是否启用）、capacity（缓冲区容量）、clear（是否清空记录）
+        """
+        if not self._process_manager or not self._process_manager.is_running():
+            return {"message": "服务器未运行", "error": True}
+        try:
+            response = requests.post(
+                f"http://localhost:{int(self._config['port'])}/traces",
+                json=body or {}, headers=self._get_server_auth_headers(), timeout=5
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"设置请求追踪失败: {str(e)}")
+            return {"message": f"设置请求追踪失败: {str(e)}", "error": True}
+
     def _download_torrent_api(self, body: dict = None) -> Dict[str, Any]:
         """API Endpoint: 下载种子"""
         try:
@@ -2283,8 +2364,8 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
 
             logger.info(f"收到插件工具更新请求: {plugin_id}, 工具数量: {len(tools)}")
 
-            # 先注销旧工具，再注册新工具
-            self._notify_mcp_server_tool_unregister(plugin_id)
+            # 注册会整体替换该插件的工具条目，一次写入即可完成更新，
+            # 避免先注销再注册时MCP Server读到中间状态
             self._notify_mcp_server_tool_register(plugin_id, tools)
 
         except Exception as e:
@@ -2302,6 +2383,9 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
 
             def update_tools(existing_tools):
                 """更新工具信息的函数"""
+                # 工具定义未变化时保留原条目，文件内容不变即可跳过写入
+                if existing_tools.get(plugin_id, {}).get("tools") == tools:
+                    return existing_tools
                 existing_tools[plugin_id] = {
                     "tools": tools,
                     "registered_at": time.time()
@@ -2466,8 +2550,8 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
 
             logger.info(f"收到插件提示更新请求: {plugin_id}, 提示数量: {len(prompts)}")
 
-            # 先注销旧提示，再注册新提示
-            self._notify_mcp_server_prompt_unregister(plugin_id)
+            # 注册会整体替换该插件的提示条目，一次写入即可完成更新，
+            # 避免先注销再注册时MCP Server读到中间状态
             self._notify_mcp_server_prompt_register(plugin_id, prompts)
 
         except Exception as e:
@@ -2485,6 +2569,9 @@ class MCPServer(_PluginBase, metaclass=SingletonClass):
 
             def update_prompts(existing_prompts):
                 """更新提示信息的函数"""
+                # 提示定义未变化时保留原条目，文件内容不变即可跳过写入
+                if existing_prompts.get(plugin_id, {}).get("prompts") == prompts:
+                    return existing_prompts
                 existing_prompts[plugin_id] = {
                     "prompts": prompts,
                     "registered_at": time.time()
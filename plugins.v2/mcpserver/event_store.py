@@ -6,12 +6,12 @@ Includes both in-memory and SQLite-based implementations.
 import logging
 import os
 import sqlite3
-from collections import deque
 from dataclasses import dataclass
-from uuid import uuid4
 import json
 import asyncio
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from mcp.server.streamable_http import (
@@ -37,51 +37,166 @@ class EventEntry:
     message: JSONRPCMessage | None
 
 
+class _StreamRing:
+    """
+    Fixed-capacity ring buffer holding the serialized events of one stream.
+
+    Events are addressed by their per-stream sequence number, so locating an
+    event is ``(head + seq - first_seq) % capacity``.
+    """
+
+    __slots__ = ("slots", "head", "count", "first_seq", "bytes", "last_access")
+
+    def __init__(self, capacity: int):
+        self.slots: list[bytes | None] = [None] * capacity
+        self.head = 0
+        self.count = 0
+        # 缓冲中最旧事件的序号
+        self.first_seq = 1
+        self.bytes = 0
+        self.last_access = time.monotonic()
+
+    @property
+    def next_seq(self) -> int:
+        return self.first_seq + self.count
+
+    def append(self, data: bytes) -> int:
+        capacity = len(self.slots)
+        self.slots[(self.head + self.count) % capacity] = data
+        self.count += 1
+        self.bytes += len(data)
+        return self.first_seq + self.count - 1
+
+    def pop_oldest(self) -> int:
+        data = self.slots[self.head]
+        self.slots[self.head] = None
+        self.head = (self.head + 1) % len(self.slots)
+        self.count -= 1
+        self.first_seq += 1
+        self.bytes -= len(data)
+        return len(data)
+
+    def get(self, seq: int) -> bytes | None:
+        offset = seq - self.first_seq
+        if offset < 0 or offset >= self.count:
+            return None
+        return self.slots[(self.head + offset) % len(self.slots)]
+
+
 class InMemoryEventStore(EventStore):
     """
-    Simple in-memory implementation of the EventStore interface for resumability.
-    This is primarily intended for examples and testing, not for production use
-    where a persistent storage solution would be more appropriate.
+    In-memory implementation of the EventStore interface for resumability.
 
-    This implementation keeps only the last N events per stream for memory efficiency.
+    Each stream keeps its serialized events in a ring buffer bounded both by event
+    count and by bytes. A global byte budget evicts events from the least recently
+    used streams first, and streams idle for longer than ``stream_idle_seconds``
+    are forgotten. Event IDs have the form ``<stream_id>:<seq>``.
     """
 
-    def __init__(self, max_events_per_stream: int = 100):
+    # 空闲流过期检查的最小间隔（秒）
+    EXPIRE_CHECK_INTERVAL = 60
+
+    def __init__(
+        self,
+        max_events_per_stream: int = 100,
+        max_bytes_per_stream: int = 4 * 1024 * 1024,
+        max_total_bytes: int = 64 * 1024 * 1024,
+        stream_idle_seconds: int = 3600
+    ):
         """Initialize the event store.
 
         Args:
             max_events_per_stream: Maximum number of events to keep per stream
+            max_bytes_per_stream: Maximum serialized bytes to keep per stream
+            max_total_bytes: Maximum serialized bytes to keep across all streams
+            stream_idle_seconds: Forget streams that saw no activity for this long
         """
-        self.max_events_per_stream = max_events_per_stream
-        # for maintaining last N events per stream
-        self.streams: dict[StreamId, deque[EventEntry]] = {}
-        # event_id -> EventEntry for quick lookup
-        self.event_index: dict[EventId, EventEntry] = {}
+        self.max_events_per_stream = max(1, max_events_per_stream)
+        self.max_bytes_per_stream = max_bytes_per_stream
+        self.max_total_bytes = max_total_bytes
+        self.stream_idle_seconds = stream_idle_seconds
+        # stream_id -> ring buffer, ordered from least to most recently used
+        self.streams: OrderedDict[StreamId, _StreamRing] = OrderedDict()
+        self.total_bytes = 0
+        self._last_expire_check = time.monotonic()
+        self._evictions = {"count": 0, "stream_bytes": 0, "total_bytes": 0}
+        self._expired_streams = 0
+
+    @staticmethod
+    def _serialize_message(message: JSONRPCMessage | None) -> bytes:
+        if message is None:
+            return b"null"
+        return json.dumps(message.root.model_dump()).encode("utf-8")
+
+    @staticmethod
+    def _deserialize_message(data: bytes) -> JSONRPCMessage | None:
+        message_dict = json.loads(data)
+        if message_dict is None:
+            return None
+        return JSONRPCMessage.model_validate(message_dict)
+
+    async def start_cleanup(self):
+        """内存存储在写入时惰性清理空闲流，无需后台任务"""
+
+    async def stop_cleanup(self):
+        """内存存储没有后台任务需要停止"""
+
+    def _evict_oldest(self, ring: _StreamRing, reason: str):
+        self.total_bytes -= ring.pop_oldest()
+        self._evictions[reason] += 1
+
+    def _drop_stream(self, stream_id: StreamId):
+        ring = self.streams.pop(stream_id)
+        self.total_bytes -= ring.bytes
+
+    def _expire_idle_streams(self, now: float):
+        """Forget streams idle for too long, oldest first; amortized O(1) per call."""
+        if now - self._last_expire_check < self.EXPIRE_CHECK_INTERVAL:
+            return
+        self._last_expire_check = now
+        while self.streams:
+            stream_id, ring = next(iter(self.streams.items()))
+            if now - ring.last_access < self.stream_idle_seconds:
+                break
+            self._drop_stream(stream_id)
+            self._expired_streams += 1
 
     async def store_event(
         self, stream_id: StreamId, message: JSONRPCMessage | None
     ) -> EventId:
-        """Stores an event with a generated event ID."""
-        event_id = str(uuid4())
-        event_entry = EventEntry(
-            event_id=event_id, stream_id=stream_id, message=message
-        )
-
-        # Get or create deque for this stream
-        if stream_id not in self.streams:
-            self.streams[stream_id] = deque(maxlen=self.max_events_per_stream)
-
-        # If deque is full, the oldest event will be automatically removed
-        # We need to remove it from the event_index as well
-        if len(self.streams[stream_id]) == self.max_events_per_stream:
-            oldest_event = self.streams[stream_id][0]
-            self.event_index.pop(oldest_event.event_id, None)
-
-        # Add new event
-        self.streams[stream_id].append(event_entry)
-        self.event_index[event_id] = event_entry
-
-        return event_id
+        """Stores an event with a sequence-based event ID."""
+        now = time.monotonic()
+        self._expire_idle_streams(now)
+
+        data = self._serialize_message(message)
+
+        ring = self.streams.get(stream_id)
+        if ring is None:
+            ring = self.streams[stream_id] = _StreamRing(self.max_events_per_stream)
+        else:
+            self.streams.move_to_end(stream_id)
+        ring.last_access = now
+
+        # 为新事件腾出空间，最新事件本身总是保留
+        if ring.count == self.max_events_per_stream:
+            self._evict_oldest(ring, "count")
+        while ring.count and ring.bytes + len(data) > self.max_bytes_per_stream:
+            self._evict_oldest(ring, "stream_bytes")
+
+        seq = ring.append(data)
+        self.total_bytes += len(data)
+
+        # 超出全局预算时，从最久未使用的流开始淘汰
+        while self.total_bytes > self.max_total_bytes:
+            oldest_id, oldest_ring = next(iter(self.streams.items()))
+            if oldest_ring is ring and ring.count == 1:
+                break
+            if oldest_ring.count:
+                self._evict_oldest(oldest_ring, "total_bytes")
+            if not oldest_ring.count:
+                self._drop_stream(oldest_id)
+
+        return f"{stream_id}:{seq}"
 
     async def replay_events_after(
         self,
@@ -89,26 +204,42 @@ class InMemoryEventStore(EventStore):
         send_callback: EventCallback,
     ) -> StreamId | None:
         """Replays events that occurred after the specified event ID."""
-        if last_event_id not in self.event_index:
+        stream_id, sep, seq_str = last_event_id.rpartition(":")
+        ring = self.streams.get(stream_id) if sep and seq_str.isdigit() else None
+        if ring is None or ring.get(int(seq_str)) is None:
             logger.warning(f"Event ID {last_event_id} not found in store")
             return None
 
-        # Get the stream and find events after the last one
-        last_event = self.event_index[last_event_id]
-        stream_id = last_event.stream_id
-        stream_events = self.streams.get(last_event.stream_id, deque())
-
-        # Events in deque are already in chronological order
-        found_last = False
-        for event in stream_events:
-            if found_last:
-                if event.message is not None:
-                    await send_callback(EventMessage(event.message, event.event_id))
-            elif event.event_id == last_event_id:
-                found_last = True
+        ring.last_access = time.monotonic()
+        self.streams.move_to_end(stream_id)
+
+        # 回放过程中可能有新事件写入，按序号逐个读取
+        seq = int(seq_str) + 1
+        while seq < ring.next_seq:
+            data = ring.get(seq)
+            if data is None:
+                # 回放期间被淘汰，跳到当前最旧的事件
+                seq = ring.first_seq
+                continue
+            message = self._deserialize_message(data)
+            if message is not None:
+                await send_callback(EventMessage(message, f"{stream_id}:{seq}"))
+            seq += 1
 
         return stream_id
 
+    def get_stats(self) -> dict:
+        """Memory usage and eviction counters for the process stats API."""
+        return {
+            "type": "memory",
+            "streams": len(self.streams),
+            "events": sum(ring.count for ring in self.streams.values()),
+            "bytes": self.total_bytes,
+            "max_total_bytes": self.max_total_bytes,
+            "evictions": dict(self._evictions),
+            "expired_streams": self._expired_streams,
+        }
+
 
 class SQLiteEventStore(EventStore):
     """
@@ -117,15 +248,30 @@ class SQLiteEventStore(EventStore):
 
     This implementation maintains a SQLite database with events and provides the same
     interface as the InMemoryEventStore but with persistence.
+
+    Writes are buffered in memory and flushed in batched transactions by a single
+    writer task. All database access goes through one long-lived WAL-mode connection
+    that is only ever touched from a dedicated single-thread executor.
+
+    Event IDs have the form ``<stream_id>:<seq>`` where ``seq`` increases
+    monotonically per stream, so a resume is one range scan on ``(stream_id, seq)``.
     """
 
+    # 回放时每次从数据库读取的行数
+    REPLAY_CHUNK_SIZE = 100
+    # 内存中跟踪序号的流数量上限，超出后按LRU淘汰，需要时再从数据库读取
+    MAX_TRACKED_STREAMS = 10000
+
     def __init__(
         self,
         db_path: str = "events.db",
         max_events_per_stream: int = 100,
         max_event_age_days: int = 30,
         auto_cleanup_interval_hours: int = 24,
-        max_db_size_mb: int = 100
+        max_db_size_mb: int = 100,
+        write_batch_size: int = 64,
+        flush_interval_ms: int = 50,
+        size_check_interval_seconds: int = 60
     ):
         """Initialize the SQLite event store.
 
@@ -135,35 +281,160 @@ class SQLiteEventStore(EventStore):
             max_event_age_days: Maximum age of events in days before cleanup
             auto_cleanup_interval_hours: How often to run automatic cleanup (in hours)
             max_db_size_mb: Maximum size of the database in MB
+            write_batch_size: Maximum number of events written in one transaction
+            flush_interval_ms: How long the writer waits to accumulate a batch
+            size_check_interval_seconds: Minimum interval between database size checks
         """
         self.db_path = db_path
         self.max_events_per_stream = max_events_per_stream
         self.max_event_age_days = max_event_age_days
         self.auto_cleanup_interval_hours = auto_cleanup_interval_hours
         self.max_db_size_mb = max_db_size_mb
+        self.write_batch_size = max(1, write_batch_size)
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self.size_check_interval_seconds = size_check_interval_seconds
+        # 每个流插入若干条后才执行一次裁剪，避免每次插入都COUNT
+        self._prune_every = max(1, max_events_per_stream // 10)
+
+        # 单线程执行器保证连接只被串行访问
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="event-store")
+        self._conn: sqlite3.Connection | None = None
+
+        self._pending: list[tuple[EventId, StreamId, str]] = []
+        # 逐条重试时因约束冲突丢弃的事件数
+        self._dropped_events = 0
+        # stream_id -> 最近分配的序号
+        self._stream_seq: OrderedDict[StreamId, int] = OrderedDict()
+        self._flush_lock: asyncio.Lock | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._writer_task = None
+
+        self._last_size_check = 0.0
+        self._size_check_task = None
+
         self._init_db()
         self._cleanup_task = None
 
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return the shared connection, opening it in WAL mode on first use."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
+
+    async def _run_db(self, func):
+        """在事件存储专用线程中执行数据库操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: func(self._get_connection()))
+
     def _init_db(self):
         """Initialize the database schema if it doesn't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        conn = self._get_connection()
+        with conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(events)")]
+            if columns and "seq" not in columns:
+                # 旧版本使用UUID作为事件ID，无法转换为序号，事件仅用于断线重连，直接重建
+                logger.info("Migrating events table to sequence-based event IDs")
+                conn.execute("DROP TABLE events")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS events (
-                    event_id TEXT PRIMARY KEY,
                     stream_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
                     message TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (stream_id, seq)
                 )
             """)
-            # Create index for faster queries
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_stream_id ON events(stream_id)")
+            # The (stream_id, seq) primary key serves replay and pruning
             conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_created_at ON events(created_at)")
-            conn.commit()
+
+    def _ensure_writer(self):
+        """Start the writer task on the running event loop if it is not running yet."""
+        if self._writer_task is not None and not self._writer_task.done():
+            return
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def _writer_loop(self):
+        """写入任务：等待新事件，稍作聚合后批量落盘"""
+        while True:
+            try:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if len(self._pending) < self.write_batch_size and self.flush_interval:
+                    await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in event writer task: {e}")
+                await asyncio.sleep(1)
+
+    async def flush(self):
+        """Write all buffered events to the database."""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.write_batch_size]
+                del self._pending[:self.write_batch_size]
+                try:
+                    await self._run_db(lambda conn: self._write_batch(conn, batch))
+                except sqlite3.IntegrityError as e:
+                    # 一条事件冲突（如主键重复）不应丢弃整批，逐条重试
+                    logger.warning(f"Failed to write {len(batch)} events in one batch, retrying row by row: {e}")
+                    try:
+                        await self._run_db(lambda conn: self._write_batch(conn, batch, row_by_row=True))
+                    except Exception as e:
+                        logger.error(f"Failed to write {len(batch)} events: {e}")
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} events: {e}")
+
+    def _write_batch(self, conn: sqlite3.Connection, batch, row_by_row: bool = False):
+        """Insert one batch and prune the streams that crossed their prune threshold.
+
+        With ``row_by_row`` each event is inserted separately and events that violate
+        a constraint are dropped, so one bad event does not discard the whole batch.
+        """
+        # 序号每增长_prune_every就裁剪一次该流，stream_id -> 需保留的最小序号
+        to_prune: dict[StreamId, int] = {}
+        for stream_id, seq, _ in batch:
+            if seq % self._prune_every == 0 and seq > self.max_events_per_stream:
+                to_prune[stream_id] = seq - self.max_events_per_stream
+
+        with conn:
+            if row_by_row:
+                for stream_id, seq, message_str in batch:
+                    try:
+                        conn.execute(
+                            "INSERT INTO events (stream_id, seq, message) VALUES (?, ?, ?)",
+                            (stream_id, seq, message_str)
+                        )
+                    except sqlite3.IntegrityError as e:
+                        self._dropped_events += 1
+                        logger.error(f"Dropping event {self._format_event_id(stream_id, seq)}: {e}")
+            else:
+                conn.executemany(
+                    "INSERT INTO events (stream_id, seq, message) VALUES (?, ?, ?)",
+                    batch
+                )
+            for stream_id, min_seq in to_prune.items():
+                # Keep only the newest max_events_per_stream rows of this stream
+                conn.execute(
+                    "DELETE FROM events WHERE stream_id = ? AND seq <= ?",
+                    (stream_id, min_seq)
+                )
 
     async def start_cleanup(self):
         """启动清理任务。必须在事件循环运行后调用。"""
+        self._ensure_writer()
         if self._cleanup_task is not None:
             return  # 防止多次启动任务
 
@@ -189,7 +460,7 @@ class SQLiteEventStore(EventStore):
         self._cleanup_task = asyncio.create_task(cleanup_task())
 
     async def stop_cleanup(self):
-        """停止清理任务"""
+        """停止清理任务，并将缓冲中的事件写入数据库"""
         if self._cleanup_task is not None:
             self._cleanup_task.cancel()
             try:
@@ -199,6 +470,27 @@ class SQLiteEventStore(EventStore):
             self._cleanup_task = None
             logger.info("Cleanup task stopped")
 
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        await self.flush()
+
+    async def close(self):
+        """Flush pending events and release the database connection."""
+        await self.stop_cleanup()
+
+        def db_close(conn):
+            conn.close()
+            self._conn = None
+
+        if self._conn is not None:
+            await self._run_db(db_close)
+        self._executor.shutdown(wait=False)
+
     def _serialize_message(self, message: JSONRPCMessage | None) -> str:
         """Serialize a JSONRPCMessage, or a priming event with no payload, for storage."""
         if message is None:
@@ -222,64 +514,55 @@ class SQLiteEventStore(EventStore):
 
         logger.info(f"Cleaning up events older than {cutoff_str}")
 
-        def db_cleanup():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                # 获取要删除的事件数量
-                cursor.execute(
-                    "SELECT COUNT(*) FROM events WHERE created_at < ?",
-                    (cutoff_str,)
-                )
-                count = cursor.fetchone()[0]
-
-                # 删除旧事件
-                cursor.execute(
+        def db_cleanup(conn):
+            with conn:
+                # 删除旧事件，rowcount即删除数量
+                cursor = conn.execute(
                     "DELETE FROM events WHERE created_at < ?",
                     (cutoff_str,)
                 )
-                conn.commit()
-                return count
+                return cursor.rowcount
 
-        # 在线程池中执行数据库操作
-        count = await asyncio.get_event_loop().run_in_executor(None, db_cleanup)
+        # 在事件存储线程中执行数据库操作
+        count = await self._run_db(db_cleanup)
         if count > 0:
             logger.info(f"Cleaned up {count} old events")
         return count
 
+    def _get_db_size_mb(self) -> float:
+        """数据库文件大小（包含WAL文件）"""
+        total = 0
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total / (1024 * 1024)
+
     async def vacuum_database(self):
         """执行VACUUM操作以回收空间并优化数据库。"""
         logger.info("Running database VACUUM operation")
 
-        def db_vacuum():
-            with sqlite3.connect(self.db_path) as conn:
-                # 获取当前数据库大小
-                db_size_bytes = os.path.getsize(self.db_path)
-                db_size_mb = db_size_bytes / (1024 * 1024)
+        def db_vacuum(conn):
+            # 获取当前数据库大小
+            db_size_mb = self._get_db_size_mb()
 
-                # 执行VACUUM操作
-                conn.execute("VACUUM")
-                conn.commit()
+            # 执行VACUUM操作，并截断WAL文件
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
-                # 获取VACUUM后的大小
-                new_size_bytes = os.path.getsize(self.db_path)
-                new_size_mb = new_size_bytes / (1024 * 1024)
+            # 获取VACUUM后的大小
+            new_size_mb = self._get_db_size_mb()
 
-                return db_size_mb, new_size_mb
+            return db_size_mb, new_size_mb
 
-        # 在线程池中执行数据库操作
-        before_mb, after_mb = await asyncio.get_event_loop().run_in_executor(None, db_vacuum)
+        # 在事件存储线程中执行数据库操作
+        before_mb, after_mb = await self._run_db(db_vacuum)
         logger.info(
             f"Database size: {before_mb:.2f}MB → {after_mb:.2f}MB (saved {before_mb - after_mb:.2f}MB)")
         return before_mb, after_mb
 
     async def check_db_size(self):
         """检查数据库大小，如果超过限制则触发清理。"""
-        def get_db_size():
-            if os.path.exists(self.db_path):
-                return os.path.getsize(self.db_path) / (1024 * 1024)
-            return 0
-
-        db_size_mb = await asyncio.get_event_loop().run_in_executor(None, get_db_size)
+        db_size_mb = self._get_db_size_mb()
 
         if db_size_mb > self.max_db_size_mb:
             logger.warning(
@@ -288,37 +571,35 @@ class SQLiteEventStore(EventStore):
             cleaned = await self.cleanup_old_events()
             if cleaned == 0:
                 # 如果没有清理到旧事件，则删除最旧的一些事件，直到大小合适
-                def emergency_cleanup():
-                    with sqlite3.connect(self.db_path) as conn:
-                        cursor = conn.cursor()
-                        # 计算需要删除的事件数量（估计值）
-                        target_percent = 0.8  # 目标是将数据库缩小到最大大小的80%
-                        target_size = self.max_db_size_mb * target_percent
-                        percent_to_delete = 1 - (target_size / db_size_mb)
-
-                        # 获取总事件数
-                        cursor.execute("SELECT COUNT(*) FROM events")
-                        total_events = cursor.fetchone()[0]
-
-                        # 计算要删除的事件数
-                        events_to_delete = int(
-                            total_events * percent_to_delete)
-
-                        if events_to_delete > 0:
-                            # 删除最旧的事件
-                            cursor.execute(
-                                """DELETE FROM events WHERE event_id IN (
-                                    SELECT event_id FROM events 
-                                    ORDER BY created_at 
+                def emergency_cleanup(conn):
+                    # 计算需要删除的事件数量（估计值）
+                    target_percent = 0.8  # 目标是将数据库缩小到最大大小的80%
+                    target_size = self.max_db_size_mb * target_percent
+                    percent_to_delete = 1 - (target_size / db_size_mb)
+
+                    # 获取总事件数
+                    total_events = conn.execute(
+                        "SELECT COUNT(*) FROM events").fetchone()[0]
+
+                    # 计算要删除的事件数
+                    events_to_delete = int(
+                        total_events * percent_to_delete)
+
+                    if events_to_delete > 0:
+                        # 删除最旧的事件
+                        with conn:
+                            conn.execute(
+                                """DELETE FROM events WHERE rowid IN (
+                                    SELECT rowid FROM events
+                                    ORDER BY rowid
                                     LIMIT ?
                                 )""",
                                 (events_to_delete,)
                             )
-                            conn.commit()
-                            return events_to_delete
-                        return 0
+                        return events_to_delete
+                    return 0
 
-                deleted = await asyncio.get_event_loop().run_in_executor(None, emergency_cleanup)
+                deleted = await self._run_db(emergency_cleanup)
                 if deleted > 0:
                     logger.info(
                         f"Emergency cleanup: deleted {deleted} oldest events")
@@ -326,48 +607,70 @@ class SQLiteEventStore(EventStore):
             # 执行VACUUM操作回收空间
             await self.vacuum_database()
 
+    def _maybe_check_db_size(self):
+        """按时间间隔在后台检查数据库大小，而不是每次存储事件都检查"""
+        now = time.monotonic()
+        if now - self._last_size_check < self.size_check_interval_seconds:
+            return
+        if self._size_check_task is not None and not self._size_check_task.done():
+            return
+        self._last_size_check = now
+        self._size_check_task = asyncio.create_task(self.check_db_size())
+
+    @staticmethod
+    def _format_event_id(stream_id: StreamId, seq: int) -> EventId:
+        return f"{stream_id}:{seq}"
+
+    @staticmethod
+    def _parse_event_id(event_id: EventId) -> tuple[StreamId, int] | None:
+        stream_id, sep, seq = event_id.rpartition(":")
+        if not sep or not stream_id or not seq.isdigit():
+            return None
+        return stream_id, int(seq)
+
+    async def _next_seq(self, stream_id: StreamId) -> int:
+        """Allocate the next sequence number of a stream."""
+        seq = self._stream_seq.get(stream_id)
+        if seq is None:
+            # 首次见到该流（或已被LRU淘汰），从数据库恢复最大序号，保证重启后仍单调递增
+            def get_max_seq(conn):
+                row = conn.execute(
+                    "SELECT MAX(seq) FROM events WHERE stream_id = ?",
+                    (stream_id,)
+                ).fetchone()
+                return row[0] or 0
+
+            if self._flush_lock is None:
+                last_seq = await self._run_db(get_max_seq)
+            else:
+                # 持有写入锁，保证没有正在落盘的批次；尚未落盘的事件也要计入，否则会重复分配序号
+                async with self._flush_lock:
+                    last_seq = await self._run_db(get_max_seq)
+                    for pending_stream, pending_seq, _ in self._pending:
+                        if pending_stream == stream_id and pending_seq > last_seq:
+                            last_seq = pending_seq
+            seq = self._stream_seq.get(stream_id, last_seq)
+
+        seq += 1
+        self._stream_seq[stream_id] = seq
+        self._stream_seq.move_to_end(stream_id)
+        if len(self._stream_seq) > self.MAX_TRACKED_STREAMS:
+            self._stream_seq.popitem(last=False)
+        return seq
+
     async def store_event(
         self, stream_id: StreamId, message: JSONRPCMessage | None
     ) -> EventId:
-        """Stores an event with a generated event ID in SQLite database."""
-        event_id = str(uuid4())
+        """Queues an event with a sequence-based event ID for the batched writer."""
+        seq = await self._next_seq(stream_id)
+        event_id = self._format_event_id(stream_id, seq)
         message_str = self._serialize_message(message)
 
-        # Run database operations in a thread pool to avoid blocking
-        def db_store():
-            with sqlite3.connect(self.db_path) as conn:
-                # Insert the new event
-                conn.execute(
-                    "INSERT INTO events (event_id, stream_id, message) VALUES (?, ?, ?)",
-                    (event_id, stream_id, message_str)
-                )
+        self._ensure_writer()
+        self._pending.append((stream_id, seq, message_str))
+        self._wakeup.set()
 
-                # Check if we need to prune old events
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT COUNT(*) FROM events WHERE stream_id = ?",
-                    (stream_id,)
-                )
-                count = cursor.fetchone()[0]
-
-                if count > self.max_events_per_stream:
-                    # Delete oldest events beyond the limit
-                    cursor.execute(
-                        """DELETE FROM events WHERE event_id IN (
-                            SELECT event_id FROM events 
-                            WHERE stream_id = ? 
-                            ORDER BY created_at 
-                            LIMIT ?
-                        )""",
-                        (stream_id, count - self.max_events_per_stream)
-                    )
-                conn.commit()
-
-        # Run in thread pool
-        await asyncio.get_event_loop().run_in_executor(None, db_store)
-
-        # 每次存储事件时检查数据库大小
-        await self.check_db_size()
+        self._maybe_check_db_size()
 
         return event_id
 
@@ -377,44 +680,57 @@ class SQLiteEventStore(EventStore):
         send_callback: EventCallback,
     ) -> StreamId | None:
         """Replays events that occurred after the specified event ID from SQLite database."""
-        # Run database query in a thread pool
-        def get_last_event():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT stream_id, created_at FROM events WHERE event_id = ?",
-                    (last_event_id,)
-                )
-                result = cursor.fetchone()
-                return result
-
-        result = await asyncio.get_event_loop().run_in_executor(None, get_last_event)
-        if not result:
+        parsed = self._parse_event_id(last_event_id)
+        if parsed is None:
             logger.warning(f"Event ID {last_event_id} not found in store")
             return None
-
-        stream_id, last_timestamp = result
-
-        # Get events after the last one
-        def get_newer_events():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """SELECT event_id, message FROM events 
-                       WHERE stream_id = ? AND created_at > ? 
-                       ORDER BY created_at""",
-                    (stream_id, last_timestamp)
+        stream_id, last_seq = parsed
+
+        # 先把缓冲中的事件写入数据库，保证回放可见
+        await self.flush()
+
+        # 单次范围扫描：第一行必须是last_event_id本身，否则说明该事件已被清理
+        def get_events_from(from_seq: int):
+            def query(conn):
+                cursor = conn.execute(
+                    """SELECT seq, message FROM events
+                       WHERE stream_id = ? AND seq >= ?
+                       ORDER BY seq
+                       LIMIT ?""",
+                    (stream_id, from_seq, self.REPLAY_CHUNK_SIZE)
                 )
                 return cursor.fetchall()
+            return query
 
-        events = await asyncio.get_event_loop().run_in_executor(None, get_newer_events)
+        rows = await self._run_db(get_events_from(last_seq))
+        if not rows or rows[0][0] != last_seq:
+            logger.warning(f"Event ID {last_event_id} not found in store")
+            return None
 
-        # Send each event through the callback. Priming events have no JSON-RPC
-        # payload and are only used to reserve an SSE event id, so they should
-        # not be replayed as application messages.
-        for event_id, message_str in events:
-            message = self._deserialize_message(message_str)
-            if message is not None:
-                await send_callback(EventMessage(message, event_id))
+        # Stream rows to the callback chunk by chunk. Priming events have no
+        # JSON-RPC payload and are only used to reserve an SSE event id, so they
+        # should not be replayed as application messages.
+        while True:
+            for seq, message_str in rows:
+                if seq == last_seq:
+                    continue
+                message = self._deserialize_message(message_str)
+                if message is not None:
+                    await send_callback(
+                        EventMessage(message, self._format_event_id(stream_id, seq)))
+            if len(rows) < self.REPLAY_CHUNK_SIZE:
+                break
+            rows = await self._run_db(get_events_from(rows[-1][0] + 1))
 
         return stream_id
+
+    def get_stats(self) -> dict:
+        """Write-behind queue and database size for the process stats API."""
+        return {
+            "type": "sqlite",
+            "pending_writes": len(self._pending),
+            "dropped_events": self._dropped_events,
+            "tracked_streams": len(self._stream_seq),
+            "db_size_mb": round(self._get_db_size_mb(), 2),
+            "max_db_size_mb": self.max_db_size_mb,
+        }
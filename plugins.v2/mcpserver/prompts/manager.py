@@ -133,103 +133,28 @@ class PromptManager:
         return self._plugin_prompt_registry
 
     def _setup_state_sync(self):
-        """设置状态同步"""
+        """监听插件提示文件，按插件增量同步到注册表"""
         try:
-            from utils.state_sync import register_sync_target, start_state_monitoring
+            from utils.plugin_watcher import watch_plugin_file
 
             # 获取插件提示文件路径
             current_dir = Path(os.path.dirname(__file__)).parent
             prompts_file = current_dir / "plugin_prompts.json"
 
-            # 注册状态同步目标
-            register_sync_target(
+            watch_plugin_file(
                 name="plugin_prompts",
                 file_path=prompts_file,
-                memory_getter=self._get_memory_state,
-                memory_setter=self._set_memory_state,
-                sync_interval=30  # 30秒检查一次
+                items_key="prompts",
+                register=self._plugin_prompt_registry.register_prompts,
+                unregister=self._plugin_prompt_registry.unregister_plugin_prompts
             )
-
-            # 启动状态监控（如果还没启动）
-            try:
-                start_state_monitoring()
-                self._state_sync_enabled = True
-                logger.info("插件提示状态同步已启用")
-            except Exception as e:
-                # 可能已经启动了，这是正常的
-                if "已在运行" in str(e):
-                    self._state_sync_enabled = True
-                    logger.debug("插件提示状态同步已启用（监控已在运行）")
-                else:
-                    raise e
+            self._state_sync_enabled = True
+            logger.info("插件提示状态同步已启用")
 
         except Exception as e:
             logger.warning(f"设置提示状态同步失败: {e}")
             self._state_sync_enabled = False
 
-    def _get_memory_state(self) -> Dict[str, any]:
-        """获取当前内存中的插件提示状态"""
-        try:
-            # 获取所有插件的提示信息
-            memory_state = {}
-
-            # 遍历插件注册表中的所有插件
-            for plugin_id in self._plugin_prompt_registry._plugin_prompts.keys():
-                prompts = self._plugin_prompt_registry.get_plugin_prompts(plugin_id)
-                if prompts:
-                    # 构建与文件格式一致的数据结构
-                    prompt_infos = []
-                    for prompt_name in prompts:
-                        prompt_info = self._plugin_prompt_registry.get_prompt_info(prompt_name)
-                        if prompt_info:
-                            prompt_infos.append(prompt_info.to_dict())
-
-                    memory_state[plugin_id] = {
-                        "prompts": prompt_infos,
-                        "registered_at": prompt_infos[0].get("registered_at") if prompt_infos else None
-                    }
-
-            return memory_state
-
-        except Exception as e:
-            logger.error(f"获取提示内存状态失败: {e}")
-            return {}
-
-    def _set_memory_state(self, file_state: Dict[str, any]):
-        """根据文件状态更新内存状态"""
-        try:
-            logger.info("开始从文件同步插件提示状态到内存")
-
-            # 获取当前内存中的插件列表
-            current_plugins = set(self._plugin_prompt_registry._plugin_prompts.keys())
-            file_plugins = set(file_state.keys())
-
-            # 移除不在文件中的插件提示
-            plugins_to_remove = current_plugins - file_plugins
-            for plugin_id in plugins_to_remove:
-                logger.info(f"移除不在文件中的插件提示: {plugin_id}")
-                self._plugin_prompt_registry.unregister_plugin_prompts(plugin_id)
-
-            # 添加或更新文件中的插件提示
-            for plugin_id, plugin_data in file_state.items():
-                prompts = plugin_data.get("prompts", [])
-                if prompts:
-                    # 先移除现有提示
-                    if plugin_id in current_plugins:
-                        self._plugin_prompt_registry.unregister_plugin_prompts(plugin_id)
-
-                    # 注册新提示
-                    result = self._plugin_prompt_registry.register_prompts(plugin_id, prompts)
-                    if result.get("success"):
-                        logger.debug(f"同步插件提示成功: {plugin_id}")
-                    else:
-                        logger.warning(f"同步插件提示失败: {plugin_id}, {result.get('message')}")
-
-            logger.info("插件提示状态同步完成")
-
-        except Exception as e:
-            logger.error(f"设置提示内存状态失败: {e}")
-
     def enable_state_sync(self):
         """启用状态同步"""
         if not self._state_sync_enabled:
@@ -239,8 +164,8 @@ class PromptManager:
         """禁用状态同步"""
         if self._state_sync_enabled:
             try:
-                from utils.state_sync import stop_state_monitoring
-                stop_state_monitoring()
+                from utils.plugin_watcher import get_plugin_watcher
+                get_plugin_watcher().unwatch("plugin_prompts")
                 self._state_sync_enabled = False
                 logger.info("插件提示状态同步已禁用")
             except Exception as e:
@@ -250,9 +175,8 @@ class PromptManager:
         """强制从文件同步状态"""
         if self._state_sync_enabled:
             try:
-                from utils.state_sync import get_state_sync_manager
-                sync_manager = get_state_sync_manager()
-                sync_manager.force_sync("plugin_prompts")
+                from utils.plugin_watcher import get_plugin_watcher
+                get_plugin_watcher().force_sync("plugin_prompts")
                 logger.info("强制提示状态同步完成")
             except Exception as e:
                 logger.error(f"强制提示状态同步失败: {e}")
@@ -29,191 +29,19 @@ sys.path.insert(0, str(current_dir))
 
 # 导入工具和提示管理器
 from tools import ToolManager
+from tools.resource_cache import resource_cache
 from prompts import PromptManager
 
 # 导入共享的认证模块
 from auth import BearerAuthMiddleware, create_token_manager
 
-def _start_plugin_tool_monitor(tool_manager):
-    """启动插件工具监控线程"""
-    import threading
-    import time
-    import json
-    import os
-    import logging
-
-    logger = logging.getLogger(__name__)
-
-    def monitor_plugin_tools():
-        """监控插件工具文件变化"""
-        tools_file = os.path.join(os.path.dirname(__file__), "plugin_tools.json")
-        last_modified = 0
-
-        while True:
-            try:
-                if os.path.exists(tools_file):
-                    current_modified = os.path.getmtime(tools_file)
-
-                    if current_modified > last_modified:
-                        last_modified = current_modified
-
-                        # 读取工具文件
-                        try:
-                            # 导入安全文件操作工具
-                            import sys
-                            import os
-                            sys.path.append(os.path.dirname(__file__))
-                            from utils.file_operations import safe_read_json
-                            from pathlib import Path
-
-                            plugin_tools = safe_read_json(Path(tools_file), default_value={})
-
-                            # 更新工具管理器
-                            _update_plugin_tools(tool_manager, plugin_tools)
-
-                        except Exception as e:
-                            logger.error(f"读取插件工具文件失败: {str(e)}")
-
-                time.sleep(5)  # 每5秒检查一次
-
-            except Exception as e:
-                logger.error(f"监控插件工具文件时发生异常: {str(e)}")
-                time.sleep(10)  # 出错时等待更长时间
-
-    # 启动监控线程
-    monitor_thread = threading.Thread(target=monitor_plugin_tools, daemon=True)
-    monitor_thread.start()
-    logger.info("插件工具监控线程已启动")
-
-
-def _start_plugin_prompt_monitor(prompt_manager):
-    """启动插件提示监控线程"""
-    import threading
-    import time
-    import json
-    import os
-    import logging
-
-    logger = logging.getLogger(__name__)
-
-    def monitor_plugin_prompts():
-        """监控插件提示文件变化"""
-        prompts_file = os.path.join(os.path.dirname(__file__), "plugin_prompts.json")
-        last_modified = 0
-
-        while True:
-            try:
-                # 检查文件是否存在且有修改
-                if os.path.exists(prompts_file):
-                    current_modified = os.path.getmtime(prompts_file)
-                    if current_modified > last_modified:
-                        last_modified = current_modified
-                        logger.info("检测到插件提示文件变化，正在更新...")
-
-                        # 读取提示文件
-                        # 导入安全文件操作工具
-                        import sys
-                        import os
-                        sys.path.append(os.path.dirname(__file__))
-                        from utils.file_operations import safe_read_json
-                        from pathlib import Path
-
-                        plugin_prompts = safe_read_json(Path(prompts_file), default_value={})
-
-                        # 更新插件提示
-                        _update_plugin_prompts(prompt_manager, plugin_prompts)
-
-                # 每5秒检查一次
-                time.sleep(5)
-
-            except Exception as e:
-                logger.error(f"监控插件提示文件时发生异常: {str(e)}")
-                time.sleep(10)  # 出错时等待更长时间
-
-    # 启动监控线程
-    monitor_thread = threading.Thread(target=monitor_plugin_prompts, daemon=True)
-    monitor_thread.start()
-    logger.info("插件提示监控线程已启动")
-
-
-def _update_plugin_prompts(prompt_manager, plugin_prompts):
-    """更新插件提示"""
-    import logging
-    logger = logging.getLogger(__name__)
-
-    try:
-        # 获取当前已注册的插件提示统计
-        current_stats = prompt_manager.get_plugin_prompt_registry().get_registry_stats()
-        current_plugins = set(current_stats.get("prompts_by_plugin", {}).keys())
-
-        # 获取新的插件列表
-        new_plugins = set(plugin_prompts.keys())
-
-        # 找出需要注销的插件（在当前注册中但不在新列表中）
-        plugins_to_unregister = current_plugins - new_plugins
-        for plugin_id in plugins_to_unregister:
-            result = prompt_manager.unregister_plugin_prompts(plugin_id)
-            logger.info(f"注销插件提示: {plugin_id}, 结果: {result}")
-
-        # 注册或更新插件提示
-        for plugin_id, plugin_data in plugin_prompts.items():
-            prompts = plugin_data.get("prompts", [])
-            if prompts:
-                # 先注销现有提示（如果存在）
-                if plugin_id in current_plugins:
-                    prompt_manager.unregister_plugin_prompts(plugin_id)
-
-                # 注册新提示
-                result = prompt_manager.register_plugin_prompts(plugin_id, prompts)
-                logger.info(f"注册插件提示: {plugin_id}, 结果: {result}")
-
-        # 记录最新统计
-        updated_stats = prompt_manager.get_plugin_prompt_registry().get_registry_stats()
-        logger.info(f"插件提示更新完成: {updated_stats}")
-
-    except Exception as e:
-        logger.error(f"更新插件提示时发生异常: {str(e)}")
-
-def _update_plugin_tools(tool_manager, plugin_tools):
-    """更新插件工具"""
-    import logging
-    import traceback
-
-    logger = logging.getLogger(__name__)
-
-    try:
-        # 获取当前已注册的插件工具统计
-        current_stats = tool_manager.get_plugin_registry_stats()
-        current_plugins = set(current_stats.get("tools_by_plugin", {}).keys())
-
-        # 获取新的插件列表
-        new_plugins = set(plugin_tools.keys())
-
-        # 找出需要注销的插件（在当前注册中但不在新列表中）
-        plugins_to_unregister = current_plugins - new_plugins
-        for plugin_id in plugins_to_unregister:
-            result = tool_manager.unregister_plugin_tools(plugin_id)
-            logger.info(f"注销插件工具: {plugin_id}, 结果: {result}")
-
-        # 注册或更新插件工具
-        for plugin_id, plugin_data in plugin_tools.items():
-            tools = plugin_data.get("tools", [])
-            if tools:
-                # 先注销现有工具（如果存在）
-                if plugin_id in current_plugins:
-                    tool_manager.unregister_plugin_tools(plugin_id)
-
-                # 注册新工具
-                result = tool_manager.register_plugin_tools(plugin_id, tools)
-                logger.info(f"注册插件工具: {plugin_id}, 结果: {result}")
-
-        # 记录最新统计
-        updated_stats = tool_manager.get_plugin_registry_stats()
-        logger.info(f"插件工具更新完成: {updated_stats}")
-
-    except Exception as e:
-        logger.error(f"更新插件工具时发生异常: {str(e)}")
-        logger.error(traceback.format_exc())
+from utils import (
+    register_stats_provider,
+    collect_server_stats,
+    get_response_cache_stats,
+    query_traces,
+    configure_tracing,
+)
 
 # 配置日志
 def setup_logging(log_level: str = "INFO", log_file: str = None):
@@ -325,17 +153,16 @@ async def run_server(
     # 创建Server实例
     app = Server("moviepilot-mcp-server")
 
-    # 初始化工具管理器
+    # 初始化工具管理器（内部会监听插件工具文件变化）
     tool_manager = ToolManager(token_manager)
 
-    # 启动插件工具监控
-    _start_plugin_tool_monitor(tool_manager)
-
-    # 初始化提示管理器
+    # 初始化提示管理器（内部会监听插件提示文件变化）
     prompt_manager = PromptManager(token_manager)
 
-    # 启动插件提示监控
-    _start_plugin_prompt_monitor(prompt_manager)
+    # 资源缓存持久化，服务器重启后资源标识符仍然有效
+    resource_cache.enable_persistence(str(current_dir / "resource_cache.db"))
+    register_stats_provider("resource_cache", resource_cache.get_cache_stats)
+    register_stats_provider("http_cache", get_response_cache_stats)
 
     @app.call_tool()
     async def call_tool(
@@ -382,6 +209,30 @@ async def run_server(
         """健康检查端点"""
         return JSONResponse({"status": "healthy", "server": "mcp-sse"})
 
+    # 运行统计端点
+    async def server_stats(request):
+        """运行统计端点，供插件进程统计API读取"""
+        return JSONResponse(collect_server_stats())
+
+    # 请求追踪端点：GET查询最近的span，POST调整追踪配置
+    async def server_traces(request):
+        """请求追踪端点，供插件API查询和开关追踪"""
+        if request.method == "POST":
+            try:
+                options = await request.json()
+            except Exception:
+                options = {}
+            return JSONResponse(configure_tracing(options if isinstance(options, dict) else {}))
+        try:
+            limit = int(request.query_params.get("limit", 100))
+        except ValueError:
+            limit = 100
+        return JSONResponse(query_traces(
+            limit=limit,
+            kind=request.query_params.get("kind"),
+            name=request.query_params.get("name"),
+        ))
+
     @contextlib.asynccontextmanager
     async def lifespan(_: Starlette) -> AsyncIterator[None]:
         """应用生命周期管理"""
@@ -435,6 +286,8 @@ async def run_server(
     routes = [
         Mount("/sse", app=sse_endpoint),  # SSE端点使用Mount，处理 /sse/ 和 /sse/messages/
         Route("/health", endpoint=health_check),
+        Route("/stats", endpoint=server_stats),
+        Route("/traces", endpoint=server_traces, methods=["GET", "POST"]),
     ]
 
     # 创建Starlette应用
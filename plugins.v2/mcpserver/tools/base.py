@@ -1,7 +1,7 @@
 import logging
 import os
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import mcp.types as types
 
 # 添加父目录到路径，以便导入utils
@@ -48,35 +48,56 @@ class BaseTool:
 
     async def _make_request(self, method: str, endpoint: str, **kwargs):
         """发送API请求的辅助方法"""
-        logger.debug(f"[BaseTool] 开始发送API请求")
-        logger.debug(f"[BaseTool] 请求方法: {method}")
-        logger.debug(f"[BaseTool] 请求端点: {endpoint}")
-        logger.debug(f"[BaseTool] 请求参数: {kwargs}")
-
         # 确保json参数被正确传递为json_data
         if 'json' in kwargs and 'json_data' not in kwargs:
             kwargs['json_data'] = kwargs.pop('json')
-            logger.debug(f"[BaseTool] 转换json参数为json_data")
 
         # 获取访问令牌
         access_token = self.token_manager.get_access_token() if self.token_manager else None
-        logger.debug(f"[BaseTool] 访问令牌: {'已设置' if access_token else '未设置'}")
-        if access_token:
-            logger.debug(f"[BaseTool] 令牌长度: {len(access_token)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[BaseTool] %s %s, 访问令牌: %s, 请求参数: %s",
+                         method, endpoint, "已设置" if access_token else "未设置", kwargs)
 
         try:
-            logger.debug(f"[BaseTool] 调用make_request函数...")
-            result = await make_request(
+            return await make_request(
                 method=method,
                 endpoint=endpoint,
                 access_token=access_token,
                 **kwargs
             )
-            logger.debug(f"[BaseTool] make_request返回结果: {result}")
-            logger.debug(f"[BaseTool] 返回结果类型: {type(result)}")
-            return result
         except Exception as e:
             logger.error(f"[BaseTool] make_request调用异常: {str(e)}")
-            import traceback
-            logger.debug(f"[BaseTool] 异常堆栈: {traceback.format_exc()}")
+            logger.debug("[BaseTool] 异常堆栈", exc_info=True)
             raise
+
+    async def _send_progress(self, progress: float, total: Optional[float] = None,
+                             message: Optional[str] = None) -> bool:
+        """向客户端发送进度通知
+
+        仅当客户端在本次工具调用中提供了progressToken时发送，发送失败不影响工具执行。
+
+        Returns:
+            bool: 是否已发送
+        """
+        try:
+            from mcp.server.lowlevel.server import request_ctx
+            ctx = request_ctx.get()
+        except (ImportError, LookupError):
+            return False
+
+        progress_token = getattr(ctx.meta, "progressToken", None) if ctx.meta else None
+        if progress_token is None:
+            return False
+
+        try:
+            try:
+                await ctx.session.send_progress_notification(
+                    progress_token, progress, total=total, message=message
+                )
+            except TypeError:
+                # 旧版本MCP SDK不支持message参数
+                await ctx.session.send_progress_notification(progress_token, progress, total=total)
+            return True
+        except Exception as e:
+            logger.debug(f"[BaseTool] 发送进度通知失败: {str(e)}")
+            return False
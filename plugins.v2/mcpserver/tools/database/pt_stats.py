@@ -103,6 +103,9 @@ class PTStatsTool(BaseTool):
 
     def _get_db_connection(self):
         """获取数据库连接"""
+        if not os.path.exists(self.db_path):
+            # 工具实例会被复用，数据库可能在服务启动后才创建，重新检测一次
+            self.db_path = self._get_database_path()
         if not os.path.exists(self.db_path):
             candidates = self.db_path_candidates or [self.db_path]
             raise FileNotFoundError(
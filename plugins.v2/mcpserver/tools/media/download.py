@@ -1,5 +1,7 @@
+import asyncio
 import json
 import logging
+import re
 import mcp.types as types
 from ..base import BaseTool
 from .recognize import MediaRecognizeTool
@@ -9,6 +11,11 @@ from ..resource_cache import resource_cache
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# 多站点并发搜索时单个站点的默认超时时间（秒）
+DEFAULT_SITE_TIMEOUT = 60
+# 每个站点完成时在进度通知中预览的新资源数量
+PROGRESS_PREVIEW_COUNT = 3
+
 
 class MovieDownloadTool(BaseTool):
     """媒体搜索和下载工具"""
@@ -53,6 +60,152 @@ class MovieDownloadTool(BaseTool):
                 return text
         return default
 
+    @staticmethod
+    def _parse_site_ids(sites) -> list[str]:
+        """把逗号分隔的站点ID字符串或列表解析为去重后的站点ID列表"""
+        if isinstance(sites, (list, tuple)):
+            items = sites
+        else:
+            items = str(sites or "").split(",")
+        site_ids = []
+        for item in items:
+            site_id = str(item).strip()
+            if site_id and site_id not in site_ids:
+                site_ids.append(site_id)
+        return site_ids
+
+    def _torrent_fields(self, torrent) -> dict:
+        """返回种子信息字典，兼容Context序列化和直接的种子信息两种结构"""
+        if not isinstance(torrent, dict):
+            return {}
+        return self._as_dict(torrent.get("torrent_info")) or torrent
+
+    def _torrent_dedup_key(self, torrent) -> tuple:
+        """种子去重键：优先使用info-hash，其次使用大小+标题，最后使用下载链接"""
+        torrent_info = self._torrent_fields(torrent)
+        for field in ("hash", "info_hash", "infohash"):
+            info_hash = self._first_text(torrent_info.get(field))
+            if info_hash:
+                return "hash", info_hash.lower()
+
+        title = self._first_text(torrent_info.get("title"), torrent_info.get("description"))
+        size = torrent_info.get("size")
+        if title and isinstance(size, (int, float)) and size > 0:
+            return "title", re.sub(r"[\W_]+", "", title).lower(), int(size)
+
+        return "url", self._first_text(torrent_info.get("enclosure"), torrent_info.get("page_url"), title,
+                                       default=str(id(torrent)))
+
+    def _torrent_seeders(self, torrent) -> int:
+        seeders = self._torrent_fields(torrent).get("seeders")
+        try:
+            return int(seeders or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    async def _fan_out_search(self, endpoint: str, params: dict, site_ids: list[str],
+                              site_timeout: float) -> tuple[list, dict]:
+        """
+        按站点并发搜索，合并去重结果
+
+        每个站点单独请求并设置超时，慢站点不会拖住整个调用；
+        每个站点完成后通过MCP进度通知推送该站点的新结果预览。
+
+        参数:
+            endpoint: 搜索API端点
+            params: 搜索参数，sites字段会被替换为单个站点ID
+            site_ids: 站点ID列表
+            site_timeout: 单个站点超时时间（秒）
+
+        返回:
+            (按做种数排序的去重结果, 搜索摘要)
+        """
+        await self._ensure_site_mapping()
+
+        async def search_site(site_id: str):
+            return await asyncio.wait_for(
+                self._make_request(method="GET", endpoint=endpoint, params={**params, "sites": site_id}),
+                timeout=site_timeout
+            )
+
+        tasks = {asyncio.create_task(search_site(site_id)): site_id for site_id in site_ids}
+        merged: dict = {}
+        summary = {"total": len(site_ids), "succeeded": [], "timed_out": [], "failed": {}, "duplicates": 0}
+        pending = set(tasks)
+        finished = 0
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    site_id = tasks[task]
+                    site_name = resource_cache.get_site_name(site_id)
+                    new_torrents = []
+                    try:
+                        response = task.result()
+                    except asyncio.TimeoutError:
+                        summary["timed_out"].append(site_name)
+                        logger.warning(f"站点 {site_name}({site_id}) 搜索超时（{site_timeout}秒）")
+                        response = None
+                    except Exception as e:
+                        summary["failed"][site_name] = str(e)
+                        logger.error(f"站点 {site_name}({site_id}) 搜索出错: {str(e)}")
+                        response = None
+
+                    if response is not None:
+                        if isinstance(response, dict) and response.get("success", False):
+                            summary["succeeded"].append(site_name)
+                            for torrent in response.get("data") or []:
+                                key = self._torrent_dedup_key(torrent)
+                                existing = merged.get(key)
+                                if existing is None:
+                                    merged[key] = torrent
+                                    new_torrents.append(torrent)
+                                else:
+                                    summary["duplicates"] += 1
+                                    # 重复资源保留做种数更多的站点
+                                    if self._torrent_seeders(torrent) > self._torrent_seeders(existing):
+                                        merged[key] = torrent
+                        else:
+                            message = response.get("message") or response.get("error") \
+                                if isinstance(response, dict) else None
+                            summary["failed"][site_name] = message or "未知错误"
+
+                    finished += 1
+                    message = f"[{finished}/{summary['total']}] 站点 {site_name} 新增 {len(new_torrents)} 个资源"
+                    for torrent in sorted(new_torrents, key=self._torrent_seeders,
+                                          reverse=True)[:PROGRESS_PREVIEW_COUNT]:
+                        torrent_info = self._torrent_fields(torrent)
+                        title = self._first_text(torrent_info.get("title"), torrent_info.get("description"),
+                                                 default="未知标题")
+                        message += f"\n - {title} (做种: {self._torrent_seeders(torrent)})"
+                    await self._send_progress(finished, summary["total"], message)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        torrents = sorted(merged.values(), key=self._torrent_seeders, reverse=True)
+        logger.info(
+            f"并发搜索完成: 站点 {summary['total']} 个, 成功 {len(summary['succeeded'])} 个, "
+            f"超时 {len(summary['timed_out'])} 个, 失败 {len(summary['failed'])} 个, "
+            f"资源 {len(torrents)} 个, 去重 {summary['duplicates']} 个")
+        return torrents, summary
+
+    @staticmethod
+    def _format_fan_out_summary(summary: dict) -> str:
+        """格式化并发搜索摘要"""
+        text = f"已并发搜索 {summary['total']} 个站点，成功 {len(summary['succeeded'])} 个"
+        if summary["duplicates"]:
+            text += f"，合并重复资源 {summary['duplicates']} 个"
+        if summary["timed_out"]:
+            text += f"\n超时站点: {', '.join(summary['timed_out'])}"
+        if summary["failed"]:
+            text += "\n失败站点: " + ", ".join(f"{name}({reason})" for name, reason in summary["failed"].items())
+        return text + "\n\n"
+
+    def _use_fan_out(self, arguments: dict, site_ids: list[str]) -> bool:
+        """多个站点时默认并发搜索，可通过fan_out=false关闭"""
+        return len(site_ids) > 1 and arguments.get("fan_out", True) is not False
+
     def _format_search_results(self, torrents: list, keyword: str, year: str = None, detailed: bool = True, limit: int = 50) -> str:
         """
         格式化搜索结果
@@ -231,6 +384,8 @@ class MovieDownloadTool(BaseTool):
             - media_type: 媒体类型(可选)，默认为 "电影"
             - sites: 站点ID列表(可选)，多个站点ID用逗号分隔
             - limit: 最大返回结果数量(可选)，默认为50
+            - fan_out: 多个站点时是否按站点并发搜索(可选)，默认为True
+            - site_timeout: 并发搜索时单个站点的超时时间(可选)，单位秒
         """
         # 检查是否直接提供了媒体ID
         mediaid = arguments.get("mediaid")
@@ -255,7 +410,7 @@ class MovieDownloadTool(BaseTool):
             return [
                 types.TextContent(
                     type="text",
-                    text="错误：请提供sites参数，指定1-3个站点ID进行搜索，避免token超限。可通过get-sites工具获取站点列表。"
+                    text="错误：请提供sites参数，指定要搜索的站点ID，多个站点会并发搜索并合并去重。可通过get-sites工具获取站点列表。"
                 )
             ]
 
@@ -305,6 +460,27 @@ class MovieDownloadTool(BaseTool):
                 "sort": "seeders"
             }
 
+            site_ids = self._parse_site_ids(sites)
+            if self._use_fan_out(arguments, site_ids):
+                torrents, summary = await self._fan_out_search(
+                    f"/api/v1/search/media/{media_id}", params, site_ids,
+                    float(arguments.get("site_timeout") or DEFAULT_SITE_TIMEOUT))
+                if not summary["succeeded"]:
+                    return [
+                        types.TextContent(
+                            type="text",
+                            text="搜索资源失败: " + self._format_fan_out_summary(summary).strip()
+                        )
+                    ]
+                result_text = self._format_fan_out_summary(summary) + self._format_search_results(
+                    torrents, keyword, year, detailed=True, limit=limit)
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=result_text
+                    )
+                ]
+
             # 调用搜索API
             try:
                 response = await self._make_request(
@@ -863,6 +1039,8 @@ class MovieDownloadTool(BaseTool):
             - sites: 站点ID列表(可选)，多个站点ID用逗号分隔
             - detailed: 是否显示详细信息(可选)，默认为False
             - limit: 最大返回结果数量(可选)，默认为50
+            - fan_out: 多个站点时是否按站点并发搜索(可选)，默认为True
+            - site_timeout: 并发搜索时单个站点的超时时间(可选)，单位秒
         """
         keyword = arguments.get("keyword")
         if not keyword:
@@ -883,7 +1061,7 @@ class MovieDownloadTool(BaseTool):
             return [
                 types.TextContent(
                     type="text",
-                    text="错误：请提供sites参数，指定1-3个站点ID进行搜索，避免token超限。可通过get-sites工具获取站点列表。"
+                    text="错误：请提供sites参数，指定要搜索的站点ID，多个站点会并发搜索并合并去重。可通过get-sites工具获取站点列表。"
                 )
             ]
 
@@ -901,6 +1079,27 @@ class MovieDownloadTool(BaseTool):
             if sites:
                 params["sites"] = sites
 
+            site_ids = self._parse_site_ids(sites)
+            if self._use_fan_out(arguments, site_ids):
+                torrents, summary = await self._fan_out_search(
+                    "/api/v1/search/title", params, site_ids,
+                    float(arguments.get("site_timeout") or DEFAULT_SITE_TIMEOUT))
+                if not summary["succeeded"]:
+                    return [
+                        types.TextContent(
+                            type="text",
+                            text="模糊搜索资源失败: " + self._format_fan_out_summary(summary).strip()
+                        )
+                    ]
+                result_text = self._format_fan_out_summary(summary) + self._format_search_results(
+                    torrents, keyword, detailed=detailed, limit=limit)
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=result_text
+                    )
+                ]
+
             # 调用模糊搜索API
             response = await self._make_request(
                 method="GET",
@@ -1021,7 +1220,15 @@ class MovieDownloadTool(BaseTool):
                         },
                         "sites": {
                             "type": "string",
-                            "description": "站点ID列表，多个站点ID用逗号分隔，是数字ID不是站点名称，若没有站点ID可以通过工具get-sites获取"
+                            "description": "站点ID列表，多个站点ID用逗号分隔，是数字ID不是站点名称，多个站点会并发搜索，若没有站点ID可以通过工具get-sites获取"
+                        },
+                        "fan_out": {
+                            "type": "boolean",
+                            "description": "多个站点时是否按站点并发搜索并合并去重，默认为true"
+                        },
+                        "site_timeout": {
+                            "type": "integer",
+                            "description": "并发搜索时单个站点的超时时间（秒），默认为60，超时站点会被跳过"
                         },
                         "limit": {
                             "type": "integer",
@@ -1045,12 +1252,20 @@ class MovieDownloadTool(BaseTool):
                         },
                         "sites": {
                             "type": "string",
-                            "description": "站点数字ID列表，多个站点ID用逗号分隔，可通过工具get-sites获取"
+                            "description": "站点数字ID列表，多个站点ID用逗号分隔，多个站点会并发搜索，可通过工具get-sites获取"
                         },
                         "detailed": {
                             "type": "boolean",
                             "description": "是否显示详细信息，默认为false"
                         },
+                        "fan_out": {
+                            "type": "boolean",
+                            "description": "多个站点时是否按站点并发搜索并合并去重，默认为true"
+                        },
+                        "site_timeout": {
+                            "type": "integer",
+                            "description": "并发搜索时单个站点的超时时间（秒），默认为60，超时站点会被跳过"
+                        },
                         "limit": {
                             "type": "integer",
                         }
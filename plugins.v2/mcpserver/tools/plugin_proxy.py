@@ -38,20 +38,15 @@ class PluginToolProxy(BaseTool):
             执行结果
         """
         try:
-            logger.debug(f"[PluginToolProxy] 开始执行插件工具")
-            logger.debug(f"[PluginToolProxy] 插件ID: {self.tool_info_data.plugin_id}")
-            logger.debug(f"[PluginToolProxy] 工具名称: {tool_name}")
-            logger.debug(f"[PluginToolProxy] 工具参数: {arguments}")
-            logger.debug(f"[PluginToolProxy] API端点: {self.tool_info_data.api_endpoint}")
-            logger.debug(f"[PluginToolProxy] 工具参数定义: {self.tool_info_data.parameters}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[PluginToolProxy] 插件ID: %s, 工具名称: %s, 工具参数: %s, API端点: %s",
+                             self.tool_info_data.plugin_id, tool_name, arguments,
+                             self.tool_info_data.api_endpoint)
 
             logger.info(f"执行插件工具: {self.tool_info_data.plugin_id}.{tool_name}")
 
             # 验证参数
-            logger.debug(f"[PluginToolProxy] 开始验证参数...")
             validation_result = self._validate_arguments(arguments)
-            logger.debug(f"[PluginToolProxy] 参数验证结果: {validation_result}")
-
             if not validation_result["valid"]:
                 logger.error(f"[PluginToolProxy] 参数验证失败: {validation_result['error']}")
                 return [
@@ -63,10 +58,8 @@ class PluginToolProxy(BaseTool):
 
             # 执行工具
             if self.tool_info_data.api_endpoint:
-                logger.debug(f"[PluginToolProxy] 通过API端点调用工具...")
                 # 通过API端点调用
                 result = await self._execute_via_api(tool_name, arguments)
-                logger.debug(f"[PluginToolProxy] API调用结果: {result}")
             else:
                 logger.error(f"[PluginToolProxy] 工具配置错误: 未指定API端点")
                 return [
@@ -77,11 +70,11 @@ class PluginToolProxy(BaseTool):
                 ]
 
             # 格式化返回结果
-            logger.debug(f"[PluginToolProxy] 开始格式化结果...")
             formatted_result = self._format_result(result)
-            logger.debug(f"[PluginToolProxy] 格式化后的结果: {formatted_result}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[PluginToolProxy] 格式化后的结果: %s", formatted_result)
             return formatted_result
-            
+
         except asyncio.TimeoutError:
             logger.error(f"插件工具执行超时: {tool_name}")
             return [
@@ -102,22 +95,16 @@ class PluginToolProxy(BaseTool):
     async def _execute_via_api(self, tool_name: str, arguments: dict) -> dict:
         """通过API端点执行工具"""
         try:
-            logger.debug(f"[PluginToolProxy] 开始API调用")
-
             # 构建API请求
             endpoint = self.tool_info_data.api_endpoint
-            logger.debug(f"[PluginToolProxy] API端点: {endpoint}")
 
             # 构建请求数据，包含工具名称和参数
             request_data = {
                 "tool_name": tool_name,
                 "arguments": arguments
             }
-            logger.debug(f"[PluginToolProxy] 请求数据: {request_data}")
-            logger.debug(f"[PluginToolProxy] 超时时间: {self._timeout}秒")
 
             # 发送API请求
-            logger.debug(f"[PluginToolProxy] 发送POST请求到: {endpoint}")
             response = await asyncio.wait_for(
                 self._make_request(
                     method="POST",
@@ -127,16 +114,14 @@ class PluginToolProxy(BaseTool):
                 timeout=self._timeout
             )
 
-            logger.debug(f"[PluginToolProxy] 收到API响应: {response}")
-            logger.debug(f"[PluginToolProxy] 响应类型: {type(response)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[PluginToolProxy] 收到API响应: %s", response)
 
             if response and response.get("success"):
-                logger.debug(f"[PluginToolProxy] API调用成功")
                 return response
             else:
                 error_msg = response.get("message", "API调用失败") if response else "API响应为空"
                 logger.error(f"[PluginToolProxy] API调用失败: {error_msg}")
-                logger.debug(f"[PluginToolProxy] 失败响应详情: {response}")
                 return {
                     "success": False,
                     "message": error_msg,
@@ -152,8 +137,7 @@ class PluginToolProxy(BaseTool):
             }
         except Exception as e:
             logger.error(f"[PluginToolProxy] API调用异常: {str(e)}")
-            import traceback
-            logger.debug(f"[PluginToolProxy] 异常堆栈: {traceback.format_exc()}")
+            logger.debug("[PluginToolProxy] 异常堆栈", exc_info=True)
             return {
                 "success": False,
                 "message": f"API调用异常: {str(e)}",
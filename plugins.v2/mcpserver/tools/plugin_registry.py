@@ -56,6 +56,7 @@ class PluginToolRegistry:
         self._plugin_tools: Dict[str, List[str]] = {}  # 插件ID -> 工具名列表
         self._lock = threading.RLock()
         self._max_tools = 100  # 最大工具数量限制
+        self._generation = 0  # 注册表变更计数，用于失效工具列表缓存
         
     def register_tools(self, plugin_id: str, tools: List[dict]) -> Dict[str, Any]:
         """
@@ -123,6 +124,9 @@ class PluginToolRegistry:
                         })
                         logger.error(f"注册工具失败: {str(e)}")
                 
+                if registered_tools:
+                    self._generation += 1
+
                 result = {
                     "success": len(registered_tools) > 0,
                     "message": f"成功注册{len(registered_tools)}个工具",
@@ -174,6 +178,7 @@ class PluginToolRegistry:
                 
                 # 清空插件工具映射
                 del self._plugin_tools[plugin_id]
+                self._generation += 1
                 
                 return {
                     "success": True,
@@ -190,6 +195,11 @@ class PluginToolRegistry:
                     "unregistered_count": 0
                 }
     
+    @property
+    def generation(self) -> int:
+        """注册表变更计数，每次注册或注销工具后递增"""
+        return self._generation
+
     def get_tool_info(self, tool_name: str) -> Optional[PluginToolInfo]:
         """获取工具信息"""
         with self._lock:
@@ -217,6 +227,7 @@ class PluginToolRegistry:
                 "total_tools": len(self._registered_tools),
                 "total_plugins": len(self._plugin_tools),
                 "max_tools": self._max_tools,
+                "generation": self._generation,
                 "tools_by_plugin": {
                     plugin_id: len(tools) 
                     for plugin_id, tools in self._plugin_tools.items()
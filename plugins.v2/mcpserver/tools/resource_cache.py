@@ -1,18 +1,31 @@
 import hashlib
+import json
+import sqlite3
 import time
 import threading
+from collections import OrderedDict
 from typing import Dict, Optional, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 用于生成稳定资源ID的字段，同一个种子多次搜索得到相同的ID
+RESOURCE_IDENTITY_FIELDS = ('enclosure', 'page_url', 'site', 'site_name', 'title', 'description', 'size')
+
 
 class ResourceCache:
-    """资源缓存管理器，用于存储资源标识符与真实下载链接的映射"""
+    """资源缓存管理器，用于存储资源标识符与真实下载链接的映射
+
+    内存中使用OrderedDict实现LRU+TTL，查询、写入、淘汰均为O(1)。
+    启用持久化后，资源同时写入SQLite，MCP服务器重启后仍可通过资源ID下载。
+    """
 
     _instance = None
     _lock = threading.Lock()
 
+    # 持久化存储中过期条目的清理间隔（秒）
+    PERSIST_CLEANUP_INTERVAL = 600
+
     def __new__(cls):
         """单例模式"""
         if cls._instance is None:
@@ -24,10 +37,19 @@ class ResourceCache:
 
     def __init__(self):
         if not getattr(self, '_initialized', False):
-            self._cache: Dict[str, Dict[str, Any]] = {}
+            # resource_id -> 资源数据，按最近使用排序，最久未使用的在前
+            self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
             self._cache_lock = threading.RLock()
             self._max_cache_size = 1000  # 最大缓存条目数
             self._cache_ttl = 3600  # 缓存过期时间（秒），1小时
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._disk_hits = 0
+            # 持久化存储，调用enable_persistence后启用
+            self._db_path: Optional[str] = None
+            self._db_conn: Optional[sqlite3.Connection] = None
+            self._last_persist_cleanup = 0.0
             # 站点映射缓存：site_id -> site_name
             self._site_mapping: Dict[str, str] = {}
             self._site_mapping_ttl = 86400  # 站点映射缓存24小时
@@ -35,8 +57,57 @@ class ResourceCache:
             self._initialized = True
             logger.info("资源缓存管理器已初始化")
 
+    def enable_persistence(self, db_path: str) -> bool:
+        """启用磁盘持久化
+
+        Args:
+            db_path: SQLite数据库文件路径
+
+        Returns:
+            bool: 是否启用成功，失败时仅使用内存缓存
+        """
+        try:
+            with self._cache_lock:
+                if self._db_conn is not None:
+                    self._db_conn.close()
+                conn = sqlite3.connect(db_path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS resources (
+                        resource_id TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_resources_created_at ON resources(created_at)")
+                conn.commit()
+                self._db_conn = conn
+                self._db_path = db_path
+                self._cleanup_persisted(force=True)
+            logger.info(f"资源缓存持久化已启用: {db_path}")
+            return True
+        except Exception as e:
+            logger.error(f"启用资源缓存持久化失败，仅使用内存缓存: {str(e)}")
+            self._db_conn = None
+            self._db_path = None
+            return False
+
+    def close(self):
+        """关闭持久化存储连接"""
+        with self._cache_lock:
+            if self._db_conn is not None:
+                try:
+                    self._db_conn.close()
+                except Exception as e:
+                    logger.debug(f"关闭资源缓存数据库失败: {str(e)}")
+                self._db_conn = None
+
     def generate_resource_id(self, torrent_info: dict) -> str:
-        """为资源生成唯一标识符
+        """为资源生成稳定的标识符
+
+        同一个资源在多次搜索中得到相同的ID，避免缓存被重复条目撑大，
+        也使服务器重启后仍能用之前返回的ID找到资源。
 
         Args:
             torrent_info: 种子信息字典
@@ -45,28 +116,27 @@ class ResourceCache:
             str: 资源标识符
         """
         try:
-            # 使用种子URL、标题和时间戳生成唯一ID
-            torrent_url = torrent_info.get('enclosure', '')
-            title = torrent_info.get('title', '')
-            timestamp = str(int(time.time()))
-
-            # 创建唯一标识符
-            content = f"{torrent_url}|{title}|{timestamp}"
+            identity = [torrent_info.get(field) for field in RESOURCE_IDENTITY_FIELDS]
+            if not any(identity):
+                # 没有可识别字段时使用完整内容
+                identity = torrent_info
+            content = json.dumps(identity, sort_keys=True, ensure_ascii=False, default=str)
             resource_id = hashlib.md5(content.encode('utf-8')).hexdigest()[:16]
 
             # 添加前缀以便识别
             resource_id = f"res_{resource_id}"
 
-            logger.debug(f"生成资源ID: {resource_id} for {title}")
+            logger.debug(f"生成资源ID: {resource_id} for {torrent_info.get('title', '')}")
             return resource_id
 
         except Exception as e:
             logger.error(f"生成资源ID失败: {str(e)}")
-            # 生成一个基于时间的备用ID
-            return f"res_{int(time.time())}{hash(str(torrent_info)) % 10000:04d}"
+            # 生成一个基于内容的备用ID
+            fallback = hashlib.md5(repr(torrent_info).encode('utf-8', 'replace')).hexdigest()[:16]
+            return f"res_{fallback}"
 
     def store_resource(self, resource_id: str, torrent_info: dict) -> bool:
-        """存储资源信息
+        """存储资源信息，超过容量时淘汰最久未使用的条目
 
         Args:
             resource_id: 资源标识符
@@ -76,27 +146,49 @@ class ResourceCache:
             bool: 是否存储成功
         """
         try:
+            resource_data = {
+                'torrent_info': torrent_info,
+                'torrent_url': torrent_info.get('enclosure', ''),
+                'title': torrent_info.get('title', ''),
+                'site': torrent_info.get('site', ''),
+                'created_at': time.time()
+            }
             with self._cache_lock:
-                # 检查缓存大小，如果超过限制则清理过期条目
-                if len(self._cache) >= self._max_cache_size:
-                    self._cleanup_expired()
-
-                # 存储资源信息
-                self._cache[resource_id] = {
-                    'torrent_info': torrent_info,
-                    'torrent_url': torrent_info.get('enclosure', ''),
-                    'title': torrent_info.get('title', ''),
-                    'site': torrent_info.get('site', ''),
-                    'created_at': time.time()
-                }
+                self._cache[resource_id] = resource_data
+                self._cache.move_to_end(resource_id)
+                self._evict()
+                self._persist(resource_id, resource_data)
 
-                logger.debug(f"已存储资源: {resource_id}")
-                return True
+            logger.debug(f"已存储资源: {resource_id}")
+            return True
 
         except Exception as e:
             logger.error(f"存储资源失败: {str(e)}")
             return False
 
+    def _lookup(self, resource_id: str) -> Optional[Dict[str, Any]]:
+        """查找未过期的资源（调用方需持有锁），内存未命中时回落到持久化存储"""
+        resource_data = self._cache.get(resource_id)
+        if resource_data is None:
+            resource_data = self._load_persisted(resource_id)
+            if resource_data is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._cache[resource_id] = resource_data
+            self._evict()
+
+        # 检查是否过期
+        if time.time() - resource_data['created_at'] > self._cache_ttl:
+            self._misses += 1
+            self._cache.pop(resource_id, None)
+            self._delete_persisted(resource_id)
+            return None
+
+        self._hits += 1
+        self._cache.move_to_end(resource_id)
+        return resource_data
+
     def get_torrent_url(self, resource_id: str) -> Optional[str]:
         """根据资源标识符获取真实下载链接
 
@@ -108,16 +200,9 @@ class ResourceCache:
         """
         try:
             with self._cache_lock:
-                if resource_id not in self._cache:
-                    logger.warning(f"资源ID不存在: {resource_id}")
-                    return None
-
-                resource_data = self._cache[resource_id]
-
-                # 检查是否过期
-                if time.time() - resource_data['created_at'] > self._cache_ttl:
-                    logger.warning(f"资源已过期: {resource_id}")
-                    del self._cache[resource_id]
+                resource_data = self._lookup(resource_id)
+                if resource_data is None:
+                    logger.warning(f"资源ID不存在或已过期: {resource_id}")
                     return None
 
                 torrent_url = resource_data['torrent_url']
@@ -139,46 +224,107 @@ class ResourceCache:
         """
         try:
             with self._cache_lock:
-                if resource_id not in self._cache:
-                    return None
-
-                resource_data = self._cache[resource_id]
-
-                # 检查是否过期
-                if time.time() - resource_data['created_at'] > self._cache_ttl:
-                    del self._cache[resource_id]
-                    return None
-
-                return resource_data.copy()
+                resource_data = self._lookup(resource_id)
+                return resource_data.copy() if resource_data is not None else None
 
         except Exception as e:
             logger.error(f"获取资源信息失败: {str(e)}")
             return None
 
-    def _cleanup_expired(self):
-        """清理过期的缓存条目"""
-        try:
-            current_time = time.time()
-            expired_keys = []
-
-            for resource_id, resource_data in self._cache.items():
-                if current_time - resource_data['created_at'] > self._cache_ttl:
-                    expired_keys.append(resource_id)
+    def _evict(self):
+        """淘汰队首的过期条目和超出容量的最久未使用条目（调用方需持有锁）
 
-            for key in expired_keys:
-                del self._cache[key]
+        只检查队首，每次写入摊销O(1)；队列中间的过期条目在访问时或被挤到队首时移除。
+        """
+        now = time.time()
+        while self._cache:
+            resource_id, resource_data = next(iter(self._cache.items()))
+            if len(self._cache) <= self._max_cache_size and \
+                    now - resource_data['created_at'] <= self._cache_ttl:
+                break
+            self._cache.popitem(last=False)
+            self._evictions += 1
+
+    def _persist(self, resource_id: str, resource_data: Dict[str, Any]):
+        """写入持久化存储（调用方需持有锁）"""
+        if self._db_conn is None:
+            return
+        try:
+            self._db_conn.execute(
+                "INSERT OR REPLACE INTO resources (resource_id, data, created_at) VALUES (?, ?, ?)",
+                (resource_id, json.dumps(resource_data['torrent_info'], ensure_ascii=False, default=str),
+                 resource_data['created_at'])
+            )
+            self._db_conn.commit()
+            self._cleanup_persisted()
+        except Exception as e:
+            logger.warning(f"持久化资源失败: {resource_id}, 错误: {str(e)}")
 
-            if expired_keys:
-                logger.info(f"清理了 {len(expired_keys)} 个过期缓存条目")
+    def _load_persisted(self, resource_id: str) -> Optional[Dict[str, Any]]:
+        """从持久化存储读取资源（调用方需持有锁）"""
+        if self._db_conn is None:
+            return None
+        try:
+            row = self._db_conn.execute(
+                "SELECT data, created_at FROM resources WHERE resource_id = ?", (resource_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            torrent_info = json.loads(row[0])
+            return {
+                'torrent_info': torrent_info,
+                'torrent_url': torrent_info.get('enclosure', ''),
+                'title': torrent_info.get('title', ''),
+                'site': torrent_info.get('site', ''),
+                'created_at': row[1]
+            }
+        except Exception as e:
+            logger.warning(f"读取持久化资源失败: {resource_id}, 错误: {str(e)}")
+            return None
 
+    def _delete_persisted(self, resource_id: str):
+        """从持久化存储删除资源（调用方需持有锁）"""
+        if self._db_conn is None:
+            return
+        try:
+            self._db_conn.execute("DELETE FROM resources WHERE resource_id = ?", (resource_id,))
+            self._db_conn.commit()
         except Exception as e:
-            logger.error(f"清理过期缓存失败: {str(e)}")
+            logger.debug(f"删除持久化资源失败: {resource_id}, 错误: {str(e)}")
+
+    def _cleanup_persisted(self, force: bool = False):
+        """按间隔清理持久化存储中的过期条目，并限制条目数（调用方需持有锁）"""
+        if self._db_conn is None:
+            return
+        now = time.time()
+        if not force and now - self._last_persist_cleanup < self.PERSIST_CLEANUP_INTERVAL:
+            return
+        self._last_persist_cleanup = now
+        try:
+            cursor = self._db_conn.execute(
+                "DELETE FROM resources WHERE created_at < ?", (now - self._cache_ttl,)
+            )
+            expired_count = cursor.rowcount
+            # 磁盘上最多保留内存容量的10倍
+            self._db_conn.execute("""
+                DELETE FROM resources WHERE resource_id IN (
+                    SELECT resource_id FROM resources ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self._max_cache_size * 10,))
+            self._db_conn.commit()
+            if expired_count:
+                logger.info(f"清理了 {expired_count} 个过期的持久化资源")
+        except Exception as e:
+            logger.warning(f"清理持久化资源失败: {str(e)}")
 
     def clear_cache(self):
         """清空所有缓存"""
         try:
             with self._cache_lock:
                 self._cache.clear()
+                if self._db_conn is not None:
+                    self._db_conn.execute("DELETE FROM resources")
+                    self._db_conn.commit()
                 logger.info("已清空资源缓存")
         except Exception as e:
             logger.error(f"清空缓存失败: {str(e)}")
@@ -189,18 +335,25 @@ class ResourceCache:
             with self._cache_lock:
                 current_time = time.time()
                 total_count = len(self._cache)
-                expired_count = 0
-
-                for resource_data in self._cache.values():
-                    if current_time - resource_data['created_at'] > self._cache_ttl:
-                        expired_count += 1
+                expired_count = sum(
+                    1 for resource_data in self._cache.values()
+                    if current_time - resource_data['created_at'] > self._cache_ttl
+                )
+                lookups = self._hits + self._misses
 
                 return {
                     'total_count': total_count,
                     'expired_count': expired_count,
                     'active_count': total_count - expired_count,
                     'max_size': self._max_cache_size,
-                    'ttl_seconds': self._cache_ttl
+                    'ttl_seconds': self._cache_ttl,
+                    'hits': self._hits,
+                    'misses': self._misses,
+                    'disk_hits': self._disk_hits,
+                    'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                    'evictions': self._evictions,
+                    'persistent': self._db_conn is not None,
+                    'db_path': self._db_path
                 }
         except Exception as e:
             logger.error(f"获取缓存统计失败: {str(e)}")
@@ -12,11 +12,25 @@ from .http_utils import (
     close_http_client,
     set_moviepilot_port,
     config,
-    Config
+    Config,
+    set_response_cache_ttl,
+    get_response_cache_stats
 )
 
 # 导入文件操作功能
-from .file_operations import safe_read_json, safe_write_json, atomic_update_json
+from .file_operations import (
+    safe_read_json,
+    safe_write_json,
+    atomic_update_json,
+    read_generation,
+    read_json_with_generation
+)
+
+# 导入请求追踪功能
+from .tracing import tracer, get_tracer, query_traces, configure_tracing
+
+# 导入运行统计功能
+from .server_stats import register_stats_provider, unregister_stats_provider, collect_server_stats
 
 __all__ = [
     # HTTP相关功能（原utils.py）
@@ -26,8 +40,21 @@ __all__ = [
     'set_moviepilot_port',
     'config',
     'Config',
+    'set_response_cache_ttl',
+    'get_response_cache_stats',
     # 文件操作功能
     'safe_read_json',
     'safe_write_json',
-    'atomic_update_json'
+    'atomic_update_json',
+    'read_generation',
+    'read_json_with_generation',
+    # 请求追踪功能
+    'tracer',
+    'get_tracer',
+    'query_traces',
+    'configure_tracing',
+    # 运行统计功能
+    'register_stats_provider',
+    'unregister_stats_provider',
+    'collect_server_stats'
 ]
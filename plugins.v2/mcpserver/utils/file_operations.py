@@ -1,202 +1,303 @@
 """
 安全的文件操作工具
-提供线程安全的JSON文件读写操作，防止并发写入导致的数据损坏
+提供线程安全、跨进程安全的JSON文件读写操作，防止并发写入导致的数据损坏
+
+plugin_tools.json 等文件由MoviePilot进程写入、MCP Server子进程读取，
+因此除进程内的线程锁外，还通过同目录下的 ``<文件名>.lock`` 文件加 fcntl 锁。
+锁文件同时保存文件的写入代数（generation），读取方只需读取这个整数
+即可判断文件是否变化，无需重新解析整个JSON。
 """
 import json
 import os
-import time
 import threading
 import tempfile
 import shutil
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import logging
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows 没有 fcntl，只能依赖进程内的线程锁
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
 class SafeFileOperations:
     """安全的文件操作类，提供原子性的JSON文件读写"""
-    
+
     def __init__(self):
         self._file_locks: Dict[str, threading.RLock] = {}
         self._locks_lock = threading.Lock()
-    
+
     def _get_file_lock(self, file_path: str) -> threading.RLock:
         """获取文件对应的锁"""
         with self._locks_lock:
             if file_path not in self._file_locks:
                 self._file_locks[file_path] = threading.RLock()
             return self._file_locks[file_path]
-    
+
+    @staticmethod
+    def _get_lock_path(file_path: Path) -> Path:
+        """获取跨进程锁文件路径，锁文件内容为当前写入代数"""
+        return file_path.with_name(f'{file_path.name}.lock')
+
+    @contextmanager
+    def _locked(self, file_path: Path, exclusive: bool):
+        """
+        同时持有进程内线程锁和跨进程文件锁
+
+        Yields:
+            锁文件对象（无法加跨进程锁时为None）
+        """
+        with self._get_file_lock(str(file_path)):
+            if not FCNTL_AVAILABLE:
+                yield None
+                return
+
+            lock_path = self._get_lock_path(file_path)
+            if not exclusive and not lock_path.exists():
+                # 文件从未通过本模块写入，读取时不创建锁文件
+                yield None
+                return
+
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(lock_path, 'a+', encoding='utf-8') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield lock_file
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_generation_from(lock_file) -> int:
+        if lock_file is None:
+            return 0
+        try:
+            lock_file.seek(0)
+            return int(lock_file.read().strip() or 0)
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _write_generation_to(lock_file, generation: int):
+        if lock_file is None:
+            return
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(generation))
+        lock_file.flush()
+
+    def read_generation(self, file_path: Path) -> int:
+        """
+        读取文件的写入代数，不解析JSON内容
+
+        Returns:
+            写入代数，文件从未通过本模块写入时返回0
+        """
+        try:
+            with open(self._get_lock_path(file_path), 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+        except Exception as e:
+            logger.debug(f"读取文件代数失败: {file_path}, 错误: {str(e)}")
+            return 0
+
+    def _read_text(self, file_path: Path) -> Optional[str]:
+        """读取文件原始内容，文件不存在或为空时返回None"""
+        if not file_path.exists():
+            logger.debug(f"文件不存在，返回默认值: {file_path}")
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if not text:
+            logger.warning(f"文件为空: {file_path}")
+            return None
+        return text
+
+    def _load_json(self, file_path: Path, default_value: Optional[Dict]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        读取并解析JSON文件（调用方需持有锁）
+
+        Returns:
+            (数据, 原始文本)，原始文本用于判断写入内容是否变化
+        """
+        try:
+            text = self._read_text(file_path)
+            if text is None:
+                return default_value or {}, None
+            data = json.loads(text)
+            logger.debug(f"成功读取文件: {file_path}")
+            return data, text
+
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON格式错误: {file_path}, 错误: {str(e)}")
+            # 尝试从备份恢复
+            backup_path = self._get_backup_path(file_path)
+            if backup_path.exists():
+                logger.info(f"尝试从备份恢复: {backup_path}")
+                try:
+                    with open(backup_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                        logger.info(f"从备份成功恢复数据: {file_path}")
+                        return data, None
+                except Exception as backup_e:
+                    logger.error(f"备份文件也损坏: {backup_e}")
+
+            return default_value or {}, None
+
+        except Exception as e:
+            logger.error(f"读取文件失败: {file_path}, 错误: {str(e)}")
+            return default_value or {}, None
+
     def safe_read_json(self, file_path: Path, default_value: Optional[Dict] = None) -> Dict[str, Any]:
         """
         安全读取JSON文件
-        
+
         Args:
             file_path: 文件路径
             default_value: 文件不存在时的默认值
-            
+
         Returns:
             JSON数据字典
         """
-        file_lock = self._get_file_lock(str(file_path))
-        
-        with file_lock:
+        return self.read_json_with_generation(file_path, default_value)[1]
+
+    def read_json_with_generation(self, file_path: Path,
+                                  default_value: Optional[Dict] = None) -> Tuple[int, Dict[str, Any]]:
+        """
+        在共享锁内同时读取写入代数和JSON数据，保证两者一致
+
+        Returns:
+            (写入代数, JSON数据字典)
+        """
+        with self._locked(file_path, exclusive=False) as lock_file:
+            generation = self._read_generation_from(lock_file)
+            data, _ = self._load_json(file_path, default_value)
+            return generation, data
+
+    @staticmethod
+    def _serialize(data: Dict[str, Any]) -> str:
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def _write_text(self, file_path: Path, text: str, create_backup: bool):
+        """写入临时文件后原子替换（调用方需持有锁）"""
+        # 确保目录存在
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 创建备份
+        if create_backup and file_path.exists():
+            self._create_backup(file_path)
+
+        # 在同一目录下创建临时文件
+        temp_fd, temp_path = tempfile.mkstemp(
+            suffix='.tmp',
+            prefix=f'{file_path.name}.',
+            dir=file_path.parent
+        )
+        try:
+            with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())  # 强制写入磁盘
+
+            # 原子替换，Windows上同样可以覆盖已存在的目标文件
+            os.replace(temp_path, file_path)
+        except Exception:
+            # 清理临时文件
             try:
-                if not file_path.exists():
-                    logger.debug(f"文件不存在，返回默认值: {file_path}")
-                    return default_value or {}
-                
-                # 检查文件是否为空
-                if file_path.stat().st_size == 0:
-                    logger.warning(f"文件为空: {file_path}")
-                    return default_value or {}
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    logger.debug(f"成功读取文件: {file_path}")
-                    return data
-                    
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON格式错误: {file_path}, 错误: {str(e)}")
-                # 尝试从备份恢复
-                backup_path = self._get_backup_path(file_path)
-                if backup_path.exists():
-                    logger.info(f"尝试从备份恢复: {backup_path}")
-                    try:
-                        with open(backup_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            logger.info(f"从备份成功恢复数据: {file_path}")
-                            return data
-                    except Exception as backup_e:
-                        logger.error(f"备份文件也损坏: {backup_e}")
-                
-                return default_value or {}
-                
-            except Exception as e:
-                logger.error(f"读取文件失败: {file_path}, 错误: {str(e)}")
-                return default_value or {}
-    
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
     def safe_write_json(self, file_path: Path, data: Dict[str, Any], create_backup: bool = True) -> bool:
         """
         安全写入JSON文件，使用原子操作防止数据损坏
-        
+
         Args:
             file_path: 文件路径
             data: 要写入的数据
             create_backup: 是否创建备份
-            
+
         Returns:
             是否写入成功
         """
-        file_lock = self._get_file_lock(str(file_path))
-        
-        with file_lock:
-            try:
-                # 确保目录存在
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                # 创建备份
-                if create_backup and file_path.exists():
-                    self._create_backup(file_path)
-                
-                # 使用临时文件进行原子写入
-                temp_file = None
-                try:
-                    # 在同一目录下创建临时文件
-                    temp_fd, temp_path = tempfile.mkstemp(
-                        suffix='.tmp',
-                        prefix=f'{file_path.name}.',
-                        dir=file_path.parent
-                    )
-                    temp_file = Path(temp_path)
-                    
-                    # 写入数据到临时文件
-                    with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                        f.flush()
-                        os.fsync(f.fileno())  # 强制写入磁盘
-                    
-                    # 验证写入的数据
-                    if not self._verify_json_file(temp_file):
-                        raise ValueError("写入的JSON文件格式验证失败")
-                    
-                    # 原子移动（重命名）
-                    if os.name == 'nt':  # Windows
-                        # Windows上需要先删除目标文件
-                        if file_path.exists():
-                            file_path.unlink()
-                    
-                    shutil.move(str(temp_file), str(file_path))
-                    logger.debug(f"成功写入文件: {file_path}")
-                    return True
-                    
-                except Exception as e:
-                    # 清理临时文件
-                    if temp_file and temp_file.exists():
-                        try:
-                            temp_file.unlink()
-                        except:
-                            pass
-                    raise e
-                    
-            except Exception as e:
-                logger.error(f"写入文件失败: {file_path}, 错误: {str(e)}")
-                return False
-    
+        try:
+            text = self._serialize(data)
+            with self._locked(file_path, exclusive=True) as lock_file:
+                self._write_text(file_path, text, create_backup)
+                self._write_generation_to(lock_file, self._read_generation_from(lock_file) + 1)
+            logger.debug(f"成功写入文件: {file_path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"写入文件失败: {file_path}, 错误: {str(e)}")
+            return False
+
     def _create_backup(self, file_path: Path) -> bool:
-        """创建文件备份"""
+        """创建文件备份，优先使用硬链接避免复制内容"""
         try:
             backup_path = self._get_backup_path(file_path)
-            shutil.copy2(str(file_path), str(backup_path))
+            temp_backup = backup_path.with_name(f'{backup_path.name}.tmp')
+            try:
+                if temp_backup.exists():
+                    temp_backup.unlink()
+                os.link(file_path, temp_backup)
+                os.replace(temp_backup, backup_path)
+            except OSError:
+                shutil.copy2(str(file_path), str(backup_path))
             logger.debug(f"创建备份: {backup_path}")
             return True
         except Exception as e:
             logger.warning(f"创建备份失败: {e}")
             return False
-    
+
     def _get_backup_path(self, file_path: Path) -> Path:
         """获取备份文件路径"""
         return file_path.with_suffix(f'{file_path.suffix}.backup')
-    
-    def _verify_json_file(self, file_path: Path) -> bool:
-        """验证JSON文件格式是否正确"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json.load(f)
-            return True
-        except:
-            return False
-    
+
     def atomic_update_json(self, file_path: Path, update_func, default_value: Optional[Dict] = None) -> bool:
         """
-        原子性更新JSON文件
-        
+        原子性更新JSON文件，内容未变化时跳过写入
+
         Args:
             file_path: 文件路径
             update_func: 更新函数，接收当前数据，返回新数据
             default_value: 文件不存在时的默认值
-            
+
         Returns:
             是否更新成功
         """
-        file_lock = self._get_file_lock(str(file_path))
-        
-        with file_lock:
-            try:
+        try:
+            with self._locked(file_path, exclusive=True) as lock_file:
                 # 读取当前数据
-                current_data = self.safe_read_json(file_path, default_value)
-                
+                current_data, current_text = self._load_json(file_path, default_value)
+
                 # 应用更新函数
                 updated_data = update_func(current_data.copy())
-                
+
+                # 内容未变化时不写文件，也不递增代数
+                updated_text = self._serialize(updated_data)
+                if updated_text == current_text:
+                    logger.debug(f"文件内容未变化，跳过写入: {file_path}")
+                    return True
+
                 # 写入更新后的数据
-                return self.safe_write_json(file_path, updated_data)
-                
-            except Exception as e:
-                logger.error(f"原子更新失败: {file_path}, 错误: {str(e)}")
-                return False
+                self._write_text(file_path, updated_text, create_backup=True)
+                self._write_generation_to(lock_file, self._read_generation_from(lock_file) + 1)
+                logger.debug(f"成功写入文件: {file_path}")
+                return True
+
+        except Exception as e:
+            logger.error(f"原子更新失败: {file_path}, 错误: {str(e)}")
+            return False
 
 
 # 全局实例
@@ -208,6 +309,16 @@ def safe_read_json(file_path: Path, default_value: Optional[Dict] = None) -> Dic
     return _safe_file_ops.safe_read_json(file_path, default_value)
 
 
+def read_json_with_generation(file_path: Path, default_value: Optional[Dict] = None) -> Tuple[int, Dict[str, Any]]:
+    """读取写入代数和JSON数据的便捷函数"""
+    return _safe_file_ops.read_json_with_generation(file_path, default_value)
+
+
+def read_generation(file_path: Path) -> int:
+    """读取文件写入代数的便捷函数"""
+    return _safe_file_ops.read_generation(file_path)
+
+
 def safe_write_json(file_path: Path, data: Dict[str, Any], create_backup: bool = True) -> bool:
     """安全写入JSON文件的便捷函数"""
     return _safe_file_ops.safe_write_json(file_path, data, create_backup)
@@ -39,8 +39,14 @@ except ImportError:
             await asyncio.sleep(seconds)
     anyio = MockAnyio()
 
+from .response_cache import ResponseCache
+from .tracing import tracer
+
 logger = logging.getLogger(__name__)
 
+# GET响应缓存
+response_cache = ResponseCache()
+
 # HTTP客户端管理
 _http_client = None
 
@@ -86,6 +92,16 @@ async def close_http_client():
         _http_client = None
 
 
+def set_response_cache_ttl(endpoint: str, ttl: float):
+    """设置端点的响应缓存时间（秒），ttl<=0 时关闭该端点的缓存"""
+    response_cache.set_ttl(endpoint, ttl)
+
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """获取响应缓存统计信息"""
+    return response_cache.get_stats()
+
+
 async def make_request(
     method: str,
     endpoint: str,
@@ -94,9 +110,13 @@ async def make_request(
     data: Optional[Dict[str, Any]] = None,
     json_data: Optional[Dict[str, Any]] = None,
     retry_count: int = 0,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
     """发送请求到MoviePilot API，支持重试机制
 
+    已配置缓存时间的GET端点会命中响应缓存，相同的并发请求只发送一次；
+    POST/PUT/PATCH/DELETE 请求完成后使同一资源分组的缓存失效。
+
     Args:
         method: HTTP请求方法 (GET, POST, etc.)
         endpoint: API端点路径
@@ -105,87 +125,122 @@ async def make_request(
         data: 表单数据
         json_data: JSON请求体
         retry_count: 当前重试次数
+        use_cache: 是否使用响应缓存
 
     Returns:
         Dict[str, Any]: API响应数据或错误信息
     """
-    logger.debug(f"[make_request] 开始处理请求")
-    logger.debug(f"[make_request] 方法: {method}")
-    logger.debug(f"[make_request] 端点: {endpoint}")
-    logger.debug(f"[make_request] 访问令牌: {'已提供' if access_token else '未提供'}")
-    logger.debug(f"[make_request] 查询参数: {params}")
-    logger.debug(f"[make_request] 表单数据: {data}")
-    logger.debug(f"[make_request] JSON数据: {json_data}")
-    logger.debug(f"[make_request] 重试次数: {retry_count}")
-    logger.debug(f"[make_request] BASE_URL: {config.BASE_URL}")
+    async def send():
+        return await _send_request(
+            method=method,
+            endpoint=endpoint,
+            access_token=access_token,
+            params=params,
+            data=data,
+            json_data=json_data,
+            retry_count=retry_count
+        )
+
+    if not use_cache:
+        return await send()
+    return await response_cache.fetch(method, endpoint, access_token, params, send)
+
+
+async def _send_request(
+    method: str,
+    endpoint: str,
+    access_token: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    data: Optional[Dict[str, Any]] = None,
+    json_data: Optional[Dict[str, Any]] = None,
+    retry_count: int = 0,
+) -> Dict[str, Any]:
+    """发送请求到MoviePilot API（不经过缓存），支持重试机制
+
+    Args:
+        method: HTTP请求方法 (GET, POST, etc.)
+        endpoint: API端点路径
+        access_token: MoviePilot access token
+        params: URL查询参数
+        data: 表单数据
+        json_data: JSON请求体
+        retry_count: 当前重试次数
+
+    Returns:
+        Dict[str, Any]: API响应数据或错误信息
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug(
+            "[make_request] %s %s%s, 访问令牌: %s, 查询参数: %s, 表单数据: %s, JSON数据: %s, 重试次数: %s",
+            method, config.BASE_URL, endpoint, "已提供" if access_token else "未提供",
+            params, data, json_data, retry_count
+        )
 
     # 处理认证：支持 MoviePilot 登录 access token（Bearer）和 API 令牌（X-API-KEY）。
     headers = {}
     if access_token:
         if access_token.startswith("apikey:"):
             headers["X-API-KEY"] = access_token.removeprefix("apikey:")
-            logger.debug("[make_request] 设置X-API-KEY头")
         else:
             headers["Authorization"] = f"Bearer {access_token}"
-            logger.debug("[make_request] 设置Authorization头")
     else:
         logger.warning("[make_request] 未提供access_token，请求可能会失败")
 
-    try:
-        # 获取HTTP客户端
-        logger.debug(f"[make_request] 获取HTTP客户端...")
-        client = await get_http_client()
-        url = f"{config.BASE_URL.rstrip('/')}{endpoint}"
-        logger.debug(f"[make_request] 完整URL: {url}")
-
-        # 记录请求信息
-        logger.info(f"发送请求: {method} {url}")
-        logger.debug(f"[make_request] 请求头: {headers}")
-        if params:
-            logger.info(f"查询参数: {params}")
-        if json_data:
-            logger.info(f"请求体: {json_data}")
-
-        # 发送请求
-        logger.debug(f"[make_request] 发送HTTP请求...")
-        response = await client.request(
-            method,
-            url,
-            params=params,
-            data=data,
-            json=json_data,
-            headers=headers,
-        )
-
-        logger.debug(f"[make_request] 收到响应")
-        logger.debug(f"[make_request] 响应状态码: {response.status_code}")
-        logger.debug(f"[make_request] 响应头: {dict(response.headers)}")
-        logger.debug(f"[make_request] 响应内容长度: {len(response.content) if response.content else 0}")
-
-        response.raise_for_status()
-        logger.debug(f"[make_request] 状态码检查通过")
-
-        # 处理响应
-        if not response.content:
-            logger.debug(f"[make_request] 响应内容为空，返回空字典")
-            return {}
+    span = tracer.span("http", endpoint, method=method, retry=retry_count)
+    if tracer.enabled and json_data is not None:
+        span.set(request_bytes=len(json.dumps(json_data, ensure_ascii=False, default=str).encode("utf-8")))
 
-        content_type = response.headers.get("content-type", "")
-        logger.debug(f"[make_request] 响应内容类型: {content_type}")
-
-        if "application/json" in content_type:
-            try:
-                logger.debug(f"[make_request] 解析JSON响应...")
-                json_result = response.json()
-                logger.debug(f"[make_request] JSON解析成功: {json_result}")
-                return json_result
-            except Exception as e:
-                logger.error(f"[make_request] 解析JSON响应失败: {str(e)}")
-                logger.debug(f"[make_request] 原始响应文本: {response.text}")
-                return {"error": f"解析响应失败: {str(e)}", "content": response.text}
+    try:
+        with span:
+            # 获取HTTP客户端
+            client = await get_http_client()
+            url = f"{config.BASE_URL.rstrip('/')}{endpoint}"
+
+            # 记录请求信息
+            logger.info("发送请求: %s %s", method, url)
+            if params:
+                logger.info("查询参数: %s", params)
+            if json_data:
+                logger.info("请求体: %s", json_data)
+
+            # 发送请求
+            response = await client.request(
+                method,
+                url,
+                params=params,
+                data=data,
+                json=json_data,
+                headers=headers,
+            )
 
-        logger.debug(f"[make_request] 返回文本响应")
-        return {"content": response.text}
+            content_length = len(response.content) if response.content else 0
+            span.set(status_code=response.status_code, response_bytes=content_length)
+            if debug:
+                logger.debug("[make_request] 响应状态码: %s, 响应内容长度: %s, 响应头: %s",
+                             response.status_code, content_length, dict(response.headers))
+
+            response.raise_for_status()
+
+            # 处理响应
+            if not response.content:
+                return {}
+
+            content_type = response.headers.get("content-type", "")
+            if "application/json" in content_type:
+                try:
+                    json_result = response.json()
+                    if debug:
+                        logger.debug("[make_request] JSON解析成功: %s", json_result)
+                    return json_result
+                except Exception as e:
+                    logger.error(f"[make_request] 解析JSON响应失败: {str(e)}")
+                    if debug:
+                        logger.debug("[make_request] 原始响应文本: %s", response.text)
+                    span.set(error=f"解析响应失败: {str(e)}")
+                    return {"error": f"解析响应失败: {str(e)}", "content": response.text}
+
+            return {"content": response.text}
 
     except httpx.HTTPStatusError as e:
         # 处理HTTP错误
@@ -201,7 +256,7 @@ async def make_request(
                 f"Token可能已过期 (重试 {retry_count + 1}/{config.MAX_RETRIES})"
             )
             await anyio.sleep(config.RETRY_DELAY * (retry_count + 1))
-            return await make_request(
+            return await _send_request(
                 method=method,
                 endpoint=endpoint,
                 access_token=access_token,
@@ -227,7 +282,7 @@ async def make_request(
                 f"请求失败 (重试 {retry_count + 1}/{config.MAX_RETRIES}): {str(e)}"
             )
             await anyio.sleep(config.RETRY_DELAY * (retry_count + 1))
-            return await make_request(
+            return await _send_request(
                 method=method,
                 endpoint=endpoint,
                 access_token=access_token,
@@ -0,0 +1,289 @@
+"""
+插件工具/提示文件监控
+MoviePilot进程把插件注册信息写入 plugin_tools.json / plugin_prompts.json，
+MCP Server进程通过本模块监听文件变化，按插件计算差异并增量更新注册表。
+
+优先使用watchdog（inotify等）获得文件事件，未安装时退化为单线程的轻量stat轮询。
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .file_operations import read_generation, safe_read_json
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _WatchTarget:
+    """单个被监控的注册文件"""
+
+    def __init__(self,
+                 name: str,
+                 file_path: Path,
+                 items_key: str,
+                 register: Callable[[str, list], Dict[str, Any]],
+                 unregister: Callable[[str], Dict[str, Any]]):
+        self.name = name
+        self.file_path = Path(file_path)
+        self.items_key = items_key
+        self.register = register
+        self.unregister = unregister
+        # 文件签名 (写入代数, mtime_ns, size)，用于判断文件是否变化
+        self.signature: Optional[Tuple[int, int, int]] = None
+        # plugin_id -> 已应用内容的指纹
+        self.applied: Dict[str, str] = {}
+        self.last_sync = 0.0
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """watchdog事件处理器，只关心被监控的文件名"""
+
+    def __init__(self, watcher: "PluginFileWatcher"):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_any_event(self, event):
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self._watcher.notify(Path(path).name)
+
+
+class PluginFileWatcher:
+    """插件注册文件监控器，所有目标共用一个观察者和一个工作线程"""
+
+    def __init__(self, poll_interval: float = 1.0, debounce: float = 0.2):
+        """
+        Args:
+            poll_interval: 未安装watchdog时的stat轮询间隔（秒）
+            debounce: 收到文件事件后等待写入完成的时间（秒）
+        """
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._targets: Dict[str, _WatchTarget] = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._observer = None
+        self._watched_dirs = set()
+        # 被监控的文件名，供watchdog线程无锁判断
+        self._watched_names = frozenset()
+
+    def watch(self,
+              name: str,
+              file_path: Path,
+              items_key: str,
+              register: Callable[[str, list], Dict[str, Any]],
+              unregister: Callable[[str], Dict[str, Any]]):
+        """
+        注册监控目标
+
+        Args:
+            name: 目标名称
+            file_path: 注册文件路径，内容为 {plugin_id: {items_key: [...]}}
+            items_key: 每个插件条目中列表字段的名称，如 "tools"、"prompts"
+            register: 注册函数 (plugin_id, items) -> 结果字典
+            unregister: 注销函数 (plugin_id) -> 结果字典
+        """
+        with self._lock:
+            self._targets[name] = _WatchTarget(name, file_path, items_key, register, unregister)
+            self._watched_names = frozenset(t.file_path.name for t in self._targets.values())
+            if self._observer is not None:
+                self._schedule_dir(Path(file_path).parent)
+        logger.info(f"注册插件文件监控目标: {name} ({file_path})")
+        self._wakeup.set()
+
+    def unwatch(self, name: str):
+        """移除监控目标，已注册的内容保持不变"""
+        with self._lock:
+            self._targets.pop(name, None)
+            self._watched_names = frozenset(t.file_path.name for t in self._targets.values())
+
+    def start(self):
+        """启动监控，重复调用无副作用"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._stop_event.clear()
+            if WATCHDOG_AVAILABLE:
+                try:
+                    self._observer = Observer()
+                    self._watched_dirs = set()
+                    for target in self._targets.values():
+                        self._schedule_dir(target.file_path.parent)
+                    self._observer.start()
+                except Exception as e:
+                    logger.warning(f"启动watchdog失败，改用轮询: {e}")
+                    self._observer = None
+
+            self._thread = threading.Thread(target=self._run, name="plugin-file-watcher", daemon=True)
+            self._thread.start()
+
+        mode = "watchdog" if self._observer is not None else f"轮询({self.poll_interval}s)"
+        logger.info(f"插件文件监控已启动，模式: {mode}")
+
+    def stop(self):
+        """停止监控"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=5)
+            except Exception as e:
+                logger.debug(f"停止watchdog失败: {e}")
+            self._observer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        logger.info("插件文件监控已停止")
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def notify(self, file_name: str):
+        """文件事件回调，只唤醒与目标文件同名的事件"""
+        if file_name in self._watched_names:
+            self._wakeup.set()
+
+    def force_sync(self, name: Optional[str] = None):
+        """强制重新读取文件并应用差异，忽略文件签名"""
+        with self._lock:
+            if name is None:
+                targets = list(self._targets.values())
+            elif name in self._targets:
+                targets = [self._targets[name]]
+            else:
+                logger.warning(f"监控目标不存在: {name}")
+                return
+            for target in targets:
+                self._sync_target(target, force=True)
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取各监控目标的状态"""
+        with self._lock:
+            return {
+                name: {
+                    "file_exists": target.file_path.exists(),
+                    "plugins": len(target.applied),
+                    "last_sync": target.last_sync,
+                    "mode": "watchdog" if self._observer is not None else "poll",
+                }
+                for name, target in self._targets.items()
+            }
+
+    def _schedule_dir(self, directory: Path):
+        if directory in self._watched_dirs:
+            return
+        self._observer.schedule(_ChangeHandler(self), str(directory), recursive=False)
+        self._watched_dirs.add(directory)
+
+    def _run(self):
+        """工作线程：有watchdog时只在文件事件到来时醒来，否则按间隔轮询"""
+        self._check_targets()
+        while not self._stop_event.is_set():
+            timeout = None if self._observer is not None else self.poll_interval
+            if self._wakeup.wait(timeout):
+                self._wakeup.clear()
+                # 等待写入方完成替换，合并同一批事件
+                if self._stop_event.wait(self.debounce):
+                    break
+            self._check_targets()
+
+    def _check_targets(self):
+        with self._lock:
+            for target in list(self._targets.values()):
+                try:
+                    self._sync_target(target)
+                except Exception as e:
+                    logger.error(f"同步插件文件失败 {target.name}: {e}")
+
+    def _sync_target(self, target: _WatchTarget, force: bool = False):
+        """文件签名变化时读取文件，并按插件增量应用差异"""
+        try:
+            stat = target.file_path.stat()
+        except FileNotFoundError:
+            return
+        # 写入代数由写入方在锁文件中递增，读取它比解析JSON便宜得多
+        signature = (read_generation(target.file_path), stat.st_mtime_ns, stat.st_size)
+        if not force and signature == target.signature:
+            return
+        target.signature = signature
+
+        file_data = safe_read_json(target.file_path, default_value={})
+        if not isinstance(file_data, dict):
+            logger.warning(f"插件文件格式无效: {target.file_path}")
+            return
+        self._apply_diff(target, file_data)
+
+    def _apply_diff(self, target: _WatchTarget, file_data: Dict[str, Any]):
+        """只注销/注册内容发生变化的插件"""
+        wanted: Dict[str, Tuple[str, list]] = {}
+        for plugin_id, plugin_data in file_data.items():
+            items = plugin_data.get(target.items_key) if isinstance(plugin_data, dict) else None
+            if items:
+                wanted[plugin_id] = (self._fingerprint(items), items)
+
+        removed = [plugin_id for plugin_id in target.applied if plugin_id not in wanted]
+        changed = [plugin_id for plugin_id, (fingerprint, _) in wanted.items()
+                   if target.applied.get(plugin_id) != fingerprint]
+
+        for plugin_id in removed:
+            result = target.unregister(plugin_id)
+            target.applied.pop(plugin_id, None)
+            logger.info(f"注销插件{target.items_key}: {plugin_id}, 结果: {result}")
+
+        for plugin_id in changed:
+            fingerprint, items = wanted[plugin_id]
+            target.unregister(plugin_id)
+            result = target.register(plugin_id, items)
+            if result.get("success"):
+                target.applied[plugin_id] = fingerprint
+            else:
+                # 注册失败时不记录指纹，文件下次变化时会重试
+                target.applied.pop(plugin_id, None)
+            logger.info(f"注册插件{target.items_key}: {plugin_id}, 结果: {result}")
+
+        target.last_sync = time.time()
+        if removed or changed:
+            logger.info(
+                f"插件{target.items_key}增量更新完成: 变更 {len(changed)} 个, 移除 {len(removed)} 个, "
+                f"未变化 {len(wanted) - len(changed)} 个")
+
+    @staticmethod
+    def _fingerprint(items: list) -> str:
+        data = json.dumps(items, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+
+# 全局实例
+_plugin_watcher = PluginFileWatcher()
+
+
+def get_plugin_watcher() -> PluginFileWatcher:
+    """获取全局插件文件监控器实例"""
+    return _plugin_watcher
+
+
+def watch_plugin_file(name: str,
+                      file_path: Path,
+                      items_key: str,
+                      register: Callable[[str, list], Dict[str, Any]],
+                      unregister: Callable[[str], Dict[str, Any]]):
+    """注册监控目标并确保监控已启动的便捷函数"""
+    _plugin_watcher.watch(name, file_path, items_key, register, unregister)
+    _plugin_watcher.start()
@@ -0,0 +1,186 @@
+"""
+MoviePilot API响应缓存
+同一次对话中智能体会反复请求站点列表、下载器列表、媒体识别等接口，
+这里按 (端点, 参数, 认证身份) 缓存GET响应，并合并同时发出的相同请求。
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 会修改数据的请求方法，执行后使相关缓存失效
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# 默认的端点缓存时间（秒），未配置的端点不缓存
+DEFAULT_ENDPOINT_TTLS = {
+    "/api/v1/site/": 300,
+    "/api/v1/download/clients": 300,
+    "/api/v1/media/recognize": 600,
+    "/api/v1/subscribe/": 60,
+    "/api/v1/user/current": 60,
+}
+
+
+class ResponseCache:
+    """带TTL的GET响应缓存，支持相同请求合并（single-flight）"""
+
+    def __init__(self, endpoint_ttls: Optional[Dict[str, float]] = None, max_entries: int = 256):
+        """
+        Args:
+            endpoint_ttls: 端点 -> 缓存时间（秒），0表示不缓存
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+        """
+        self.endpoint_ttls: Dict[str, float] = dict(DEFAULT_ENDPOINT_TTLS if endpoint_ttls is None else endpoint_ttls)
+        self.max_entries = max_entries
+        # key -> (过期时间, 响应)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # key -> 正在进行的请求任务
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # 资源分组 -> 失效代数，请求期间发生过失效的响应不写入缓存
+        self._group_generations: Dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    def set_ttl(self, endpoint: str, ttl: float):
+        """设置端点的缓存时间，ttl<=0 时关闭该端点的缓存并清除已有条目"""
+        if ttl > 0:
+            self.endpoint_ttls[endpoint] = ttl
+        else:
+            self.endpoint_ttls.pop(endpoint, None)
+            self._drop(lambda key: key[0] == endpoint)
+
+    @staticmethod
+    def _group_of(endpoint: str) -> str:
+        """端点所属的资源分组，如 /api/v1/subscribe/123 -> /api/v1/subscribe"""
+        parts = [part for part in endpoint.split("?", 1)[0].split("/") if part]
+        return "/" + "/".join(parts[:3])
+
+    @staticmethod
+    def _identity(access_token: Optional[str]) -> str:
+        """认证身份摘要，缓存键中不保存原始令牌"""
+        if not access_token:
+            return ""
+        return hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+
+    def _make_key(self, endpoint: str, access_token: Optional[str], params: Optional[Dict[str, Any]]) -> Tuple:
+        params_key = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+        return endpoint, params_key, self._identity(access_token)
+
+    def _drop(self, predicate: Callable[[Tuple], bool]) -> int:
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def invalidate(self, endpoint: str) -> int:
+        """使端点所在资源分组的缓存失效
+
+        Returns:
+            int: 移除的条目数
+        """
+        group = self._group_of(endpoint)
+        self._group_generations[group] = self._group_generations.get(group, 0) + 1
+        removed = self._drop(lambda key: self._group_of(key[0]) == group)
+        if removed:
+            self._invalidations += removed
+            logger.debug(f"响应缓存失效: {group}, 移除 {removed} 条")
+        return removed
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+
+    async def fetch(self,
+                    method: str,
+                    endpoint: str,
+                    access_token: Optional[str],
+                    params: Optional[Dict[str, Any]],
+                    send: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        经过缓存发送请求
+
+        Args:
+            method: HTTP请求方法
+            endpoint: API端点路径
+            access_token: 访问令牌，作为缓存键的一部分
+            params: URL查询参数
+            send: 实际发送请求的协程函数
+
+        Returns:
+            响应数据，命中缓存时返回副本
+        """
+        method = method.upper()
+        if method in MUTATING_METHODS:
+            try:
+                return await send()
+            finally:
+                self.invalidate(endpoint)
+
+        ttl = self.endpoint_ttls.get(endpoint, 0) if method == "GET" else 0
+        if ttl <= 0:
+            return await send()
+
+        key = self._make_key(endpoint, access_token, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # 相同请求正在进行，等待其结果
+            self._coalesced += 1
+        else:
+            self._misses += 1
+            # 请求在独立的任务中执行，发起者被取消时不影响其他等待者
+            task = asyncio.ensure_future(send())
+            self._inflight[key] = task
+            group = self._group_of(endpoint)
+            generation = self._group_generations.get(group, 0)
+            task.add_done_callback(lambda done: self._on_fetched(key, group, generation, ttl, done))
+        # 只取消当前等待者，不取消共享的请求
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _on_fetched(self, key: Tuple, group: str, generation: int, ttl: float, task: asyncio.Future):
+        """共享请求完成后移出进行中列表，并缓存成功的响应"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # 已读取异常，所有等待者都被取消时不会出现 "Task exception was never retrieved" 警告
+            return
+        result = task.result()
+        # 只缓存成功的响应，请求期间相关数据被修改过时也不缓存
+        failed = isinstance(result, dict) and "error" in result
+        if not failed and self._group_generations.get(group, 0) == generation:
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self._invalidations,
+            "endpoint_ttls": dict(self.endpoint_ttls),
+        }
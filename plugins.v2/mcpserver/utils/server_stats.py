@@ -0,0 +1,41 @@
+"""
+MCP服务器运行统计
+各组件注册自己的统计函数，由服务器的 /stats 端点统一汇总，
+插件进程通过该端点把统计信息合并到进程统计API中
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_providers_lock = threading.Lock()
+
+
+def register_stats_provider(name: str, provider: Callable[[], Dict[str, Any]]):
+    """注册统计函数，同名的会被覆盖"""
+    with _providers_lock:
+        _providers[name] = provider
+
+
+def unregister_stats_provider(name: str):
+    """注销统计函数"""
+    with _providers_lock:
+        _providers.pop(name, None)
+
+
+def collect_server_stats() -> Dict[str, Any]:
+    """收集所有已注册组件的统计信息，单个组件出错不影响其他组件"""
+    with _providers_lock:
+        providers = list(_providers.items())
+
+    stats = {}
+    for name, provider in providers:
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            logger.error(f"收集统计信息失败 {name}: {str(e)}")
+            stats[name] = {"error": str(e)}
+    return stats
@@ -0,0 +1,211 @@
+"""
+请求追踪
+记录工具调用和MoviePilot API请求的耗时、负载大小等信息到环形缓冲区，
+供服务器的 /traces 端点和插件API查询。
+
+未启用时 span() 返回共享的空对象，调用方的开销只有一次属性判断；
+需要额外计算的属性（如请求体大小）应先判断 tracer.enabled 再计算。
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 环形缓冲区默认容量
+DEFAULT_CAPACITY = 1000
+
+
+class _NoopSpan:
+    """未启用追踪时使用的空span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """一次调用的追踪记录"""
+
+    __slots__ = ("_tracer", "kind", "name", "attrs", "start", "_start_perf", "status")
+
+    def __init__(self, tracer: "Tracer", kind: str, name: str, attrs: Dict[str, Any]):
+        self._tracer = tracer
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self._start_perf = 0.0
+        self.status = "ok"
+
+    def __enter__(self):
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start_perf) * 1000
+        if exc_type is not None:
+            self.status = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+            self.attrs.setdefault("error", str(exc) or exc_type.__name__)
+        self._tracer._record({
+            "kind": self.kind,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(duration_ms, 3),
+            "status": self.status,
+            **self.attrs,
+        })
+        return False
+
+    def set(self, **attrs):
+        """补充属性，如响应大小、状态码"""
+        self.attrs.update(attrs)
+        if attrs.get("error"):
+            self.status = "error"
+
+
+class Tracer:
+    """追踪器，所有span写入同一个环形缓冲区"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, enabled: bool = False):
+        self.enabled = enabled
+        self._spans = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._recorded = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._spans.maxlen
+
+    def configure(self, enabled: Optional[bool] = None, capacity: Optional[int] = None):
+        """启用/停用追踪或调整缓冲区容量，调整容量时保留最新的记录"""
+        with self._lock:
+            if capacity is not None and capacity > 0 and capacity != self._spans.maxlen:
+                self._spans = deque(self._spans, maxlen=capacity)
+            if enabled is not None:
+                self.enabled = bool(enabled)
+        logger.info(f"请求追踪: {'已启用' if self.enabled else '已停用'}, 缓冲区容量: {self.capacity}")
+
+    def span(self, kind: str, name: str, **attrs):
+        """
+        创建span上下文管理器
+
+        Args:
+            kind: 类型，如 "tool"、"http"
+            name: 名称，如工具名或端点
+            **attrs: 附加属性
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, kind, name, attrs)
+
+    def _record(self, span: Dict[str, Any]):
+        with self._lock:
+            self._spans.append(span)
+            self._recorded += 1
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def get_spans(self, limit: int = 100, kind: Optional[str] = None,
+                  name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取最近的span，最新的在前"""
+        with self._lock:
+            spans = list(self._spans)
+        result = []
+        for span in reversed(spans):
+            if kind and span["kind"] != kind:
+                continue
+            if name and span["name"] != name:
+                continue
+            result.append(span)
+            if 0 < limit <= len(result):
+                break
+        return result
+
+    def get_summary(self) -> Dict[str, Any]:
+        """按 (类型, 名称) 汇总缓冲区中的span"""
+        with self._lock:
+            spans = list(self._spans)
+
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for span in spans:
+            groups.setdefault((span["kind"], span["name"]), []).append(span)
+
+        summary = []
+        for (kind, name), items in groups.items():
+            durations = sorted(item["duration_ms"] for item in items)
+            summary.append({
+                "kind": kind,
+                "name": name,
+                "count": len(items),
+                "errors": sum(1 for item in items if item["status"] != "ok"),
+                "avg_ms": round(sum(durations) / len(durations), 3),
+                "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "max_ms": durations[-1],
+                "request_bytes": sum(item.get("request_bytes", 0) for item in items),
+                "response_bytes": sum(item.get("response_bytes", 0) for item in items),
+            })
+        summary.sort(key=lambda item: item["count"] * item["avg_ms"], reverse=True)
+
+        return {
+            "enabled": self.enabled,
+            "capacity": self.capacity,
+            "buffered": len(spans),
+            "recorded": self._recorded,
+            "operations": summary,
+        }
+
+
+# 全局追踪器，可通过环境变量 MCPSERVER_TRACE=1 在启动时启用
+tracer = Tracer(
+    capacity=int(os.environ.get("MCPSERVER_TRACE_CAPACITY") or DEFAULT_CAPACITY),
+    enabled=os.environ.get("MCPSERVER_TRACE", "").lower() in ("1", "true", "yes", "on"),
+)
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器"""
+    return tracer
+
+
+def query_traces(limit: int = 100, kind: Optional[str] = None, name: Optional[str] = None) -> Dict[str, Any]:
+    """查询追踪汇总和最近的span，供服务器 /traces 端点使用"""
+    return {
+        "summary": tracer.get_summary(),
+        "spans": tracer.get_spans(limit=limit, kind=kind, name=name),
+    }
+
+
+def configure_tracing(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    根据请求参数调整追踪配置
+
+    Args:
+        options: 可包含 enabled（是否启用）、capacity（缓冲区容量）、clear（是否清空缓冲区）
+
+    Returns:
+        调整后的追踪汇总
+    """
+    tracer.configure(
+        enabled=options.get("enabled"),
+        capacity=int(options["capacity"]) if options.get("capacity") else None,
+    )
+    if options.get("clear"):
+        tracer.clear()
+    return tracer.get_summary()
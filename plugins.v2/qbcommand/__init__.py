@@ -1,7 +1,5 @@
 from typing import List, Tuple, Dict, Any, Optional
 from enum import Enum
-from urllib.parse import urlparse
-import urllib
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import NotificationType, ServiceInfo
@@ -16,6 +14,24 @@ from app.utils.string import StringUtils
 from app.helper.downloader import DownloaderHelper
 from datetime import datetime, timedelta
 
+from .torrent_snapshot import (
+    TorrentSnapshot,
+    torrent_tracker,
+    DOWNLOADING,
+    UPLOADING,
+    PAUSED,
+    CHECKING,
+    ERROR,
+)
+from .state_confirm import confirm_states
+from .matchers import DomainMatcher, ExcludeDirMatcher
+from .downloader_pool import (
+    DownloaderResult,
+    run_on_downloaders,
+    DOWNLOADER_TIMEOUT,
+    DOWNLOADER_QUERY_TIMEOUT,
+)
+
 import pytz
 import time
 
@@ -28,7 +44,7 @@ class QbCommand(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DzAvril/MoviePilot-Plugins/main/icons/qb_tr.png"
     # 插件版本
-    plugin_version = "2.4"
+    plugin_version = "2.8"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -64,6 +80,10 @@ class QbCommand(_PluginBase):
     _multi_level_root_domain = ["edu.cn", "com.cn", "net.cn", "org.cn"]
     _scheduler = None
     _exclude_dirs = ""
+    # 由配置编译的匹配器，在init_plugin中重建
+    _domain_matcher = DomainMatcher(_multi_level_root_domain)
+    _exclude_matcher = ExcludeDirMatcher(_exclude_dirs)
+    _op_site_domains = frozenset()
 
     # 限速状态数据库键名
     SPEED_LIMIT_DATA_KEY = "speed_limit_status"
@@ -102,6 +122,8 @@ class QbCommand(_PluginBase):
             self._op_sites = [site for site in all_sites if site.get("id") in self._op_site_ids]
             self._exclude_dirs = config.get("exclude_dirs") or ""
 
+        self.__compile_matchers()
+
         if self._only_pause_once or self._only_resume_once:
             if self._only_pause_once and self._only_resume_once:
                 logger.warning("只能选择一个: 立即暂停或立即开始所有任务")
@@ -419,7 +441,7 @@ class QbCommand(_PluginBase):
             )
         return services
 
-    def get_all_torrents(self, service):
+    def get_all_torrents(self, service, notify: bool = True):
         downloader_name = service.name
         downloader_obj = service.instance
         downloader_type = self.get_downloader_type(service)
@@ -429,7 +451,7 @@ class QbCommand(_PluginBase):
         all_torrents, error = downloader_obj.get_torrents()
         if error:
             logger.error(f"获取下载器:{downloader_name}种子失败: {error}")
-            if self._notify:
+            if self._notify and notify:
                 self.post_message(
                     mtype=NotificationType.SiteMessage,
                     title=f"❌ 下载器连接失败",
@@ -439,7 +461,7 @@ class QbCommand(_PluginBase):
 
         if not all_torrents:
             logger.warning(f"下载器:{downloader_name}没有种子")
-            if self._notify:
+            if self._notify and notify:
                 self.post_message(
                     mtype=NotificationType.SiteMessage,
                     title=f"ℹ️ 下载器状态",
@@ -450,199 +472,80 @@ class QbCommand(_PluginBase):
         logger.debug(f"下载器 {downloader_name} 获取到 {len(all_torrents)} 个种子")
         return all_torrents
 
+    def get_torrents_snapshot(self, service, notify: bool = True) -> TorrentSnapshot:
+        """
+        拉取一次种子列表并构建列式快照
+        :param notify: 获取失败时是否单独发送通知，汇总通知的操作中传False
+        """
+        downloader_type = self.get_downloader_type(service)
+        if downloader_type == "qbittorrent":
+            snapshot = self.get_qb_maindata_snapshot(service)
+            if snapshot is not None:
+                return snapshot
+
+        all_torrents = self.get_all_torrents(service, notify=notify)
+        start = time.perf_counter()
+        snapshot = TorrentSnapshot.from_torrents(
+            all_torrents, downloader_type, resolve_tracker=self.get_torrent_tracker
+        )
+        if snapshot.skipped:
+            logger.warning(f"下载器 {service.name} 有 {snapshot.skipped} 个种子无法获取hash，已跳过")
+        logger.debug(f"下载器 {service.name} 种子快照构建完成: {len(snapshot)} 个种子, "
+                     f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        return snapshot
+
     @staticmethod
-    def get_torrents_status(torrents):
-        downloading_torrents = []
-        uploading_torrents = []
-        paused_torrents = []
-        checking_torrents = []
-        error_torrents = []
-
-        total_count = len(torrents)
-        if total_count == 0:
-            return (downloading_torrents, uploading_torrents, paused_torrents, checking_torrents, error_torrents)
-
-        # 对于大量种子，添加进度日志
-        if total_count > 1000:
-            logger.info(f"🔍 开始分析 {total_count} 个种子的状态...")
-
-        # 检查第一个种子的结构，用于调试
-        first_torrent = torrents[0]
-        logger.debug(f"第一个种子对象类型: {type(first_torrent)}")
-
-        # 检查种子类型，确定处理方式
-        is_transmission = not hasattr(first_torrent, 'state_enum') and hasattr(first_torrent, 'status')
-        is_qbittorrent = hasattr(first_torrent, 'state_enum')
-
-        if is_transmission:
-            logger.debug(f"检测到Transmission种子，使用status状态映射")
-        elif is_qbittorrent:
-            logger.debug(f"检测到qBittorrent种子，使用state_enum状态")
+    def get_qb_maindata_snapshot(service) -> Optional[TorrentSnapshot]:
+        """
+        通过 sync/maindata 全量数据构建qBittorrent快照，记录的rid用于操作后拉取增量
+        :return: 快照，客户端不支持或请求失败时返回None
+        """
+        client = getattr(service.instance, "qbc", None)
+        if client is None or not hasattr(client, "sync_maindata"):
+            return None
+        start = time.perf_counter()
+        try:
+            maindata = client.sync_maindata(rid=0)
+        except Exception as e:
+            logger.warning(f"下载器 {service.name} 获取sync/maindata失败，改为拉取种子列表: {e}")
+            return None
+        snapshot = TorrentSnapshot.from_qb_maindata(maindata)
+        logger.debug(f"下载器 {service.name} 种子快照构建完成(sync/maindata): {len(snapshot)} 个种子, "
+                     f"rid={snapshot.rid}, 耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+        return snapshot
+
+    def confirm_torrent_states(self, service, snapshot: TorrentSnapshot, hashes: List[str],
+                               settled) -> Tuple[int, Dict[int, int], str]:
+        """
+        操作后确认种子状态，只拉取受影响种子的增量变化
+        :param settled: 判断状态码是否已到达目标状态
+        :return: (种子总数, 各状态数量, 确认摘要)
+        """
+        if not hashes:
+            return len(snapshot), snapshot.counts, ""
+        result = confirm_states(snapshot, self.get_downloader_type(service), service.instance, hashes, settled)
+        if result is None:
+            # 下载器不支持增量拉取，按原方式等待后重新拉取种子列表
+            start = time.monotonic()
+            time.sleep(0.001 * len(hashes) + 1)
+            snapshot = self.get_torrents_snapshot(service, notify=False)
+            return len(snapshot), snapshot.counts, f"全量刷新，耗时 {time.monotonic() - start:.2f}s"
+        summary = result.describe()
+        if result.error:
+            logger.warning(f"下载器 {service.name} 状态确认中断({result.method}): {result.error}")
+        if result.converged:
+            logger.info(f"⏱️ 下载器 {service.name} 状态确认({result.method}): {summary}")
         else:
-            logger.warning(f"未知种子类型，将尝试自动识别")
-
-        # 对于大量种子，分批处理避免卡住
-        batch_size = 1000 if total_count > 5000 else total_count
-        logger.debug(f"批处理大小: {batch_size}")
-
-        processed_count = 0
-
-        # 分批处理种子，避免一次性处理太多导致卡住
-        for batch_start in range(0, total_count, batch_size):
-            batch_end = min(batch_start + batch_size, total_count)
-            batch_torrents = torrents[batch_start:batch_end]
-
-            if total_count > 1000:
-                logger.info(f"🔄 处理批次 {batch_start//batch_size + 1}: 种子 {batch_start+1}-{batch_end}")
-
-            for i, torrent in enumerate(batch_torrents, start=batch_start):
-                # 对于大量种子，每处理1000个输出一次进度
-                if total_count > 1000 and i > 0 and i % 1000 == 0:
-                    logger.info(f"⏳ 已分析 {i}/{total_count} 个种子状态...")
-
-                try:
-                    # 获取种子hash，支持qBittorrent和Transmission
-                    torrent_hash = None
-                    # 尝试多种方式获取hash
-                    if hasattr(torrent, 'get') and callable(torrent.get):
-                        torrent_hash = torrent.get("hash")
-                    if not torrent_hash and hasattr(torrent, 'hashString'):
-                        torrent_hash = torrent.hashString
-                    if not torrent_hash and hasattr(torrent, 'hash'):
-                        torrent_hash = torrent.hash
-                    if not torrent_hash and hasattr(torrent, 'id'):
-                        torrent_hash = str(torrent.id)  # 使用ID作为备选
-
-                    if not torrent_hash:
-                        if i < 10:  # 只对前10个种子输出详细日志
-                            logger.debug(f"种子 {i} 无法获取hash，可用属性: {[attr for attr in dir(torrent) if 'hash' in attr.lower() or 'id' in attr.lower()]}")
-                        continue
-
-                    # 获取种子名称用于调试
-                    torrent_name = getattr(torrent, 'name', torrent.get('name', f'Unknown_{i}'))
-
-                    # 只在处理前几个种子时输出详细日志
-                    if i < 3:
-                        logger.debug(f"正在分析种子 {i}: {torrent_name[:50]}...")
-
-                    # 检查种子对象是否有state_enum属性
-                    if not hasattr(torrent, 'state_enum'):
-                        if i < 3:  # 只对前3个种子输出警告
-                            logger.debug(f"种子 {torrent_name} 没有state_enum属性，使用Transmission状态映射")
-                        # 对于没有state_enum的种子，尝试多种方式判断状态
-                        status_found = False
-
-                        # 尝试获取status属性
-                        if hasattr(torrent, 'status'):
-                            status = torrent.status
-                            status_found = True
-                            # 输出前几个种子的详细状态信息用于调试
-                            if i < 5:
-                                # 获取更多状态相关属性
-                                status_attrs = {}
-                                for attr in ['status', 'state', 'error', 'errorString', 'isFinished', 'isStalled', 'leftUntilDone', 'rateDownload', 'rateUpload']:
-                                    if hasattr(torrent, attr):
-                                        status_attrs[attr] = getattr(torrent, attr)
-                                logger.debug(f"种子 {i} ({torrent_name[:30]}) 状态属性: {status_attrs}")
-
-                            # 首先检查是否有错误 - 优先级最高
-                            has_error = False
-                            error_code = getattr(torrent, 'error', 0)
-                            error_string = getattr(torrent, 'errorString', '')
-
-                            # 检查错误状态
-                            if error_code and error_code != 0:
-                                has_error = True
-                                if i < 10:  # 对前10个错误种子输出详细信息
-                                    logger.debug(f"种子 {torrent_name} 有错误: code={error_code}, string='{error_string}'")
-                            elif error_string and error_string.strip():
-                                # 即使error code为0，但有错误字符串也认为是错误
-                                has_error = True
-                                if i < 10:
-                                    logger.debug(f"种子 {torrent_name} 有错误字符串: '{error_string}'")
-
-                            if has_error:
-                                error_torrents.append(torrent_hash)
-                            else:
-                                # 没有错误时，根据状态进行分类
-                                # Transmission状态映射 - 处理枚举类型和数值类型
-                                status_value = status
-                                status_str = str(status).lower()
-
-                                # 如果是枚举对象，尝试获取其值
-                                if hasattr(status, 'value'):
-                                    status_value = status.value
-                                elif hasattr(status, 'name'):
-                                    status_str = status.name.lower()
-
-                                # 根据字符串状态进行映射
-                                if 'stop' in status_str or status_value == 0:
-                                    paused_torrents.append(torrent_hash)
-                                elif 'check' in status_str or status_value in [1, 2]:
-                                    checking_torrents.append(torrent_hash)
-                                elif 'download' in status_str or status_value in [3, 4]:
-                                    downloading_torrents.append(torrent_hash)
-                                elif 'seed' in status_str or status_value in [5, 6]:
-                                    uploading_torrents.append(torrent_hash)
-                                else:
-                                    if i < 10:  # 对前10个未知状态的种子输出详细信息
-                                        logger.warning(f"种子 {torrent_name} 未知状态值: {status} (str: {status_str}, value: {status_value})")
-                                    error_torrents.append(torrent_hash)
-
-                        # 如果没有status属性，尝试其他方式
-                        if not status_found:
-                            if i < 10:  # 只对前10个种子输出警告
-                                available_attrs = [attr for attr in dir(torrent) if not attr.startswith('_')]
-                                logger.warning(f"种子 {torrent_name} 无法获取status属性，可用属性: {available_attrs}")
-                            error_torrents.append(torrent_hash)
-                        processed_count += 1
-                        continue
-
-                    # 使用state_enum检查状态
-                    if torrent.state_enum.is_paused:
-                        paused_torrents.append(torrent_hash)
-                    elif torrent.state_enum.is_errored:
-                        error_torrents.append(torrent_hash)
-                    elif torrent.state_enum.is_checking:
-                        checking_torrents.append(torrent_hash)
-                    elif torrent.state_enum.is_downloading:
-                        downloading_torrents.append(torrent_hash)
-                    elif torrent.state_enum.is_uploading:
-                        uploading_torrents.append(torrent_hash)
-                    else:
-                        if i < 10:  # 只对前10个种子输出调试信息
-                            logger.debug(f"种子 {torrent_name} 状态未知，归类为错误")
-                        error_torrents.append(torrent_hash)
-
-                    processed_count += 1
-
-                except Exception as e:
-                    logger.error(f"分析种子 {i} 状态时发生异常: {str(e)}")
-                    if i < 5:  # 只对前5个种子输出详细错误信息
-                        logger.debug(f"种子对象类型: {type(torrent)}")
-                        logger.debug(f"种子对象属性: {[attr for attr in dir(torrent) if not attr.startswith('_')]}")
-                    # 发生异常时，尝试获取种子hash并归类为错误
-                    try:
-                        torrent_hash = torrent.get("hash") or getattr(torrent, 'hashString', None)
-                        if torrent_hash:
-                            error_torrents.append(torrent_hash)
-                            processed_count += 1
-                    except:
-                        if i < 10:  # 只对前10个种子输出错误
-                            logger.error(f"无法获取种子 {i} 的hash")
-
-        logger.info(f"📊 实际处理了 {processed_count}/{total_count} 个种子")
-
-        if total_count > 1000:
-            logger.info(f"✅ 种子状态分析完成: ⬇️下载{len(downloading_torrents)}, ⬆️上传{len(uploading_torrents)}, ⏸️暂停{len(paused_torrents)}, 🔄检查{len(checking_torrents)}, ❌错误{len(error_torrents)}")
-
-        return (
-            downloading_torrents,
-            uploading_torrents,
-            paused_torrents,
-            checking_torrents,
-            error_torrents,
-        )
+            logger.warning(f"⏱️ 下载器 {service.name} 状态确认({result.method}): {summary}")
+        return result.total, result.counts, summary
+
+    @staticmethod
+    def get_torrents_status(torrents):
+        """
+        按状态分类种子
+        :return: (下载, 上传, 暂停, 检查, 错误) 的hash列表
+        """
+        return TorrentSnapshot.from_torrents(torrents).status_lists()
 
     @eventmanager.register(EventType.PluginAction)
     def handle_pause_torrent(self, event: Event):
@@ -694,145 +597,143 @@ class QbCommand(_PluginBase):
             return
 
         logger.info(f"⏸️ 开始暂停操作，共有 {len(service_info)} 个下载器服务: {list(service_info.keys())}")
+        results = run_on_downloaders(service_info.values(), lambda service: self.__pause_downloader(service, type))
+        self.__post_downloader_report("✅ 下载器暂停任务完成", results)
 
-        for service in service_info.values():
-            downloader_name = service.name
-            downloader_obj = service.instance
-            if not downloader_obj:
-                logger.error(f"获取下载器失败 {downloader_name}")
-                continue
-            all_torrents = self.get_all_torrents(service)
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(all_torrents)
-            )
-
-            logger.info(
-                f"⏸️ 下载器{downloader_name}暂停任务启动 \n"
-                f"📊 种子总数:  {len(all_torrents)} \n"
-                f"⬆️ 做种数量:  {len(hash_uploading)}\n"
-                f"⬇️ 下载数量:  {len(hash_downloading)}\n"
-                f"🔄 检查数量:  {len(hash_checking)}\n"
-                f"⏸️ 暂停数量:  {len(hash_paused)}\n"
-                f"❌ 错误数量:  {len(hash_error)}\n"
-                f"⏳ 暂停操作中请稍等...\n",
-            )
-            if self._notify:
-                self.post_message(
-                    mtype=NotificationType.SiteMessage,
-                    title=f"⏸️ 下载器暂停任务启动",
-                    text=f"🎯 下载器: {downloader_name}\n"
-                    f"📊 种子总数: {len(all_torrents)}\n"
-                    f"⬆️ 做种: {len(hash_uploading)} | ⬇️ 下载: {len(hash_downloading)}\n"
-                    f"🔄 检查: {len(hash_checking)} | ⏸️ 暂停: {len(hash_paused)}\n"
-                    f"❌ 错误: {len(hash_error)}\n"
-                    f"⏳ 正在执行暂停操作...",
-                )
-            logger.info(f"🔍 开始过滤下载器 {downloader_name} 的种子...")
-
-            # 对于大量种子，添加处理限制
-            if len(all_torrents) > 5000:
-                logger.warning(f"⚠️ 下载器 {downloader_name} 种子数量过多 ({len(all_torrents)} 个)，为避免处理超时，将限制处理数量")
-                # 只处理前5000个种子
-                all_torrents = all_torrents[:5000]
-                logger.info(f"📊 已限制处理种子数量为 {len(all_torrents)} 个")
-
-            pause_torrents = self.filter_pause_torrents(all_torrents)
-            logger.info(f"✅ 过滤后剩余 {len(pause_torrents)} 个种子需要处理")
+    def __pause_downloader(self, service, type: TorrentType) -> str:
+        """
+        暂停单个下载器的种子
+        :return: 汇总通知中该下载器的内容
+        """
+        downloader_name = service.name
+        downloader_obj = service.instance
+        if not downloader_obj:
+            logger.error(f"获取下载器失败 {downloader_name}")
+            return f"🎯 下载器: {downloader_name}\n❌ 获取下载器失败"
+        snapshot = self.get_torrents_snapshot(service, notify=False)
+        counts = snapshot.counts
+
+        logger.info(
+            f"⏸️ 下载器{downloader_name}暂停任务启动 \n"
+            f"📊 种子总数:  {len(snapshot)} \n"
+            f"⬆️ 做种数量:  {counts[UPLOADING]}\n"
+            f"⬇️ 下载数量:  {counts[DOWNLOADING]}\n"
+            f"🔄 检查数量:  {counts[CHECKING]}\n"
+            f"⏸️ 暂停数量:  {counts[PAUSED]}\n"
+            f"❌ 错误数量:  {counts[ERROR]}\n"
+            f"⏳ 暂停操作中请稍等...\n",
+        )
 
-            logger.info(f"🔍 开始分析下载器 {downloader_name} 的种子状态...")
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(pause_torrents)
-            )
-            logger.info(f"✅ 种子状态分析完成")
-            if type == self.TorrentType.DOWNLOADING:
-                to_be_paused = hash_downloading
-            elif type == self.TorrentType.UPLOADING:
-                to_be_paused = hash_uploading
-            elif type == self.TorrentType.CHECKING:
-                to_be_paused = hash_checking
+        if type == self.TorrentType.DOWNLOADING:
+            pause_states = (DOWNLOADING,)
+        elif type == self.TorrentType.UPLOADING:
+            pause_states = (UPLOADING,)
+        elif type == self.TorrentType.CHECKING:
+            pause_states = (CHECKING,)
+        else:
+            pause_states = (DOWNLOADING, UPLOADING, CHECKING)
+        to_be_paused = snapshot.hashes_in(pause_states, mask=self.filter_pause_torrents(snapshot))
+
+        paused_hashes = []
+        error = None
+        if len(to_be_paused) > 0:
+            logger.info(f"⏸️ 准备暂停下载器 {downloader_name} ({self.get_downloader_type(service)}) 的 {len(to_be_paused)} 个种子")
+            if downloader_obj.stop_torrents(ids=to_be_paused):
+                logger.info(f"✅ 成功暂停下载器 {downloader_name} 的 {len(to_be_paused)} 个种子")
+                paused_hashes = to_be_paused
             else:
-                to_be_paused = hash_downloading + hash_uploading + hash_checking
+                logger.error(f"❌ 下载器{downloader_name}暂停种子失败")
+                error = "❌ 暂停种子操作失败，请检查下载器连接状态"
+        else:
+            logger.info(f"ℹ️ 下载器 {downloader_name} ({self.get_downloader_type(service)}) 没有需要暂停的种子")
+        total, counts, confirm_summary = self.confirm_torrent_states(
+            service, snapshot, paused_hashes, settled=lambda code: code in (PAUSED, ERROR)
+        )
+        logger.info(
+            f"下载器{downloader_name}暂定任务完成 \n"
+            f"种子总数:  {total} \n"
+            f"做种数量:  {counts[UPLOADING]}\n"
+            f"下载数量:  {counts[DOWNLOADING]}\n"
+            f"检查数量:  {counts[CHECKING]}\n"
+            f"暂停数量:  {counts[PAUSED]}\n"
+            f"错误数量:  {counts[ERROR]}\n"
+        )
+        return self.__format_downloader_section(
+            downloader_name, total, counts, action=f"⏸️ 已暂停: {len(paused_hashes)} 个种子",
+            confirm_summary=confirm_summary, error=error,
+        )
 
-            if len(to_be_paused) > 0:
-                logger.info(f"⏸️ 准备暂停下载器 {downloader_name} ({self.get_downloader_type(service)}) 的 {len(to_be_paused)} 个种子")
-                if downloader_obj.stop_torrents(ids=to_be_paused):
-                    logger.info(f"✅ 成功暂停下载器 {downloader_name} 的 {len(to_be_paused)} 个种子")
-                else:
-                    logger.error(f"❌ 下载器{downloader_name}暂停种子失败")
-                    if self._notify:
-                        self.post_message(
-                            mtype=NotificationType.SiteMessage,
-                            title=f"❌ 下载器操作失败",
-                            text=f"🎯 下载器: {downloader_name}\n❌ 暂停种子操作失败\n🔧 请检查下载器连接状态",
-                        )
+    @staticmethod
+    def __format_downloader_section(downloader_name: str, total: int, counts: Dict[int, int],
+                                    action: str = "", confirm_summary: str = "",
+                                    error: Optional[str] = None) -> str:
+        """汇总通知中单个下载器的内容"""
+        lines = [f"🎯 下载器: {downloader_name}"]
+        if error:
+            lines.append(error)
+        if action:
+            lines.append(action)
+        lines.extend([
+            f"📊 种子总数: {total}",
+            f"  ⬆️ 做种: {counts[UPLOADING]} | ⬇️ 下载: {counts[DOWNLOADING]}",
+            f"  🔄 检查: {counts[CHECKING]} | ⏸️ 暂停: {counts[PAUSED]}",
+            f"  ❌ 错误: {counts[ERROR]}",
+        ])
+        if confirm_summary:
+            lines.append(f"⏱️ 状态确认: {confirm_summary}")
+        return "\n".join(lines)
+
+    def __post_downloader_report(self, title: str, results: List[DownloaderResult]):
+        """
+        把所有下载器的执行结果合并为一条通知
+        """
+        sections = []
+        for result in results:
+            if result.timed_out:
+                logger.error(f"下载器 {result.name} 操作超时（{DOWNLOADER_TIMEOUT}s），已不再等待")
+                sections.append(f"🎯 下载器: {result.name}\n⏰ 操作超时（{DOWNLOADER_TIMEOUT}s），请检查下载器连接状态")
+            elif result.error:
+                logger.error(f"下载器 {result.name} 操作失败: {result.error}")
+                sections.append(f"🎯 下载器: {result.name}\n❌ 操作失败: {result.error}")
             else:
-                logger.info(f"ℹ️ 下载器 {downloader_name} ({self.get_downloader_type(service)}) 没有需要暂停的种子")
-            # 每个种子等待1ms以让状态切换成功,至少等待1S
-            wait_time = 0.001 * len(to_be_paused) + 1
-            time.sleep(wait_time)
-
-            all_torrents = self.get_all_torrents(service)
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(all_torrents)
-            )
-            logger.info(
-                f"下载器{downloader_name}暂定任务完成 \n"
-                f"种子总数:  {len(all_torrents)} \n"
-                f"做种数量:  {len(hash_uploading)}\n"
-                f"下载数量:  {len(hash_downloading)}\n"
-                f"检查数量:  {len(hash_checking)}\n"
-                f"暂停数量:  {len(hash_paused)}\n"
-                f"错误数量:  {len(hash_error)}\n"
+                sections.append(f"{result.value}\n🕒 耗时: {result.elapsed:.1f}s")
+        logger.info(f"{title}: " + ", ".join(
+            f"{result.name}={'超时' if result.timed_out else '失败' if result.error else f'{result.elapsed:.1f}s'}"
+            for result in results
+        ))
+        if self._notify and sections:
+            self.post_message(
+                mtype=NotificationType.SiteMessage,
+                title=title,
+                text="\n\n".join(sections),
             )
-            if self._notify:
-                # 计算暂停的种子数量
-                paused_count = len(to_be_paused) if len(to_be_paused) > 0 else 0
-                self.post_message(
-                    mtype=NotificationType.SiteMessage,
-                    title=f"✅ 下载器暂停任务完成",
-                    text=f"🎯 下载器: {downloader_name}\n"
-                    f"⏸️ 已暂停: {paused_count} 个种子\n"
-                    f"📊 当前状态:\n"
-                    f"  ⬆️ 做种: {len(hash_uploading)} | ⬇️ 下载: {len(hash_downloading)}\n"
-                    f"  🔄 检查: {len(hash_checking)} | ⏸️ 暂停: {len(hash_paused)}\n"
-                    f"  ❌ 错误: {len(hash_error)}",
-                )
 
-    def __is_excluded(self, file_path) -> bool:
+    def __compile_matchers(self):
         """
-        是否排除目录
+        编译过滤种子用的匹配器：根域名后缀树、保种站点主域名集合、排除目录
         """
-        for exclude_dir in self._exclude_dirs.split("\n"):
-            if exclude_dir and exclude_dir in str(file_path):
-                return True
-        return False
-    def filter_pause_torrents(self, all_torrents):
-        torrents = []
-        total_count = len(all_torrents)
-        excluded_count = 0
-
-        # 对于大量种子，添加进度日志
-        if total_count > 1000:
-            logger.info(f"处理大量种子 ({total_count} 个)，正在过滤排除目录...")
-
-        for i, torrent in enumerate(all_torrents):
-            # 对于大量种子，每处理1000个输出一次进度
-            if total_count > 1000 and i > 0 and i % 1000 == 0:
-                logger.info(f"已处理 {i}/{total_count} 个种子...")
-
-            # 获取种子路径，支持qBittorrent和Transmission
-            content_path = (torrent.get("content_path") or
-                          getattr(torrent, 'download_dir', None) or
-                          getattr(torrent, 'downloadDir', None))
-            if self.__is_excluded(content_path):
-                excluded_count += 1
-                continue
-            torrents.append(torrent)
+        self._domain_matcher = DomainMatcher(self._multi_level_root_domain)
+        self._exclude_matcher = ExcludeDirMatcher(self._exclude_dirs)
+        op_site_domains = set()
+        for site in self._op_sites or []:
+            domain = StringUtils.get_url_netloc(site.get("url"))
+            main_domain = self.get_main_domain(domain[1])
+            if main_domain:
+                op_site_domains.add(main_domain)
+        self._op_site_domains = frozenset(op_site_domains)
 
+    def filter_pause_torrents(self, snapshot: TorrentSnapshot) -> Optional[bytearray]:
+        """
+        过滤排除目录中的种子
+        :return: 筛选掩码，没有配置排除目录时返回None
+        """
+        if not self._exclude_matcher:
+            return None
+        mask = snapshot.path_mask(self._exclude_matcher)
+        excluded_count = len(mask) - mask.count(1)
         if excluded_count > 0:
-            logger.info(f"排除了 {excluded_count} 个种子，剩余 {len(torrents)} 个种子")
-
-        return torrents
+            logger.info(f"排除了 {excluded_count} 个种子，剩余 {len(mask) - excluded_count} 个种子")
+        return mask
 
     @eventmanager.register(EventType.PluginAction)
     def handle_resume_torrent(self, event: Event):
@@ -854,133 +755,81 @@ class QbCommand(_PluginBase):
             return
 
         logger.info(f"▶️ 开始恢复操作，共有 {len(service_info)} 个下载器服务: {list(service_info.keys())}")
+        results = run_on_downloaders(service_info.values(), self.__resume_downloader)
+        self.__post_downloader_report("✅ 下载器恢复任务完成", results)
 
-        for service in service_info.values():
-            downloader_name = service.name
-            downloader_obj = service.instance
-            if not downloader_obj:
-                logger.error(f"获取下载器失败 {downloader_name}")
-                continue
-            all_torrents = self.get_all_torrents(service)
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(all_torrents)
-            )
-            logger.info(
-                f"下载器{downloader_name}开始任务启动 \n"
-                f"种子总数:  {len(all_torrents)} \n"
-                f"做种数量:  {len(hash_uploading)}\n"
-                f"下载数量:  {len(hash_downloading)}\n"
-                f"检查数量:  {len(hash_checking)}\n"
-                f"暂停数量:  {len(hash_paused)}\n"
-                f"错误数量:  {len(hash_error)}\n"
-                f"开始操作中请稍等...\n",
-            )
-            if self._notify:
-                self.post_message(
-                    mtype=NotificationType.SiteMessage,
-                    title=f"▶️ 下载器恢复任务启动",
-                    text=f"🎯 下载器: {downloader_name}\n"
-                    f"📊 种子总数: {len(all_torrents)}\n"
-                    f"⬆️ 做种: {len(hash_uploading)} | ⬇️ 下载: {len(hash_downloading)}\n"
-                    f"🔄 检查: {len(hash_checking)} | ⏸️ 暂停: {len(hash_paused)}\n"
-                    f"❌ 错误: {len(hash_error)}\n"
-                    f"⏳ 正在恢复暂停的种子...",
-                )
+    def __resume_downloader(self, service) -> str:
+        """
+        恢复单个下载器的种子
+        :return: 汇总通知中该下载器的内容
+        """
+        downloader_name = service.name
+        downloader_obj = service.instance
+        if not downloader_obj:
+            logger.error(f"获取下载器失败 {downloader_name}")
+            return f"🎯 下载器: {downloader_name}\n❌ 获取下载器失败"
+        snapshot = self.get_torrents_snapshot(service, notify=False)
+        counts = snapshot.counts
+        logger.info(
+            f"下载器{downloader_name}开始任务启动 \n"
+            f"种子总数:  {len(snapshot)} \n"
+            f"做种数量:  {counts[UPLOADING]}\n"
+            f"下载数量:  {counts[DOWNLOADING]}\n"
+            f"检查数量:  {counts[CHECKING]}\n"
+            f"暂停数量:  {counts[PAUSED]}\n"
+            f"错误数量:  {counts[ERROR]}\n"
+            f"开始操作中请稍等...\n",
+        )
 
-            resume_torrents = self.filter_resume_torrents(all_torrents)
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(resume_torrents)
-            )
-            if not downloader_obj.start_torrents(ids=hash_paused):
-                logger.error(f"下载器{downloader_name}开始种子失败")
-                if self._notify:
-                    self.post_message(
-                        mtype=NotificationType.SiteMessage,
-                        title=f"❌ 下载器操作失败",
-                        text=f"🎯 下载器: {downloader_name}\n❌ 恢复种子操作失败\n🔧 请检查下载器连接状态",
-                    )
-            # 每个种子等待1ms以让状态切换成功,至少等待1S
-            wait_time = 0.001 * len(hash_paused) + 1
-            time.sleep(wait_time)
-
-            all_torrents = self.get_all_torrents(service)
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(all_torrents)
-            )
-            logger.info(
-                f"下载器{downloader_name}开始任务完成 \n"
-                f"种子总数:  {len(all_torrents)} \n"
-                f"做种数量:  {len(hash_uploading)}\n"
-                f"下载数量:  {len(hash_downloading)}\n"
-                f"检查数量:  {len(hash_checking)}\n"
-                f"暂停数量:  {len(hash_paused)}\n"
-                f"错误数量:  {len(hash_error)}\n"
-            )
-            if self._notify:
-                # 计算恢复的种子数量
-                resumed_count = len(hash_paused) if len(hash_paused) > 0 else 0
-                self.post_message(
-                    mtype=NotificationType.SiteMessage,
-                    title=f"✅ 下载器恢复任务完成",
-                    text=f"🎯 下载器: {downloader_name}\n"
-                    f"▶️ 已恢复: {resumed_count} 个种子\n"
-                    f"📊 当前状态:\n"
-                    f"  ⬆️ 做种: {len(hash_uploading)} | ⬇️ 下载: {len(hash_downloading)}\n"
-                    f"  🔄 检查: {len(hash_checking)} | ⏸️ 暂停: {len(hash_paused)}\n"
-                    f"  ❌ 错误: {len(hash_error)}",
-                )
+        to_be_resumed = snapshot.hashes_in((PAUSED,), mask=self.filter_resume_torrents(snapshot))
+        resumed_hashes = to_be_resumed
+        error = None
+        if not downloader_obj.start_torrents(ids=to_be_resumed):
+            resumed_hashes = []
+            logger.error(f"下载器{downloader_name}开始种子失败")
+            error = "❌ 恢复种子操作失败，请检查下载器连接状态"
+        total, counts, confirm_summary = self.confirm_torrent_states(
+            service, snapshot, resumed_hashes, settled=lambda code: code != PAUSED
+        )
+        logger.info(
+            f"下载器{downloader_name}开始任务完成 \n"
+            f"种子总数:  {total} \n"
+            f"做种数量:  {counts[UPLOADING]}\n"
+            f"下载数量:  {counts[DOWNLOADING]}\n"
+            f"检查数量:  {counts[CHECKING]}\n"
+            f"暂停数量:  {counts[PAUSED]}\n"
+            f"错误数量:  {counts[ERROR]}\n"
+        )
+        return self.__format_downloader_section(
+            downloader_name, total, counts, action=f"▶️ 已恢复: {len(resumed_hashes)} 个种子",
+            confirm_summary=confirm_summary, error=error,
+        )
 
-    def filter_resume_torrents(self, all_torrents):
+    def filter_resume_torrents(self, snapshot: TorrentSnapshot) -> Optional[bytearray]:
         """
         过滤掉不参与保种的种子
+        :return: 筛选掩码，没有配置保种站点时返回None
         """
-        if len(self._op_sites) == 0:
-            return all_torrents
+        op_site_domains = self._op_site_domains
+        if not op_site_domains:
+            return None
 
-        urls = [site.get("url") for site in self._op_sites]
-        op_sites_main_domains = []
-        for url in urls:
-            domain = StringUtils.get_url_netloc(url)
-            main_domain = self.get_main_domain(domain[1])
-            op_sites_main_domains.append(main_domain)
-
-        torrents = []
-        for torrent in all_torrents:
-            # 检查是否为暂停的上传状态种子
-            is_paused_upload = False
-
-            # qBittorrent状态检查
-            if torrent.get("state") in ["pausedUP", "stoppedUP"]:
-                is_paused_upload = True
-            # Transmission状态检查
-            elif hasattr(torrent, 'status') and torrent.status == "stopped":
-                is_paused_upload = True
-
-            if is_paused_upload:
-                tracker_url = self.get_torrent_tracker(torrent)
-                if not tracker_url:
-                    torrent_name = getattr(torrent, 'name', torrent.get('name', 'Unknown'))
-                    logger.info(f"获取种子 {torrent_name} Tracker失败，不过滤该种子")
-                    torrents.append(torrent)
-                    continue
-
-                _, tracker_domain = StringUtils.get_url_netloc(tracker_url)
-                if not tracker_domain:
-                    torrent_name = getattr(torrent, 'name', torrent.get('name', 'Unknown'))
-                    logger.info(f"获取种子 {torrent_name} Tracker失败，不过滤该种子")
-                    torrents.append(torrent)
-                    continue
-
-                tracker_main_domain = self.get_main_domain(domain=tracker_domain)
-                if tracker_main_domain in op_sites_main_domains:
-                    torrent_name = getattr(torrent, 'name', torrent.get('name', 'Unknown'))
-                    logger.info(
-                        f"种子 {torrent_name} 属于站点{tracker_main_domain}，不执行操作"
-                    )
-                    continue
-
-            torrents.append(torrent)
-        return torrents
+        main_domain = self._domain_matcher.main_domain
+        mask = bytearray(b"\x01") * len(snapshot)
+        skipped_count = 0
+        for i, resumable in enumerate(snapshot.resumable):
+            # 只过滤暂停的做种种子，获取不到tracker的种子不过滤
+            if not resumable:
+                continue
+            tracker_domain = snapshot.tracker_hosts[i]
+            if not tracker_domain:
+                continue
+            if main_domain(tracker_domain) in op_site_domains:
+                mask[i] = 0
+                skipped_count += 1
+        if skipped_count:
+            logger.info(f"{skipped_count} 个暂停的做种种子属于保种站点，不执行操作")
+        return mask
 
     @eventmanager.register(EventType.PluginAction)
     def handle_downloader_status(self, event: Event):
@@ -995,38 +844,34 @@ class QbCommand(_PluginBase):
     def downloader_status(self):
         if not self._enabled:
             return
-        for service in self.service_info.values():
-            downloader_name = service.name
-            downloader_obj = service.instance
-            if not downloader_obj:
-                logger.error(f"获取下载器失败 {downloader_name}")
-                continue
-            all_torrents = self.get_all_torrents(service)
-            hash_downloading, hash_uploading, hash_paused, hash_checking, hash_error = (
-                self.get_torrents_status(all_torrents)
-            )
-            logger.info(
-                f"下载器{downloader_name}任务状态 \n"
-                f"种子总数:  {len(all_torrents)} \n"
-                f"做种数量:  {len(hash_uploading)}\n"
-                f"下载数量:  {len(hash_downloading)}\n"
-                f"检查数量:  {len(hash_checking)}\n"
-                f"暂停数量:  {len(hash_paused)}\n"
-                f"错误数量:  {len(hash_error)}\n"
-            )
-            if self._notify:
-                self.post_message(
-                    mtype=NotificationType.SiteMessage,
-                    title=f"📊 下载器状态报告",
-                    text=f"🎯 下载器: {downloader_name}\n"
-                    f"📊 种子总数: {len(all_torrents)}\n\n"
-                    f"📈 运行状态:\n"
-                    f"  ⬆️ 做种中: {len(hash_uploading)}\n"
-                    f"  ⬇️ 下载中: {len(hash_downloading)}\n"
-                    f"  🔄 检查中: {len(hash_checking)}\n\n"
-                    f"⏸️ 暂停: {len(hash_paused)}\n"
-                    f"❌ 错误: {len(hash_error)}",
-                )
+        service_info = self.service_info
+        if not service_info:
+            logger.error("没有可用的下载器服务")
+            return
+        results = run_on_downloaders(service_info.values(), self.__downloader_status)
+        self.__post_downloader_report("📊 下载器状态报告", results)
+
+    def __downloader_status(self, service) -> str:
+        """
+        统计单个下载器的种子状态
+        :return: 汇总通知中该下载器的内容
+        """
+        downloader_name = service.name
+        if not service.instance:
+            logger.error(f"获取下载器失败 {downloader_name}")
+            return f"🎯 下载器: {downloader_name}\n❌ 获取下载器失败"
+        snapshot = self.get_torrents_snapshot(service, notify=False)
+        counts = snapshot.counts
+        logger.info(
+            f"下载器{downloader_name}任务状态 \n"
+            f"种子总数:  {len(snapshot)} \n"
+            f"做种数量:  {counts[UPLOADING]}\n"
+            f"下载数量:  {counts[DOWNLOADING]}\n"
+            f"检查数量:  {counts[CHECKING]}\n"
+            f"暂停数量:  {counts[PAUSED]}\n"
+            f"错误数量:  {counts[ERROR]}\n"
+        )
+        return self.__format_downloader_section(downloader_name, len(snapshot), counts)
 
     @eventmanager.register(EventType.PluginAction)
     def handle_toggle_upload_limit(self, event: Event):
@@ -1064,47 +909,53 @@ class QbCommand(_PluginBase):
             )
             return False
 
-        flag = True
+        services = []
         for service in self.service_info.values():
-            downloader_name = service.name
-            downloader_obj = service.instance
-            downloader_type = self.get_downloader_type(service)
-            if not downloader_obj:
-                logger.error(f"获取下载器失败 {downloader_name}")
+            if not service.instance:
+                logger.error(f"获取下载器失败 {service.name}")
                 continue
+            services.append(service)
 
-            # 根据下载器类型调用相应的限速方法
-            success = False
-            if downloader_type == "qbittorrent":
-                # qBittorrent需要转换单位
-                logger.debug(f"调用qBittorrent API设置限速: 下载={download_limit} KB/s, 上传={upload_limit} KB/s")
-                success = downloader_obj.set_speed_limit(
-                    download_limit=int(download_limit), upload_limit=int(upload_limit)
-                )
-                logger.debug(f"qBittorrent API调用结果: {success}")
-            elif downloader_type == "transmission":
-                # Transmission直接使用KB/s，0表示无限制
-                dl_limit = int(download_limit)
-                ul_limit = int(upload_limit)
-                logger.debug(f"调用Transmission API设置限速: 下载={dl_limit} KB/s, 上传={ul_limit} KB/s")
-                success = downloader_obj.set_speed_limit(
-                    download_limit=dl_limit, upload_limit=ul_limit
-                )
-                logger.debug(f"Transmission API调用结果: {success}")
-            else:
-                logger.warning(f"不支持的下载器类型: {downloader_type}")
-                success = False
-
-            # 如果设置成功，保存状态到数据库
+        results = run_on_downloaders(
+            services,
+            lambda service: self.__apply_speed_limit(service, int(download_limit), int(upload_limit)),
+            timeout=DOWNLOADER_QUERY_TIMEOUT,
+        )
+        flag = True
+        for result in results:
+            success = result.ok and bool(result.value)
+            # 如果设置成功，保存状态到数据库；限速状态是读-改-写，统一在当前线程保存
             if success:
-                logger.debug(f"API调用成功，保存状态到数据库: {downloader_name}")
-                self.save_speed_limit_status(downloader_name, int(download_limit), int(upload_limit))
+                logger.debug(f"API调用成功，保存状态到数据库: {result.name}")
+                self.save_speed_limit_status(result.name, int(download_limit), int(upload_limit))
+            elif result.timed_out:
+                logger.error(f"下载器 {result.name} 设置限速超时（{DOWNLOADER_QUERY_TIMEOUT}s），不保存状态到数据库")
             else:
-                logger.error(f"API调用失败，不保存状态到数据库: {downloader_name}")
+                logger.error(f"API调用失败，不保存状态到数据库: {result.name} {result.error or ''}")
 
             flag = flag and success
         return flag
 
+    def __apply_speed_limit(self, service, download_limit: int, upload_limit: int) -> bool:
+        """
+        根据下载器类型调用相应的限速方法
+        """
+        downloader_obj = service.instance
+        downloader_type = self.get_downloader_type(service)
+        if downloader_type == "qbittorrent":
+            logger.debug(f"调用qBittorrent API设置限速: 下载={download_limit} KB/s, 上传={upload_limit} KB/s")
+            success = downloader_obj.set_speed_limit(download_limit=download_limit, upload_limit=upload_limit)
+            logger.debug(f"qBittorrent API调用结果: {success}")
+        elif downloader_type == "transmission":
+            # Transmission直接使用KB/s，0表示无限制
+            logger.debug(f"调用Transmission API设置限速: 下载={download_limit} KB/s, 上传={upload_limit} KB/s")
+            success = downloader_obj.set_speed_limit(download_limit=download_limit, upload_limit=upload_limit)
+            logger.debug(f"Transmission API调用结果: {success}")
+        else:
+            logger.warning(f"不支持的下载器类型: {downloader_type}")
+            success = False
+        return success
+
     def set_upload_limit(self, upload_limit):
         # 确保参数是字符串类型
         upload_limit = str(upload_limit) if upload_limit is not None else "0"
@@ -1438,32 +1289,7 @@ class QbCommand(_PluginBase):
         解析种子tracker，支持qBittorrent和Transmission
         :return: tracker url
         """
-        if not torrent:
-            return None
-
-        # qBittorrent方式
-        tracker = torrent.get("tracker")
-        if tracker and len(tracker) > 0:
-            return tracker
-
-        # Transmission方式 - 检查trackers属性
-        if hasattr(torrent, 'trackers') and torrent.trackers:
-            for tracker_info in torrent.trackers:
-                if hasattr(tracker_info, 'announce') and tracker_info.announce:
-                    return tracker_info.announce
-                elif isinstance(tracker_info, dict) and tracker_info.get('announce'):
-                    return tracker_info.get('announce')
-
-        # 从magnet链接解析
-        magnet_uri = torrent.get("magnet_uri") or getattr(torrent, 'magnetLink', None)
-        if not magnet_uri or len(magnet_uri) <= 0:
-            return None
-        magnet_uri_obj = urlparse(magnet_uri)
-        query = urllib.parse.parse_qs(magnet_uri_obj.query)
-        tr = query.get("tr")
-        if not tr or len(tr) <= 0:
-            return None
-        return tr[0]
+        return torrent_tracker(torrent)
 
     def get_main_domain(self, domain):
         """
@@ -1471,17 +1297,7 @@ class QbCommand(_PluginBase):
         :param domain: 原域名
         :return: 主域名
         """
-        if not domain:
-            return None
-        domain_arr = domain.split(".")
-        domain_len = len(domain_arr)
-        if domain_len < 2:
-            return None
-        root_domain, root_domain_len = self.match_multi_level_root_domain(domain=domain)
-        if root_domain:
-            return f"{domain_arr[-root_domain_len - 1]}.{root_domain}"
-        else:
-            return f"{domain_arr[-2]}.{domain_arr[-1]}"
+        return self._domain_matcher.main_domain(domain)
 
     def match_multi_level_root_domain(self, domain):
         """
@@ -1489,13 +1305,7 @@ class QbCommand(_PluginBase):
         :param domain: 被匹配的域名
         :return: 匹配的根域名, 匹配的根域名长度
         """
-        if not domain or not self._multi_level_root_domain:
-            return None, 0
-        for root_domain in self._multi_level_root_domain:
-            if domain.endswith("." + root_domain):
-                root_domain_len = len(root_domain.split("."))
-                return root_domain, root_domain_len
-        return None, 0
+        return self._domain_matcher.match_root(domain)
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         customSites = self.__custom_sites()
@@ -2026,63 +1836,72 @@ class QbCommand(_PluginBase):
         if not self.service_info:
             return []
 
+        services = list(self.service_info.values())
+        results = run_on_downloaders(services, self.__downloader_speed_status, timeout=DOWNLOADER_QUERY_TIMEOUT)
         status_list = []
-        for service_name, service in self.service_info.items():
-            downloader_obj = service.instance
-            downloader_type = self.get_downloader_type(service)
-
-            try:
-                # 从数据库获取限速状态
-                download_limit, upload_limit = self.get_speed_limit_status(service_name)
+        for service, result in zip(services, results):
+            if result.ok:
+                status_list.append(result.value)
+                continue
+            if result.timed_out:
+                logger.error(f"获取下载器 {service.name} 状态超时（{DOWNLOADER_QUERY_TIMEOUT}s）")
+            else:
+                logger.error(f"获取下载器 {service.name} 状态失败: {result.error}")
+            status_list.append({
+                'name': service.name,
+                'type': self.get_downloader_type(service),
+                'download_limit': 0,
+                'upload_limit': 0,
+                'current_download_speed': 0,
+                'current_upload_speed': 0,
+                'status': 'error',
+                'limit_status': '错误'
+            })
 
-                # 如果数据库中没有保存的状态，显示为未知
-                if download_limit is None or upload_limit is None:
-                    download_limit, upload_limit = 0, 0
-                    status_text = "未知（初始状态）"
-                else:
-                    status_text = "已设置"
-
-                # 获取传输统计信息
-                transfer_info = downloader_obj.transfer_info()
-                if transfer_info:
-                    if downloader_type == "qbittorrent":
-                        # qBittorrent返回的是字节/秒，转换为KB/s
-                        current_dl_speed = getattr(transfer_info, 'dl_info_speed', 0) / 1024
-                        current_ul_speed = getattr(transfer_info, 'up_info_speed', 0) / 1024
-                    else:  # transmission
-                        # Transmission返回的是字节/秒，转换为KB/s
-                        current_dl_speed = getattr(transfer_info, 'download_speed', 0) / 1024
-                        current_ul_speed = getattr(transfer_info, 'upload_speed', 0) / 1024
-                else:
-                    current_dl_speed, current_ul_speed = 0, 0
+        return status_list
 
-                status_info = {
-                    'name': service_name,
-                    'type': downloader_type,
-                    'download_limit': int(download_limit),
-                    'upload_limit': int(upload_limit),
-                    'current_download_speed': round(current_dl_speed, 1),
-                    'current_upload_speed': round(current_ul_speed, 1),
-                    'status': 'active' if downloader_obj else 'inactive',
-                    'limit_status': status_text
-                }
+    def __downloader_speed_status(self, service) -> Dict[str, Any]:
+        """
+        获取单个下载器的限速状态和当前速度
+        """
+        service_name = service.name
+        downloader_obj = service.instance
+        downloader_type = self.get_downloader_type(service)
 
-                status_list.append(status_info)
+        # 从数据库获取限速状态
+        download_limit, upload_limit = self.get_speed_limit_status(service_name)
 
-            except Exception as e:
-                logger.error(f"获取下载器 {service_name} 状态失败: {str(e)}")
-                status_list.append({
-                    'name': service_name,
-                    'type': downloader_type,
-                    'download_limit': 0,
-                    'upload_limit': 0,
-                    'current_download_speed': 0,
-                    'current_upload_speed': 0,
-                    'status': 'error',
-                    'limit_status': '错误'
-                })
+        # 如果数据库中没有保存的状态，显示为未知
+        if download_limit is None or upload_limit is None:
+            download_limit, upload_limit = 0, 0
+            status_text = "未知（初始状态）"
+        else:
+            status_text = "已设置"
 
-        return status_list
+        # 获取传输统计信息
+        transfer_info = downloader_obj.transfer_info()
+        if transfer_info:
+            if downloader_type == "qbittorrent":
+                # qBittorrent返回的是字节/秒，转换为KB/s
+                current_dl_speed = getattr(transfer_info, 'dl_info_speed', 0) / 1024
+                current_ul_speed = getattr(transfer_info, 'up_info_speed', 0) / 1024
+            else:  # transmission
+                # Transmission返回的是字节/秒，转换为KB/s
+                current_dl_speed = getattr(transfer_info, 'download_speed', 0) / 1024
+                current_ul_speed = getattr(transfer_info, 'upload_speed', 0) / 1024
+        else:
+            current_dl_speed, current_ul_speed = 0, 0
+
+        return {
+            'name': service_name,
+            'type': downloader_type,
+            'download_limit': int(download_limit),
+            'upload_limit': int(upload_limit),
+            'current_download_speed': round(current_dl_speed, 1),
+            'current_upload_speed': round(current_ul_speed, 1),
+            'status': 'active' if downloader_obj else 'inactive',
+            'limit_status': status_text
+        }
 
     def get_page(self) -> List[dict]:
         """
@@ -0,0 +1,89 @@
+"""
+多下载器并发执行
+暂停、恢复、状态查询、限速等操作对每个下载器相互独立，这里用有界线程池同时执行，
+每个下载器单独计算超时，一个下载器无响应不会拖慢其他下载器，结果按下载器顺序汇总。
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, Optional
+
+# 同时操作的下载器数量上限
+DOWNLOADER_MAX_WORKERS = 8
+# 单个下载器操作的默认超时时间（秒），从该下载器开始执行时计时
+DOWNLOADER_TIMEOUT = 120
+# 限速、速度查询等轻量操作的超时时间（秒）
+DOWNLOADER_QUERY_TIMEOUT = 15
+# 检查超时的最长间隔（秒）
+_WAIT_SLICE = 0.5
+
+
+class DownloaderResult:
+    """单个下载器的执行结果"""
+
+    __slots__ = ("name", "value", "error", "elapsed", "timed_out")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.elapsed = 0.0
+        self.timed_out = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+def run_on_downloaders(services: Iterable[Any],
+                       func: Callable[[Any], Any],
+                       timeout: float = DOWNLOADER_TIMEOUT,
+                       max_workers: int = DOWNLOADER_MAX_WORKERS) -> List[DownloaderResult]:
+    """
+    并发地对每个下载器执行操作
+
+    :param services: 下载器服务列表，需要有name属性
+    :param func: 对单个下载器执行的操作，返回值记录在结果的value中
+    :param timeout: 单个下载器的超时时间（秒）
+    :param max_workers: 线程池大小
+    :return: 与services顺序一致的结果列表，超时的下载器继续在后台执行，但不再等待
+    """
+    services = list(services)
+    results = [DownloaderResult(getattr(service, "name", str(service))) for service in services]
+    if not services:
+        return results
+
+    started = [0.0] * len(services)
+    workers = max(1, min(max_workers, len(services)))
+    # 超时的下载器会一直占用线程，排队的下载器最迟在所有批次的超时时间之后放弃
+    deadline = time.monotonic() + timeout * -(-len(services) // workers)
+
+    def run(index: int):
+        started[index] = time.monotonic()
+        return func(services[index])
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qbcommand-downloader")
+    try:
+        futures = {executor.submit(run, index): index for index in range(len(services))}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=_WAIT_SLICE, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                result = results[futures[future]]
+                result.elapsed = now - started[futures[future]]
+                try:
+                    result.value = future.result()
+                except Exception as e:
+                    result.error = str(e) or type(e).__name__
+            # 排队中的下载器尚未开始计时，只受整体截止时间限制
+            for future in list(pending):
+                index = futures[future]
+                if (started[index] and now - started[index] >= timeout) or now >= deadline:
+                    results[index].timed_out = True
+                    results[index].elapsed = now - started[index] if started[index] else 0.0
+                    future.cancel()
+                    pending.discard(future)
+    finally:
+        # 不等待超时的下载器，让其在后台自行结束
+        executor.shutdown(wait=False)
+    return results
@@ -0,0 +1,91 @@
+"""
+种子过滤用的预编译匹配器
+在 init_plugin 时根据配置编译一次，过滤大量种子时每个种子只做常数次查找：
+- DomainMatcher: 多级根域名的反向后缀树，主域名解析结果按主机名缓存
+- ExcludeDirMatcher: 排除目录的子串匹配
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+# 后缀树中标记根域名结尾的键
+_END = ""
+
+
+class DomainMatcher:
+    """主域名解析"""
+
+    def __init__(self, multi_level_root_domains: Iterable[str], cache_size: int = 4096):
+        # 按标签反向构建的后缀树，如 edu.cn -> {"cn": {"edu": {"": 2}}}
+        self._trie = {}
+        for root_domain in multi_level_root_domains or []:
+            labels = [label for label in root_domain.strip(".").split(".") if label]
+            if not labels:
+                continue
+            node = self._trie
+            for label in reversed(labels):
+                node = node.setdefault(label, {})
+            node[_END] = len(labels)
+        self.main_domain = lru_cache(maxsize=cache_size)(self._main_domain)
+
+    def match_root(self, domain: Optional[str]) -> Tuple[Optional[str], int]:
+        """
+        匹配多级根域名，有多个匹配时取最长的
+        :return: 匹配的根域名, 匹配的根域名长度
+        """
+        if not domain or not self._trie:
+            return None, 0
+        labels = domain.split(".")
+        node = self._trie
+        matched = 0
+        # 根域名之前至少还要有一级标签
+        for depth in range(1, len(labels)):
+            node = node.get(labels[-depth])
+            if node is None:
+                break
+            if _END in node:
+                matched = node[_END]
+        if not matched:
+            return None, 0
+        return ".".join(labels[-matched:]), matched
+
+    def _main_domain(self, domain: Optional[str]) -> Optional[str]:
+        if not domain:
+            return None
+        domain_arr = domain.split(".")
+        if len(domain_arr) < 2:
+            return None
+        root_domain, root_domain_len = self.match_root(domain)
+        if root_domain:
+            return f"{domain_arr[-root_domain_len - 1]}.{root_domain}"
+        return f"{domain_arr[-2]}.{domain_arr[-1]}"
+
+
+class ExcludeDirMatcher:
+    """
+    排除目录匹配，保存路径中包含任一排除目录即视为排除
+    单个目录直接子串查找，多个目录编译为一个正则，一次扫描完成匹配
+    """
+
+    def __init__(self, exclude_dirs: Optional[str]):
+        dirs = []
+        for exclude_dir in (exclude_dirs or "").split("\n"):
+            if exclude_dir and exclude_dir not in dirs:
+                dirs.append(exclude_dir)
+        self.dirs = tuple(dirs)
+        self._single = dirs[0] if len(dirs) == 1 else None
+        self._pattern = None
+        if len(dirs) > 1:
+            # 长的目录在前，避免前缀相同的目录互相遮挡（对结果无影响，只减少回溯）
+            self._pattern = re.compile("|".join(re.escape(d) for d in sorted(dirs, key=len, reverse=True)))
+
+    def __bool__(self) -> bool:
+        return bool(self.dirs)
+
+    def __call__(self, file_path) -> bool:
+        if not self.dirs:
+            return False
+        path = file_path if isinstance(file_path, str) else str(file_path)
+        if self._single is not None:
+            return self._single in path
+        return self._pattern.search(path) is not None
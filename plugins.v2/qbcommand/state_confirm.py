@@ -0,0 +1,211 @@
+"""
+暂停/恢复后的种子状态确认
+执行 stop_torrents/start_torrents 后不再固定等待再全量拉取种子列表，而是只拉取增量：
+qBittorrent 使用 sync/maindata 的rid增量，Transmission 使用 recently-active，
+把变化合并到快照的状态索引中，直到受影响的种子全部到达目标状态或超过截止时间。
+"""
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .torrent_snapshot import STATE_NAMES, TorrentSnapshot, qb_state_code, tr_torrent_code
+
+# 确认状态的最长等待时间（秒）
+CONFIRM_TIMEOUT = 30
+# 首次拉取增量前的等待时间（秒），之后按倍数退避
+CONFIRM_INITIAL_INTERVAL = 0.2
+CONFIRM_MAX_INTERVAL = 2.0
+CONFIRM_BACKOFF = 1.5
+
+# Transmission增量请求的字段
+TR_DELTA_FIELDS = ["id", "hashString", "status", "error", "errorString"]
+# Transmission按hash直接查询待确认种子时每批的数量
+TR_QUERY_CHUNK = 500
+
+
+class ConfirmResult:
+    """状态确认结果"""
+
+    __slots__ = ("method", "requested", "confirmed", "elapsed", "polls", "total", "counts", "error")
+
+    def __init__(self, method: str, requested: int, counts: Dict[int, int], total: int):
+        self.method = method
+        self.requested = requested
+        self.confirmed = 0
+        self.elapsed = 0.0
+        self.polls = 0
+        self.total = total
+        self.counts = counts
+        self.error: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        return self.requested - self.confirmed
+
+    @property
+    def converged(self) -> bool:
+        return self.pending == 0
+
+    def describe(self) -> str:
+        """用于日志和通知的确认摘要"""
+        if self.converged:
+            status = "已确认"
+        elif self.error:
+            status = "确认中断"
+        else:
+            status = "确认超时"
+        return f"{status} {self.confirmed}/{self.requested}，耗时 {self.elapsed:.2f}s，增量请求 {self.polls} 次"
+
+
+class _StateIndex:
+    """hash到状态码的索引，合并增量时同步维护各状态数量"""
+
+    def __init__(self, snapshot: TorrentSnapshot):
+        self.states = snapshot.state_index()
+        self.counts = dict(snapshot.counts)
+        # 发生删除或全量更新时置位，需要重新检查全部待确认的种子
+        self.rebuilt = False
+
+    def set(self, torrent_hash: str, code: int) -> bool:
+        """更新种子状态，返回状态是否变化"""
+        old = self.states.get(torrent_hash)
+        if old == code:
+            return False
+        if old is not None:
+            self.counts[old] -= 1
+        self.counts[code] += 1
+        self.states[torrent_hash] = code
+        return True
+
+    def remove(self, torrent_hash: str):
+        old = self.states.pop(torrent_hash, None)
+        if old is not None:
+            self.counts[old] -= 1
+            self.rebuilt = True
+
+    def replace(self, states: Dict[str, int]):
+        """全量更新"""
+        self.states = states
+        self.counts = {code: 0 for code in STATE_NAMES}
+        for code in states.values():
+            self.counts[code] += 1
+        self.rebuilt = True
+
+
+def _qb_poller(client, rid: int):
+    """
+    qBittorrent增量拉取：每次只返回上次rid之后变化的种子字段
+    """
+    state = {"rid": rid}
+
+    def poll(index: _StateIndex, pending: Set[str]) -> Iterable[str]:
+        maindata = client.sync_maindata(rid=state["rid"])
+        state["rid"] = maindata.get("rid", state["rid"])
+        torrents = maindata.get("torrents") or {}
+        if maindata.get("full_update"):
+            # rid失效（如其他客户端使用了同一会话），服务端返回了全量数据
+            index.replace({torrent_hash: qb_state_code(torrent.get("state"))
+                           for torrent_hash, torrent in torrents.items()})
+            return ()
+        for torrent_hash in maindata.get("torrents_removed") or []:
+            index.remove(torrent_hash)
+        changed = []
+        for torrent_hash, delta in torrents.items():
+            # 增量中没有state字段说明状态未变化
+            if "state" in delta and index.set(torrent_hash, qb_state_code(delta["state"])):
+                changed.append(torrent_hash)
+        return changed
+
+    return poll
+
+
+def _tr_poller(client):
+    """
+    Transmission增量拉取：只返回最近有活动（状态变化）的种子；
+    最近活动中没有出现的待确认种子，再按hash直接查询
+    """
+
+    def merge(index: _StateIndex, torrents, changed: List[str]):
+        for torrent in torrents or []:
+            torrent_hash = getattr(torrent, "hashString", None) or str(getattr(torrent, "id", ""))
+            if torrent_hash and index.set(torrent_hash, tr_torrent_code(torrent)):
+                changed.append(torrent_hash)
+
+    def poll(index: _StateIndex, pending: Set[str]) -> Iterable[str]:
+        changed: List[str] = []
+        active, _ = client.get_recently_active_torrents(arguments=TR_DELTA_FIELDS)
+        merge(index, active, changed)
+        changed_set = set(changed)
+        remaining = [torrent_hash for torrent_hash in pending if torrent_hash not in changed_set]
+        if remaining:
+            for i in range(0, len(remaining), TR_QUERY_CHUNK):
+                merge(index, client.get_torrents(ids=remaining[i:i + TR_QUERY_CHUNK], arguments=TR_DELTA_FIELDS),
+                      changed)
+        return changed
+
+    return poll
+
+
+def confirm_states(snapshot: TorrentSnapshot,
+                   downloader_type: str,
+                   downloader_obj,
+                   hashes: Iterable[str],
+                   settled: Callable[[int], bool],
+                   timeout: float = CONFIRM_TIMEOUT,
+                   sleep: Callable[[float], None] = time.sleep,
+                   clock: Callable[[], float] = time.monotonic) -> Optional[ConfirmResult]:
+    """
+    等待受影响的种子到达目标状态
+
+    :param snapshot: 操作前的快照，qBittorrent需要由 sync/maindata 构建以获得rid
+    :param downloader_type: qbittorrent 或 transmission
+    :param downloader_obj: 下载器实例，需要提供底层客户端（qbc/trc）
+    :param hashes: 执行了操作的种子hash
+    :param settled: 判断状态码是否已到达目标状态
+    :param timeout: 最长等待时间（秒）
+    :return: 确认结果，下载器不支持增量拉取时返回None
+    """
+    if downloader_type == "qbittorrent":
+        client = getattr(downloader_obj, "qbc", None)
+        if client is None or not hasattr(client, "sync_maindata") or snapshot.rid is None:
+            return None
+        poll, method = _qb_poller(client, snapshot.rid), "sync/maindata"
+    else:
+        client = getattr(downloader_obj, "trc", None)
+        if client is None or not hasattr(client, "get_recently_active_torrents"):
+            return None
+        poll, method = _tr_poller(client), "recently-active"
+
+    pending = set(hashes)
+    index = _StateIndex(snapshot)
+    result = ConfirmResult(method, len(pending), index.counts, len(index.states))
+    start = clock()
+    deadline = start + timeout
+    interval = CONFIRM_INITIAL_INTERVAL
+    while pending:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            break
+        sleep(min(interval, remaining))
+        interval = min(interval * CONFIRM_BACKOFF, CONFIRM_MAX_INTERVAL)
+        try:
+            changed = poll(index, pending)
+        except Exception as e:
+            result.error = str(e)
+            break
+        result.polls += 1
+        states = index.states
+        if index.rebuilt:
+            # 全量更新或有种子被删除，重新检查全部待确认的种子，已删除的种子不再等待
+            index.rebuilt = False
+            pending = {torrent_hash for torrent_hash in pending
+                       if torrent_hash in states and not settled(states[torrent_hash])}
+        else:
+            for torrent_hash in changed:
+                if torrent_hash in pending and settled(states[torrent_hash]):
+                    pending.discard(torrent_hash)
+
+    result.confirmed = result.requested - len(pending)
+    result.elapsed = clock() - start
+    result.counts = index.counts
+    result.total = len(index.states)
+    return result
@@ -0,0 +1,314 @@
+"""
+下载器种子快照
+一次性拉取种子列表后，把qBittorrent和Transmission的种子统一成列式结构
+（hash、状态码、tracker、保存路径），在构建时一次遍历完成状态分类，
+之后的统计、过滤都只在这些列上进行，不再反复探测种子对象的属性。
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# 状态码
+DOWNLOADING = 0
+UPLOADING = 1
+PAUSED = 2
+CHECKING = 3
+ERROR = 4
+
+STATE_NAMES = {
+    DOWNLOADING: "downloading",
+    UPLOADING: "uploading",
+    PAUSED: "paused",
+    CHECKING: "checking",
+    ERROR: "error",
+}
+
+# qBittorrent中视为“已暂停的做种”的状态，恢复时按站点过滤
+QB_PAUSED_UPLOAD_STATES = frozenset(("pausedUP", "stoppedUP"))
+
+# qBittorrent状态字符串到状态码的映射，与qbittorrent-api的state_enum判断顺序一致
+QB_STATE_CODES = {
+    "pausedUP": PAUSED,
+    "pausedDL": PAUSED,
+    "stoppedUP": PAUSED,
+    "stoppedDL": PAUSED,
+    "error": ERROR,
+    "missingFiles": ERROR,
+    "checkingUP": CHECKING,
+    "checkingDL": CHECKING,
+    "checkingResumeData": CHECKING,
+    "downloading": DOWNLOADING,
+    "metaDL": DOWNLOADING,
+    "forcedMetaDL": DOWNLOADING,
+    "stalledDL": DOWNLOADING,
+    "queuedDL": DOWNLOADING,
+    "forcedDL": DOWNLOADING,
+    "uploading": UPLOADING,
+    "stalledUP": UPLOADING,
+    "queuedUP": UPLOADING,
+    "forcedUP": UPLOADING,
+}
+
+
+@lru_cache(maxsize=4096)
+def tracker_host(tracker_url: str) -> Optional[str]:
+    """解析tracker地址的主机名，同一站点的tracker地址高度重复，因此缓存结果"""
+    if not tracker_url:
+        return None
+    try:
+        host = urlparse(tracker_url).hostname
+    except ValueError:
+        return None
+    return host or None
+
+
+def torrent_tracker(torrent) -> Optional[str]:
+    """
+    解析种子tracker，支持qBittorrent和Transmission
+    :return: tracker url
+    """
+    if not torrent:
+        return None
+
+    # qBittorrent方式
+    tracker = torrent.get("tracker")
+    if tracker:
+        return tracker
+
+    # Transmission方式 - 检查trackers属性
+    trackers = getattr(torrent, "trackers", None)
+    if trackers:
+        for tracker_info in trackers:
+            announce = getattr(tracker_info, "announce", None)
+            if announce:
+                return announce
+            if isinstance(tracker_info, dict) and tracker_info.get("announce"):
+                return tracker_info.get("announce")
+
+    # 从magnet链接解析
+    magnet_uri = torrent.get("magnet_uri") or getattr(torrent, "magnetLink", None)
+    if not magnet_uri:
+        return None
+    tr = parse_qs(urlparse(magnet_uri).query).get("tr")
+    return tr[0] if tr else None
+
+
+# qbittorrent-api判断出的新状态，按状态字符串缓存
+_qb_extra_state_codes: Dict[Optional[str], int] = {}
+
+
+def _qb_state_code(torrent) -> int:
+    """通过qbittorrent-api的state_enum判断状态，结果按状态字符串缓存"""
+    state = torrent.get("state")
+    code = _qb_extra_state_codes.get(state)
+    if code is not None:
+        return code
+    try:
+        code = _qb_enum_code(torrent.state_enum)
+    except Exception:
+        code = ERROR
+    _qb_extra_state_codes[state] = code
+    return code
+
+
+def _qb_enum_code(state_enum) -> int:
+    if state_enum.is_paused:
+        return PAUSED
+    if state_enum.is_errored:
+        return ERROR
+    if state_enum.is_checking:
+        return CHECKING
+    if state_enum.is_downloading:
+        return DOWNLOADING
+    if state_enum.is_uploading:
+        return UPLOADING
+    return ERROR
+
+
+def qb_state_code(state: Optional[str]) -> int:
+    """qBittorrent状态字符串对应的状态码，未知状态视为错误"""
+    return QB_STATE_CODES.get(state, ERROR)
+
+
+def tr_torrent_code(torrent) -> int:
+    """Transmission种子的状态码，有错误的种子优先归为错误"""
+    status = getattr(torrent, "status", None)
+    error_string = getattr(torrent, "error_string", None) or getattr(torrent, "errorString", "")
+    if status is None or getattr(torrent, "error", 0) or (error_string and error_string.strip()):
+        return ERROR
+    return _tr_status_code(status)
+
+
+@lru_cache(maxsize=64)
+def _tr_status_code(status) -> int:
+    """Transmission状态映射，兼容枚举、字符串和数值，结果按状态值缓存"""
+    status_value = getattr(status, "value", status)
+    status_str = str(status).lower()
+    if not hasattr(status, "value") and hasattr(status, "name"):
+        status_str = status.name.lower()
+
+    if "stop" in status_str or status_value == 0:
+        return PAUSED
+    if "check" in status_str or status_value in (1, 2):
+        return CHECKING
+    if "download" in status_str or status_value in (3, 4):
+        return DOWNLOADING
+    if "seed" in status_str or status_value in (5, 6):
+        return UPLOADING
+    return ERROR
+
+
+class TorrentSnapshot:
+    """种子列表的列式快照"""
+
+    __slots__ = ("hashes", "states", "resumable", "tracker_hosts", "save_paths", "skipped", "rid", "_counts")
+
+    def __init__(self):
+        # 第i个种子的各列数据
+        self.hashes: List[str] = []
+        self.states = bytearray()
+        # 已暂停的做种种子，恢复时需要按站点过滤
+        self.resumable = bytearray()
+        # tracker主机名，只为可恢复的种子解析，其余为None
+        self.tracker_hosts: List[Optional[str]] = []
+        self.save_paths: List[Optional[str]] = []
+        # 无法获取hash而跳过的种子数
+        self.skipped = 0
+        # 由qBittorrent sync/maindata构建时的响应ID，用于之后只拉取增量
+        self.rid: Optional[int] = None
+        self._counts: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @classmethod
+    def from_torrents(cls, torrents: Optional[Iterable[Any]], downloader_type: Optional[str] = None,
+                      resolve_tracker: Callable[[Any], Optional[str]] = torrent_tracker) -> "TorrentSnapshot":
+        """
+        从下载器返回的种子列表构建快照
+
+        :param torrents: 种子列表
+        :param downloader_type: qbittorrent 或 transmission，为空时按第一个种子自动识别
+        :param resolve_tracker: 解析种子tracker地址的函数
+        """
+        snapshot = cls()
+        torrents = list(torrents or [])
+        if not torrents:
+            return snapshot
+
+        if downloader_type not in ("qbittorrent", "transmission"):
+            downloader_type = "qbittorrent" if hasattr(torrents[0], "state_enum") else "transmission"
+        if downloader_type == "qbittorrent":
+            snapshot._load_qbittorrent(torrents, resolve_tracker)
+        else:
+            snapshot._load_transmission(torrents, resolve_tracker)
+        return snapshot
+
+    @classmethod
+    def from_qb_maindata(cls, maindata: Dict[str, Any]) -> "TorrentSnapshot":
+        """
+        从qBittorrent的 sync/maindata 全量响应构建快照，同时记录rid供后续增量同步
+        """
+        snapshot = cls()
+        snapshot.rid = maindata.get("rid")
+        hashes, states, resumable = snapshot.hashes, snapshot.states, snapshot.resumable
+        tracker_hosts, save_paths = snapshot.tracker_hosts, snapshot.save_paths
+        for torrent_hash, torrent in (maindata.get("torrents") or {}).items():
+            state = torrent.get("state")
+            hashes.append(torrent_hash)
+            states.append(QB_STATE_CODES.get(state, ERROR))
+            save_paths.append(torrent.get("content_path"))
+            if state in QB_PAUSED_UPLOAD_STATES:
+                resumable.append(1)
+                tracker_hosts.append(tracker_host(torrent_tracker(torrent)))
+            else:
+                resumable.append(0)
+                tracker_hosts.append(None)
+        return snapshot
+
+    def _load_qbittorrent(self, torrents: List[Any], resolve_tracker):
+        hashes, states, resumable = self.hashes, self.states, self.resumable
+        tracker_hosts, save_paths = self.tracker_hosts, self.save_paths
+        for torrent in torrents:
+            torrent_hash = torrent.get("hash")
+            if not torrent_hash:
+                self.skipped += 1
+                continue
+            state = torrent.get("state")
+            code = QB_STATE_CODES.get(state)
+            if code is None:
+                # 新版本qBittorrent增加的状态，交给qbittorrent-api判断
+                code = _qb_state_code(torrent)
+
+            hashes.append(torrent_hash)
+            states.append(code)
+            save_paths.append(torrent.get("content_path"))
+            if state in QB_PAUSED_UPLOAD_STATES:
+                resumable.append(1)
+                tracker_hosts.append(tracker_host(resolve_tracker(torrent)))
+            else:
+                resumable.append(0)
+                tracker_hosts.append(None)
+
+    def _load_transmission(self, torrents: List[Any], resolve_tracker):
+        hashes, states, resumable = self.hashes, self.states, self.resumable
+        tracker_hosts, save_paths = self.tracker_hosts, self.save_paths
+        for torrent in torrents:
+            torrent_hash = getattr(torrent, "hashString", None) or getattr(torrent, "hash", None)
+            if not torrent_hash:
+                torrent_id = getattr(torrent, "id", None)
+                if torrent_id is None:
+                    self.skipped += 1
+                    continue
+                torrent_hash = str(torrent_id)
+
+            code = tr_torrent_code(torrent)
+            status = getattr(torrent, "status", None)
+
+            hashes.append(torrent_hash)
+            states.append(code)
+            save_paths.append(getattr(torrent, "download_dir", None) or getattr(torrent, "downloadDir", None))
+            if status == "stopped":
+                resumable.append(1)
+                tracker_hosts.append(tracker_host(resolve_tracker(torrent)))
+            else:
+                resumable.append(0)
+                tracker_hosts.append(None)
+
+    @property
+    def counts(self) -> Dict[int, int]:
+        """各状态的种子数量"""
+        if self._counts is None:
+            self._counts = {code: self.states.count(code) for code in STATE_NAMES}
+        return self._counts
+
+    def count(self, code: int) -> int:
+        return self.counts[code]
+
+    def hashes_in(self, codes: Iterable[int], mask: Optional[bytearray] = None) -> List[str]:
+        """
+        获取指定状态的种子hash
+
+        :param codes: 状态码集合
+        :param mask: 可选的筛选掩码，为0的种子被排除
+        """
+        codes = frozenset(codes)
+        if mask is None:
+            return [torrent_hash for torrent_hash, code in zip(self.hashes, self.states) if code in codes]
+        return [torrent_hash for torrent_hash, code, keep in zip(self.hashes, self.states, mask)
+                if keep and code in codes]
+
+    def path_mask(self, is_excluded: Callable[[Optional[str]], bool]) -> bytearray:
+        """按保存路径生成掩码，被排除的种子为0"""
+        return bytearray(0 if is_excluded(path) else 1 for path in self.save_paths)
+
+    def state_index(self) -> Dict[str, int]:
+        """hash到状态码的映射"""
+        return dict(zip(self.hashes, self.states))
+
+    def status_lists(self):
+        """按 (下载, 上传, 暂停, 检查, 错误) 的顺序返回各状态的hash列表"""
+        lists = ([], [], [], [], [])
+        for torrent_hash, code in zip(self.hashes, self.states):
+            lists[code].append(torrent_hash)
+        return lists
@@ -1,15 +1,12 @@
 import json
 import traceback
-import hashlib
 import time
-import random
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, List, Dict, Tuple, Optional
-from functools import wraps
 from collections import defaultdict
-import sqlite3
 import os
+from urllib.parse import quote
 
 from app.core.event import eventmanager, Event
 from app.log import logger
@@ -18,6 +15,15 @@ from app.schemas import WebhookEventInfo
 from app.schemas.types import EventType
 from app.core.config import settings
 
+from .provider_index import ProviderIndexManager, ProviderIndex, INDEX_PAGE_SIZE, MISS_REFRESH_INTERVAL
+from .server_state import ServerState
+from .sync_queue import SyncQueue
+from .history_store import HistoryStore, utc_timestamp, utc_since
+from .ttl_cache import TTLCache
+
+# 重复事件的判定窗口（秒）
+EVENT_DEDUP_WINDOW = 30
+
 
 class SyncLoopProtector:
     """
@@ -27,10 +33,8 @@ class SyncLoopProtector:
     """
 
     def __init__(self, ttl_seconds: int = 15):
-        # 缓存格式: (user_name, item_id, sync_type) -> 触发时间
-        self._cache: Dict[Tuple[str, str, str], datetime] = {}
-        self._ttl = timedelta(seconds=ttl_seconds)
-        self._lock = threading.Lock()
+        # 缓存格式: (user_name, item_id, sync_type) -> 触发时间，过期条目在读写时从头部清理
+        self._cache = TTLCache(ttl=ttl_seconds)
 
     def add(self, user_name: str, item_id: str, sync_type: str):
         """
@@ -38,12 +42,9 @@ class SyncLoopProtector:
         """
         if not all([user_name, item_id, sync_type]):
             return
-        with self._lock:
-            cache_key = (user_name, item_id, sync_type)
-            self._cache[cache_key] = datetime.now()
-            logger.debug(f"添加到防循环缓存: {cache_key}")
-            # 主动清理一下过期条目，防止缓存无限增长
-            self._cleanup_nolock()
+        cache_key = (user_name, item_id, sync_type)
+        self._cache.set(cache_key)
+        logger.debug(f"添加到防循环缓存: {cache_key}")
 
     def is_protected(self, user_name: str, item_id: str, sync_type: str) -> bool:
         """
@@ -52,68 +53,15 @@ class SyncLoopProtector:
         if not all([user_name, item_id, sync_type]):
             return False
 
-        with self._lock:
-            cache_key = (user_name, item_id, sync_type)
-            if cache_key in self._cache:
-                event_time = self._cache[cache_key]
-                if datetime.now() - event_time < self._ttl:
-                    logger.info(f"🔄 检测到循环同步事件，跳过处理: {cache_key}")
-                    # 不再立即移除key，让它根据TTL自然过期，以处理并发事件
-                    return True
+        cache_key = (user_name, item_id, sync_type)
+        # 不再立即移除key，让它根据TTL自然过期，以处理并发事件
+        if cache_key in self._cache:
+            logger.info(f"🔄 检测到循环同步事件，跳过处理: {cache_key}")
+            return True
         return False
 
-    def _cleanup_nolock(self):
-        """
-        在锁内执行，移除缓存中的过期条目。
-        """
-        now = datetime.now()
-        expired_keys = [
-            key for key, timestamp in self._cache.items() if now - timestamp > self._ttl]
-        for key in expired_keys:
-            try:
-                del self._cache[key]
-            except KeyError:
-                pass  # Already deleted by another thread
-
-
-def retry_on_failure(max_retries=3, base_delay=1, max_delay=60, backoff_factor=2):
-    """
-    装饰器：为函数添加指数退避重试机制
-    """
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
-
-            for attempt in range(max_retries + 1):
-                try:
-                    result = func(*args, **kwargs)
-                    if result:  # 如果成功，直接返回
-                        return result
-                    elif attempt == max_retries:  # 最后一次尝试失败
-                        logger.error(
-                            f"{func.__name__} 在 {max_retries} 次重试后仍然失败")
-                        return False
-                except Exception as e:
-                    last_exception = e
-                    if attempt == max_retries:
-                        logger.error(
-                            f"{func.__name__} 重试 {max_retries} 次后仍然出现异常: {str(e)}")
-                        raise e
-
-                # 计算延迟时间（指数退避 + 随机抖动）
-                delay = min(
-                    base_delay * (backoff_factor ** attempt), max_delay)
-                jitter = random.uniform(0, delay * 0.1)  # 添加10%的随机抖动
-                total_delay = delay + jitter
-
-                logger.warning(
-                    f"{func.__name__} 第 {attempt + 1} 次尝试失败，{total_delay:.2f}秒后重试")
-                time.sleep(total_delay)
-
-            return False
-        return wrapper
-    return decorator
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
 
 
 class WatchSync(_PluginBase):
@@ -124,7 +72,7 @@ class WatchSync(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/DzAvril/MoviePilot-Plugins/main/icons/emby_watch_sync.png"
     # 插件版本
-    plugin_version = "1.0"
+    plugin_version = "1.5"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -147,8 +95,9 @@ class WatchSync(_PluginBase):
         self._min_watch_time = 300  # 最小观看时间（秒）
         self._emby_instances = {}
         self._db_path = None
+        self._history: Optional[HistoryStore] = None
         # 事件去重相关
-        self._event_timestamps = {}
+        self._event_timestamps = TTLCache(ttl=EVENT_DEDUP_WINDOW)
         self._sync_metrics = {
             'total_events': 0,
             'successful_syncs': 0,
@@ -159,9 +108,15 @@ class WatchSync(_PluginBase):
         }
         # 并发控制
         self._sync_lock = threading.RLock()  # 可重入锁
-        self._active_syncs = {}  # 跟踪正在进行的同步
         self._max_concurrent_syncs = 3  # 最大并发同步数
+        self._max_syncs_per_server = 2  # 每个服务器的最大并发同步数
+        self._sync_queue = self._create_sync_queue()
         self._loop_protector = SyncLoopProtector(ttl_seconds=30)  # 用于防止同步循环
+        # 各服务器的媒体标识索引
+        self._provider_indexes = ProviderIndexManager()
+        # 各服务器的用户目录缓存和健康状态
+        self._server_states: Dict[str, ServerState] = {}
+        self._server_states_lock = threading.Lock()
         self._init_database()
 
     def init_plugin(self, config: dict = None):
@@ -183,6 +138,17 @@ class WatchSync(_PluginBase):
 
         # 获取Emby服务器实例
         self._load_emby_instances()
+        self._server_states = {}
+
+        # 重建同步队列，丢弃旧配置下未执行的任务
+        self._sync_queue.stop()
+        self._sync_queue = self._create_sync_queue()
+
+        # 在后台建立各服务器的媒体标识索引
+        self._provider_indexes.stop()
+        self._provider_indexes = ProviderIndexManager()
+        if self._enabled:
+            self._start_provider_indexes()
 
         # 记录API端点信息（简化日志）
         api_endpoints = self.get_api()
@@ -193,9 +159,10 @@ class WatchSync(_PluginBase):
         else:
             logger.info("观看记录同步插件已禁用")
 
-    def _generate_event_fingerprint(self, event_data: WebhookEventInfo) -> str:
+    def _generate_event_fingerprint(self, event_data: WebhookEventInfo) -> tuple:
         """
         生成更可靠的事件指纹 - 修复版本
+        指纹只在内存中用作去重缓存的键，直接使用各字段组成的元组，不再计算哈希摘要
         """
         # 提取关键信息
         json_obj = event_data.json_object
@@ -211,43 +178,26 @@ class WatchSync(_PluginBase):
         position_rounded = (position_ticks // 100000000) * 100000000
 
         # 创建更精确的指纹，但允许位置的小幅变化
-        fingerprint_data = (f"{event_data.channel}_{event_data.event}_"
-                            f"{user_id}_{item_id}_{session_id}_{position_rounded}")
-
-        # 使用SHA256生成指纹，避免hash冲突
-        fingerprint = hashlib.sha256(fingerprint_data.encode()).hexdigest()
-        logger.debug(f"生成事件指纹: {fingerprint_data} -> {fingerprint[:16]}...")
+        fingerprint = (event_data.channel, event_data.event,
+                       user_id, item_id, session_id, position_rounded)
+        logger.debug(f"生成事件指纹: {fingerprint}")
         return fingerprint
 
-    def _is_duplicate_event(self, event_fingerprint: str, time_window_seconds: int = 30) -> bool:
+    def _is_duplicate_event(self, event_fingerprint: tuple) -> bool:
         """
         检查是否为重复事件（基于时间窗口）- 修复版本
         缩短时间窗口，避免过度过滤正常事件
         """
-        current_time = datetime.now()
-
-        # 清理过期的事件记录
-        cutoff_time = current_time - \
-            timedelta(seconds=time_window_seconds * 2)  # 保留更长时间用于清理
-        expired_events = [fp for fp, timestamp in self._event_timestamps.items()
-                          if timestamp < cutoff_time]
-        for fp in expired_events:
-            del self._event_timestamps[fp]
-
-        # 检查是否为重复事件
-        if event_fingerprint in self._event_timestamps:
-            last_time = self._event_timestamps[event_fingerprint]
-            time_diff = current_time - last_time
-            if time_diff < timedelta(seconds=time_window_seconds):
-                logger.info(
-                    f"🔄 检测到重复事件，跳过处理: {event_fingerprint[:16]}... (间隔: {time_diff.total_seconds():.1f}秒)")
-                return True
-            else:
-                logger.debug(f"事件间隔足够长，允许处理: {time_diff.total_seconds():.1f}秒")
+        # 窗口内出现过的指纹视为重复，重复事件不刷新时间，过期条目由缓存从头部清理
+        time_diff = self._event_timestamps.age(event_fingerprint)
+        if time_diff is not None:
+            logger.info(
+                f"🔄 检测到重复事件，跳过处理: {event_fingerprint} (间隔: {time_diff:.1f}秒)")
+            return True
 
         # 记录新事件
-        self._event_timestamps[event_fingerprint] = current_time
-        logger.debug(f"记录新事件: {event_fingerprint[:16]}...")
+        self._event_timestamps.set(event_fingerprint)
+        logger.debug(f"记录新事件: {event_fingerprint}")
         return False
 
     def _is_event_a_sync_loop(self, event_data: WebhookEventInfo) -> bool:
@@ -288,39 +238,24 @@ class WatchSync(_PluginBase):
 
         return sync_type
 
-    def _add_to_ignore_cache(self, user_name: str, item_id: str, sync_type: str):
-        """
-        将一个成功的同步操作添加到忽略缓存中。
-        """
-        if not all([user_name, item_id, sync_type]):
-            return
-        cache_key = (user_name, item_id, sync_type)
-        self._sync_ignore_cache[cache_key] = datetime.now()
-        logger.debug(f"添加到同步忽略缓存: {cache_key}")
-
-        # 清理旧缓存
-        cutoff = datetime.now() - timedelta(minutes=5)
-        expired_keys = [
-            k for k, v in self._sync_ignore_cache.items() if v < cutoff]
-        for key in expired_keys:
-            del self._sync_ignore_cache[key]
-
     def _update_sync_metrics(self, event_type: str, success: bool = True, error_type: str = None):
         """
         更新同步指标
         """
-        if event_type == 'event_received':
-            self._sync_metrics['total_events'] += 1
-        elif event_type == 'sync_completed':
-            if success:
-                self._sync_metrics['successful_syncs'] += 1
-                self._sync_metrics['last_sync_time'] = datetime.now()
-            else:
-                self._sync_metrics['failed_syncs'] += 1
-        elif event_type == 'duplicate_event':
-            self._sync_metrics['duplicate_events'] += 1
-        elif event_type == 'api_error' and error_type:
-            self._sync_metrics['api_errors'][error_type] += 1
+        # 同步队列的多个工作线程会同时更新指标
+        with self._sync_lock:
+            if event_type == 'event_received':
+                self._sync_metrics['total_events'] += 1
+            elif event_type == 'sync_completed':
+                if success:
+                    self._sync_metrics['successful_syncs'] += 1
+                    self._sync_metrics['last_sync_time'] = datetime.now()
+                else:
+                    self._sync_metrics['failed_syncs'] += 1
+            elif event_type == 'duplicate_event':
+                self._sync_metrics['duplicate_events'] += 1
+            elif event_type == 'api_error' and error_type:
+                self._sync_metrics['api_errors'][error_type] += 1
 
     def _init_database(self):
         """
@@ -335,56 +270,15 @@ class WatchSync(_PluginBase):
 
             self._db_path = os.path.join(plugin_data_dir, "watchsync.db")
 
-            # 创建数据库表
-            with sqlite3.connect(self._db_path) as conn:
-                cursor = conn.cursor()
-
-                # 同步记录表
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS sync_records (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TEXT NOT NULL,
-                        source_server TEXT NOT NULL,
-                        source_user TEXT NOT NULL,
-                        target_server TEXT NOT NULL,
-                        target_user TEXT NOT NULL,
-                        media_name TEXT NOT NULL,
-                        media_type TEXT NOT NULL,
-                        media_id TEXT,
-                        position_ticks INTEGER,
-                        sync_type TEXT DEFAULT 'playback',
-                        status TEXT NOT NULL,
-                        error_message TEXT,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-                # 检查并添加sync_type字段（为了兼容旧数据库）
-                try:
-                    cursor.execute(
-                        "ALTER TABLE sync_records ADD COLUMN sync_type TEXT DEFAULT 'playback'")
-                except sqlite3.OperationalError:
-                    # 字段已存在，忽略错误
-                    pass
-
-                # 统计信息表
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS sync_stats (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TEXT NOT NULL UNIQUE,
-                        total_syncs INTEGER DEFAULT 0,
-                        success_syncs INTEGER DEFAULT 0,
-                        failed_syncs INTEGER DEFAULT 0,
-                        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-                conn.commit()
-                logger.info(f"数据库初始化完成: {self._db_path}")
+            # 使用一个长连接，同步结果批量写入
+            self._history = HistoryStore(self._db_path)
+            self._history.open()
+            logger.info(f"数据库初始化完成: {self._db_path}")
 
         except Exception as e:
             logger.error(f"数据库初始化失败: {str(e)}")
             self._db_path = None
+            self._history = None
 
     def get_state(self) -> bool:
         return self._enabled
@@ -453,7 +347,7 @@ class WatchSync(_PluginBase):
         # 生成事件指纹并检查重复
         event_fingerprint = self._generate_event_fingerprint(event.event_data)
         if self._is_duplicate_event(event_fingerprint):
-            logger.debug(f"检测到重复事件，跳过处理: {event_fingerprint[:16]}...")
+            logger.debug(f"检测到重复事件，跳过处理: {event_fingerprint}")
             self._update_sync_metrics('duplicate_event')
             return
 
@@ -492,6 +386,10 @@ class WatchSync(_PluginBase):
                 "json_object": event_data.json_object
             }
 
+            # 媒体库变化时更新媒体标识索引
+            if event_data.event in ["library.new", "library.update"]:
+                self._on_library_changed(event_data.server_name, json_obj.get("Item", {}))
+
             # 根据事件类型分发处理
             if event_data.event in ["playback.pause", "playback.stop"]:
                 self._handle_playback_event(webhook_data)
@@ -671,9 +569,13 @@ class WatchSync(_PluginBase):
                     logger.error(f"未找到服务器实例: {target_server}")
                     continue
 
+                if not self._health_check_emby_connection(target_server, emby_instance):
+                    logger.warning(f"目标服务器 {target_server} 暂不可用，跳过")
+                    continue
+
                 # 在目标服务器上查找对应的媒体项
                 target_item = self._find_matching_item(
-                    emby_instance, target_user, item_info
+                    emby_instance, target_user, item_info, source_server
                 )
 
                 # 从返回的项目中获取ID
@@ -758,7 +660,7 @@ class WatchSync(_PluginBase):
                 from app.utils.http import RequestUtils
                 response = RequestUtils().delete_res(actual_url)
 
-            return response and response.status_code == 200
+            return self._record_response(emby_instance, response) and response.status_code == 200
 
         except Exception as e:
             logger.error(f"设置播放状态失败: {str(e)}")
@@ -848,9 +750,13 @@ class WatchSync(_PluginBase):
                     logger.error(f"未找到服务器实例: {target_server}")
                     continue
 
+                if not self._health_check_emby_connection(target_server, emby_instance):
+                    logger.warning(f"目标服务器 {target_server} 暂不可用，跳过")
+                    continue
+
                 # 在目标服务器上查找对应的媒体项
                 target_item = self._find_matching_item(
-                    emby_instance, target_user, item_info
+                    emby_instance, target_user, item_info, source_server
                 )
 
                 # 从返回的项目中获取ID
@@ -938,6 +844,7 @@ class WatchSync(_PluginBase):
                 from app.utils.http import RequestUtils
                 response = RequestUtils().delete_res(actual_url)
 
+            self._record_response(emby_instance, response)
             if response:
                 logger.info(f"收藏API响应状态: {response.status_code}")
                 if response.status_code in [200, 204]:
@@ -959,51 +866,76 @@ class WatchSync(_PluginBase):
 
     def _get_user_id(self, emby_instance, user_name):
         """
-        获取用户ID
+        获取用户ID，使用服务器的用户目录缓存
         """
         try:
-            url = f"[HOST]emby/Users?api_key=[APIKEY]"
-            response = emby_instance.get_data(url)
-
-            if response and response.status_code == 200:
-                users = response.json()
-                for user in users:
-                    if user.get("Name") == user_name:
-                        return user.get("Id")
+            server_name = self._get_instance_server_name(emby_instance)
+            if server_name:
+                return self._get_server_state(server_name).users.get_id(user_name)
 
+            for user in self._fetch_users(emby_instance) or []:
+                if user.get("Name") == user_name:
+                    return user.get("Id")
             return None
         except Exception as e:
             logger.error(f"获取用户ID失败: {str(e)}")
             return None
 
-    def _cleanup_expired_syncs(self):
+    def _fetch_users(self, emby_instance, server_name: str = None) -> Optional[List[dict]]:
         """
-        清理过期的同步记录
+        下载服务器的用户列表，失败时返回None
         """
-        current_time = datetime.now()
-        expired_threshold = timedelta(minutes=10)  # 10分钟超时
+        url = f"[HOST]emby/Users?api_key=[APIKEY]"
+        response = emby_instance.get_data(url)
+        if server_name:
+            self._get_server_state(server_name).health.record_response(response)
+        if response and response.status_code == 200:
+            return response.json()
+        logger.warning(f"获取用户列表失败: {response.status_code if response else 'No response'}")
+        return None
 
-        with self._sync_lock:
-            expired_keys = [
-                key for key, start_time in self._active_syncs.items()
-                if current_time - start_time > expired_threshold
-            ]
+    def _get_server_state(self, server_name: str) -> ServerState:
+        """获取服务器的用户目录和健康状态，首次使用时创建"""
+        state = self._server_states.get(server_name)
+        if state is None:
+            with self._server_states_lock:
+                state = self._server_states.get(server_name)
+                if state is None:
+                    state = ServerState(
+                        server_name,
+                        lambda: self._fetch_users(self._emby_instances.get(server_name), server_name)
+                        if self._emby_instances.get(server_name) else None,
+                    )
+                    self._server_states[server_name] = state
+        return state
 
-            for key in expired_keys:
-                logger.warning(f"清理过期同步: {key}")
-                del self._active_syncs[key]
+    def _record_response(self, emby_instance, response) -> bool:
+        """
+        根据请求结果被动更新服务器健康状态
+        :return: 请求是否成功
+        """
+        server_name = self._get_instance_server_name(emby_instance)
+        if server_name:
+            return self._get_server_state(server_name).health.record_response(response)
+        return bool(response) and response.status_code < 400
 
     def get_sync_status(self) -> dict:
         """
         获取同步状态信息
         """
+        queue_stats = self._sync_queue.stats()
         with self._sync_lock:
             return {
                 "metrics": dict(self._sync_metrics),
-                "active_syncs": len(self._active_syncs),
+                "active_syncs": queue_stats["running"],
                 "max_concurrent": self._max_concurrent_syncs,
+                "sync_queue": queue_stats,
                 "event_cache_size": len(self._event_timestamps),
+                "event_dedup": self._event_timestamps.stats(),
+                "loop_protector": self._loop_protector.stats(),
                 "emby_servers": len(self._emby_instances),
+                "provider_indexes": self._provider_indexes.stats(),
+                "servers": {name: state.stats() for name, state in self._server_states.items()},
                 "sync_groups": len([g for g in self._sync_groups if g.get("enabled", True)])
             }
 
@@ -1108,7 +1040,7 @@ class WatchSync(_PluginBase):
         logger.info(f"当前配置的同步组数量: {len(self._sync_groups)}")
         logger.info(f"可用的Emby服务器实例: {list(self._emby_instances.keys())}")
 
-        synced_count = 0
+        queued_count = 0
 
         # 查找包含源用户的同步组
         for i, group in enumerate(self._sync_groups):
@@ -1173,20 +1105,22 @@ class WatchSync(_PluginBase):
                 logger.info(
                     f"目标服务器实例是否存在: {actual_target_server in self._emby_instances}")
 
-                if self._sync_watch_progress_with_retry(source_server, source_user, actual_target_server, target_username, item_info, position_ticks):
-                    synced_count += 1
-                    logger.info(
-                        f"同步到组内用户成功: {target_server}:{target_username}")
-                    self._update_sync_metrics('sync_completed', True)
-                else:
-                    logger.warning(
-                        f"同步到组内用户失败: {target_server}:{target_username}")
-                    self._update_sync_metrics('sync_completed', False)
-
-        if synced_count > 0:
-            logger.info(f"成功同步到 {synced_count} 个组内用户")
+                # 加入同步队列，同一目标用户和媒体的未执行同步只保留最新进度
+                sync_key = (actual_target_server, target_username, item_info.get("Id", ""))
+                if self._sync_queue.submit(sync_key, actual_target_server, {
+                    "source_server": source_server,
+                    "source_user": source_user,
+                    "target_server": actual_target_server,
+                    "target_user": target_username,
+                    "item_info": item_info,
+                    "position_ticks": position_ticks,
+                }):
+                    queued_count += 1
+
+        if queued_count > 0:
+            logger.info(f"已将 {queued_count} 个组内用户的同步加入队列")
         else:
-            logger.info("未找到匹配的同步组或同步失败")
+            logger.info("未找到匹配的同步组")
 
     def _is_server_match(self, config_server: str, actual_server: str) -> bool:
         """
@@ -1254,37 +1188,27 @@ class WatchSync(_PluginBase):
 
         return None
 
-    @retry_on_failure(max_retries=3, base_delay=2, max_delay=30)
-    def _sync_watch_progress_with_retry(self, source_server: str, source_user: str,
-                                        target_server: str, target_user: str,
-                                        item_info: dict, position_ticks: int) -> bool:
+    def _create_sync_queue(self) -> SyncQueue:
+        return SyncQueue(self._run_sync_task,
+                         max_workers=self._max_concurrent_syncs,
+                         per_server_limit=self._max_syncs_per_server,
+                         max_retries=3, base_delay=2, max_delay=30,
+                         on_give_up=self._on_sync_task_failed)
+
+    def _run_sync_task(self, task: dict) -> bool:
         """
-        带重试机制和并发控制的观看进度同步
+        同步队列的工作线程执行一次观看进度同步，失败时由队列按指数退避重试
         """
-        sync_key = f"{target_server}:{target_user}:{item_info.get('Id', '')}"
+        success = self._sync_watch_progress(**task)
+        if success:
+            logger.info(f"同步到组内用户成功: {task['target_server']}:{task['target_user']}")
+            self._update_sync_metrics('sync_completed', True)
+        return success
 
-        with self._sync_lock:
-            # 检查是否已有相同的同步在进行
-            if sync_key in self._active_syncs:
-                logger.debug(f"同步已在进行中，跳过: {sync_key}")
-                return False
-
-            # 检查并发同步数量限制
-            if len(self._active_syncs) >= self._max_concurrent_syncs:
-                logger.warning(
-                    f"达到最大并发同步数限制 ({self._max_concurrent_syncs})，跳过同步")
-                return False
-
-            # 标记同步开始
-            self._active_syncs[sync_key] = datetime.now()
-
-        try:
-            return self._sync_watch_progress(source_server, source_user, target_server,
-                                             target_user, item_info, position_ticks)
-        finally:
-            # 清理同步标记
-            with self._sync_lock:
-                self._active_syncs.pop(sync_key, None)
+    def _on_sync_task_failed(self, task: dict):
+        """同步任务重试后仍然失败"""
+        logger.warning(f"同步到组内用户失败: {task['target_server']}:{task['target_user']}")
+        self._update_sync_metrics('sync_completed', False)
 
     def _sync_watch_progress(self, source_server: str, source_user: str, target_server: str, target_user: str,
                              item_info: dict, position_ticks: int) -> bool:
@@ -1305,7 +1229,7 @@ class WatchSync(_PluginBase):
 
             # 在目标服务器查找对应媒体
             target_item = self._find_matching_item(
-                target_emby, target_user, item_info)
+                target_emby, target_user, item_info, source_server)
             if not target_item:
                 logger.warning(f"在目标服务器 {target_server} 中未找到匹配的媒体")
                 return False
@@ -1386,7 +1310,8 @@ class WatchSync(_PluginBase):
             logger.error(f"同步观看进度失败: {str(e)}")
             return False
 
-    def _find_matching_item(self, emby_instance, target_user, source_item: dict) -> Optional[dict]:
+    def _find_matching_item(self, emby_instance, target_user, source_item: dict,
+                            source_server: str = None) -> Optional[dict]:
         """
         在目标服务器中查找匹配的媒体项目
         """
@@ -1402,7 +1327,16 @@ class WatchSync(_PluginBase):
 
             logger.info(f"媒体标识符: TMDB={tmdb_id}, IMDB={imdb_id}")
 
-            if tmdb_id:
+            # 目标服务器索引已建立时直接查找，索引中没有的媒体不再逐个比对
+            target_index = self._provider_indexes.get(self._get_instance_server_name(emby_instance))
+            if target_index:
+                result_item = self._lookup_provider_index(target_index, source_item, source_server)
+                if result_item:
+                    logger.info(f"索引匹配成功: {result_item.get('Name', 'Unknown')}")
+                    return result_item
+                logger.info("索引中未找到匹配的媒体标识，尝试名称匹配")
+
+            if tmdb_id and not target_index:
                 logger.info(f"尝试使用TMDB ID匹配: {tmdb_id}")
                 # 使用TMDB ID搜索
                 if source_item.get("Type") == "Movie":
@@ -1440,7 +1374,7 @@ class WatchSync(_PluginBase):
                 try:
                     logger.info(f"通过名称搜索媒体: {title} ({year})")
 
-                    user_id = emby_instance.get_user(target_user)
+                    user_id = self._get_user_id(emby_instance, target_user)
                     if not user_id:
                         logger.error(f"未找到用户: {target_user}")
                         return False
@@ -1498,6 +1432,95 @@ class WatchSync(_PluginBase):
             logger.error(traceback.format_exc())
             return None
 
+    def _lookup_provider_index(self, target_index: ProviderIndex, source_item: dict,
+                               source_server: str = None) -> Optional[dict]:
+        """
+        在目标服务器的媒体标识索引中查找，未命中时增量刷新一次后重试
+        """
+        series_provider_ids = None
+        if source_item.get("Type") == "Episode":
+            series_provider_ids = self._get_series_provider_ids(source_server, source_item.get("SeriesId"))
+
+        result_item = target_index.lookup(source_item, series_provider_ids)
+        if result_item is None and self._provider_indexes.refresh_now(target_index.server_name, MISS_REFRESH_INTERVAL):
+            result_item = target_index.lookup(source_item, series_provider_ids)
+        return result_item
+
+    def _get_series_provider_ids(self, source_server: str, series_id: str) -> Optional[dict]:
+        """
+        获取源服务器上剧集的媒体标识，优先使用源服务器的索引
+        """
+        if not series_id or not source_server:
+            return None
+        server_name = self._get_actual_server_name(source_server)
+        source_index = self._provider_indexes.get(server_name)
+        if source_index:
+            entry = source_index.get(series_id)
+            if entry:
+                return entry.get("ProviderIds")
+
+        emby_instance = self._emby_instances.get(server_name)
+        if not emby_instance:
+            return None
+        try:
+            url = f"[HOST]emby/Items?api_key=[APIKEY]&Ids={series_id}&Fields=ProviderIds"
+            response = emby_instance.get_data(url)
+            if response and response.status_code == 200:
+                items = response.json().get("Items", [])
+                if items:
+                    if source_index:
+                        source_index.add_items(items[:1])
+                    return items[0].get("ProviderIds")
+        except Exception as e:
+            logger.warning(f"获取剧集媒体标识失败: {str(e)}")
+        return None
+
+    def _get_instance_server_name(self, emby_instance) -> Optional[str]:
+        """根据服务器实例获取服务器名称"""
+        for server_name, instance in self._emby_instances.items():
+            if instance is emby_instance:
+                return server_name
+        return None
+
+    def _start_provider_indexes(self):
+        """为每个Emby服务器在后台建立媒体标识索引"""
+        for server_name, emby_instance in self._emby_instances.items():
+            self._provider_indexes.start(
+                server_name,
+                lambda start, limit, since, instance=emby_instance:
+                    self._fetch_library_page(instance, start, limit, since),
+            )
+
+    def _fetch_library_page(self, emby_instance, start: int, limit: int = INDEX_PAGE_SIZE,
+                            min_date_last_saved: str = None) -> Tuple[List[dict], int]:
+        """
+        分页获取服务器上的电影、剧集和单集
+        """
+        url = (f"[HOST]emby/Items?api_key=[APIKEY]&Recursive=true"
+               f"&IncludeItemTypes=Movie,Series,Episode&Fields=ProviderIds"
+               f"&EnableImages=false&EnableUserData=false&SortBy=DateCreated&SortOrder=Ascending"
+               f"&StartIndex={start}&Limit={limit}")
+        if min_date_last_saved:
+            url += f"&MinDateLastSaved={quote(min_date_last_saved)}"
+        response = emby_instance.get_data(url)
+        self._record_response(emby_instance, response)
+        if not response or response.status_code != 200:
+            raise RuntimeError(f"获取媒体列表失败: {response.status_code if response else 'No response'}")
+        data = response.json()
+        return data.get("Items", []), data.get("TotalRecordCount", 0)
+
+    def _on_library_changed(self, server_name: str, item_info: dict):
+        """
+        媒体库新增或更新媒体时，加入事件中的媒体项并在后台增量刷新索引
+        """
+        actual_server = self._get_actual_server_name(server_name) if server_name else None
+        index = self._provider_indexes.get_any(actual_server)
+        if not index:
+            return
+        if item_info:
+            index.add_items([item_info])
+        self._provider_indexes.schedule_refresh(actual_server)
+
     def _search_tv_by_tmdb(self, emby_instance, tmdb_id: str):
         """
         通过TMDB ID搜索电视剧
@@ -1538,7 +1561,7 @@ class WatchSync(_PluginBase):
         """
         try:
             # 获取用户ID
-            user_id = emby_instance.get_user(user_name)
+            user_id = self._get_user_id(emby_instance, user_name)
             if not user_id:
                 logger.error(f"未找到用户: {user_name}")
                 return False
@@ -1591,19 +1614,11 @@ class WatchSync(_PluginBase):
 
             response = emby_instance.post_data(url_with_params, json.dumps(data),
                                                headers={"Content-Type": "application/json"})
+            self._record_response(emby_instance, response)
 
             if response and response.status_code in [200, 204]:
                 logger.info(
                     f"UserData API成功更新用户 {user_id} 的观看进度到 {position_ticks} ticks")
-
-                # 验证更新是否成功
-                updated_userdata = self._get_current_userdata(
-                    emby_instance, user_id, item_id)
-                actual_position = updated_userdata.get(
-                    "PlaybackPositionTicks", 0)
-                logger.info(
-                    f"验证更新结果: 期望={position_ticks}, 实际={actual_position}")
-
                 return True
             else:
                 logger.error(
@@ -1627,6 +1642,7 @@ class WatchSync(_PluginBase):
         try:
             url = f"[HOST]emby/Users/{user_id}/Items/{item_id}?api_key=[APIKEY]"
             response = emby_instance.get_data(url)
+            self._record_response(emby_instance, response)
 
             if response and response.status_code == 200:
                 item_data = response.json()
@@ -1661,24 +1677,15 @@ class WatchSync(_PluginBase):
     def _health_check_emby_connection(self, server_name: str, emby_instance) -> bool:
         """
         检查Emby服务器连接健康状态
+        健康状态由实际请求的结果被动更新，这里不再发出请求，熔断期间直接返回False
         """
-        try:
-            url = f"[HOST]emby/System/Info?api_key=[APIKEY]"
-            response = emby_instance.get_data(url)
-
-            if response and response.status_code == 200:
-                server_info = response.json()
-                logger.debug(
-                    f"Emby服务器 {server_name} 健康检查通过: {server_info.get('ServerName', 'Unknown')}")
-                return True
-            else:
-                logger.warning(
-                    f"Emby服务器 {server_name} 健康检查失败: {response.status_code if response else 'No response'}")
-                return False
-
-        except Exception as e:
-            logger.error(f"Emby服务器 {server_name} 健康检查异常: {str(e)}")
+        if not emby_instance:
             return False
+        health = self._get_server_state(server_name).health
+        if health.allow():
+            return True
+        logger.warning(f"Emby服务器 {server_name} 连续请求失败，熔断中 ({health.failures} 次失败)")
+        return False
 
     def _record_sync_result(self, source_server: str, source_user: str, target_server: str,
                             target_user: str, item_info: dict, position_ticks: int,
@@ -1686,57 +1693,26 @@ class WatchSync(_PluginBase):
         """
         记录同步结果到数据库
         """
-        if not self._db_path:
+        if not self._history:
             return
 
         try:
-            with sqlite3.connect(self._db_path) as conn:
-                cursor = conn.cursor()
-
-                # 插入同步记录
-                cursor.execute('''
-                    INSERT INTO sync_records
-                    (timestamp, source_server, source_user, target_server, target_user,
-                     media_name, media_type, media_id, position_ticks, sync_type, status, error_message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    datetime.now().isoformat(),
-                    source_server,
-                    source_user,
-                    target_server,
-                    target_user,
-                    item_info.get('Name', ''),
-                    item_info.get('Type', ''),
-                    item_info.get('Id', ''),
-                    position_ticks,
-                    sync_type,
-                    status,
-                    error_message
-                ))
-
-                # 更新统计信息
-                today = datetime.now().strftime('%Y-%m-%d')
-                cursor.execute('''
-                    INSERT OR IGNORE INTO sync_stats (date, total_syncs, success_syncs, failed_syncs)
-                    VALUES (?, 0, 0, 0)
-                ''', (today,))
-
-                if status == 'success':
-                    cursor.execute('''
-                        UPDATE sync_stats
-                        SET total_syncs = total_syncs + 1, success_syncs = success_syncs + 1,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE date = ?
-                    ''', (today,))
-                else:
-                    cursor.execute('''
-                        UPDATE sync_stats
-                        SET total_syncs = total_syncs + 1, failed_syncs = failed_syncs + 1,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE date = ?
-                    ''', (today,))
-
-                conn.commit()
+            # 放入写入队列，由后台线程批量写入并更新汇总
+            self._history.record({
+                "timestamp": datetime.now().isoformat(),
+                "source_server": source_server,
+                "source_user": source_user,
+                "target_server": target_server,
+                "target_user": target_user,
+                "media_name": item_info.get('Name', ''),
+                "media_type": item_info.get('Type', ''),
+                "media_id": item_info.get('Id', ''),
+                "position_ticks": position_ticks,
+                "sync_type": sync_type,
+                "status": status,
+                "error_message": error_message,
+                "created_at": utc_timestamp(),
+            })
 
         except Exception as e:
             logger.error(f"记录同步结果失败: {str(e)}")
@@ -1977,83 +1953,38 @@ class WatchSync(_PluginBase):
         获取同步统计信息
         """
         try:
-            if not self._db_path:
+            if not self._history:
                 return {"success": False, "message": "数据库未初始化"}
 
-            with sqlite3.connect(self._db_path) as conn:
-                cursor = conn.cursor()
-
-                # 从sync_records表获取详细统计
-                cursor.execute('''
-                    SELECT timestamp, source_user, target_user, sync_type, status, created_at
-                    FROM sync_records
-                    ORDER BY created_at DESC
-                ''')
-
-                all_records = cursor.fetchall()
-                total_syncs = len(all_records)
-                success_syncs = len(
-                    [r for r in all_records if r[4] == 'success'])
-                failed_syncs = total_syncs - success_syncs
-
-                # 计算成功率
-                success_rate = (success_syncs / total_syncs *
-                                100) if total_syncs > 0 else 0
-
-                # 计算今日同步次数 - 修复时区问题
-                today = datetime.now().date()
-                today_syncs = 0
-                for record in all_records:
-                    if record[5]:  # created_at字段
-                        try:
-                            # 处理不同的日期格式
-                            record_date_str = record[5]
-                            if 'T' in record_date_str:
-                                record_date = datetime.fromisoformat(
-                                    record_date_str.replace('Z', '+00:00')).date()
-                            else:
-                                record_date = datetime.strptime(
-                                    record_date_str, '%Y-%m-%d %H:%M:%S').date()
-
-                            if record_date == today:
-                                today_syncs += 1
-                        except Exception as e:
-                            logger.debug(f"解析日期失败: {record_date_str}, 错误: {e}")
-                            continue
-
-                # 计算活跃用户数（最近24小时）
-                yesterday = datetime.now() - timedelta(hours=24)
-                recent_records = [r for r in all_records if r[5] and
-                                  datetime.fromisoformat(r[5]) >= yesterday]
-                active_users = set()
-                for record in recent_records:
-                    active_users.add(record[1])  # source_user
-                    active_users.add(record[2])  # target_user
-
-                # 统计同步类型
-                sync_types = set()
-                for record in all_records:
-                    sync_types.add(record[3] or 'playback')
-
-                # 获取同步组数量
-                enabled_groups = len(
-                    [g for g in self._sync_groups if g.get("enabled", True)])
-                total_users = sum(len(g.get("users", []))
-                                  for g in self._sync_groups if g.get("enabled", True))
-
-                stats = {
-                    "总同步次数": total_syncs,
-                    "今日同步次数": today_syncs,
-                    "成功次数": success_syncs,
-                    "失败次数": failed_syncs,
-                    "成功率": f"{success_rate:.1f}",
-                    "活跃用户数": len(active_users),
-                    "同步类型": list(sync_types),
-                    "同步组数": enabled_groups,
-                    "组内用户数": total_users
-                }
+            # 总数、今日次数和成功率来自汇总表，活跃用户只查询最近24小时的记录
+            summary = self._history.stats(today=datetime.now().strftime('%Y-%m-%d'),
+                                          active_since=utc_since(24))
+            total_syncs = summary["total"]
+            success_syncs = summary["success"]
+
+            # 计算成功率
+            success_rate = (success_syncs / total_syncs *
+                            100) if total_syncs > 0 else 0
+
+            # 获取同步组数量
+            enabled_groups = len(
+                [g for g in self._sync_groups if g.get("enabled", True)])
+            total_users = sum(len(g.get("users", []))
+                              for g in self._sync_groups if g.get("enabled", True))
+
+            stats = {
+                "总同步次数": total_syncs,
+                "今日同步次数": summary["today"],
+                "成功次数": success_syncs,
+                "失败次数": summary["failed"],
+                "成功率": f"{success_rate:.1f}",
+                "活跃用户数": summary["active_users"],
+                "同步类型": summary["sync_types"],
+                "同步组数": enabled_groups,
+                "组内用户数": total_users
+            }
 
-                return {"success": True, "data": stats}
+            return {"success": True, "data": stats}
 
         except Exception as e:
             logger.error(f"获取统计信息失败: {str(e)}")
@@ -2064,61 +1995,48 @@ class WatchSync(_PluginBase):
         获取同步记录，支持分页
         """
         try:
-            if not self._db_path:
+            if not self._history:
                 return {"success": False, "message": "数据库未初始化"}
 
             # 限制最大记录数，防止性能问题
             limit = min(max(limit, 10), 100)  # 最小10条，最大100条
             offset = max(offset, 0)  # offset不能为负数
 
-            with sqlite3.connect(self._db_path) as conn:
-                cursor = conn.cursor()
-
-                # 先获取总记录数
-                cursor.execute('SELECT COUNT(*) FROM sync_records')
-                total_count = cursor.fetchone()[0]
-
-                # 获取同步记录
-                cursor.execute('''
-                    SELECT id, timestamp, source_server, source_user, target_server, target_user,
-                           media_name, media_type, sync_type, status, error_message, created_at, position_ticks
-                    FROM sync_records
-                    ORDER BY created_at DESC
-                    LIMIT ? OFFSET ?
-                ''', (limit, offset))
-
-                records = []
-                for row in cursor.fetchall():
-                    records.append({
-                        "id": row[0],
-                        "timestamp": row[1],
-                        "source_server": row[2],
-                        "source_user": row[3],
-                        "target_server": row[4],
-                        "target_user": row[5],
-                        "media_name": row[6],
-                        "media_type": row[7],
-                        "sync_type": row[8],
-                        "status": row[9],
-                        "error_message": row[10],
-                        "created_at": row[11],
-                        "position_ticks": row[12]
-                    })
-
-                # 计算是否还有更多记录
-                has_more = (offset + len(records)) < total_count
-
-                return {
-                    "success": True,
-                    "data": records,
-                    "pagination": {
-                        "total": total_count,
-                        "offset": offset,
-                        "limit": limit,
-                        "has_more": has_more,
-                        "current_count": len(records)
-                    }
+            # 总记录数从汇总表读取，分页查询使用created_at索引
+            total_count = self._history.count()
+
+            records = []
+            for row in self._history.records(limit, offset):
+                records.append({
+                    "id": row[0],
+                    "timestamp": row[1],
+                    "source_server": row[2],
+                    "source_user": row[3],
+                    "target_server": row[4],
+                    "target_user": row[5],
+                    "media_name": row[6],
+                    "media_type": row[7],
+                    "sync_type": row[8],
+                    "status": row[9],
+                    "error_message": row[10],
+                    "created_at": row[11],
+                    "position_ticks": row[12]
+                })
+
+            # 计算是否还有更多记录
+            has_more = (offset + len(records)) < total_count
+
+            return {
+                "success": True,
+                "data": records,
+                "pagination": {
+                    "total": total_count,
+                    "offset": offset,
+                    "limit": limit,
+                    "has_more": has_more,
+                    "current_count": len(records)
                 }
+            }
 
         except Exception as e:
             logger.error(f"获取同步记录失败: {str(e)}")
@@ -2149,9 +2067,6 @@ class WatchSync(_PluginBase):
         获取同步状态API
         """
         try:
-            # 清理过期的同步记录
-            self._cleanup_expired_syncs()
-
             # 获取状态信息
             status = self.get_sync_status()
 
@@ -2178,30 +2093,22 @@ class WatchSync(_PluginBase):
         清理指定天数前的旧记录
         """
         try:
-            if not self._db_path:
+            if not self._history:
                 return {"success": False, "message": "数据库未初始化"}
 
             # 限制天数范围，防止误删
             days = max(min(days, 365), 1)  # 最小1天，最大365天
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-
-            with sqlite3.connect(self._db_path) as conn:
-                cursor = conn.cursor()
-
-                # 删除指定天数前的记录
-                cursor.execute('''
-                    DELETE FROM sync_records
-                    WHERE created_at < ?
-                ''', (cutoff_date,))
+            # created_at 为UTC时间，截止时间使用相同格式比较
+            cutoff_date = utc_since(days * 24)
 
-                deleted_count = cursor.rowcount
-                conn.commit()
+            # 删除指定天数前的记录，并从汇总中减去
+            deleted_count = self._history.delete_before(cutoff_date)
 
-                logger.info(f"清理了 {deleted_count} 条旧记录")
-                return {
-                    "success": True,
-                    "message": f"成功清理了 {deleted_count} 条{days}天前的记录"
-                }
+            logger.info(f"清理了 {deleted_count} 条旧记录")
+            return {
+                "success": True,
+                "message": f"成功清理了 {deleted_count} 条{days}天前的记录"
+            }
 
         except Exception as e:
             logger.error(f"清理旧记录失败: {str(e)}")
@@ -2232,4 +2139,8 @@ class WatchSync(_PluginBase):
         """
         退出插件
         """
+        self._provider_indexes.stop()
+        self._sync_queue.stop()
+        if self._history:
+            self._history.close()
         logger.info("观看记录同步插件已停止")
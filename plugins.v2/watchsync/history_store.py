@@ -0,0 +1,367 @@
+"""
+同步历史数据库
+原来每记录一次同步结果都新建一个数据库连接，统计时读出全部记录在Python中逐条解析日期计算，
+记录数增长后仪表盘越来越慢。这里改为：
+- 一个WAL模式的长连接，同步结果先放入内存队列，由后台线程批量写入
+- created_at / status 上建立索引
+- 按 日期+同步类型+状态 维护汇总表，总数、今日次数、成功率直接从汇总表读取
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+# 批量写入的间隔（秒）和每批最大记录数
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH_SIZE = 200
+# 数据库被锁定时重新排队的最大次数，超过后丢弃该批记录
+FLUSH_MAX_RETRIES = 5
+# 数据库结构版本，低于该版本时建立索引并从同步记录重建汇总表
+SCHEMA_VERSION = 1
+
+RECORD_COLUMNS = ("timestamp", "source_server", "source_user", "target_server", "target_user",
+                  "media_name", "media_type", "media_id", "position_ticks", "sync_type",
+                  "status", "error_message", "created_at")
+
+INSERT_RECORD_SQL = f'''
+    INSERT INTO sync_records ({", ".join(RECORD_COLUMNS)})
+    VALUES ({", ".join("?" for _ in RECORD_COLUMNS)})
+'''
+
+
+def utc_timestamp(value: Optional[datetime] = None) -> str:
+    """与 CURRENT_TIMESTAMP 相同格式的UTC时间，用于 created_at 字段"""
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def utc_since(hours: float) -> str:
+    """若干小时前的UTC时间，用于按created_at筛选"""
+    return utc_timestamp(datetime.now(timezone.utc) - timedelta(hours=hours))
+
+
+def is_transient_error(error: Exception) -> bool:
+    """数据库被其他连接锁定等可以稍后重试的错误"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class HistoryStore:
+    """同步历史记录的存储，写入在后台批量执行"""
+
+    def __init__(self, db_path: str, flush_interval: float = FLUSH_INTERVAL,
+                 batch_size: int = FLUSH_BATCH_SIZE, max_retries: int = FLUSH_MAX_RETRIES):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        # 当前批次因数据库锁定已重试的次数
+        self._retries = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.RLock()
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = False
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def open(self):
+        """打开数据库连接，创建表和索引"""
+        with self._db_lock:
+            if self._conn is not None:
+                return
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._create_schema(conn)
+            except Exception:
+                conn.close()
+                raise
+            self._conn = conn
+            self._closing = False
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        # 同步记录表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                source_server TEXT NOT NULL,
+                source_user TEXT NOT NULL,
+                target_server TEXT NOT NULL,
+                target_user TEXT NOT NULL,
+                media_name TEXT NOT NULL,
+                media_type TEXT NOT NULL,
+                media_id TEXT,
+                position_ticks INTEGER,
+                sync_type TEXT DEFAULT 'playback',
+                status TEXT NOT NULL,
+                error_message TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 检查并添加sync_type字段（为了兼容旧数据库）
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(sync_records)")]
+        if "sync_type" not in columns:
+            cursor.execute("ALTER TABLE sync_records ADD COLUMN sync_type TEXT DEFAULT 'playback'")
+
+        # 按日期（本地时间）、同步类型和状态汇总的同步次数
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_daily_stats (
+                date TEXT NOT NULL,
+                sync_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, sync_type, status)
+            )
+        ''')
+
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_records_created_at ON sync_records(created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_records_status ON sync_records(status)")
+            # 从已有记录重建汇总表
+            cursor.execute("DELETE FROM sync_daily_stats")
+            cursor.execute('''
+                INSERT INTO sync_daily_stats (date, sync_type, status, count)
+                SELECT substr(timestamp, 1, 10), COALESCE(sync_type, 'playback'), status, COUNT(*)
+                FROM sync_records
+                GROUP BY 1, 2, 3
+            ''')
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.open()
+        return self._conn
+
+    def record(self, row: Dict[str, Any]):
+        """
+        记录一次同步结果，由后台线程批量写入
+        """
+        values = tuple(row.get(column) for column in RECORD_COLUMNS)
+        with self._pending_lock:
+            self._pending.append(values)
+            pending = len(self._pending)
+            if self._flusher is None or not self._flusher.is_alive():
+                self._closing = False
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                                 name="watchsync-history")
+                self._flusher.start()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"批量写入同步记录失败: {str(e)}")
+            with self._pending_lock:
+                # 没有待写入的记录时退出，下次记录时重新启动
+                if self._closing or not self._pending:
+                    self._flusher = None
+                    return
+
+    def flush(self) -> int:
+        """
+        立即写入队列中的记录
+        :return: 写入的记录数
+        """
+        with self._db_lock:
+            # 在数据库锁内取出队列，保证多个线程同时写入时记录的顺序
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+
+            conn = self._connection()
+            try:
+                conn.executemany(INSERT_RECORD_SQL, rows)
+                self._update_rollup(conn, rows)
+                conn.commit()
+                written = len(rows)
+            except Exception as e:
+                conn.rollback()
+                if is_transient_error(e):
+                    if self._requeue(rows, e):
+                        raise
+                    return 0
+                # 约束冲突等无法重试的错误，逐条写入并丢弃写入失败的记录，避免一条坏记录阻塞整个队列
+                logger.warning(f"批量写入同步记录失败，改为逐条写入: {str(e)}")
+                written = self._flush_each(conn, rows)
+            self._retries = 0
+            self.written += written
+            self.batches += 1
+        return written
+
+    @staticmethod
+    def _update_rollup(conn: sqlite3.Connection, rows: List[Tuple]):
+        rollup: Dict[Tuple[str, str, str], int] = {}
+        for values in rows:
+            key = (str(values[0])[:10], values[9] or "playback", values[10])
+            rollup[key] = rollup.get(key, 0) + 1
+        conn.executemany('''
+            INSERT INTO sync_daily_stats (date, sync_type, status, count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(date, sync_type, status) DO UPDATE SET count = count + excluded.count
+        ''', [key + (count,) for key, count in rollup.items()])
+
+    def _flush_each(self, conn: sqlite3.Connection, rows: List[Tuple]) -> int:
+        """
+        逐条写入记录，丢弃写入失败的记录
+        :return: 写入的记录数
+        """
+        written = []
+        failed = 0
+        try:
+            for values in rows:
+                try:
+                    conn.execute(INSERT_RECORD_SQL, values)
+                except sqlite3.Error as e:
+                    if is_transient_error(e):
+                        raise
+                    failed += 1
+                    logger.error(f"丢弃无法写入的同步记录 {values[5]}: {str(e)}")
+                    continue
+                written.append(values)
+            self._update_rollup(conn, written)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            if is_transient_error(e) and not self._requeue(rows, e):
+                return 0
+            raise
+        self.dropped += failed
+        return len(written)
+
+    def _requeue(self, rows: List[Tuple], error: Exception) -> bool:
+        """
+        数据库被锁定时把记录放回队列头部，下次重试
+        :return: 是否放回队列，超过重试次数时丢弃
+        """
+        self._retries += 1
+        if self._retries > self.max_retries:
+            self._retries = 0
+            self.dropped += len(rows)
+            logger.error(f"数据库持续被锁定，{self.max_retries} 次重试后丢弃 {len(rows)} 条同步记录: {str(error)}")
+            return False
+        with self._pending_lock:
+            self._pending[:0] = rows
+        return True
+
+    def stats(self, today: str, active_since: str) -> Dict[str, Any]:
+        """
+        汇总统计
+        :param today: 本地日期 YYYY-MM-DD
+        :param active_since: 统计活跃用户的起始时间，UTC，与created_at格式相同
+        """
+        self.flush()
+        with self._db_lock:
+            conn = self._connection()
+            totals = {"total": 0, "success": 0, "today": 0}
+            sync_types = set()
+            for date, sync_type, status, count in conn.execute(
+                    "SELECT date, sync_type, status, SUM(count) FROM sync_daily_stats "
+                    "GROUP BY date, sync_type, status HAVING SUM(count) > 0"):
+                totals["total"] += count
+                if status == "success":
+                    totals["success"] += count
+                if date == today:
+                    totals["today"] += count
+                sync_types.add(sync_type)
+            # 只读取时间范围内的记录，使用created_at索引
+            active_users = conn.execute('''
+                SELECT COUNT(*) FROM (
+                    SELECT source_user FROM sync_records WHERE created_at >= ?
+                    UNION
+                    SELECT target_user FROM sync_records WHERE created_at >= ?
+                )
+            ''', (active_since, active_since)).fetchone()[0]
+        return {
+            "total": totals["total"],
+            "success": totals["success"],
+            "failed": totals["total"] - totals["success"],
+            "today": totals["today"],
+            "active_users": active_users,
+            "sync_types": sorted(sync_types),
+        }
+
+    def count(self) -> int:
+        """记录总数，从汇总表读取"""
+        self.flush()
+        with self._db_lock:
+            total = self._connection().execute("SELECT SUM(count) FROM sync_daily_stats").fetchone()[0]
+        return total or 0
+
+    def records(self, limit: int, offset: int) -> List[Tuple]:
+        """按创建时间倒序分页读取记录"""
+        self.flush()
+        with self._db_lock:
+            return self._connection().execute('''
+                SELECT id, timestamp, source_server, source_user, target_server, target_user,
+                       media_name, media_type, sync_type, status, error_message, created_at, position_ticks
+                FROM sync_records
+                ORDER BY created_at DESC
+                LIMIT ? OFFSET ?
+            ''', (limit, offset)).fetchall()
+
+    def delete_before(self, cutoff: str) -> int:
+        """
+        删除created_at早于cutoff的记录，并从汇总表中减去
+        :param cutoff: UTC时间，与created_at格式相同
+        """
+        self.flush()
+        with self._db_lock:
+            conn = self._connection()
+            try:
+                removed = conn.execute('''
+                    SELECT substr(timestamp, 1, 10), COALESCE(sync_type, 'playback'), status, COUNT(*)
+                    FROM sync_records
+                    WHERE created_at < ?
+                    GROUP BY 1, 2, 3
+                ''', (cutoff,)).fetchall()
+                deleted = conn.execute("DELETE FROM sync_records WHERE created_at < ?", (cutoff,)).rowcount
+                conn.executemany('''
+                    UPDATE sync_daily_stats SET count = count - ?
+                    WHERE date = ? AND sync_type = ? AND status = ?
+                ''', [(count, date, sync_type, status) for date, sync_type, status, count in removed])
+                conn.execute("DELETE FROM sync_daily_stats WHERE count <= 0")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return deleted
+
+    def close(self):
+        """写入剩余的记录并关闭连接，之后再次使用时重新打开"""
+        with self._pending_lock:
+            self._closing = True
+            flusher = self._flusher
+        self._wakeup.set()
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"写入剩余同步记录失败: {str(e)}")
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,355 @@
+"""
+Emby服务器媒体标识索引
+原来同步剧集时每次都要拉取目标服务器上全部剧集和单集再逐个比对TMDB ID，媒体库较大时每次暂停播放都要下载数MB数据。
+这里为每个服务器在后台分页建立索引：
+- TMDB/IMDB/TVDB ID + 媒体类型 -> 媒体项
+- 剧集ID + 季号 + 集号 -> 单集
+之后通过 library.new/library.update 事件和 MinDateLastSaved 增量刷新，匹配媒体只需几次字典查找。
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.log import logger
+
+# 参与匹配的媒体标识，按优先级排列
+PROVIDER_KEYS = ("tmdb", "imdb", "tvdb")
+INDEXED_TYPES = ("Movie", "Series", "Episode")
+# 每页拉取的媒体项数量
+INDEX_PAGE_SIZE = 1000
+# 完整重建间隔（秒），用于清理已删除的媒体项
+FULL_REBUILD_INTERVAL = 6 * 3600
+# 增量刷新时向前多取的时间（秒），避免两台机器时钟不一致漏掉更新
+REFRESH_OVERLAP = 300
+# 未命中索引时触发同步增量刷新的最小间隔（秒）
+MISS_REFRESH_INTERVAL = 60
+# 首次构建失败后的重试间隔（秒），按指数退避
+BUILD_RETRY_BASE_DELAY = 30
+BUILD_RETRY_MAX_DELAY = 1800
+
+# fetch_page(start_index, limit, min_date_last_saved) -> (媒体项列表, 总数)
+FetchPage = Callable[[int, int, Optional[str]], Tuple[List[dict], int]]
+
+
+def provider_keys(provider_ids: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    规范化媒体标识，按 PROVIDER_KEYS 的优先级返回 (标识类型, 值)
+    """
+    normalized = {}
+    for name, value in (provider_ids or {}).items():
+        name = str(name).lower()
+        if name in PROVIDER_KEYS and value:
+            normalized[name] = str(value).strip()
+    return [(name, normalized[name]) for name in PROVIDER_KEYS if normalized.get(name)]
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _IndexTables:
+    """索引数据，完整重建时在新表中构建后整体替换"""
+
+    def __init__(self):
+        self.items: Dict[str, dict] = {}
+        self.by_provider: Dict[Tuple[str, str, str], str] = {}
+        self.episodes: Dict[Tuple[str, int, int], str] = {}
+
+    @staticmethod
+    def _episode_key(entry: dict) -> Optional[Tuple[str, int, int]]:
+        if entry["Type"] != "Episode" or not entry.get("SeriesId"):
+            return None
+        season = _to_int(entry.get("ParentIndexNumber"))
+        episode = _to_int(entry.get("IndexNumber"))
+        if season is None or episode is None:
+            return None
+        return str(entry["SeriesId"]), season, episode
+
+    def add(self, entry: dict):
+        item_id = entry["Id"]
+        if item_id in self.items:
+            self.remove(item_id)
+        self.items[item_id] = entry
+        for name, value in provider_keys(entry.get("ProviderIds")):
+            self.by_provider[(name, value, entry["Type"])] = item_id
+        episode_key = self._episode_key(entry)
+        if episode_key:
+            self.episodes[episode_key] = item_id
+
+    def remove(self, item_id: str):
+        entry = self.items.pop(item_id, None)
+        if not entry:
+            return
+        for name, value in provider_keys(entry.get("ProviderIds")):
+            key = (name, value, entry["Type"])
+            if self.by_provider.get(key) == item_id:
+                del self.by_provider[key]
+        episode_key = self._episode_key(entry)
+        if episode_key and self.episodes.get(episode_key) == item_id:
+            del self.episodes[episode_key]
+
+
+class ProviderIndex:
+    """一个Emby服务器的媒体标识索引"""
+
+    def __init__(self, server_name: str, fetch_page: FetchPage,
+                 page_size: int = INDEX_PAGE_SIZE, clock: Callable[[], float] = time.time):
+        self.server_name = server_name
+        self._fetch_page = fetch_page
+        self.page_size = max(1, page_size)
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._tables = _IndexTables()
+        self.ready = False
+        # 最近一次完整构建和增量刷新的开始时间
+        self.built_at = 0.0
+        self.refreshed_at = 0.0
+        self.requests = 0
+        self.lookups = 0
+        self.hits = 0
+
+    @staticmethod
+    def make_entry(item: dict) -> Optional[dict]:
+        """只保留匹配需要的字段"""
+        item_id = item.get("Id")
+        item_type = item.get("Type")
+        if not item_id or item_type not in INDEXED_TYPES:
+            return None
+        return {
+            "Id": str(item_id),
+            "Name": item.get("Name"),
+            "Type": item_type,
+            "ProviderIds": dict(item.get("ProviderIds") or {}),
+            "SeriesId": item.get("SeriesId"),
+            "ParentIndexNumber": item.get("ParentIndexNumber"),
+            "IndexNumber": item.get("IndexNumber"),
+        }
+
+    def _page_through(self, consume: Callable[[dict], None], since: Optional[str],
+                      stop_event: Optional[threading.Event]) -> bool:
+        start = 0
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            items, total = self._fetch_page(start, self.page_size, since)
+            self.requests += 1
+            for item in items or []:
+                entry = self.make_entry(item)
+                if entry:
+                    consume(entry)
+            start += len(items or [])
+            if not items or start >= (total or 0):
+                return True
+
+    def build(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        分页拉取全部媒体项重建索引，构建期间原索引仍可使用
+        """
+        started = self._clock()
+        tables = _IndexTables()
+        if not self._page_through(tables.add, None, stop_event):
+            return False
+        with self._lock:
+            self._tables = tables
+            self.ready = True
+            self.built_at = self.refreshed_at = started
+        logger.info(f"服务器 {self.server_name} 媒体索引构建完成: {len(tables.items)} 个媒体项，"
+                    f"{self.requests} 次请求，耗时 {self._clock() - started:.1f}s")
+        return True
+
+    def needs_rebuild(self) -> bool:
+        """尚未构建或超过完整重建间隔"""
+        return not self.ready or self._clock() - self.built_at > FULL_REBUILD_INTERVAL
+
+    def refresh(self, stop_event: Optional[threading.Event] = None, allow_rebuild: bool = True) -> bool:
+        """
+        增量刷新：只拉取上次刷新后保存过的媒体项，超过完整重建间隔时重建
+        :param allow_rebuild: 为False时只做增量刷新，未构建的索引直接返回
+        """
+        if self.needs_rebuild():
+            if allow_rebuild:
+                return self.build(stop_event)
+            if not self.ready:
+                return False
+        started = self._clock()
+        since = datetime.fromtimestamp(self.refreshed_at - REFRESH_OVERLAP, timezone.utc)
+        count = 0
+
+        def consume(entry: dict):
+            nonlocal count
+            with self._lock:
+                self._tables.add(entry)
+            count += 1
+
+        if not self._page_through(consume, since.strftime("%Y-%m-%dT%H:%M:%SZ"), stop_event):
+            return False
+        self.refreshed_at = started
+        logger.debug(f"服务器 {self.server_name} 媒体索引增量刷新: {count} 个媒体项")
+        return True
+
+    def add_items(self, items: List[dict]) -> int:
+        """加入事件中携带的媒体项"""
+        added = 0
+        with self._lock:
+            for item in items:
+                entry = self.make_entry(item or {})
+                if entry:
+                    self._tables.add(entry)
+                    added += 1
+        return added
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._tables.remove(str(item_id))
+
+    def get(self, item_id) -> Optional[dict]:
+        with self._lock:
+            entry = self._tables.items.get(str(item_id))
+            return dict(entry) if entry else None
+
+    def lookup(self, source_item: dict, series_provider_ids: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+        """
+        查找与源媒体项对应的媒体项
+        :param series_provider_ids: 源单集所属剧集的媒体标识，用于按 剧集+季号+集号 匹配
+        """
+        item_type = source_item.get("Type")
+        with self._lock:
+            tables = self._tables
+            self.lookups += 1
+            item_id = None
+            if item_type == "Episode" and series_provider_ids:
+                season = _to_int(source_item.get("ParentIndexNumber"))
+                episode = _to_int(source_item.get("IndexNumber"))
+                if season is not None and episode is not None:
+                    for name, value in provider_keys(series_provider_ids):
+                        series_id = tables.by_provider.get((name, value, "Series"))
+                        item_id = series_id and tables.episodes.get((series_id, season, episode))
+                        if item_id:
+                            break
+            if not item_id:
+                for name, value in provider_keys(source_item.get("ProviderIds")):
+                    item_id = tables.by_provider.get((name, value, item_type))
+                    if item_id:
+                        break
+            entry = tables.items.get(item_id) if item_id else None
+            if entry:
+                self.hits += 1
+                return dict(entry)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._tables.items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "items": len(self),
+            "requests": self.requests,
+            "lookups": self.lookups,
+            "hits": self.hits,
+        }
+
+
+class ProviderIndexManager:
+    """管理各服务器的索引，在后台线程中构建和刷新"""
+
+    def __init__(self, retry_base_delay: float = BUILD_RETRY_BASE_DELAY,
+                 retry_max_delay: float = BUILD_RETRY_MAX_DELAY):
+        self._indexes: Dict[str, ProviderIndex] = {}
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+        self._pending: Set[str] = set()
+        self._stop_event = threading.Event()
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+    def start(self, server_name: str, fetch_page: FetchPage, **kwargs):
+        """注册服务器并在后台构建索引"""
+        with self._lock:
+            self._indexes[server_name] = ProviderIndex(server_name, fetch_page, **kwargs)
+        self.schedule_refresh(server_name)
+
+    def get(self, server_name: Optional[str]) -> Optional[ProviderIndex]:
+        """获取已构建完成的索引"""
+        index = self._indexes.get(server_name) if server_name else None
+        return index if index is not None and index.ready else None
+
+    def get_any(self, server_name: Optional[str]) -> Optional[ProviderIndex]:
+        """获取索引，不论是否构建完成"""
+        return self._indexes.get(server_name) if server_name else None
+
+    def schedule_refresh(self, server_name: str):
+        """
+        后台增量刷新，刷新进行中时合并为一次后续刷新
+        """
+        with self._lock:
+            if server_name not in self._indexes or self._stop_event.is_set():
+                return
+            if server_name in self._running:
+                self._pending.add(server_name)
+                return
+            self._running.add(server_name)
+        threading.Thread(target=self._run, args=(server_name,), daemon=True,
+                         name=f"watchsync-index-{server_name}").start()
+
+    def refresh_now(self, server_name: str, min_interval: float = MISS_REFRESH_INTERVAL) -> bool:
+        """
+        在当前线程增量刷新，距离上次刷新不足 min_interval 或后台正在刷新时跳过
+        需要完整重建时只做增量刷新，重建交给后台线程，不阻塞调用方
+        :return: 是否执行了刷新
+        """
+        index = self.get(server_name)
+        if index is None or time.time() - index.refreshed_at < min_interval:
+            return False
+        with self._lock:
+            if server_name in self._running:
+                return False
+            self._running.add(server_name)
+        try:
+            return index.refresh(self._stop_event, allow_rebuild=False)
+        except Exception as e:
+            logger.warning(f"服务器 {server_name} 媒体索引刷新失败: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._running.discard(server_name)
+            if index.needs_rebuild():
+                self.schedule_refresh(server_name)
+
+    def _run(self, server_name: str):
+        failures = 0
+        while True:
+            index = self._indexes.get(server_name)
+            if index is not None:
+                try:
+                    done = index.refresh(self._stop_event)
+                except Exception as e:
+                    logger.warning(f"服务器 {server_name} 媒体索引刷新失败: {e}")
+                    done = False
+                if not index.ready and not done and not self._stop_event.is_set():
+                    # 首次构建失败时没有其他事件会触发重建，按指数退避重试
+                    delay = min(self.retry_base_delay * (2 ** failures), self.retry_max_delay)
+                    failures += 1
+                    logger.info(f"服务器 {server_name} 媒体索引将在 {delay:.0f}s 后第 {failures} 次重试构建")
+                    if not self._stop_event.wait(delay) and self._indexes.get(server_name) is index:
+                        continue
+            with self._lock:
+                if server_name in self._pending and not self._stop_event.is_set():
+                    self._pending.discard(server_name)
+                    continue
+                self._running.discard(server_name)
+                return
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: index.stats() for name, index in self._indexes.items()}
+
+    def stop(self):
+        """停止后台刷新并清空索引"""
+        self._stop_event.set()
+        with self._lock:
+            self._indexes.clear()
+            self._pending.clear()
@@ -0,0 +1,166 @@
+"""
+Emby服务器的用户目录缓存和健康状态
+原来每同步一个目标用户都要请求一次 /System/Info 做健康检查，再下载完整的 /Users 列表查找用户ID，
+一个六人的同步组每个事件会产生几十个重复请求。这里为每个服务器：
+- UserDirectory: 缓存用户名到用户ID的映射，按TTL刷新，未找到的用户名最多每隔一段时间重新拉取一次
+- ServerHealth: 熔断器式的健康状态，根据实际请求的结果被动更新，不再单独请求健康检查接口
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.log import logger
+
+# 用户目录缓存有效期（秒）
+USER_CACHE_TTL = 600
+# 用户名未命中时重新拉取用户列表的最小间隔（秒）
+USER_MISS_REFRESH_INTERVAL = 30
+# 连续失败多少次后熔断
+FAILURE_THRESHOLD = 3
+# 熔断后多久允许一次试探请求（秒）
+OPEN_COOLDOWN = 60
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class UserDirectory:
+    """一个服务器的用户名 -> 用户ID缓存"""
+
+    def __init__(self, fetch_users: Callable[[], Optional[List[dict]]],
+                 ttl: float = USER_CACHE_TTL,
+                 miss_refresh_interval: float = USER_MISS_REFRESH_INTERVAL,
+                 clock: Callable[[], float] = time.time):
+        """
+        :param fetch_users: 拉取用户列表的函数，返回 [{"Id": ..., "Name": ...}]，失败时返回None
+        """
+        self._fetch_users = fetch_users
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._users: Dict[str, str] = {}
+        self.loaded_at = 0.0
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh_nolock(self) -> bool:
+        self.requests += 1
+        users = self._fetch_users()
+        if users is None:
+            return False
+        self._users = {user.get("Name"): user.get("Id") for user in users if user.get("Name") and user.get("Id")}
+        self.loaded_at = self._clock()
+        return True
+
+    def get_id(self, user_name: str) -> Optional[str]:
+        """
+        获取用户ID，缓存过期或用户名未命中时重新拉取用户列表
+        """
+        if not user_name:
+            return None
+        with self._lock:
+            age = self._clock() - self.loaded_at
+            if age >= self.ttl or (user_name not in self._users and age >= self.miss_refresh_interval):
+                self._refresh_nolock()
+            user_id = self._users.get(user_name)
+            if user_id:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return user_id
+
+    def invalidate(self):
+        """用户ID失效时（如用户被删除后重建）下次查找重新拉取"""
+        with self._lock:
+            self.loaded_at = 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return {"users": len(self._users), "requests": self.requests, "hits": self.hits, "misses": self.misses}
+
+
+class ServerHealth:
+    """
+    熔断器式的服务器健康状态
+    - closed: 正常，所有请求放行
+    - open: 连续失败达到阈值后熔断，冷却期内直接拒绝
+    - half_open: 冷却期结束后放行一次试探请求，成功则恢复，失败则重新熔断
+    """
+
+    def __init__(self, server_name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = OPEN_COOLDOWN, clock: Callable[[], float] = time.time):
+        self.server_name = server_name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        # 试探请求的放行时间，试探没有产生结果时冷却期后再放行一次
+        self._probe_at = None
+
+    def allow(self) -> bool:
+        """是否放行一次请求"""
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            now = self._clock()
+            if self.state == STATE_OPEN and now - self.opened_at >= self.cooldown:
+                self.state = STATE_HALF_OPEN
+                self._probe_at = None
+            if self.state == STATE_HALF_OPEN and (self._probe_at is None or now - self._probe_at >= self.cooldown):
+                self._probe_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info(f"Emby服务器 {self.server_name} 已恢复")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._probe_at = None
+
+    def record_failure(self, reason: str = None):
+        with self._lock:
+            self.failures += 1
+            if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning(f"Emby服务器 {self.server_name} 连续 {self.failures} 次请求失败，"
+                                   f"暂停同步 {self.cooldown:.0f}s: {reason or '未知错误'}")
+                self.state = STATE_OPEN
+                self.opened_at = self._clock()
+                self._probe_at = None
+
+    def record_response(self, response) -> bool:
+        """
+        根据请求结果更新健康状态，服务器有响应且不是5xx视为连接正常
+        :return: 请求是否成功
+        """
+        status_code = getattr(response, "status_code", None) if response is not None else None
+        if status_code is None or status_code >= 500:
+            self.record_failure(f"HTTP {status_code}" if status_code else "无响应")
+            return False
+        self.record_success()
+        return status_code < 400
+
+    def stats(self) -> Dict[str, object]:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class ServerState:
+    """一个服务器的用户目录和健康状态"""
+
+    def __init__(self, server_name: str, fetch_users: Callable[[], Optional[List[dict]]],
+                 clock: Callable[[], float] = time.time):
+        self.server_name = server_name
+        self.health = ServerHealth(server_name, clock=clock)
+        self.users = UserDirectory(fetch_users, clock=clock)
+
+    def stats(self) -> Dict[str, object]:
+        return {"health": self.health.stats(), "users": self.users.stats()}
@@ -0,0 +1,249 @@
+"""
+观看进度同步队列
+原来同步在webhook处理线程中串行执行，同时进行的同步达到上限时直接丢弃。这里改为：
+- 同一 (目标服务器, 目标用户, 媒体) 的同步合并为一个任务，只保留最新的进度
+- 有界的工作线程池，并限制每个服务器同时进行的同步数
+- 失败的任务按指数退避重新排队，不占用工作线程等待
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.log import logger
+
+# 工作线程数
+SYNC_WORKERS = 3
+# 每个服务器同时进行的同步数
+PER_SERVER_LIMIT = 2
+# 失败后的重试次数
+SYNC_RETRIES = 3
+SYNC_RETRY_BASE_DELAY = 2
+SYNC_RETRY_MAX_DELAY = 30
+# 空闲工作线程的退出时间（秒）
+WORKER_IDLE_TIMEOUT = 60
+
+
+class SyncTask:
+    """一个待执行的同步任务"""
+
+    __slots__ = ("key", "server", "payload", "attempts", "not_before")
+
+    def __init__(self, key: Hashable, server: str, payload: Dict[str, Any]):
+        self.key = key
+        self.server = server
+        self.payload = payload
+        self.attempts = 0
+        self.not_before = 0.0
+
+
+class SyncQueue:
+    """合并重复任务的同步队列"""
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], bool],
+                 max_workers: int = SYNC_WORKERS,
+                 per_server_limit: int = PER_SERVER_LIMIT,
+                 max_retries: int = SYNC_RETRIES,
+                 base_delay: float = SYNC_RETRY_BASE_DELAY,
+                 max_delay: float = SYNC_RETRY_MAX_DELAY,
+                 on_give_up: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param handler: 执行同步的函数，返回是否成功，抛出异常视为失败
+        :param on_give_up: 任务超过重试次数放弃时调用
+        """
+        self._handler = handler
+        self._on_give_up = on_give_up
+        self.max_workers = max(1, max_workers)
+        self.per_server_limit = max(1, per_server_limit)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._cond = threading.Condition()
+        # 等待执行的任务，按首次提交的顺序
+        self._pending: "OrderedDict[Hashable, SyncTask]" = OrderedDict()
+        # 执行中的任务，以及执行期间提交的更新进度
+        self._running: Dict[Hashable, SyncTask] = {}
+        self._follow_up: Dict[Hashable, SyncTask] = {}
+        self._server_running: Dict[str, int] = {}
+        self._workers = 0
+        self._idle = 0
+        self._stopped = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def submit(self, key: Hashable, server: str, payload: Dict[str, Any]) -> bool:
+        """
+        提交同步任务，相同key的任务未执行时用新的进度替换
+        :return: 是否加入了队列（队列已停止时为False）
+        """
+        with self._cond:
+            if self._stopped:
+                return False
+            self.submitted += 1
+            task = SyncTask(key, server, payload)
+            if key in self._running:
+                if key in self._follow_up:
+                    self.coalesced += 1
+                # 执行中的任务完成后再执行最新的进度
+                self._follow_up[key] = task
+            elif key in self._pending:
+                self.coalesced += 1
+                # 替换进度并重置重试次数，保持排队位置
+                self._pending[key] = task
+            else:
+                self._pending[key] = task
+            self._ensure_worker_nolock()
+            self._cond.notify()
+            return True
+
+    def _runnable_nolock(self, limit: int) -> int:
+        """可以立即执行的等待任务数，数到limit为止"""
+        now = self._clock()
+        server_running = dict(self._server_running)
+        runnable = 0
+        for task in self._pending.values():
+            if task.not_before > now or server_running.get(task.server, 0) >= self.per_server_limit:
+                continue
+            server_running[task.server] = server_running.get(task.server, 0) + 1
+            runnable += 1
+            if runnable >= limit:
+                break
+        return runnable
+
+    def _ensure_worker_nolock(self):
+        """可执行的任务多于空闲工作线程时启动新的工作线程，避免一批任务由一个空闲线程串行执行"""
+        if self._workers >= self.max_workers:
+            return
+        spare = self.max_workers - self._workers
+        needed = min(self._runnable_nolock(self._idle + spare) - self._idle, spare)
+        for _ in range(max(0, needed)):
+            self._workers += 1
+            threading.Thread(target=self._worker, daemon=True,
+                             name=f"watchsync-sync-{self._workers}").start()
+
+    def _next_task_nolock(self):
+        """
+        取出一个可以执行的任务
+        :return: (任务, 需要等待的秒数)
+        """
+        now = self._clock()
+        wait = None
+        for key, task in self._pending.items():
+            if self._server_running.get(task.server, 0) >= self.per_server_limit:
+                continue
+            if task.not_before > now:
+                delay = task.not_before - now
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            del self._pending[key]
+            return task, None
+        return None, wait
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                task = None
+                idle_since = self._clock()
+                while not self._stopped:
+                    task, wait = self._next_task_nolock()
+                    if task:
+                        break
+                    if wait is None and self._clock() - idle_since >= WORKER_IDLE_TIMEOUT:
+                        break
+                    self._idle += 1
+                    self._cond.wait(wait if wait is not None else WORKER_IDLE_TIMEOUT)
+                    self._idle -= 1
+                if not task:
+                    self._workers -= 1
+                    return
+                self._running[task.key] = task
+                self._server_running[task.server] = self._server_running.get(task.server, 0) + 1
+                # 还有可执行的任务时唤醒或启动其他工作线程
+                if self._pending:
+                    self._ensure_worker_nolock()
+                    self._cond.notify()
+
+            try:
+                success = bool(self._handler(task.payload))
+            except Exception as e:
+                logger.error(f"同步任务执行异常 {task.key}: {str(e)}")
+                success = False
+
+            with self._cond:
+                del self._running[task.key]
+                self._server_running[task.server] -= 1
+                follow_up = self._follow_up.pop(task.key, None)
+                gave_up = False
+                if success:
+                    self.completed += 1
+                if follow_up:
+                    # 执行期间有新的进度，失败的旧进度不再重试
+                    self._pending[task.key] = follow_up
+                elif not success:
+                    gave_up = not self._retry_nolock(task)
+                self._cond.notify_all()
+
+            if gave_up and self._on_give_up:
+                try:
+                    self._on_give_up(task.payload)
+                except Exception as e:
+                    logger.error(f"同步任务放弃回调异常 {task.key}: {str(e)}")
+
+    def _retry_nolock(self, task: SyncTask) -> bool:
+        """
+        按指数退避重新排队
+        :return: 是否重新排队，超过重试次数时放弃
+        """
+        if task.attempts >= self.max_retries or self._stopped:
+            self.failed += 1
+            logger.error(f"同步任务 {task.key} 在 {task.attempts} 次重试后仍然失败")
+            return False
+        delay = min(self.base_delay * (2 ** task.attempts), self.max_delay)
+        delay += random.uniform(0, delay * 0.1)  # 添加10%的随机抖动
+        task.attempts += 1
+        task.not_before = self._clock() + delay
+        self.retried += 1
+        logger.warning(f"同步任务 {task.key} 第 {task.attempts} 次失败，{delay:.2f}秒后重试")
+        self._pending[task.key] = task
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的任务全部完成"""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            while self._pending or self._running:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 1)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": len(self._pending) + len(self._follow_up),
+                "running": len(self._running),
+                "workers": self._workers,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retried": self.retried,
+            }
+
+    def stop(self):
+        """停止队列，丢弃未执行的任务，执行中的任务完成后工作线程退出"""
+        with self._cond:
+            self._stopped = True
+            dropped = len(self._pending) + len(self._follow_up)
+            self._pending.clear()
+            self._follow_up.clear()
+            self._cond.notify_all()
+        if dropped:
+            logger.info(f"同步队列已停止，丢弃 {dropped} 个未执行的任务")
@@ -0,0 +1,90 @@
+"""
+固定有效期的缓存
+事件去重和防循环缓存原来每次写入都要遍历整个字典找出过期条目。
+所有条目的有效期相同，按写入时间排序后最早写入的条目总在最前面，
+过期时只需从头部依次弹出，均摊每次操作 O(1)。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """按写入顺序过期的缓存，写入已存在的键会刷新时间并移到末尾"""
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # 键 -> (写入时间, 值)，按写入时间排序
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _expire_nolock(self, now: float):
+        cutoff = now - self.ttl
+        data = self._data
+        while data:
+            key, (written, _) = next(iter(data.items()))
+            if written > cutoff:
+                break
+            del data[key]
+            self.expired += 1
+
+    def set(self, key: Hashable, value: Any = True):
+        """写入或刷新一个键"""
+        with self._lock:
+            now = self._clock()
+            self._expire_nolock(now)
+            self._data[key] = (now, value)
+            self._data.move_to_end(key)
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """
+        键写入后经过的秒数，不存在或已过期时返回None，同时计入命中率
+        """
+        with self._lock:
+            now = self._clock()
+            self._expire_nolock(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return now - entry[0]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self._expire_nolock(self._clock())
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.age(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire_nolock(self._clock())
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_nolock(self._clock())
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+            }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Regression check: CleanInvalidSeed must not delete source files when reading torrent fields times out.
+
+Run inside the plugin repository:
+    python3 tests/cleaninvalidseed_detect_timeout_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PLUGIN_DIR = REPO_ROOT / "plugins.v2" / "cleaninvalidseed"
+
+
+class PluginBase:
+    def __init__(self):
+        self.messages = []
+        self.data = {}
+
+    def post_message(self, **kwargs):
+        self.messages.append(kwargs)
+
+    def get_data(self, key):
+        return self.data.get(key)
+
+    def save_data(self, key, value):
+        self.data[key] = value
+
+
+class EventManager:
+    @staticmethod
+    def register(*args, **kwargs):
+        return lambda func: func
+
+
+def install_stubs():
+    def module(name, **attrs):
+        mod = types.ModuleType(name)
+        for key, value in attrs.items():
+            setattr(mod, key, value)
+        sys.modules[name] = mod
+        return mod
+
+    module("pytz", timezone=lambda name: None)
+    module("apscheduler")
+    module("apscheduler.schedulers")
+    module("apscheduler.schedulers.background", BackgroundScheduler=object)
+    module("apscheduler.triggers")
+    module("apscheduler.triggers.cron", CronTrigger=object)
+    module("app")
+    module("app.log", logger=logging.getLogger("cleaninvalidseed"))
+    module("app.utils")
+    module("app.utils.string", StringUtils=types.SimpleNamespace(str_filesize=lambda size: f"{size}B"))
+    module("app.schemas", ServiceInfo=object, NotificationType=types.SimpleNamespace(SiteMessage="SiteMessage"))
+    module("app.schemas.types", EventType=types.SimpleNamespace(PluginAction="PluginAction"))
+    module("app.core")
+    module("app.core.event", eventmanager=EventManager(), Event=object)
+    module("app.core.config", settings=types.SimpleNamespace(TZ="UTC"))
+    module("app.plugins", _PluginBase=PluginBase)
+    module("app.helper")
+    module("app.helper.downloader", DownloaderHelper=object)
+
+
+def load_plugin_class():
+    install_stubs()
+    spec = importlib.util.spec_from_file_location(
+        "cleaninvalidseed", PLUGIN_DIR / "__init__.py", submodule_search_locations=[str(PLUGIN_DIR)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["cleaninvalidseed"] = module
+    spec.loader.exec_module(module)
+    return module.CleanInvalidSeed
+
+
+class QbTorrent:
+    def __init__(self, content_path, delay=0.0):
+        self._content_path = content_path
+        self._delay = delay
+        self.name = Path(content_path).name
+
+    @property
+    def content_path(self):
+        time.sleep(self._delay)
+        return self._content_path
+
+
+def make_plugin(plugin_class, download_dir, torrents):
+    class Plugin(plugin_class):
+        @property
+        def service_info(self):
+            return {"qb": types.SimpleNamespace(name="qb", instance=object())}
+
+        def get_all_torrents(self, service):
+            return list(torrents)
+
+    plugin = Plugin()
+    plugin._download_dirs = f"{download_dir}:{download_dir}"
+    plugin._delete_invalid_files = True
+    plugin._exclude_keywords = ""
+    plugin._min_seeding_days = 0
+    plugin._incremental_detect = False
+    plugin._notify = False
+    return plugin
+
+
+def main():
+    plugin_class = load_plugin_class()
+    plugin_class.CONTENT_PATH_TIMEOUT = 0.3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        download_dir = Path(tmp)
+        for name in ("seeded-a", "seeded-b", "seeded-c"):
+            (download_dir / name).mkdir()
+            (download_dir / name / "video.mkv").write_bytes(b"x" * 16)
+
+        # 第二个种子读取卡住，后面的种子都读取不到
+        torrents = [QbTorrent(str(download_dir / "seeded-a")),
+                    QbTorrent(str(download_dir / "seeded-b"), delay=1.0),
+                    QbTorrent(str(download_dir / "seeded-c"))]
+        plugin = make_plugin(plugin_class, download_dir, torrents)
+        start = time.perf_counter()
+        plugin.detect_invalid_files()
+        elapsed = time.perf_counter() - start
+
+        assert all((download_dir / name).exists() for name in ("seeded-a", "seeded-b", "seeded-c"))
+        assert elapsed < 1.0, elapsed
+        assert plugin.messages and "未删除任何文件" in plugin.messages[-1]["text"], plugin.messages
+
+        # 读取完成时照常删除没有对应种子的文件
+        (download_dir / "orphan").mkdir()
+        time.sleep(1.0)  # 等待卡住的读取结束，释放共享线程
+        plugin = make_plugin(plugin_class, download_dir, [QbTorrent(str(download_dir / name))
+                                                         for name in ("seeded-a", "seeded-b", "seeded-c")])
+        plugin.detect_invalid_files()
+        assert not (download_dir / "orphan").exists()
+        assert all((download_dir / name).exists() for name in ("seeded-a", "seeded-b", "seeded-c"))
+
+    print(f"PASS: CleanInvalidSeed skips orphan deletion when the torrent field read times out ({elapsed * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Regression check for CleanInvalidSeed orphaned-file detection path index and directory size cache.
+
+Run inside the plugin repository:
+    python3 tests/cleaninvalidseed_path_index_regression.py
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+INDEX_FILE = REPO_ROOT / "plugins.v2" / "cleaninvalidseed" / "path_index.py"
+
+TORRENT_COUNT = 20000
+ENTRY_COUNT = 5000
+
+
+def load_index_module():
+    module_name = "cleaninvalidseed_path_index"
+    spec = importlib.util.spec_from_file_location(module_name, INDEX_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    index_module = load_index_module()
+    normalize = index_module.normalize_path
+
+    assert normalize("D:\\downloads\\Movie\\") == "D:/downloads/Movie"
+    assert normalize("//downloads//tv/./Show/") == "/downloads/tv/Show"
+
+    index = index_module.ContentPathIndex([
+        "/downloads/Movie.A",
+        "/downloads/tv/Show/Season 1",
+        "/downloads/tv/Show/Season 1/",
+        None,
+        "",
+    ])
+    assert len(index) == 2
+    # 按路径组件匹配，前缀相同的其他文件名不算命中
+    assert index.covers("/downloads/Movie.A")
+    assert not index.covers("/downloads/Movie.AB")
+    assert not index.covers("/downloads/Movie")
+    # 种子保存在子目录中时，上级目录也算有种子
+    assert index.covers("/downloads/tv/Show")
+    assert index.covers("/downloads/tv//Show/")
+    assert not index.covers("/downloads/tv/Other")
+
+    fingerprint = index.fingerprint("/mnt/downloads", ["/downloads"])
+    assert fingerprint == index_module.ContentPathIndex(
+        ["/downloads/tv/Show/Season 1", "/downloads/Movie.A"]).fingerprint("/mnt/downloads", ["/downloads"])
+    assert fingerprint != index.fingerprint("/mnt/downloads", ["/downloads", "/data"])
+    assert fingerprint != index_module.ContentPathIndex(["/downloads/Movie.A"]).fingerprint(
+        "/mnt/downloads", ["/downloads"])
+
+    # 大量种子时建立索引和逐个查找
+    paths = [f"/downloads/torrent-{i}" for i in range(TORRENT_COUNT)]
+    start = time.perf_counter()
+    big_index = index_module.ContentPathIndex(paths)
+    hits = sum(big_index.covers(f"/downloads/torrent-{i}") for i in range(0, TORRENT_COUNT * 2, 4))
+    elapsed = time.perf_counter() - start
+    assert hits == TORRENT_COUNT // 4, hits
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        folder = root / "Orphan"
+        (folder / "sub").mkdir(parents=True)
+        (folder / "a.mkv").write_bytes(b"x" * 100)
+        (folder / "sub" / "b.nfo").write_bytes(b"x" * 20)
+        (root / "single.mkv").write_bytes(b"x" * 7)
+        os.symlink(folder / "a.mkv", folder / "link.mkv")
+
+        cache = index_module.DirSizeCache()
+        assert cache.size(folder) == 120
+        assert cache.size(root / "single.mkv") == 7
+        assert cache.size(root / "missing") == 0
+        assert cache.walked == 1 and cache.reused == 0
+
+        # 目录未变化时使用上次的结果
+        reload = index_module.DirSizeCache(cache.to_dict())
+        assert reload.size(folder) == 120
+        assert reload.walked == 0 and reload.reused == 1
+
+        # 目录变化后重新统计
+        (folder / "c.mkv").write_bytes(b"x" * 5)
+        changed = index_module.DirSizeCache(reload.to_dict())
+        assert changed.size(folder) == 125
+        assert changed.walked == 1
+
+        for i in range(ENTRY_COUNT):
+            (folder / "sub" / f"f{i}").write_bytes(b"x")
+        walk_start = time.perf_counter()
+        assert index_module.DirSizeCache().size(folder) == 125 + ENTRY_COUNT
+        walk_elapsed = time.perf_counter() - walk_start
+
+    print(
+        f"PASS: CleanInvalidSeed indexes {TORRENT_COUNT} content paths in {elapsed * 1000:.0f}ms, "
+        f"sizes {ENTRY_COUNT} files in {walk_elapsed * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Regression check for CleanInvalidSeed batched deletion/labeling with a resumable plan.
+
+Run inside the plugin repository:
+    python3 tests/cleaninvalidseed_torrent_actions_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+ACTIONS_FILE = REPO_ROOT / "plugins.v2" / "cleaninvalidseed" / "torrent_actions.py"
+
+TORRENT_COUNT = 950
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("cleaninvalidseed")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_actions_module():
+    install_stubs()
+    module_name = "cleaninvalidseed_torrent_actions"
+    spec = importlib.util.spec_from_file_location(module_name, ACTIONS_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeDownloader:
+    def __init__(self, fail_batches=()):
+        self.calls = []
+        self.fail_batches = set(fail_batches)
+
+    def delete_torrents(self, delete_file, ids):
+        self.calls.append(list(ids))
+        if len(self.calls) in self.fail_batches:
+            raise ConnectionError("downloader unavailable")
+        return True
+
+
+def main():
+    actions = load_actions_module()
+    hashes = [f"{index:040x}" for index in range(TORRENT_COUNT)]
+
+    # 删除按批调用，每批最多ACTION_BATCH_SIZE个hash
+    plan = actions.TorrentActionPlan("qb", actions.ACTION_DELETE)
+    for torrent_hash in hashes:
+        plan.add(torrent_hash)
+    downloader = FakeDownloader()
+    saved = []
+    done, failed = actions.execute_plan(
+        plan, apply=lambda ids, tags: downloader.delete_torrents(False, ids),
+        save=lambda p: saved.append(len(p)), sleep=lambda _: None)
+    batch_count = -(-TORRENT_COUNT // actions.ACTION_BATCH_SIZE)
+    assert len(downloader.calls) == batch_count, len(downloader.calls)
+    assert done == hashes and not failed and not len(plan)
+    assert saved[-1] == 0 and saved[0] == TORRENT_COUNT - actions.ACTION_BATCH_SIZE
+
+    # 失败的批次重试，重试成功不影响结果
+    plan = actions.TorrentActionPlan("qb", actions.ACTION_DELETE, items={h: None for h in hashes[:250]})
+    downloader = FakeDownloader(fail_batches={2})
+    delays = []
+    done, failed = actions.execute_plan(
+        plan, apply=lambda ids, tags: downloader.delete_torrents(False, ids), sleep=delays.append)
+    assert len(done) == 250 and not failed and delays == [actions.ACTION_RETRY_DELAY]
+
+    # 重试仍失败的批次跳过，其它批次继续处理
+    plan = actions.TorrentActionPlan("qb", actions.ACTION_DELETE, items={h: None for h in hashes[:250]})
+    done, failed = actions.execute_plan(plan, apply=lambda ids, tags: ids[0] != hashes[100] and None,
+                                        sleep=lambda _: None)
+    assert failed == hashes[100:200] and len(done) == 150
+
+    # Transmission标记时按标签分组
+    plan = actions.TorrentActionPlan("tr", actions.ACTION_LABEL, "无效做种")
+    plan.add("a", ["无效做种"])
+    plan.add("b", ["movie", "无效做种"])
+    plan.add("c", ["无效做种"])
+    calls = []
+    actions.execute_plan(plan, apply=lambda ids, tags: calls.append((ids, tags)))
+    assert sorted(calls) == [(["a", "c"], ["无效做种"]), (["b"], ["movie", "无效做种"])], calls
+
+    # 保存的计划可以恢复后继续执行
+    interrupted = actions.TorrentActionPlan("qb", actions.ACTION_DELETE, items={h: None for h in hashes[:3]})
+    restored = actions.TorrentActionPlan.from_dict("qb", interrupted.to_dict())
+    assert restored.items == interrupted.items and restored.created == interrupted.created
+    assert actions.TorrentActionPlan.from_dict("qb", {"action": "unknown"}) is None
+    assert actions.TorrentActionPlan.from_dict("qb", None) is None
+
+    print(f"PASS: CleanInvalidSeed deletes {TORRENT_COUNT} torrents in {batch_count} batched calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Regression check for CleanInvalidSeed timeout-protected attribute reads on a shared worker pool.
+
+Run inside the plugin repository:
+    python3 tests/cleaninvalidseed_torrent_fields_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FIELDS_FILE = REPO_ROOT / "plugins.v2" / "cleaninvalidseed" / "torrent_fields.py"
+
+TORRENT_COUNT = 20000
+FIELDS = ("content_path", "downloadDir", "download_dir", "hashString", "trackerStats", "name")
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("cleaninvalidseed")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_fields_module():
+    install_stubs()
+    module_name = "cleaninvalidseed_torrent_fields"
+    spec = importlib.util.spec_from_file_location(module_name, FIELDS_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class TrTorrent:
+    def __init__(self, index):
+        self.hashString = f"{index:040x}"
+        self.downloadDir = "/downloads"
+        self.name = f"torrent-{index}"
+
+    @property
+    def error_string(self):
+        raise KeyError("errorString")
+
+
+class HungTorrent:
+    release = threading.Event()
+
+    @property
+    def name(self):
+        self.release.wait()
+        return "hung"
+
+
+class SlowTorrent:
+    @property
+    def name(self):
+        time.sleep(1)
+        return "slow"
+
+
+def main():
+    fields_module = load_fields_module()
+    resolver = fields_module.FieldResolver()
+
+    started = []
+    original_start = threading.Thread.start
+
+    def counting_start(thread):
+        started.append(thread.name)
+        return original_start(thread)
+
+    threading.Thread.start = counting_start
+    try:
+        torrents = [TrTorrent(index) for index in range(TORRENT_COUNT)]
+        start = time.perf_counter()
+        batch = resolver.fields_many(torrents, FIELDS, timeout=30)
+        elapsed = time.perf_counter() - start
+
+        # 每个种子一次读取全部属性，不存在的属性不出现在结果中
+        assert batch[5] == {"downloadDir": "/downloads", "hashString": f"{5:040x}", "name": "torrent-5"}, batch[5]
+        assert len(batch) == TORRENT_COUNT
+
+        # 单个属性读取兼容原有接口，异常的属性返回默认值
+        for torrent in torrents[:2000]:
+            assert resolver.hasattr(torrent, "downloadDir", timeout=3)
+            assert not resolver.hasattr(torrent, "content_path", timeout=3)
+            assert resolver.getattr(torrent, "error_string", "", timeout=3) == ""
+    finally:
+        threading.Thread.start = original_start
+
+    # 共用线程池，不再为每次属性读取创建线程
+    assert len(started) <= fields_module.FIELD_RESOLVER_WORKERS, started
+
+    # 读取卡住时按截止时间返回，批量读取未完成时抛出异常并带上已读取的部分
+    start = time.perf_counter()
+    assert resolver.fields(SlowTorrent(), ("name",), timeout=0.2) == {}
+    try:
+        resolver.fields_many([SlowTorrent()] * 5, ("name",), timeout=0.5)
+    except fields_module.FieldReadTimeout as e:
+        timed_out = e
+    else:
+        raise AssertionError("fields_many should raise FieldReadTimeout")
+    assert time.perf_counter() - start < 1.5
+    assert len(timed_out.partial) == 5 and timed_out.partial[-1] == {}
+    assert timed_out.done < 5, timed_out.done
+
+    # 卡住的读取占满线程池后，后续读取仍然使用新的线程按时完成
+    hung = fields_module.FieldResolver()
+    for _ in range(fields_module.FIELD_RESOLVER_WORKERS):
+        assert hung.fields(HungTorrent(), ("name",), timeout=0.1) == {}
+    start = time.perf_counter()
+    assert hung.fields(TrTorrent(1), ("name",), timeout=2) == {"name": "torrent-1"}
+    assert hung.hasattr(TrTorrent(2), "downloadDir", timeout=2)
+    assert time.perf_counter() - start < 0.5
+    assert hung.abandoned == fields_module.FIELD_RESOLVER_WORKERS
+    HungTorrent.release.set()
+    hung.shutdown()
+    resolver.shutdown()
+
+    print(
+        f"PASS: CleanInvalidSeed reads {len(FIELDS)} fields of {TORRENT_COUNT} torrents in "
+        f"{elapsed * 1000:.0f}ms using {len(started)} worker threads"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Regression check and benchmark for CleanInvalidSeed bulk tracker collection.
+
+Run inside the plugin repository:
+    python3 tests/cleaninvalidseed_tracker_collector_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+COLLECTOR_FILE = REPO_ROOT / "plugins.v2" / "cleaninvalidseed" / "tracker_collector.py"
+
+TORRENT_COUNT = 5000
+# 模拟一次 torrents/trackers 请求的耗时
+REQUEST_LATENCY = 0.005
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("cleaninvalidseed")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_collector_module():
+    install_stubs()
+    module_name = "cleaninvalidseed_tracker_collector"
+    spec = importlib.util.spec_from_file_location(module_name, COLLECTOR_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class QbTorrent(dict):
+    requests = 0
+    lock = threading.Lock()
+
+    @property
+    def trackers(self):
+        with QbTorrent.lock:
+            QbTorrent.requests += 1
+        time.sleep(REQUEST_LATENCY)
+        return [{"url": "https://tracker.example.com/announce", "status": 4,
+                 "msg": "torrent not registered with this tracker", "tier": 0}]
+
+
+def make_torrents():
+    return [
+        QbTorrent(hash=f"{index:040x}", name=f"torrent-{index}",
+                  tracker="" if index % 20 == 0 else "https://tracker.example.com/announce")
+        for index in range(TORRENT_COUNT)
+    ]
+
+
+def main():
+    collector_module = load_collector_module()
+    torrents = make_torrents()
+    not_working = [torrent for torrent in torrents if not torrent["tracker"]]
+
+    collector = collector_module.TrackerCollector(
+        "qbittorrent",
+        fetch=lambda torrent: list(torrent.trackers),
+        hash_of=lambda torrent: torrent.get("hash"),
+    )
+    start = time.perf_counter()
+    collector.collect(torrents)
+    elapsed = time.perf_counter() - start
+
+    # 只有tracker字段为空的种子单独请求，且并发执行
+    assert QbTorrent.requests == len(not_working), QbTorrent.requests
+    assert collector.from_info == TORRENT_COUNT - len(not_working)
+    assert collector.fetched == len(not_working)
+    sequential = len(not_working) * REQUEST_LATENCY
+    assert elapsed < sequential / 2, (elapsed, sequential)
+
+    working = collector.get(torrents[1])
+    assert working == [{"url": "https://tracker.example.com/announce", "status": 2, "msg": "", "tier": 0}]
+    assert collector.get(not_working[0])[0]["status"] == 4
+
+    # 第二轮筛选命中缓存，不再请求
+    for torrent in not_working:
+        collector.get(torrent)
+    assert QbTorrent.requests == len(not_working)
+    assert "个种子/秒" in collector.summary()
+
+    # Transmission的tracker信息在种子列表中，顺序处理并缓存
+    calls = []
+    tr_collector = collector_module.TrackerCollector(
+        "transmission",
+        fetch=lambda torrent: calls.append(torrent) or [],
+        hash_of=lambda torrent: torrent.hashString,
+    )
+    tr_torrents = [types.SimpleNamespace(hashString=f"tr{index}") for index in range(10)]
+    tr_collector.collect(tr_torrents)
+    tr_collector.collect(tr_torrents)
+    assert len(calls) == 10 and tr_collector.total == 10
+
+    print(
+        f"PASS: CleanInvalidSeed collects trackers for {TORRENT_COUNT} torrents in {elapsed * 1000:.0f}ms "
+        f"({len(not_working)} requests, sequential would take {sequential * 1000:.0f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
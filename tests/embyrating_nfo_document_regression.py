@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Regression check for the EmbyRating parse-once NFO document model.
+
+Run inside the plugin repository:
+    python3 tests/embyrating_nfo_document_regression.py
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.dom import minidom
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DOCUMENT_FILE = REPO_ROOT / "plugins.v2" / "embyrating" / "nfo_document.py"
+
+NFO_CONTENT = """<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<movie>
+
+  <title>流浪地球</title>
+  <year>2019</year>
+  <rating>7.9</rating>
+  <uniqueid type="tmdb">535167</uniqueid>
+  <actor>
+    <name>吴京</name>
+  </actor>
+</movie>
+"""
+SERIALIZE_ROUNDS = 2000
+
+
+def load_document_module():
+    module_name = "embyrating_nfo_document"
+    spec = importlib.util.spec_from_file_location(module_name, DOCUMENT_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    nfo = load_document_module()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        nfo_path = Path(tmp) / "movie.nfo"
+        nfo_path.write_text(NFO_CONTENT, encoding="utf-8")
+        cache = nfo.NfoDocumentCache()
+
+        # 处理一个文件的多个步骤共用一次解析
+        doc = cache.get(nfo_path)
+        for _ in range(5):
+            assert cache.get(nfo_path) is doc
+        assert cache.loads == 1 and cache.hits == 5
+        assert doc.get_text("rating") == "7.9" and doc.emby_text("douban") is None
+
+        # 内容没有变化时不写文件
+        signature = doc.signature
+        doc.set_text("rating", "7.9")
+        assert not doc.dirty and not doc.save()
+        assert doc.signature == signature
+
+        emby_rating = doc.ensure_emby_rating()
+        doc.set_text("tmdb", "7.9", emby_rating)
+        doc.set_text("douban", "8.0", emby_rating)
+        doc.set_text("rating", "8.0")
+        assert doc.dirty and doc.save() and not doc.dirty
+
+        # 写入后缓存仍然有效，格式化输出没有多余的空行
+        assert cache.get(nfo_path) is doc and cache.loads == 1
+        text = nfo_path.read_text(encoding="utf-8")
+        assert text.startswith('<?xml version="1.0" ?>\n<movie>\n  <title>流浪地球</title>'), text
+        assert "\n\n" not in text and "    <douban>8.0</douban>" in text
+        reparsed = nfo.NfoDocument.load(nfo_path)
+        assert reparsed.emby_text("douban") == "8.0" and reparsed.get_text("rating") == "8.0"
+
+        # 文件被外部修改后重新解析
+        nfo_path.write_text(NFO_CONTENT.replace("7.9", "6.5"), encoding="utf-8")
+        os.utime(nfo_path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        assert cache.get(nfo_path).get_text("rating") == "6.5" and cache.loads == 2
+
+        # gbk编码的文件
+        gbk_path = Path(tmp) / "gbk.nfo"
+        gbk_path.write_bytes("<movie><title>无间道</title></movie>".encode("gbk"))
+        gbk_doc = nfo.NfoDocument.load(gbk_path)
+        assert gbk_doc.encoding == "gbk" and gbk_doc.get_text("title") == "无间道"
+
+        broken_path = Path(tmp) / "broken.nfo"
+        broken_path.write_text("<movie><title>", encoding="utf-8")
+        for path in (broken_path, Path(tmp) / "missing.nfo"):
+            try:
+                cache.get(path)
+                raise AssertionError(f"{path} should not load")
+            except nfo.NfoError:
+                pass
+
+        # 删除标签标记为已修改
+        assert doc.remove("rating") and doc.dirty and not doc.remove("rating")
+
+        # 有未保存修改的文档在文件被外部修改后也重新读取，不会用旧内容覆盖
+        dirty = cache.get(nfo_path)
+        dirty.set_text("rating", "1.0")
+        assert dirty.dirty and cache.get(nfo_path) is dirty
+        nfo_path.write_text(NFO_CONTENT.replace("7.9", "9.1"), encoding="utf-8")
+        os.utime(nfo_path, ns=(time.time_ns(), time.time_ns() + 2 * 10 ** 9))
+        rescraped = cache.get(nfo_path)
+        assert rescraped is not dirty and rescraped.get_text("rating") == "9.1" and not rescraped.dirty
+
+        # 处理中断后丢弃未保存的修改，未修改的文档保留
+        rescraped.set_text("rating", "2.0")
+        assert cache.discard_dirty(nfo_path)
+        assert cache.get(nfo_path).get_text("rating") == "9.1"
+        assert not cache.discard_dirty(nfo_path) and not cache.discard_dirty(Path(tmp) / "missing.nfo")
+
+        # 同一路径使用同一把可重入的锁
+        lock = cache.path_lock(nfo_path)
+        assert cache.path_lock(str(nfo_path)) is lock
+        with lock:
+            with cache.path_lock(nfo_path):
+                pass
+
+    root = ET.fromstring(NFO_CONTENT.encode("utf-8"))
+    start = time.perf_counter()
+    for _ in range(SERIALIZE_ROUNDS):
+        nfo.serialize_xml(root)
+    indent_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(SERIALIZE_ROUNDS):
+        minidom.parseString(ET.tostring(root, encoding="unicode")).toprettyxml(indent="  ")
+    minidom_elapsed = time.perf_counter() - start
+    assert indent_elapsed < minidom_elapsed, (indent_elapsed, minidom_elapsed)
+
+    print(
+        f"PASS: EmbyRating parses each NFO once; serializing {SERIALIZE_ROUNDS} documents takes "
+        f"{indent_elapsed * 1000:.0f}ms (minidom {minidom_elapsed * 1000:.0f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Regression check for the EmbyRating incremental library scan index.
+
+Run inside the plugin repository:
+    python3 tests/embyrating_scan_index_regression.py
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+INDEX_FILE = REPO_ROOT / "plugins.v2" / "embyrating" / "scan_index.py"
+
+MOVIE_COUNT = 300
+MEDIA_EXTENSIONS = {".mkv", ".mp4", ".strm"}
+DAY = 24 * 3600
+
+
+def load_index_module():
+    module_name = "embyrating_scan_index"
+    spec = importlib.util.spec_from_file_location(module_name, INDEX_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_library(root: Path):
+    for index in range(MOVIE_COUNT):
+        movie_dir = root / "movies" / f"Movie {index} (2020)"
+        movie_dir.mkdir(parents=True)
+        (movie_dir / f"Movie {index} (2020).mkv").write_bytes(b"")
+        (movie_dir / f"Movie {index} (2020).nfo").write_text("<movie/>", encoding="utf-8")
+        (movie_dir / "poster.jpg").write_bytes(b"")
+    season = root / "tv" / "Show" / "Season 1"
+    season.mkdir(parents=True)
+    (root / "tv" / "Show" / "tvshow.nfo").write_text("<tvshow/>", encoding="utf-8")
+    for episode in range(1, 4):
+        (season / f"Show S01E0{episode}.mkv").write_bytes(b"")
+
+
+def scan(module, db_path, root):
+    with module.ScanIndex(db_path, MEDIA_EXTENSIONS) as index:
+        listings = list(index.walk(root))
+        index.prune(root)
+        return index.dirs_scanned, index.dirs_reused, listings
+
+
+def main():
+    module = load_index_module()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        db_path = Path(tmp) / module.SCAN_INDEX_FILE
+        make_library(root)
+
+        start = time.perf_counter()
+        scanned, reused, listings = scan(module, db_path, root)
+        first_elapsed = time.perf_counter() - start
+        dir_count = len(listings)
+        assert scanned == dir_count and reused == 0
+        # 上级目录先于子目录返回
+        order = [listing.path for listing in listings]
+        assert order.index(str(root / "tv" / "Show")) < order.index(str(root / "tv" / "Show" / "Season 1"))
+        show = next(listing for listing in listings if listing.path == str(root / "tv" / "Show"))
+        assert show.nfo == ["tvshow.nfo"] and show.dirs == ["Season 1"]
+        movie = next(listing for listing in listings if listing.path.endswith("Movie 7 (2020)"))
+        assert movie.media == ["Movie 7 (2020).mkv"] and movie.nfo == ["Movie 7 (2020).nfo"] and movie.files == 3
+
+        # 第二次扫描不再读取未变化的目录
+        start = time.perf_counter()
+        scanned, reused, listings = scan(module, db_path, root)
+        second_elapsed = time.perf_counter() - start
+        assert scanned == 0 and reused == dir_count, (scanned, reused)
+        assert [listing.path for listing in listings] == order
+
+        # 新增文件的目录重新读取
+        new_movie = root / "movies" / "Movie 7 (2020)" / "Movie 7 (2020) - extra.mp4"
+        new_movie.write_bytes(b"")
+        scanned, reused, listings = scan(module, db_path, root)
+        assert scanned == 1 and reused == dir_count - 1
+        movie = next(listing for listing in listings if listing.path.endswith("Movie 7 (2020)"))
+        assert not movie.cached and "Movie 7 (2020) - extra.mp4" in movie.media
+
+        # NFO文件状态
+        nfo_path = str(root / "movies" / "Movie 1 (2020)" / "Movie 1 (2020).nfo")
+        now = time.time()
+        with module.ScanIndex(db_path, MEDIA_EXTENSIONS) as index:
+            assert not index.is_up_to_date(nfo_path, os.stat(nfo_path), "douban", 7 * DAY)
+            index.record_nfo(nfo_path, "douban", now - 3 * DAY)
+            stat = os.stat(nfo_path)
+            assert index.is_up_to_date(nfo_path, stat, "douban", 7 * DAY, now=now)
+            # 超过更新间隔
+            assert not index.is_up_to_date(nfo_path, stat, "douban", 2 * DAY, now=now)
+            # 评分源变化
+            assert not index.is_up_to_date(nfo_path, stat, "tmdb", 7 * DAY, now=now)
+            index.record_nfo(nfo_path, "tmdb", now - 365 * DAY)
+            assert index.is_up_to_date(nfo_path, os.stat(nfo_path), "tmdb", 7 * DAY, now=now)
+
+        # 文件被修改后重新处理
+        Path(nfo_path).write_text("<movie><title>changed</title></movie>", encoding="utf-8")
+        with module.ScanIndex(db_path, MEDIA_EXTENSIONS) as index:
+            assert not index.is_up_to_date(nfo_path, os.stat(nfo_path), "tmdb", 7 * DAY, now=now)
+            index.record_nfo(nfo_path, "tmdb", now)
+            list(index.walk(root))
+            # 本次扫描未遇到的NFO记录在完整扫描后清理
+            other_nfo = str(root / "movies" / "Movie 2 (2020)" / "Movie 2 (2020).nfo")
+            index.record_nfo(other_nfo, "tmdb", now)
+            index._seen_nfos.discard(other_nfo)
+            assert index.prune(root) == 1
+            assert index.nfo_state(other_nfo) is None and index.nfo_state(nfo_path) is not None
+
+        # 已删除的目录从索引中清理，本次扫描未检查的NFO记录一并清理
+        removed = root / "movies" / "Movie 3 (2020)"
+        for child in removed.iterdir():
+            child.unlink()
+        removed.rmdir()
+        with module.ScanIndex(db_path, MEDIA_EXTENSIONS) as index:
+            list(index.walk(root))
+            assert index.prune(root) == 2
+            assert all(listing.path != str(removed) for listing in index.walk(root))
+
+    print(
+        f"PASS: EmbyRating rescans {dir_count} unchanged directories from the index in {second_elapsed * 1000:.0f}ms "
+        f"(full scan {first_elapsed * 1000:.0f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Regression check for MCPServer event store batching, replay and memory budgets.
+
+Run inside the plugin repository:
+    python3 tests/mcpserver_event_store_regression.py
+"""
+
+import asyncio
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import types
+import uuid
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EVENT_STORE_FILE = REPO_ROOT / "plugins.v2" / "mcpserver" / "event_store.py"
+
+BENCH_EVENTS = 500
+BENCH_STREAMS = 5
+
+
+class EventStore:
+    pass
+
+
+class EventMessage:
+    def __init__(self, message, event_id):
+        self.message = message
+        self.event_id = event_id
+
+
+class _Root:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def model_dump(self):
+        return self.payload
+
+
+class JSONRPCMessage:
+    def __init__(self, payload):
+        self.root = _Root(payload)
+
+    @classmethod
+    def model_validate(cls, payload):
+        return cls(payload)
+
+
+def install_import_stubs():
+    mcp = types.ModuleType("mcp")
+    mcp_server = types.ModuleType("mcp.server")
+    streamable_http = types.ModuleType("mcp.server.streamable_http")
+    streamable_http.EventCallback = object
+    streamable_http.EventId = str
+    streamable_http.EventMessage = EventMessage
+    streamable_http.EventStore = EventStore
+    streamable_http.StreamId = str
+    mcp_types = types.ModuleType("mcp.types")
+    mcp_types.JSONRPCMessage = JSONRPCMessage
+
+    sys.modules.update(
+        {
+            "mcp": mcp,
+            "mcp.server": mcp_server,
+            "mcp.server.streamable_http": streamable_http,
+            "mcp.types": mcp_types,
+        }
+    )
+
+
+def load_event_store_module():
+    install_import_stubs()
+    module_name = "event_store"
+    spec = importlib.util.spec_from_file_location(module_name, EVENT_STORE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+async def check_sqlite_store(event_store, db_path):
+    store = event_store.SQLiteEventStore(
+        db_path=str(db_path),
+        max_events_per_stream=20,
+        flush_interval_ms=0,
+    )
+    await store.start_cleanup()
+
+    event_ids = []
+    for index in range(50):
+        event_ids.append(
+            await store.store_event("stream-a", JSONRPCMessage({"index": index}))
+        )
+    await store.store_event("stream-b", None)
+
+    replayed = []
+
+    async def collect(event_message):
+        replayed.append(event_message.message.root.payload["index"])
+
+    # 同一秒内写入的事件也必须按顺序完整回放，回放前需先写入缓冲中的事件
+    stream_id = await store.replay_events_after(event_ids[45], collect)
+    assert stream_id == "stream-a", stream_id
+    assert replayed == [46, 47, 48, 49], replayed
+
+    # 跨多个分页回放
+    store.REPLAY_CHUNK_SIZE = 3
+    replayed.clear()
+    await store.replay_events_after(event_ids[39], collect)
+    assert replayed == list(range(40, 50)), replayed
+
+    # 已被裁剪或格式错误的事件ID
+    assert await store.replay_events_after(event_ids[0], collect) is None
+    assert await store.replay_events_after("not-an-id", collect) is None
+
+    await store.close()
+
+    with sqlite3.connect(db_path) as conn:
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        count_a = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE stream_id = 'stream-a'"
+        ).fetchone()[0]
+        count_b = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE stream_id = 'stream-b'"
+        ).fetchone()[0]
+
+    assert journal_mode == "wal", journal_mode
+    # 裁剪是按插入次数摊销的，允许略多于上限，但不能无限增长
+    assert 20 <= count_a < 20 + store._prune_every, count_a
+    assert count_b == 1, count_b
+
+    # 重启后同一个流的序号继续递增
+    store = event_store.SQLiteEventStore(db_path=str(db_path), flush_interval_ms=0)
+    next_id = await store.store_event("stream-a", JSONRPCMessage({"index": 50}))
+    assert next_id == "stream-a:51", next_id
+    await store.close()
+
+
+async def check_memory_store(event_store):
+    store = event_store.InMemoryEventStore(
+        max_events_per_stream=10,
+        max_bytes_per_stream=400,
+        max_total_bytes=600,
+    )
+
+    event_ids = []
+    for index in range(15):
+        event_ids.append(
+            await store.store_event("stream-a", JSONRPCMessage({"index": index}))
+        )
+
+    replayed = []
+
+    async def collect(event_message):
+        replayed.append(event_message.message.root.payload["index"])
+
+    assert await store.replay_events_after(event_ids[12], collect) == "stream-a"
+    assert replayed == [13, 14], replayed
+    # 按条数淘汰的事件已无法定位
+    assert await store.replay_events_after(event_ids[2], collect) is None
+
+    # 单个流超过字节预算时淘汰旧事件
+    big = JSONRPCMessage({"data": "x" * 150})
+    for _ in range(3):
+        await store.store_event("stream-b", big)
+    assert store.streams["stream-b"].bytes <= 400, store.streams["stream-b"].bytes
+
+    # 超过全局预算时先淘汰最久未使用的流
+    for _ in range(3):
+        await store.store_event("stream-c", big)
+    stats = store.get_stats()
+    assert stats["bytes"] <= 600, stats
+    assert "stream-a" not in store.streams, list(store.streams)
+    assert stats["evictions"]["count"] == 5, stats
+    assert stats["evictions"]["stream_bytes"] > 0, stats
+    assert stats["evictions"]["total_bytes"] > 0, stats
+
+    # 空闲流过期
+    store.stream_idle_seconds = 0
+    store._last_expire_check = 0
+    await store.store_event("stream-d", None)
+    assert list(store.streams) == ["stream-d"], list(store.streams)
+    assert store.get_stats()["expired_streams"] == 2, store.get_stats()
+
+
+async def check_conflicting_row(event_store, db_path):
+    store = event_store.SQLiteEventStore(db_path=str(db_path), flush_interval_ms=0)
+    await store.store_event("stream-x", JSONRPCMessage({"index": 1}))
+    await store.flush()
+
+    # 另一个进程已写入了同一序号，整批写入会因主键冲突失败
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO events (stream_id, seq, message) VALUES ('stream-x', 2, 'null')")
+    for index in (2, 3, 4):
+        await store.store_event("stream-x", JSONRPCMessage({"index": index}))
+    await store.flush()
+    assert store.get_stats()["dropped_events"] == 1, store.get_stats()
+    await store.close()
+
+    with sqlite3.connect(db_path) as conn:
+        seqs = [row[0] for row in conn.execute("SELECT seq FROM events WHERE stream_id = 'stream-x' ORDER BY seq")]
+    # 只丢弃冲突的事件，同一批的其他事件照常写入
+    assert seqs == [1, 2, 3, 4], seqs
+
+
+async def check_evicted_stream_seq(event_store, db_path):
+    # 写入间隔足够长，事件都留在缓冲中
+    store = event_store.SQLiteEventStore(db_path=str(db_path), flush_interval_ms=60000)
+    store.MAX_TRACKED_STREAMS = 1
+    await store.store_event("stream-a", JSONRPCMessage({"index": 1}))
+    await store.store_event("stream-a", JSONRPCMessage({"index": 2}))
+    # stream-b挤出了stream-a的序号，此时stream-a的事件尚未落盘
+    await store.store_event("stream-b", None)
+    assert "stream-a" not in store._stream_seq
+    next_id = await store.store_event("stream-a", JSONRPCMessage({"index": 3}))
+    assert next_id == "stream-a:3", next_id
+    await store.flush()
+    assert store.get_stats()["dropped_events"] == 0, store.get_stats()
+    await store.close()
+
+    with sqlite3.connect(db_path) as conn:
+        seqs = [row[0] for row in conn.execute("SELECT seq FROM events WHERE stream_id = 'stream-a' ORDER BY seq")]
+    assert seqs == [1, 2, 3], seqs
+
+
+async def legacy_events_per_second(db_path):
+    """原实现：每个事件新建连接，插入后COUNT并裁剪，提交后检查数据库大小"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE events (event_id TEXT PRIMARY KEY, stream_id TEXT NOT NULL, "
+                     "message TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("CREATE INDEX idx_stream_id ON events(stream_id)")
+
+    def db_store(stream_id, message_str):
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO events (event_id, stream_id, message) VALUES (?, ?, ?)",
+                         (str(uuid.uuid4()), stream_id, message_str))
+            count = conn.execute("SELECT COUNT(*) FROM events WHERE stream_id = ?", (stream_id,)).fetchone()[0]
+            if count > 100:
+                conn.execute("DELETE FROM events WHERE event_id IN (SELECT event_id FROM events "
+                             "WHERE stream_id = ? ORDER BY created_at LIMIT ?)", (stream_id, count - 100))
+            conn.commit()
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    for index in range(BENCH_EVENTS):
+        await loop.run_in_executor(None, db_store, f"stream-{index % BENCH_STREAMS}", f'{{"index": {index}}}')
+        os.path.getsize(db_path)
+    return BENCH_EVENTS / (time.perf_counter() - start)
+
+
+async def batched_events_per_second(event_store, db_path):
+    store = event_store.SQLiteEventStore(db_path=str(db_path))
+    start = time.perf_counter()
+    for index in range(BENCH_EVENTS):
+        await store.store_event(f"stream-{index % BENCH_STREAMS}", JSONRPCMessage({"index": index}))
+    await store.flush()
+    elapsed = time.perf_counter() - start
+    await store.close()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == BENCH_EVENTS
+    return BENCH_EVENTS / elapsed
+
+
+def check_legacy_schema_migration(event_store, db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE events (event_id TEXT PRIMARY KEY, stream_id TEXT NOT NULL, "
+            "message TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO events VALUES ('uuid', 'stream', 'null', NULL)")
+
+    event_store.SQLiteEventStore(db_path=str(db_path))
+    with sqlite3.connect(db_path) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(events)")]
+    assert "seq" in columns, columns
+
+
+def main():
+    event_store = load_event_store_module()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        asyncio.run(check_sqlite_store(event_store, Path(temp_dir) / "events.db"))
+        asyncio.run(check_conflicting_row(event_store, Path(temp_dir) / "conflict.db"))
+        asyncio.run(check_evicted_stream_seq(event_store, Path(temp_dir) / "evicted.db"))
+        check_legacy_schema_migration(event_store, Path(temp_dir) / "legacy.db")
+        legacy_rate = asyncio.run(legacy_events_per_second(Path(temp_dir) / "bench-legacy.db"))
+        batched_rate = asyncio.run(batched_events_per_second(event_store, Path(temp_dir) / "bench-batched.db"))
+    asyncio.run(check_memory_store(event_store))
+
+    # 批量写入至少比逐条连接提交快一倍
+    assert batched_rate > legacy_rate * 2, (legacy_rate, batched_rate)
+
+    print(
+        "PASS: MCPServer event stores replay by sequence within their budgets; "
+        f"SQLite writes {batched_rate:.0f} events/s batched vs {legacy_rate:.0f} events/s per-event"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Regression check for MCPServer per-site fan-out search: timeouts, dedup precedence and progress.
+
+Run inside the plugin repository:
+    python3 tests/mcpserver_fan_out_search_regression.py
+"""
+
+import asyncio
+import importlib.util
+import sys
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DOWNLOAD_FILE = (
+    REPO_ROOT / "plugins.v2" / "mcpserver" / "tools" / "media" / "download.py"
+)
+
+SITE_TIMEOUT = 0.2
+
+
+class BaseTool:
+    def __init__(self, token_manager=None):
+        self.token_manager = token_manager
+
+
+class TextContent:
+    def __init__(self, type, text=None, **kwargs):
+        self.type = type
+        self.text = text
+
+
+class MediaRecognizeTool:
+    def __init__(self, token_manager=None):
+        self.token_manager = token_manager
+
+
+class ResourceCache:
+    def get_site_name(self, site_id):
+        return f"站点{site_id}"
+
+
+def install_import_stubs():
+    mcp = types.ModuleType("mcp")
+    mcp_types = types.ModuleType("mcp.types")
+    mcp_types.TextContent = TextContent
+    mcp_types.ImageContent = TextContent
+    mcp_types.Tool = object
+    mcp.types = mcp_types
+
+    packages = {}
+    for name in ("mcpserver", "mcpserver.tools", "mcpserver.tools.media"):
+        package = types.ModuleType(name)
+        package.__path__ = []
+        packages[name] = package
+
+    base = types.ModuleType("mcpserver.tools.base")
+    base.BaseTool = BaseTool
+
+    recognize = types.ModuleType("mcpserver.tools.media.recognize")
+    recognize.MediaRecognizeTool = MediaRecognizeTool
+
+    resource_cache_module = types.ModuleType("mcpserver.tools.resource_cache")
+    resource_cache_module.resource_cache = ResourceCache()
+
+    sys.modules.update(
+        {
+            "mcp": mcp,
+            "mcp.types": mcp_types,
+            **packages,
+            "mcpserver.tools.base": base,
+            "mcpserver.tools.media.recognize": recognize,
+            "mcpserver.tools.resource_cache": resource_cache_module,
+        }
+    )
+
+
+def load_download_module():
+    module_name = "mcpserver.tools.media.download"
+    spec = importlib.util.spec_from_file_location(module_name, DOWNLOAD_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def torrent(title, seeders, size=None, info_hash=None, enclosure=None):
+    info = {"title": title, "seeders": seeders, "size": size,
+            "enclosure": enclosure or f"https://pt.example/{title}/{seeders}"}
+    if info_hash:
+        info["hash"] = info_hash
+    return {"torrent_info": info}
+
+
+class FakeSites:
+    """按站点ID返回结果的假搜索接口，站点3一直挂起"""
+
+    def __init__(self):
+        self.requests = []
+        self.cancelled = []
+
+    async def request(self, method, endpoint, params):
+        site_id = params["sites"]
+        self.requests.append((endpoint, dict(params)))
+        if site_id == "1":
+            return {"success": True, "data": [
+                torrent("Hash Release", 5, size=100, info_hash="ABCDEF"),
+                torrent("Movie.2024.1080p", 3, size=2000),
+                torrent("No Size", 1, enclosure="https://pt.example/shared"),
+            ]}
+        if site_id == "2":
+            await asyncio.sleep(0.05)
+            return {"success": True, "data": [
+                # info-hash相同（大小写不同），标题不同，做种更多，替换站点1的资源
+                torrent("Renamed Release", 9, size=999, info_hash="abcdef"),
+                # 标题规范化后相同且大小相同，做种更少，保留站点1的资源
+                torrent("movie 2024 1080p", 1, size=2000),
+                # 标题和大小与上一条相同但有info-hash，按hash区分为不同资源
+                torrent("Movie.2024.1080p", 4, size=2000, info_hash="123456"),
+                # 没有大小时按下载链接去重
+                torrent("No Size Mirror", 7, enclosure="https://pt.example/shared"),
+            ]}
+        if site_id == "3":
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                self.cancelled.append(site_id)
+                raise
+        if site_id == "4":
+            raise ConnectionError("connection reset")
+        return {"success": False, "message": "cookie expired"}
+
+
+async def run_fan_out(download):
+    tool = download.MovieDownloadTool()
+    sites = FakeSites()
+    progress = []
+
+    async def ensure_site_mapping():
+        return None
+
+    async def send_progress(progress_value, total=None, message=None):
+        progress.append((progress_value, total, message))
+        return True
+
+    tool._ensure_site_mapping = ensure_site_mapping
+    tool._make_request = sites.request
+    tool._send_progress = send_progress
+
+    start = time.perf_counter()
+    torrents, summary = await tool._fan_out_search(
+        "/api/v1/search/media/tmdb:1", {"mtype": "电影", "sites": "1,2,3,4,5"},
+        ["1", "2", "3", "4", "5"], SITE_TIMEOUT)
+    elapsed = time.perf_counter() - start
+    return tool, sites, progress, torrents, summary, elapsed
+
+
+def main():
+    install_import_stubs()
+    download = load_download_module()
+    tool, sites, progress, torrents, summary, elapsed = asyncio.run(run_fan_out(download))
+
+    # 每个站点单独请求，挂起的站点按超时结束并被取消，不拖住整个调用
+    assert sorted(params["sites"] for _, params in sites.requests) == ["1", "2", "3", "4", "5"]
+    assert all(params["mtype"] == "电影" for _, params in sites.requests)
+    assert SITE_TIMEOUT <= elapsed < 1, elapsed
+    assert sites.cancelled == ["3"], sites.cancelled
+    assert summary["succeeded"] == ["站点1", "站点2"], summary
+    assert summary["timed_out"] == ["站点3"], summary
+    assert summary["failed"] == {"站点4": "connection reset", "站点5": "cookie expired"}, summary
+
+    # 去重顺序：info-hash > 规范化标题+大小 > 下载链接，重复时保留做种数多的
+    titles = [(t["torrent_info"]["title"], t["torrent_info"]["seeders"]) for t in torrents]
+    assert titles == [
+        ("Renamed Release", 9),
+        ("No Size Mirror", 7),
+        ("Movie.2024.1080p", 4),
+        ("Movie.2024.1080p", 3),
+    ], titles
+    assert summary["duplicates"] == 3, summary
+
+    # 每个站点完成时推送一次进度，包含新增资源预览
+    assert [(value, total) for value, total, _ in progress] == [(i, 5) for i in range(1, 6)], progress
+    by_site = {}
+    for value, _, message in progress:
+        assert message.startswith(f"[{value}/5] 站点 "), message
+        by_site[message.split(" ")[2]] = message
+    assert "新增 3 个资源" in by_site["站点1"] and " - Hash Release (做种: 5)" in by_site["站点1"], by_site
+    assert "新增 1 个资源" in by_site["站点2"] and " - Movie.2024.1080p (做种: 4)" in by_site["站点2"], by_site
+    assert all("新增 0 个资源" in by_site[name] for name in ("站点3", "站点4", "站点5")), by_site
+    # 挂起的站点最后完成
+    assert progress[-1][2].startswith("[5/5] 站点 站点3"), progress[-1][2]
+
+    text = tool._format_fan_out_summary(summary)
+    assert "合并重复资源 3 个" in text and "超时站点: 站点3" in text, text
+
+    print(
+        f"PASS: MCPServer fan-out search merges {len(torrents)} resources from 5 sites in "
+        f"{elapsed * 1000:.0f}ms with a {SITE_TIMEOUT * 1000:.0f}ms per-site timeout"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Regression check for MCPServer cross-process JSON updates of plugin_tools.json.
+
+Run inside the plugin repository:
+    python3 tests/mcpserver_plugin_file_lock_regression.py
+"""
+
+import importlib.util
+import multiprocessing
+import sys
+import tempfile
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FILE_OPERATIONS_FILE = (
+    REPO_ROOT / "plugins.v2" / "mcpserver" / "utils" / "file_operations.py"
+)
+
+
+def load_file_operations():
+    module_name = "mcpserver_file_operations"
+    spec = importlib.util.spec_from_file_location(module_name, FILE_OPERATIONS_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def register_tools(tools_file, worker_id, count):
+    file_operations = load_file_operations()
+    for index in range(count):
+        plugin_id = f"plugin_{worker_id}_{index}"
+
+        def update(existing, plugin_id=plugin_id):
+            existing[plugin_id] = {"tools": [{"name": plugin_id}]}
+            return existing
+
+        assert file_operations.atomic_update_json(tools_file, update, default_value={})
+
+
+def main():
+    file_operations = load_file_operations()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tools_file = Path(temp_dir) / "plugin_tools.json"
+        assert file_operations.read_generation(tools_file) == 0
+
+        # 多个进程同时注册，不能丢失任何一次更新
+        workers = [
+            multiprocessing.Process(target=register_tools, args=(tools_file, worker_id, 10))
+            for worker_id in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0, worker.exitcode
+
+        generation, data = file_operations.read_json_with_generation(tools_file)
+        if file_operations.FCNTL_AVAILABLE:
+            assert len(data) == 40, len(data)
+            assert generation == 40, generation
+
+        # 内容未变化时跳过写入，代数保持不变
+        before = file_operations.read_generation(tools_file)
+        mtime = tools_file.stat().st_mtime_ns
+        assert file_operations.atomic_update_json(tools_file, lambda existing: existing)
+        assert file_operations.read_generation(tools_file) == before
+        assert tools_file.stat().st_mtime_ns == mtime
+
+    print("PASS: MCPServer plugin file updates are locked across processes and versioned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Regression check for the MCPServer resource cache LRU/TTL and SQLite persistence.
+
+Run inside the plugin repository:
+    python3 tests/mcpserver_resource_cache_regression.py
+"""
+
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESOURCE_CACHE_FILE = REPO_ROOT / "plugins.v2" / "mcpserver" / "tools" / "resource_cache.py"
+
+
+def load_resource_cache_module(name, clock):
+    """每次加载得到新的单例，模拟MCP服务器重启"""
+    spec = importlib.util.spec_from_file_location(name, RESOURCE_CACHE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    module.time = types.SimpleNamespace(time=lambda: clock[0])
+    return module
+
+
+def torrent(index, **extra):
+    info = {"title": f"Movie {index} 2160p", "enclosure": f"https://pt.example/download/{index}",
+            "page_url": f"https://pt.example/details/{index}", "site": 1, "site_name": "Example",
+            "size": 1000 + index, "seeders": 10}
+    info.update(extra)
+    return info
+
+
+def check_lru_and_ttl(clock):
+    cache = load_resource_cache_module("resource_cache_memory", clock).resource_cache
+    cache._max_cache_size = 3
+    cache._cache_ttl = 100
+
+    ids = {}
+    for index in range(3):
+        ids[index] = cache.generate_resource_id(torrent(index))
+        assert cache.store_resource(ids[index], torrent(index))
+    # 访问后移到队尾，淘汰最久未使用的条目
+    assert cache.get_torrent_url(ids[0]) == "https://pt.example/download/0"
+    ids[3] = cache.generate_resource_id(torrent(3))
+    cache.store_resource(ids[3], torrent(3))
+    assert list(cache._cache) == [ids[2], ids[0], ids[3]], list(cache._cache)
+    assert cache.get_torrent_url(ids[1]) is None
+    assert cache.get_cache_stats()["evictions"] == 1
+
+    # 过期条目在访问时移除
+    clock[0] += 60
+    ids[4] = cache.generate_resource_id(torrent(4))
+    cache.store_resource(ids[4], torrent(4))
+    clock[0] += 50
+    assert cache.get_torrent_url(ids[0]) is None
+    assert ids[0] not in cache._cache
+    assert cache.get_resource_info(ids[4])["title"] == "Movie 4 2160p"
+    # 写入时淘汰队首的过期条目
+    ids[5] = cache.generate_resource_id(torrent(5))
+    cache.store_resource(ids[5], torrent(5))
+    assert list(cache._cache) == [ids[4], ids[5]], list(cache._cache)
+
+    stats = cache.get_cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2, stats
+
+
+def check_persistence(clock, db_path):
+    first = load_resource_cache_module("resource_cache_first", clock).resource_cache
+    assert first.enable_persistence(db_path)
+    resource_id = first.generate_resource_id(torrent(7))
+    # 做种数等易变字段不影响ID
+    assert first.generate_resource_id(torrent(7, seeders=99, peers=3)) == resource_id
+    assert first.generate_resource_id(torrent(8)) != resource_id
+    first.store_resource(resource_id, torrent(7))
+    expired_id = first.generate_resource_id(torrent(9))
+    first.store_resource(expired_id, torrent(9))
+    first.close()
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE resources SET created_at = created_at - 7200 WHERE resource_id = ?", (expired_id,))
+
+    # 重启后同一个资源得到相同的ID，并从数据库读取
+    second = load_resource_cache_module("resource_cache_second", clock).resource_cache
+    assert second is not first and not second._cache
+    assert second.enable_persistence(db_path)
+    assert second.generate_resource_id(torrent(7)) == resource_id
+    assert second.get_torrent_url(resource_id) == "https://pt.example/download/7"
+    assert second.get_resource_info(resource_id)["torrent_info"]["size"] == 1007
+    assert resource_id in second._cache
+    stats = second.get_cache_stats()
+    assert stats["disk_hits"] == 1 and stats["persistent"], stats
+
+    # 启用时清理数据库中过期的条目
+    assert second.get_torrent_url(expired_id) is None
+    with sqlite3.connect(db_path) as conn:
+        remaining = [row[0] for row in conn.execute("SELECT resource_id FROM resources")]
+    assert remaining == [resource_id], remaining
+
+    second.clear_cache()
+    assert second.get_torrent_url(resource_id) is None
+    second.close()
+
+
+def main():
+    clock = [1_700_000_000.0]
+    check_lru_and_ttl(clock)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        check_persistence(clock, str(Path(temp_dir) / "resource_cache.db"))
+
+    print("PASS: MCPServer resource cache evicts by LRU/TTL and reloads stable IDs from resource_cache.db")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Regression check for MCPServer API response caching, invalidation and request coalescing.
+
+Run inside the plugin repository:
+    python3 tests/mcpserver_response_cache_regression.py
+"""
+
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESPONSE_CACHE_FILE = REPO_ROOT / "plugins.v2" / "mcpserver" / "utils" / "response_cache.py"
+
+
+def load_response_cache_module():
+    spec = importlib.util.spec_from_file_location("mcpserver_response_cache", RESPONSE_CACHE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeApi:
+    """记录请求次数的假接口，可以让请求停在 release 事件上"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    def sender(self, payload):
+        async def send():
+            self.calls += 1
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return payload
+        return send
+
+
+async def check_cache_and_invalidation(module):
+    cache = module.ResponseCache(endpoint_ttls={"/api/v1/site/": 300, "/api/v1/subscribe/": 300})
+    api = FakeApi()
+
+    first = await cache.fetch("GET", "/api/v1/site/", "token-a", None, api.sender({"sites": [1]}))
+    first["sites"].append(2)
+    second = await cache.fetch("GET", "/api/v1/site/", "token-a", None, api.sender({"sites": [9]}))
+    # 命中缓存，返回副本
+    assert second == {"sites": [1]}, second
+    assert api.calls == 1
+
+    # 认证身份和参数不同的请求不共用缓存
+    await cache.fetch("GET", "/api/v1/site/", "token-b", None, api.sender({"sites": []}))
+    await cache.fetch("GET", "/api/v1/site/", "token-a", {"page": 2}, api.sender({"sites": []}))
+    assert api.calls == 3
+
+    # 未配置的端点和错误响应不缓存
+    await cache.fetch("GET", "/api/v1/other", "token-a", None, api.sender({}))
+    await cache.fetch("GET", "/api/v1/other", "token-a", None, api.sender({}))
+    await cache.fetch("GET", "/api/v1/subscribe/", "token-a", None, api.sender({"error": "boom"}))
+    await cache.fetch("GET", "/api/v1/subscribe/", "token-a", None, api.sender({"error": "boom"}))
+    assert api.calls == 7
+
+    # 修改请求使同一资源分组的缓存失效
+    await cache.fetch("GET", "/api/v1/subscribe/", "token-a", None, api.sender({"subscribes": [1]}))
+    await cache.fetch("DELETE", "/api/v1/subscribe/12", "token-a", None, api.sender({"success": True}))
+    fresh = await cache.fetch("GET", "/api/v1/subscribe/", "token-a", None, api.sender({"subscribes": []}))
+    assert fresh == {"subscribes": []}, fresh
+    assert api.calls == 10
+    # 站点缓存不受影响
+    assert await cache.fetch("GET", "/api/v1/site/", "token-a", None, api.sender({})) == {"sites": [1]}
+    assert api.calls == 10
+
+    # 请求期间发生失效时结果不写入缓存
+    cache.invalidate("/api/v1/subscribe/")
+    api.release.clear()
+    pending = asyncio.ensure_future(
+        cache.fetch("GET", "/api/v1/subscribe/", "token-a", None, api.sender({"subscribes": ["stale"]})))
+    await asyncio.sleep(0)
+    cache.invalidate("/api/v1/subscribe/3")
+    api.release.set()
+    assert await pending == {"subscribes": ["stale"]}
+    await cache.fetch("GET", "/api/v1/subscribe/", "token-a", None, api.sender({"subscribes": []}))
+    assert api.calls == 12
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2 and stats["inflight"] == 0, stats
+
+
+async def check_single_flight(module):
+    cache = module.ResponseCache(endpoint_ttls={"/api/v1/site/": 300})
+    api = FakeApi()
+    api.release.clear()
+
+    waiters = [asyncio.ensure_future(cache.fetch("GET", "/api/v1/site/", "token", None, api.sender({"sites": [1]})))
+               for _ in range(5)]
+    await asyncio.sleep(0.01)
+    assert api.calls == 1 and cache.get_stats()["inflight"] == 1
+    api.release.set()
+    results = await asyncio.gather(*waiters)
+    assert all(result == {"sites": [1]} for result in results), results
+    # 每个等待者拿到独立的副本
+    results[0]["sites"].append(2)
+    assert results[1] == {"sites": [1]}
+    stats = cache.get_stats()
+    assert stats["coalesced"] == 4 and stats["misses"] == 1 and stats["inflight"] == 0, stats
+
+    # 共享请求失败时所有等待者收到同一个异常，且不缓存
+    async def failing():
+        api.calls += 1
+        await asyncio.sleep(0.01)
+        raise ConnectionError("down")
+
+    failed = await asyncio.gather(*[cache.fetch("GET", "/api/v1/site/", "other", None, failing)
+                                    for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(error, ConnectionError) for error in failed), failed
+    assert cache.get_stats()["inflight"] == 0
+
+
+async def check_leader_cancel(module):
+    cache = module.ResponseCache(endpoint_ttls={"/api/v1/site/": 300})
+    api = FakeApi()
+    api.release.clear()
+
+    leader = asyncio.ensure_future(cache.fetch("GET", "/api/v1/site/", "token", None, api.sender({"sites": [1]})))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(cache.fetch("GET", "/api/v1/site/", "token", None, api.sender({})))
+                 for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    # 发起请求的调用方被取消（如客户端断开），等待中的其他调用方照常拿到结果
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    assert leader.cancelled()
+    assert api.cancelled == 0
+    api.release.set()
+    results = await asyncio.gather(*followers)
+    assert all(result == {"sites": [1]} for result in results), results
+    assert api.calls == 1
+
+    # 请求完成后即使发起者已取消，结果也会写入缓存
+    assert await cache.fetch("GET", "/api/v1/site/", "token", None, api.sender({})) == {"sites": [1]}
+    assert api.calls == 1
+
+    # 跟随者被取消不影响发起者
+    api.release.clear()
+    leader = asyncio.ensure_future(cache.fetch("GET", "/api/v1/site/", "other", None, api.sender({"sites": [2]})))
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(cache.fetch("GET", "/api/v1/site/", "other", None, api.sender({})))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+    await asyncio.sleep(0.01)
+    api.release.set()
+    assert await leader == {"sites": [2]}
+    assert follower.cancelled() and api.cancelled == 0
+
+
+async def run_checks():
+    module = load_response_cache_module()
+    await check_cache_and_invalidation(module)
+    await check_single_flight(module)
+    await check_leader_cancel(module)
+
+
+def main():
+    asyncio.run(run_checks())
+    print("PASS: MCPServer response cache coalesces requests and survives leader cancellation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Regression check for MCPServer request tracing: ring buffer, summaries and the /traces payloads.
+
+Run inside the plugin repository:
+    python3 tests/mcpserver_tracing_regression.py
+"""
+
+import asyncio
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+TRACING_FILE = REPO_ROOT / "plugins.v2" / "mcpserver" / "utils" / "tracing.py"
+
+
+def load_tracing_module():
+    module_name = "mcpserver_tracing"
+    spec = importlib.util.spec_from_file_location(module_name, TRACING_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def check_ring_buffer(tracing):
+    tracer = tracing.Tracer(capacity=5)
+    # 未启用时返回共享的空span，不写入缓冲区
+    assert tracer.span("tool", "noop") is tracer.span("http", "noop")
+    with tracer.span("tool", "noop") as span:
+        span.set(response_bytes=1)
+    assert tracer.get_spans() == []
+
+    tracer.configure(enabled=True)
+    for index in range(8):
+        with tracer.span("http", f"/api/{index % 2}", method="GET") as span:
+            span.set(status_code=200, response_bytes=10)
+    # 超过容量时只保留最新的记录，最新的在前
+    spans = tracer.get_spans(limit=0)
+    assert len(spans) == 5 and [s["name"] for s in spans] == ["/api/1", "/api/0", "/api/1", "/api/0", "/api/1"]
+    assert tracer.get_summary()["recorded"] == 8
+    assert [s["name"] for s in tracer.get_spans(limit=2, name="/api/0")] == ["/api/0", "/api/0"]
+    assert tracer.get_spans(kind="tool") == []
+
+    # 调整容量时保留最新的记录
+    tracer.configure(capacity=3)
+    assert tracer.capacity == 3 and len(tracer.get_spans(limit=0)) == 3
+    tracer.configure(capacity=10)
+    assert len(tracer.get_spans(limit=0)) == 3
+
+    # 异常和取消记录状态，异常继续抛出
+    try:
+        with tracer.span("tool", "broken"):
+            raise ValueError("bad arguments")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("span must not swallow exceptions")
+
+    async def cancelled():
+        with tracer.span("tool", "slow"):
+            await asyncio.sleep(10)
+
+    async def run_cancelled():
+        task = asyncio.ensure_future(cancelled())
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run_cancelled())
+    slow, broken = tracer.get_spans(limit=2, kind="tool")
+    assert slow["status"] == "cancelled" and slow["name"] == "slow", slow
+    assert broken["status"] == "error" and broken["error"] == "bad arguments", broken
+    with tracer.span("http", "/api/err") as span:
+        span.set(error="解析响应失败")
+    assert tracer.get_spans(limit=1)[0]["status"] == "error"
+
+
+def check_traces_endpoint(tracing):
+    tracer = tracing.get_tracer()
+    # GET /traces 在未启用时也返回汇总
+    payload = tracing.query_traces()
+    assert payload["spans"] == [] and payload["summary"]["enabled"] is False, payload
+
+    # POST /traces 调整配置
+    summary = tracing.configure_tracing({"enabled": True, "capacity": "50"})
+    assert summary["enabled"] is True and summary["capacity"] == 50, summary
+
+    for _ in range(3):
+        with tracer.span("tool", "search-media-resources", source="builtin") as span:
+            span.set(request_bytes=40, response_bytes=2000)
+    with tracer.span("http", "/api/v1/site/", method="GET") as span:
+        span.set(status_code=200, response_bytes=500)
+
+    payload = tracing.query_traces(limit=2, kind="tool")
+    # 端点直接以JSON返回
+    payload = json.loads(json.dumps(payload))
+    assert len(payload["spans"]) == 2 and all(s["kind"] == "tool" for s in payload["spans"]), payload
+    assert payload["spans"][0]["request_bytes"] == 40 and payload["spans"][0]["source"] == "builtin"
+    operations = {(op["kind"], op["name"]): op for op in payload["summary"]["operations"]}
+    tool_op = operations[("tool", "search-media-resources")]
+    assert tool_op["count"] == 3 and tool_op["errors"] == 0, tool_op
+    assert tool_op["request_bytes"] == 120 and tool_op["response_bytes"] == 6000, tool_op
+    assert operations[("http", "/api/v1/site/")]["response_bytes"] == 500
+    assert payload["summary"]["buffered"] == 4
+
+    summary = tracing.configure_tracing({"clear": True, "enabled": False})
+    assert summary["buffered"] == 0 and summary["enabled"] is False, summary
+    with tracer.span("tool", "after-disable"):
+        pass
+    assert tracing.query_traces()["spans"] == []
+
+
+def main():
+    tracing = load_tracing_module()
+    check_ring_buffer(tracing)
+    check_traces_endpoint(tracing)
+    print("PASS: MCPServer tracing keeps the newest spans and serves /traces summaries with payload sizes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Regression check for QbCommand concurrent multi-downloader execution with per-downloader timeouts.
+
+Run inside the plugin repository:
+    python3 tests/qbcommand_downloader_pool_regression.py
+"""
+
+import importlib.util
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+POOL_FILE = REPO_ROOT / "plugins.v2" / "qbcommand" / "downloader_pool.py"
+
+
+def load_pool_module():
+    module_name = "qbcommand_downloader_pool"
+    spec = importlib.util.spec_from_file_location(module_name, POOL_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_services(*names):
+    return [types.SimpleNamespace(name=name) for name in names]
+
+
+def main():
+    pool = load_pool_module()
+    release = threading.Event()
+
+    def operate(service):
+        if service.name == "hung":
+            release.wait(10)
+            return "late"
+        if service.name == "broken":
+            raise ConnectionError("connection refused")
+        time.sleep(0.3)
+        return f"{service.name} done"
+
+    # 五个下载器并发执行，总耗时接近最慢的一个
+    services = make_services("qb1", "qb2", "qb3", "tr1", "tr2")
+    start = time.monotonic()
+    results = pool.run_on_downloaders(services, operate)
+    elapsed = time.monotonic() - start
+    assert [result.name for result in results] == ["qb1", "qb2", "qb3", "tr1", "tr2"]
+    assert all(result.ok for result in results)
+    assert [result.value for result in results] == [f"{name} done" for name in ("qb1", "qb2", "qb3", "tr1", "tr2")]
+    assert elapsed < 1.0, elapsed
+
+    # 无响应的下载器超时，出错的下载器记录错误，其他下载器不受影响
+    services = make_services("qb1", "hung", "broken", "tr1")
+    start = time.monotonic()
+    results = pool.run_on_downloaders(services, operate, timeout=1)
+    elapsed = time.monotonic() - start
+    by_name = {result.name: result for result in results}
+    assert by_name["hung"].timed_out and not by_name["hung"].ok
+    assert by_name["broken"].error == "connection refused"
+    assert by_name["qb1"].ok and by_name["tr1"].ok
+    assert by_name["qb1"].elapsed < 1.0
+    assert elapsed < 2.0, elapsed
+
+    # 线程池被无响应的下载器占满时，排队的下载器也会在截止时间放弃
+    services = make_services("hung", "qb1")
+    start = time.monotonic()
+    results = pool.run_on_downloaders(services, operate, timeout=0.5, max_workers=1)
+    elapsed = time.monotonic() - start
+    assert results[0].timed_out
+    assert results[1].ok or results[1].timed_out
+    assert elapsed < 2.5, elapsed
+
+    release.set()
+    assert pool.run_on_downloaders([], operate) == []
+
+    print("PASS: QbCommand runs downloader actions concurrently with per-downloader timeouts")
+
+
+if __name__ == "__main__":
+    main()
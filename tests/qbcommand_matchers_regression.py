@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Regression check and benchmark for QbCommand precompiled domain and exclude-dir matchers.
+
+Run inside the plugin repository:
+    python3 tests/qbcommand_matchers_regression.py
+"""
+
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MATCHERS_FILE = REPO_ROOT / "plugins.v2" / "qbcommand" / "matchers.py"
+
+TORRENT_COUNT = 50000
+ROOT_DOMAINS = ["edu.cn", "com.cn", "net.cn", "org.cn"]
+
+
+def load_matchers_module():
+    module_name = "qbcommand_matchers"
+    spec = importlib.util.spec_from_file_location(module_name, MATCHERS_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def reference_main_domain(domain):
+    """原有的线性扫描实现"""
+    if not domain:
+        return None
+    domain_arr = domain.split(".")
+    if len(domain_arr) < 2:
+        return None
+    for root_domain in ROOT_DOMAINS:
+        if domain.endswith("." + root_domain):
+            return f"{domain_arr[-len(root_domain.split('.')) - 1]}.{root_domain}"
+    return f"{domain_arr[-2]}.{domain_arr[-1]}"
+
+
+def reference_is_excluded(exclude_dirs, file_path):
+    for exclude_dir in exclude_dirs.split("\n"):
+        if exclude_dir and exclude_dir in str(file_path):
+            return True
+    return False
+
+
+def check_domains(matchers):
+    matcher = matchers.DomainMatcher(ROOT_DOMAINS)
+    domains = [
+        "tracker.site.com", "site.com", "localhost", "", None, "pt.school.edu.cn", "edu.cn",
+        "a.b.c.com.cn", "x.org.cn", "tracker.example.net", "t.example.co.uk", "cn",
+    ]
+    for domain in domains:
+        assert matcher.main_domain(domain) == reference_main_domain(domain), domain
+    assert matcher.match_root("pt.school.edu.cn") == ("edu.cn", 2)
+    assert matcher.match_root("edu.cn") == (None, 0)
+    assert matcher.match_root("site.com") == (None, 0)
+
+    # 有多个匹配时取最长的根域名
+    nested = matchers.DomainMatcher(["cn", "edu.cn"])
+    assert nested.main_domain("pt.school.edu.cn") == "school.edu.cn"
+    assert nested.main_domain("pt.site.cn") == "site.cn"
+    assert matchers.DomainMatcher([]).main_domain("a.b.edu.cn") == "edu.cn"
+
+
+def check_exclude_dirs(matchers):
+    paths = ["/downloads/movies/a", "/downloads/tv/b", "/data/keep/c", None, "/downloads/Movies/d"]
+    for exclude_dirs in ["", "\n", "/downloads/movies", "/downloads/movies\n/keep/\n\n/keep/"]:
+        matcher = matchers.ExcludeDirMatcher(exclude_dirs)
+        for path in paths:
+            assert matcher(path) == reference_is_excluded(exclude_dirs, path), (exclude_dirs, path)
+    assert not matchers.ExcludeDirMatcher("\n")
+    assert matchers.ExcludeDirMatcher("a\nb\na").dirs == ("a", "b")
+
+
+def benchmark(matchers):
+    domain_matcher = matchers.DomainMatcher(ROOT_DOMAINS)
+    op_site_domains = frozenset(f"site{index}.com" for index in range(0, 200, 2))
+    tracker_hosts = [f"tracker.site{index % 200}.com" for index in range(TORRENT_COUNT)]
+    exclude_matcher = matchers.ExcludeDirMatcher("\n".join(f"/downloads/skip{index}/" for index in range(20)))
+    paths = [f"/downloads/skip{index % 40}/{index}" for index in range(TORRENT_COUNT)]
+
+    start = time.perf_counter()
+    main_domain = domain_matcher.main_domain
+    kept = sum(1 for host in tracker_hosts if main_domain(host) not in op_site_domains)
+    excluded = sum(1 for path in paths if exclude_matcher(path))
+    elapsed = time.perf_counter() - start
+
+    assert kept == TORRENT_COUNT // 2, kept
+    assert excluded == TORRENT_COUNT // 2, excluded
+    # 主域名按主机名缓存，只解析不同的主机名
+    assert domain_matcher.main_domain.cache_info().misses == 200
+    return elapsed
+
+
+def main():
+    matchers = load_matchers_module()
+    check_domains(matchers)
+    check_exclude_dirs(matchers)
+    elapsed = benchmark(matchers)
+    print(f"PASS: QbCommand matchers filter {TORRENT_COUNT} torrents in {elapsed * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Regression check for QbCommand state confirmation after pause/resume using incremental deltas.
+
+Run inside the plugin repository:
+    python3 tests/qbcommand_state_confirm_regression.py
+"""
+
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PLUGIN_DIR = REPO_ROOT / "plugins.v2" / "qbcommand"
+
+TORRENT_COUNT = 20000
+
+
+def load_modules():
+    package_name = "qbcommand_pkg"
+    package = types.ModuleType(package_name)
+    package.__path__ = [str(PLUGIN_DIR)]
+    sys.modules[package_name] = package
+    modules = []
+    for name in ("torrent_snapshot", "state_confirm"):
+        spec = importlib.util.spec_from_file_location(f"{package_name}.{name}", PLUGIN_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        modules.append(module)
+    return modules
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+
+class FakeQbClient:
+    """模拟 sync/maindata：暂停的种子分两批在增量中出现"""
+
+    def __init__(self, torrents, clock):
+        self.torrents = torrents
+        self.clock = clock
+        self.rid = 1
+        self.pending_changes = []
+        self.requests = []
+
+    def sync_maindata(self, rid=0):
+        self.requests.append(rid)
+        if rid == 0:
+            return {"rid": self.rid, "full_update": True,
+                    "torrents": {h: dict(t) for h, t in self.torrents.items()}}
+        changed = {}
+        while self.pending_changes and self.pending_changes[0][0] <= self.clock():
+            _, torrent_hash, state = self.pending_changes.pop(0)
+            self.torrents[torrent_hash]["state"] = state
+            changed[torrent_hash] = {"state": state}
+        self.rid += 1
+        # 与状态无关的字段变化也会出现在增量中
+        changed.setdefault("qb00000001", {"dlspeed": 0})
+        return {"rid": self.rid, "torrents": changed}
+
+
+class FakeTrTorrent:
+    def __init__(self, torrent_hash, status):
+        self.hashString = torrent_hash
+        self.status = status
+        self.error = 0
+        self.error_string = ""
+
+
+class FakeTrClient:
+    """模拟 recently-active：部分种子状态变化后不在最近活动中出现"""
+
+    def __init__(self, hidden):
+        self.hidden = hidden
+        self.queried = []
+
+    def get_recently_active_torrents(self, arguments=None):
+        return [FakeTrTorrent("tr0", "stopped")], []
+
+    def get_torrents(self, ids=None, arguments=None):
+        self.queried.extend(ids)
+        return [FakeTrTorrent(torrent_hash, "stopped") for torrent_hash in ids if torrent_hash in self.hidden]
+
+
+def check_qbittorrent(snapshot_module, confirm_module):
+    clock = FakeClock()
+    torrents = {
+        f"qb{index:08x}": {"state": "uploading" if index % 2 else "downloading",
+                           "content_path": f"/downloads/{index}",
+                           "tracker": "https://tracker.example.com/announce"}
+        for index in range(TORRENT_COUNT)
+    }
+    client = FakeQbClient(torrents, clock)
+    downloader = types.SimpleNamespace(qbc=client)
+
+    snapshot = snapshot_module.TorrentSnapshot.from_qb_maindata(client.sync_maindata(rid=0))
+    assert snapshot.rid == 1
+    assert len(snapshot) == TORRENT_COUNT
+
+    affected = snapshot.hashes_in((snapshot_module.UPLOADING,))
+    for i, torrent_hash in enumerate(affected):
+        client.pending_changes.append((0.5 if i % 2 else 1.0, torrent_hash, "pausedUP"))
+
+    result = confirm_module.confirm_states(
+        snapshot, "qbittorrent", downloader, affected,
+        settled=lambda code: code == snapshot_module.PAUSED, sleep=clock.sleep, clock=clock,
+    )
+    assert result.converged, result.describe()
+    assert result.method == "sync/maindata"
+    # 只拉取增量，rid单调递增，不再用rid=0全量拉取
+    assert client.requests[0] == 0 and all(rid > 0 for rid in client.requests[1:]), client.requests
+    assert client.requests[1:] == sorted(client.requests[1:])
+    assert result.elapsed < 2, result.elapsed
+    assert result.total == TORRENT_COUNT
+    assert result.counts[snapshot_module.PAUSED] == len(affected), result.counts
+    assert result.counts[snapshot_module.UPLOADING] == 0, result.counts
+    assert result.counts[snapshot_module.DOWNLOADING] == TORRENT_COUNT - len(affected)
+
+    # 状态始终没有变化时在截止时间停止
+    clock.now = 0.0
+    result = confirm_module.confirm_states(
+        snapshot, "qbittorrent", downloader, snapshot.hashes_in((snapshot_module.DOWNLOADING,))[:10],
+        settled=lambda code: code == snapshot_module.PAUSED, timeout=5, sleep=clock.sleep, clock=clock,
+    )
+    assert not result.converged and result.pending == 10
+    assert 5 <= result.elapsed < 5.01, result.elapsed
+    assert "超时" in result.describe()
+
+    # 不支持增量拉取时返回None，由调用方回退到全量刷新
+    assert confirm_module.confirm_states(
+        snapshot, "qbittorrent", types.SimpleNamespace(), affected, settled=bool
+    ) is None
+
+
+def check_transmission(snapshot_module, confirm_module):
+    clock = FakeClock()
+    torrents = [FakeTrTorrent(f"tr{index}", "seeding") for index in range(100)]
+    snapshot = snapshot_module.TorrentSnapshot.from_torrents(torrents, "transmission")
+    affected = [f"tr{index}" for index in range(10)]
+    client = FakeTrClient(hidden=set(affected[1:]))
+
+    result = confirm_module.confirm_states(
+        snapshot, "transmission", types.SimpleNamespace(trc=client), affected,
+        settled=lambda code: code == snapshot_module.PAUSED, sleep=clock.sleep, clock=clock,
+    )
+    assert result.converged, result.describe()
+    assert result.method == "recently-active"
+    assert result.polls == 1, result.polls
+    # 只按hash查询待确认的种子
+    assert sorted(client.queried) == sorted(affected[1:]), client.queried
+    assert result.counts[snapshot_module.PAUSED] == 10, result.counts
+
+
+def main():
+    snapshot_module, confirm_module = load_modules()
+    check_qbittorrent(snapshot_module, confirm_module)
+    check_transmission(snapshot_module, confirm_module)
+    print("PASS: QbCommand confirms pause/resume through incremental deltas without fixed sleeps")
+
+
+if __name__ == "__main__":
+    main()
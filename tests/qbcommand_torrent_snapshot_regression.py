@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Regression check and benchmark for QbCommand torrent snapshots on 50k synthetic torrents.
+
+Run inside the plugin repository:
+    python3 tests/qbcommand_torrent_snapshot_regression.py
+"""
+
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SNAPSHOT_FILE = REPO_ROOT / "plugins.v2" / "qbcommand" / "torrent_snapshot.py"
+
+TORRENT_COUNT = 50000
+
+QB_STATES = {
+    "downloading": "downloading",
+    "stalledDL": "downloading",
+    "uploading": "uploading",
+    "stalledUP": "uploading",
+    "pausedUP": "paused",
+    "stoppedDL": "paused",
+    "checkingUP": "checking",
+    "error": "error",
+    "moving": "error",
+}
+
+
+class QbStateEnum:
+    def __init__(self, state):
+        kind = QB_STATES[state]
+        self.is_paused = kind == "paused"
+        self.is_errored = kind == "error" and state != "moving"
+        self.is_checking = kind == "checking"
+        self.is_downloading = kind == "downloading"
+        self.is_uploading = kind == "uploading"
+
+
+class QbTorrent(dict):
+    enum_calls = 0
+
+    @property
+    def state_enum(self):
+        QbTorrent.enum_calls += 1
+        return QbStateEnum(self["state"])
+
+
+class TrTorrent:
+    def __init__(self, index, status, error=0):
+        self.hashString = f"tr{index:08x}"
+        self.status = status
+        self.error = error
+        self.error_string = "tracker error" if error else ""
+        self.download_dir = f"/downloads/{'keep' if index % 10 else 'skip'}/{index}"
+        self.trackers = [{"announce": f"https://tracker{index % 20}.example.com:8443/announce"}]
+
+    def get(self, key, default=None):
+        return default
+
+
+def load_snapshot_module():
+    module_name = "qbcommand_torrent_snapshot"
+    spec = importlib.util.spec_from_file_location(module_name, SNAPSHOT_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_qb_torrents():
+    states = list(QB_STATES)
+    return [
+        QbTorrent(
+            hash=f"qb{index:08x}",
+            state=states[index % len(states)],
+            content_path=f"/downloads/{'keep' if index % 10 else 'skip'}/{index}",
+            tracker=f"https://tracker{index % 20}.example.com/announce?passkey=abc",
+        )
+        for index in range(TORRENT_COUNT)
+    ]
+
+
+def make_tr_torrents():
+    statuses = ["stopped", "check pending", "checking", "downloading", "seeding", "seed pending"]
+    return [
+        TrTorrent(index, statuses[index % len(statuses)], error=1 if index % 97 == 0 else 0)
+        for index in range(TORRENT_COUNT)
+    ]
+
+
+def check_qbittorrent(snapshot_module):
+    torrents = make_qb_torrents()
+    start = time.perf_counter()
+    snapshot = snapshot_module.TorrentSnapshot.from_torrents(torrents, "qbittorrent")
+    elapsed = time.perf_counter() - start
+
+    assert len(snapshot) == TORRENT_COUNT, len(snapshot)
+    per_state = TORRENT_COUNT // len(QB_STATES)
+    counts = snapshot.counts
+    assert counts[snapshot_module.DOWNLOADING] == per_state * 2 + 2, counts
+    assert counts[snapshot_module.UPLOADING] == per_state * 2 + 2, counts
+    assert counts[snapshot_module.PAUSED] == per_state * 2 + 1, counts
+    assert counts[snapshot_module.CHECKING] == per_state, counts
+    assert counts[snapshot_module.ERROR] == per_state * 2, counts
+
+    # 不截断，全部种子都参与过滤
+    mask = snapshot.path_mask(lambda path: "/skip/" in str(path))
+    active = snapshot.hashes_in(
+        (snapshot_module.DOWNLOADING, snapshot_module.UPLOADING, snapshot_module.CHECKING), mask=mask
+    )
+    expected = [
+        torrent["hash"] for torrent in torrents
+        if QB_STATES[torrent["state"]] in ("downloading", "uploading", "checking")
+        and "/skip/" not in torrent["content_path"]
+    ]
+    assert active == expected
+
+    # 只有暂停的做种种子解析tracker
+    assert snapshot.resumable.count(1) == sum(1 for t in torrents if t["state"] == "pausedUP")
+    assert snapshot.tracker_hosts[4] == "tracker4.example.com", snapshot.tracker_hosts[4]
+    assert snapshot.tracker_hosts[0] is None
+    return elapsed
+
+
+def check_transmission(snapshot_module):
+    torrents = make_tr_torrents()
+    start = time.perf_counter()
+    snapshot = snapshot_module.TorrentSnapshot.from_torrents(torrents, "transmission")
+    elapsed = time.perf_counter() - start
+
+    downloading, uploading, paused, checking, error = snapshot.status_lists()
+    assert len(snapshot) == TORRENT_COUNT
+    assert len(error) == len([t for t in torrents if t.error]), len(error)
+    assert all(not t.error and t.status == "stopped" for t in torrents if t.hashString in set(paused))
+    assert len(downloading) + len(uploading) + len(paused) + len(checking) + len(error) == TORRENT_COUNT
+    # tracker主机名不包含端口
+    assert snapshot.tracker_hosts[6] == "tracker6.example.com", snapshot.tracker_hosts[6]
+    return elapsed
+
+
+def check_state_code_cache(snapshot_module):
+    # 未知的qBittorrent状态只交给state_enum判断一次
+    assert QbTorrent.enum_calls == 1, QbTorrent.enum_calls
+    assert snapshot_module._qb_state_code(QbTorrent(hash="x", state="moving")) == snapshot_module.ERROR
+    assert QbTorrent.enum_calls == 1, QbTorrent.enum_calls
+
+    # Transmission状态按状态值缓存，逐个种子判断和快照构建共用同一份结果
+    info = snapshot_module._tr_status_code.cache_info()
+    assert info.currsize == 6, info
+    assert snapshot_module.tr_torrent_code(TrTorrent(1, "check pending")) == snapshot_module.CHECKING
+    assert snapshot_module.tr_torrent_code(TrTorrent(97, "seeding", error=1)) == snapshot_module.ERROR
+    assert snapshot_module._tr_status_code.cache_info().hits == info.hits + 1
+
+
+def main():
+    snapshot_module = load_snapshot_module()
+    qb_elapsed = check_qbittorrent(snapshot_module)
+    tr_elapsed = check_transmission(snapshot_module)
+    check_state_code_cache(snapshot_module)
+
+    print(
+        f"PASS: QbCommand snapshots classify {TORRENT_COUNT} torrents in one pass "
+        f"(qBittorrent {qb_elapsed * 1000:.0f}ms, Transmission {tr_elapsed * 1000:.0f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Regression check and benchmark for the WatchSync batched history database.
+
+Run inside the plugin repository:
+    python3 tests/watchsync_history_store_regression.py
+"""
+
+import importlib.util
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+STORE_FILE = REPO_ROOT / "plugins.v2" / "watchsync" / "history_store.py"
+
+LEGACY_RECORDS = 200000
+NEW_RECORDS = 1000
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("watchsync")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_store_module():
+    install_stubs()
+    module_name = "watchsync_history_store"
+    spec = importlib.util.spec_from_file_location(module_name, STORE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_legacy_database(db_path):
+    """旧版本插件创建的数据库，没有索引和汇总表"""
+    now = datetime.now()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''
+            CREATE TABLE sync_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                source_server TEXT NOT NULL,
+                source_user TEXT NOT NULL,
+                target_server TEXT NOT NULL,
+                target_user TEXT NOT NULL,
+                media_name TEXT NOT NULL,
+                media_type TEXT NOT NULL,
+                media_id TEXT,
+                position_ticks INTEGER,
+                sync_type TEXT DEFAULT 'playback',
+                status TEXT NOT NULL,
+                error_message TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        rows = []
+        for index in range(LEGACY_RECORDS):
+            # 从100天前到2天前均匀分布
+            local = now - timedelta(days=2) - timedelta(seconds=index * 40)
+            utc = local.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append((local.isoformat(), "emby", f"user{index % 5}", "emby", f"user{(index + 1) % 5}",
+                         f"Movie {index}", "Movie", str(index), index,
+                         "playback" if index % 3 else "favorite",
+                         "success" if index % 10 else "error", None, utc))
+        conn.executemany('''
+            INSERT INTO sync_records (timestamp, source_server, source_user, target_server, target_user,
+                                      media_name, media_type, media_id, position_ticks, sync_type,
+                                      status, error_message, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    return rows
+
+
+def main():
+    module = load_store_module()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "watchsync.db")
+        legacy = create_legacy_database(db_path)
+
+        store = module.HistoryStore(db_path, flush_interval=0.05, batch_size=100)
+        store.open()
+        conn = sqlite3.connect(db_path)
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(sync_records)")}
+        assert {"idx_sync_records_created_at", "idx_sync_records_status"} <= indexes, indexes
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        # 新的同步结果写入队列，后台批量写入
+        for index in range(NEW_RECORDS):
+            store.record({
+                "timestamp": datetime.now().isoformat(),
+                "source_server": "emby", "source_user": "alice",
+                "target_server": "emby", "target_user": f"member{index % 3}",
+                "media_name": f"Episode {index}", "media_type": "Episode", "media_id": f"e{index}",
+                "position_ticks": index, "sync_type": "playback",
+                "status": "success" if index % 4 else "error", "error_message": None,
+                "created_at": module.utc_timestamp(),
+            })
+        deadline = time.time() + 5
+        while store.written < NEW_RECORDS and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.written == NEW_RECORDS and store.batches <= NEW_RECORDS // 100 + 5, store.batches
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        start = time.perf_counter()
+        for _ in range(100):
+            stats = store.stats(today=today, active_since=module.utc_since(24))
+        stats_elapsed = (time.perf_counter() - start) / 100
+
+        total = LEGACY_RECORDS + NEW_RECORDS
+        legacy_success = sum(1 for row in legacy if row[10] == "success")
+        assert stats["total"] == total and store.count() == total
+        assert stats["success"] == legacy_success + NEW_RECORDS * 3 // 4
+        assert stats["failed"] == total - stats["success"]
+        assert stats["today"] == NEW_RECORDS + sum(1 for row in legacy if row[0][:10] == today)
+        # 最近24小时只有新写入的记录
+        assert stats["active_users"] == 4, stats
+        assert stats["sync_types"] == ["favorite", "playback"]
+
+        records = store.records(10, 0)
+        assert len(records) == 10 and records[0][6].startswith("Episode")
+
+        # 清理旧记录后汇总同步减少
+        cutoff = module.utc_since(30 * 24)
+        expected = conn.execute("SELECT COUNT(*) FROM sync_records WHERE created_at < ?", (cutoff,)).fetchone()[0]
+        assert store.delete_before(cutoff) == expected > 0
+        remaining = conn.execute("SELECT COUNT(*) FROM sync_records").fetchone()[0]
+        assert store.count() == remaining == total - expected
+        success = conn.execute("SELECT COUNT(*) FROM sync_records WHERE status = 'success'").fetchone()[0]
+        assert store.stats(today=today, active_since=module.utc_since(24))["success"] == success
+
+        # 关闭时写入剩余记录，之后可以重新打开
+        store.record({"timestamp": datetime.now().isoformat(), "source_server": "emby", "source_user": "bob",
+                      "target_server": "emby", "target_user": "alice", "media_name": "Late", "media_type": "Movie",
+                      "sync_type": "mark_played", "status": "success", "created_at": module.utc_timestamp()})
+        store.close()
+        assert conn.execute("SELECT COUNT(*) FROM sync_records").fetchone()[0] == remaining + 1
+        conn.close()
+
+        reopened = module.HistoryStore(db_path)
+        assert reopened.count() == remaining + 1
+        reopened.close()
+
+        # 一条违反约束的记录不会阻塞其他记录，丢弃后队列清空
+        def result(name):
+            return {"timestamp": datetime.now().isoformat(), "source_server": "emby", "source_user": "bob",
+                    "target_server": "emby", "target_user": "alice", "media_name": name, "media_type": "Movie",
+                    "sync_type": "playback", "status": "success", "created_at": module.utc_timestamp()}
+
+        guarded = module.HistoryStore(db_path, flush_interval=60, max_retries=2)
+        guarded.open()
+        for name in ("Good 1", None, "Good 2"):
+            guarded.record(result(name))
+        assert guarded.flush() == 2 and guarded.dropped == 1
+        assert guarded.flush() == 0
+        assert guarded.count() == remaining + 3
+
+        # 数据库被锁定时重新排队，超过重试次数后丢弃
+        guarded._connection().execute("PRAGMA busy_timeout = 0")
+        locker = sqlite3.connect(db_path, isolation_level=None)
+        locker.execute("BEGIN EXCLUSIVE")
+        guarded.record(result("Locked"))
+        for _ in range(2):
+            try:
+                guarded.flush()
+            except sqlite3.OperationalError:
+                pass
+            else:
+                raise AssertionError("flush should fail while the database is locked")
+            assert len(guarded._pending) == 1
+        assert guarded.flush() == 0 and not guarded._pending and guarded.dropped == 2
+        locker.execute("ROLLBACK")
+        locker.close()
+        guarded.record(result("Unlocked"))
+        assert guarded.flush() == 1
+        assert guarded.count() == remaining + 4
+        guarded.close()
+
+    print(
+        f"PASS: WatchSync history stats over {total} records take {stats_elapsed * 1000:.2f}ms; "
+        f"{NEW_RECORDS} results written in {store.batches} batches"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Regression check for the WatchSync per-server provider-ID index.
+
+Run inside the plugin repository:
+    python3 tests/watchsync_provider_index_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+INDEX_FILE = REPO_ROOT / "plugins.v2" / "watchsync" / "provider_index.py"
+
+SERIES_COUNT = 500
+EPISODES_PER_SERIES = 200
+MOVIE_COUNT = 5000
+LOOKUPS = 10000
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("watchsync")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_index_module():
+    install_stubs()
+    module_name = "watchsync_provider_index"
+    spec = importlib.util.spec_from_file_location(module_name, INDEX_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_library():
+    items = []
+    for series in range(SERIES_COUNT):
+        series_id = f"s{series}"
+        items.append({"Id": series_id, "Name": f"Series {series}", "Type": "Series",
+                      "ProviderIds": {"Tmdb": str(100000 + series), "Tvdb": str(900000 + series)}})
+        for episode in range(EPISODES_PER_SERIES):
+            season, number = divmod(episode, 20)
+            items.append({"Id": f"{series_id}e{episode}", "Name": f"Episode {episode}", "Type": "Episode",
+                          "SeriesId": series_id, "ParentIndexNumber": season + 1, "IndexNumber": number + 1,
+                          "ProviderIds": {"Tmdb": str(5000000 + series * 1000 + episode)}})
+    for movie in range(MOVIE_COUNT):
+        items.append({"Id": f"m{movie}", "Name": f"Movie {movie}", "Type": "Movie",
+                      "ProviderIds": {"Tmdb": str(movie + 1), "Imdb": f"tt{movie:07d}"}})
+    return items
+
+
+class FakeServer:
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+
+    def fetch_page(self, start, limit, since):
+        self.calls.append((start, limit, since))
+        source = self.items if since is None else [item for item in self.items if item.get("recent")]
+        return source[start:start + limit], len(source)
+
+
+def main():
+    module = load_index_module()
+    server = FakeServer(make_library())
+    now = [1_700_000_000.0]
+    index = module.ProviderIndex("target", server.fetch_page, page_size=1000, clock=lambda: now[0])
+
+    start = time.perf_counter()
+    assert index.build()
+    build_elapsed = time.perf_counter() - start
+    total = len(server.items)
+    assert len(index) == total and len(server.calls) == -(-total // 1000)
+
+    # 按源剧集标识 + 季号 + 集号匹配单集
+    source_episode = {"Id": "src-ep", "Type": "Episode", "ParentIndexNumber": 3, "IndexNumber": 5,
+                      "SeriesId": "src-series", "ProviderIds": {}}
+    series_ids = {"Tmdb": "100007"}
+    assert index.lookup(source_episode, series_ids)["Id"] == "s7e44"
+    # 剧集在目标服务器上只有TVDB标识时也能匹配
+    assert index.lookup(source_episode, {"tvdb": "900007"})["Id"] == "s7e44"
+    # 没有剧集标识时使用单集自己的标识
+    assert index.lookup({"Type": "Episode", "ProviderIds": {"Tmdb": "5007045"}})["Id"] == "s7e45"
+    assert index.lookup({"Type": "Movie", "ProviderIds": {"Imdb": "tt0000042"}})["Id"] == "m42"
+    assert index.lookup({"Type": "Movie", "ProviderIds": {"Tmdb": "100007"}}) is None
+    assert index.lookup({"Type": "Series", "ProviderIds": {"Tmdb": "100007"}})["Id"] == "s7"
+
+    start = time.perf_counter()
+    for movie in range(LOOKUPS):
+        assert index.lookup({"Type": "Movie", "ProviderIds": {"Tmdb": str(movie % MOVIE_COUNT + 1)}})
+    lookup_elapsed = time.perf_counter() - start
+
+    # 增量刷新只拉取最近保存的媒体项
+    server.calls.clear()
+    new_movie = {"Id": "m-new", "Name": "New Movie", "Type": "Movie", "ProviderIds": {"Tmdb": "999999"}, "recent": True}
+    server.items.append(new_movie)
+    now[0] += 600
+    assert index.refresh()
+    assert len(server.calls) == 1 and server.calls[0][2] == "2023-11-14T22:08:20Z", server.calls
+    assert index.lookup({"Type": "Movie", "ProviderIds": {"Tmdb": "999999"}})["Id"] == "m-new"
+    assert index.refreshed_at == now[0]
+
+    # 媒体标识变化后旧的标识不再命中
+    index.add_items([{"Id": "m-new", "Name": "New Movie", "Type": "Movie", "ProviderIds": {"Tmdb": "888888"}}])
+    assert index.lookup({"Type": "Movie", "ProviderIds": {"Tmdb": "999999"}}) is None
+    assert index.lookup({"Type": "Movie", "ProviderIds": {"Tmdb": "888888"}})["Id"] == "m-new"
+    index.remove("m-new")
+    assert index.lookup({"Type": "Movie", "ProviderIds": {"Tmdb": "888888"}}) is None
+
+    # 超过完整重建间隔时重建
+    now[0] += module.FULL_REBUILD_INTERVAL + 1
+    server.calls.clear()
+    assert index.refresh() and server.calls[0][2] is None
+
+    # 后台刷新进行中时再次请求刷新合并为一次
+    gate = threading.Event()
+    manager_calls = []
+
+    def slow_fetch(start, limit, since):
+        manager_calls.append(since)
+        gate.wait(5)
+        return [], 0
+
+    manager = module.ProviderIndexManager()
+    manager.start("emby", slow_fetch)
+    for _ in range(5):
+        manager.schedule_refresh("emby")
+    gate.set()
+    deadline = time.time() + 5
+    while time.time() < deadline and (len(manager_calls) < 2 or manager._running):
+        time.sleep(0.01)
+    assert len(manager_calls) == 2, manager_calls
+    assert manager.get("emby") is not None and manager.get("other") is None
+    manager.stop()
+    assert manager.get("emby") is None
+
+    # 首次构建失败时按退避重试
+    attempts = []
+
+    def flaky_fetch(start, limit, since):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError("server unavailable")
+        return [{"Id": "m1", "Type": "Movie", "ProviderIds": {"Tmdb": "1"}}], 1
+
+    manager = module.ProviderIndexManager(retry_base_delay=0.05, retry_max_delay=1)
+    manager.start("emby", flaky_fetch)
+    deadline = time.time() + 5
+    while time.time() < deadline and manager.get("emby") is None:
+        time.sleep(0.01)
+    assert manager.get("emby") is not None and len(attempts) == 3, attempts
+    assert attempts[2] - attempts[1] >= attempts[1] - attempts[0] >= 0.05
+    manager.stop()
+
+    # 未命中时的同步刷新只做增量，需要完整重建时交给后台线程
+    rebuild_gate = threading.Event()
+    fetches = []
+
+    def fetch(start, limit, since):
+        fetches.append(since)
+        if since is None and len(fetches) > 1:
+            rebuild_gate.wait(5)
+        return [{"Id": "m1", "Type": "Movie", "ProviderIds": {"Tmdb": "1"}}], 1
+
+    manager = module.ProviderIndexManager()
+    manager.start("emby", fetch)
+    deadline = time.time() + 5
+    while time.time() < deadline and (manager.get("emby") is None or manager._running):
+        time.sleep(0.01)
+    stale = manager.get("emby")
+    stale.built_at -= module.FULL_REBUILD_INTERVAL + 1
+    stale.refreshed_at -= module.MISS_REFRESH_INTERVAL + 1
+    start = time.perf_counter()
+    assert manager.refresh_now("emby")
+    assert time.perf_counter() - start < 1
+    assert fetches[1] is not None, fetches
+    while time.time() < deadline and len(fetches) < 3:
+        time.sleep(0.01)
+    assert fetches[2] is None, fetches
+    rebuild_gate.set()
+    while time.time() < deadline and manager._running:
+        time.sleep(0.01)
+    assert not stale.needs_rebuild()
+    manager.stop()
+
+    print(
+        f"PASS: WatchSync indexes {total} items in {build_elapsed * 1000:.0f}ms and resolves "
+        f"{LOOKUPS} lookups in {lookup_elapsed * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
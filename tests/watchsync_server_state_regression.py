@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Regression check for WatchSync cached user directories and passive server health.
+
+Run inside the plugin repository:
+    python3 tests/watchsync_server_state_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+STATE_FILE = REPO_ROOT / "plugins.v2" / "watchsync" / "server_state.py"
+
+GROUP_SIZE = 6
+EVENTS = 200
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("watchsync")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_state_module():
+    install_stubs()
+    module_name = "watchsync_server_state"
+    spec = importlib.util.spec_from_file_location(module_name, STATE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def main():
+    module = load_state_module()
+    now = [1000.0]
+    clock = lambda: now[0]
+    users = [{"Id": f"id-{index}", "Name": f"user{index}"} for index in range(GROUP_SIZE)]
+    fetches = []
+
+    def fetch_users():
+        fetches.append(now[0])
+        return list(users)
+
+    state = module.ServerState("emby", fetch_users, clock=clock)
+
+    # 一个同步组的所有事件只下载一次用户列表
+    for _ in range(EVENTS):
+        for index in range(GROUP_SIZE):
+            assert state.users.get_id(f"user{index}") == f"id-{index}"
+        now[0] += 1
+    assert len(fetches) == 1, fetches
+    assert state.users.hits == EVENTS * GROUP_SIZE
+
+    # TTL过期后重新拉取
+    now[0] += module.USER_CACHE_TTL
+    assert state.users.get_id("user0") == "id-0" and len(fetches) == 2
+
+    # 新建的用户在未命中间隔后可以找到，未命中不会每次都拉取
+    users.append({"Id": "id-new", "Name": "newcomer"})
+    assert state.users.get_id("newcomer") is None and len(fetches) == 2
+    for _ in range(10):
+        state.users.get_id("missing")
+    assert len(fetches) == 2
+    now[0] += module.USER_MISS_REFRESH_INTERVAL
+    assert state.users.get_id("newcomer") == "id-new" and len(fetches) == 3
+
+    # 拉取失败时保留原缓存
+    state.users.invalidate()
+    users_backup = list(users)
+    users.clear()
+    state.users._fetch_users = lambda: None
+    assert state.users.get_id("user1") == "id-1"
+    users.extend(users_backup)
+
+    # 健康状态：4xx视为服务器正常，连续失败达到阈值后熔断
+    health = state.health
+    assert health.record_response(Response(404)) is False and health.state == module.STATE_CLOSED
+    assert health.record_response(Response(204)) is True
+    for _ in range(module.FAILURE_THRESHOLD - 1):
+        health.record_response(None)
+    assert health.allow() and health.state == module.STATE_CLOSED
+    health.record_response(Response(503))
+    assert health.state == module.STATE_OPEN
+    assert not health.allow() and health.rejected == 1
+
+    # 冷却期后只放行一次试探请求，失败重新熔断，成功恢复
+    now[0] += module.OPEN_COOLDOWN
+    assert health.allow() and not health.allow()
+    health.record_response(None)
+    assert health.state == module.STATE_OPEN and not health.allow()
+    now[0] += module.OPEN_COOLDOWN
+    assert health.allow()
+    health.record_response(Response(200))
+    assert health.state == module.STATE_CLOSED and health.allow()
+
+    # 试探请求没有产生结果时，冷却期后再放行一次
+    for _ in range(module.FAILURE_THRESHOLD):
+        health.record_failure()
+    now[0] += module.OPEN_COOLDOWN
+    assert health.allow() and not health.allow()
+    now[0] += module.OPEN_COOLDOWN
+    assert health.allow()
+
+    print(
+        f"PASS: WatchSync resolves {EVENTS * GROUP_SIZE} user IDs with {len(fetches)} user list downloads "
+        f"and no health-check requests"
+    )
+
+
+if __name__ == "__main__":
+    main()
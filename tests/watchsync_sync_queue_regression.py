@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Regression check for the WatchSync coalescing sync queue.
+
+Run inside the plugin repository:
+    python3 tests/watchsync_sync_queue_regression.py
+"""
+
+import importlib.util
+import logging
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+QUEUE_FILE = REPO_ROOT / "plugins.v2" / "watchsync" / "sync_queue.py"
+
+SERVERS = ("emby-a", "emby-b")
+USERS = 6
+ITEMS = 4
+UPDATES = 5
+SYNC_LATENCY = 0.02
+
+
+def install_stubs():
+    app = sys.modules.setdefault("app", types.ModuleType("app"))
+    log_module = types.ModuleType("app.log")
+    log_module.logger = logging.getLogger("watchsync")
+    app.log = log_module
+    sys.modules["app.log"] = log_module
+
+
+def load_queue_module():
+    install_stubs()
+    module_name = "watchsync_sync_queue"
+    spec = importlib.util.spec_from_file_location(module_name, QUEUE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    module = load_queue_module()
+    lock = threading.Lock()
+    running = {}
+    peak = {"total": 0}
+    for server in SERVERS:
+        peak[server] = 0
+    applied = {}
+    calls = []
+
+    def handler(task):
+        server = task["target_server"]
+        with lock:
+            running[server] = running.get(server, 0) + 1
+            peak[server] = max(peak[server], running[server])
+            peak["total"] = max(peak["total"], sum(running.values()))
+            calls.append(task)
+        time.sleep(SYNC_LATENCY)
+        with lock:
+            running[server] -= 1
+            applied[(server, task["target_user"], task["item"])] = task["position"]
+        return True
+
+    queue = module.SyncQueue(handler, max_workers=3, per_server_limit=2)
+
+    # 一批暂停事件同时到达，提交不会阻塞
+    start = time.perf_counter()
+    for position in range(UPDATES):
+        for server in SERVERS:
+            for user in range(USERS):
+                for item in range(ITEMS):
+                    key = (server, user, item)
+                    assert queue.submit(key, server, {"target_server": server, "target_user": user,
+                                                      "item": item, "position": position})
+    submit_elapsed = time.perf_counter() - start
+    assert queue.join(timeout=30)
+
+    total_keys = len(SERVERS) * USERS * ITEMS
+    # 没有丢弃任何目标，且每个目标最终都是最新进度
+    assert len(applied) == total_keys
+    assert all(position == UPDATES - 1 for position in applied.values()), applied
+    # 未执行的同步被合并
+    assert len(calls) < total_keys * UPDATES, len(calls)
+    stats = queue.stats()
+    assert stats["coalesced"] > 0 and stats["completed"] == len(calls) and stats["failed"] == 0
+    # 并发受工作线程数和每个服务器的上限约束
+    assert peak["total"] <= 3 and all(peak[server] <= 2 for server in SERVERS), peak
+    assert peak["total"] >= 2
+
+    # 失败的任务按退避重试，超过次数后回调
+    attempts = []
+    given_up = []
+    flaky = module.SyncQueue(lambda task: attempts.append(time.monotonic()) or len(attempts) >= 3,
+                             max_retries=3, base_delay=0.01, max_delay=0.05)
+    flaky.submit("k", "emby-a", {"n": 1})
+    assert flaky.join(timeout=5)
+    assert len(attempts) == 3 and flaky.stats()["retried"] == 2 and flaky.stats()["completed"] == 1
+    assert attempts[2] - attempts[1] >= attempts[1] - attempts[0] >= 0.01
+
+    def broken(task):
+        raise RuntimeError("server down")
+
+    failing = module.SyncQueue(broken, max_retries=2, base_delay=0.01, on_give_up=given_up.append)
+    failing.submit("k", "emby-a", {"n": 2})
+    assert failing.join(timeout=5)
+    assert given_up == [{"n": 2}] and failing.stats()["failed"] == 1
+
+    # 执行中收到新进度时，完成后再执行最新的一次
+    gate = threading.Event()
+    seen = []
+
+    def slow(task):
+        seen.append(task["position"])
+        gate.wait(5)
+        return True
+
+    follow = module.SyncQueue(slow)
+    follow.submit("k", "emby-a", {"position": 1})
+    while not seen:
+        time.sleep(0.005)
+    follow.submit("k", "emby-a", {"position": 2})
+    follow.submit("k", "emby-a", {"position": 3})
+    gate.set()
+    assert follow.join(timeout=5)
+    assert seen == [1, 3], seen
+
+    # 已有一个空闲工作线程时，一批任务仍然并行执行
+    burst = module.SyncQueue(lambda task: time.sleep(task["delay"]) or True, max_workers=3)
+    burst.submit("warm", "emby-a", {"delay": 0})
+    assert burst.join(timeout=5)
+    assert burst.stats()["workers"] == 1
+    start = time.perf_counter()
+    for server in ("emby-a", "emby-b", "emby-c"):
+        burst.submit(server, server, {"delay": 0.5})
+    assert burst.join(timeout=5)
+    burst_elapsed = time.perf_counter() - start
+    assert burst_elapsed < 0.9, burst_elapsed
+    assert burst.stats()["workers"] == 3
+    burst.stop()
+
+    queue.stop()
+    assert not queue.submit("k", "emby-a", {})
+
+    print(
+        f"PASS: WatchSync queues {total_keys * UPDATES} progress updates in {submit_elapsed * 1000:.1f}ms "
+        f"and applies the latest position for all {total_keys} targets with {len(calls)} syncs"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Regression check and benchmark for the WatchSync TTL cache used for event dedup and loop protection.
+
+Run inside the plugin repository:
+    python3 tests/watchsync_ttl_cache_regression.py
+"""
+
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CACHE_FILE = REPO_ROOT / "plugins.v2" / "watchsync" / "ttl_cache.py"
+
+STREAMS = 500
+EVENTS = 200000
+
+
+def load_cache_module():
+    module_name = "watchsync_ttl_cache"
+    spec = importlib.util.spec_from_file_location(module_name, CACHE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    module = load_cache_module()
+    now = [0.0]
+    cache = module.TTLCache(ttl=30, clock=lambda: now[0])
+
+    # 窗口内重复，过期后不再命中
+    cache.set("a")
+    now[0] = 10
+    assert cache.age("a") == 10 and "a" in cache
+    now[0] = 30
+    assert cache.age("a") is None and len(cache) == 0 and cache.expired == 1
+
+    # 重新写入会刷新时间并移到末尾，不会被先过期
+    cache.set("a")
+    now[0] = 35
+    cache.set("b", "value")
+    now[0] = 50
+    cache.set("a")
+    now[0] = 66
+    assert "b" not in cache and "a" in cache
+    assert cache.get("missing", "default") == "default"
+
+    stats = cache.stats()
+    assert stats["hits"] > 0 and stats["misses"] > 0 and 0 < stats["hit_rate"] < 1
+
+    # 大量并发播放流每隔几秒产生一次进度事件，写入和查询耗时不随缓存大小增长
+    events = module.TTLCache(ttl=30, clock=lambda: now[0])
+    now[0] = 1000.0
+    start = time.perf_counter()
+    duplicates = 0
+    for index in range(EVENTS):
+        now[0] += 0.01
+        fingerprint = ("emby", "playback.progress", f"user{index % STREAMS}", "item", "session",
+                       (index // STREAMS) // 3)
+        if events.age(fingerprint) is not None:
+            duplicates += 1
+        else:
+            events.set(fingerprint)
+    elapsed = time.perf_counter() - start
+
+    # 30秒窗口覆盖3000个事件，缓存大小保持有界
+    assert len(events) <= 3000, len(events)
+    assert duplicates > 0 and events.expired > 0
+    assert events.stats()["hits"] == duplicates
+    per_event = elapsed / EVENTS
+    assert per_event < 50e-6, per_event
+
+    print(
+        f"PASS: WatchSync dedup handles {EVENTS} events in {elapsed * 1000:.0f}ms "
+        f"({per_event * 1e6:.2f}us/event, hit rate {events.stats()['hit_rate']:.2%})"
+    )
+
+
+if __name__ == "__main__":
+    main()